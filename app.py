@@ -6,7 +6,7 @@ This replaces app.py with proper dependency injection and configuration manageme
 import os
 import logging
 import nest_asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
 from flask import Flask, request, jsonify, render_template
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from telegram import Update
@@ -145,6 +145,7 @@ class BotApplication:
             websocket_service = get_websocket_service()
             websocket_service.set_socketio(self.socketio)
             self.logger.info("SocketIO connected to WebSocket service")
+            websocket_service.start_deadline_scheduler()
         except Exception as e:
             self.logger.warning(f"Failed to connect SocketIO to WebSocket service: {e}")
 
@@ -400,80 +401,81 @@ class BotApplication:
         
         @app.route("/api/products")
         def api_products():
-            """API endpoint for products data with pagination support."""
+            """API endpoint for products data with keyset (cursor) pagination."""
             try:
                 from core.modern_service_container import get_product_service
+                from utils.api_responses import cursor_paginated_response, validation_error
+                from utils.pagination import clamp_page_size, InvalidCursorError
 
                 product_service = get_product_service()
 
-                # Get pagination parameters with validation
-                limit = request.args.get('limit', type=int)
-                offset = request.args.get('offset', type=int, default=0)
+                limit = clamp_page_size(request.args.get('limit', type=int))
+                cursor = request.args.get('cursor')
 
-                # Apply max limit constraint (500 products max per request)
-                if limit is not None:
-                    limit = min(limit, 500)
-
-                # Ensure offset is non-negative
-                offset = max(0, offset)
-
-                products_with_stock = product_service.get_products_with_stock(limit=limit, offset=offset)
-
-                return jsonify({
-                    "products": [item.to_dict() for item in products_with_stock],
-                    "pagination": {
-                        "limit": limit,
-                        "offset": offset,
-                        "count": len(products_with_stock)
-                    }
-                })
+                try:
+                    page = product_service.get_products_with_stock_page(limit=limit, cursor=cursor)
+                except InvalidCursorError as e:
+                    return validation_error(str(e))
+
+                return cursor_paginated_response(
+                    "products",
+                    [item.to_dict() for item in page.items],
+                    page
+                )
             except Exception as e:
                 self.logger.error(f"Products API error: {e}", exc_info=True)
                 return jsonify({"error": "Erro ao carregar produtos"}), 500
         
         @app.route("/api/sales")
         def api_sales():
-            """API endpoint for sales data."""
+            """API endpoint for sales data with keyset (cursor) pagination."""
             try:
                 from core.modern_service_container import get_sales_service
+                from utils.api_responses import cursor_paginated_response, validation_error
+                from utils.pagination import clamp_page_size, InvalidCursorError
 
                 sales_service = get_sales_service()
-                sales = sales_service.get_sales_with_details(limit=50)
 
-                return jsonify({"sales": [sale.to_dict() for sale in sales]})
+                limit = clamp_page_size(request.args.get('limit', type=int))
+                cursor = request.args.get('cursor')
+
+                try:
+                    page = sales_service.get_sales_with_details_page(limit=limit, cursor=cursor)
+                except InvalidCursorError as e:
+                    return validation_error(str(e))
+
+                return cursor_paginated_response(
+                    "sales",
+                    [sale.to_dict() for sale in page.items],
+                    page
+                )
             except Exception as e:
                 self.logger.error(f"Sales API error: {e}")
                 return jsonify({"error": "Erro ao carregar vendas"}), 500
         
         @app.route("/api/users")
         def api_users():
-            """API endpoint for users data with pagination support."""
+            """API endpoint for users data with keyset (cursor) pagination."""
             try:
                 from core.modern_service_container import get_user_service
+                from utils.api_responses import cursor_paginated_response, validation_error
+                from utils.pagination import clamp_page_size, InvalidCursorError
 
                 user_service = get_user_service(None)
 
-                # Get pagination parameters with validation
-                limit = request.args.get('limit', type=int)
-                offset = request.args.get('offset', type=int, default=0)
-
-                # Apply max limit constraint (500 users max per request)
-                if limit is not None:
-                    limit = min(limit, 500)
-
-                # Ensure offset is non-negative
-                offset = max(0, offset)
+                limit = clamp_page_size(request.args.get('limit', type=int))
+                cursor = request.args.get('cursor')
 
-                users = user_service.get_users_with_stats(limit=limit, offset=offset)
-
-                return jsonify({
-                    "users": [user.to_dict() for user in users],
-                    "pagination": {
-                        "limit": limit,
-                        "offset": offset,
-                        "count": len(users)
-                    }
-                })
+                try:
+                    page = user_service.get_users_with_stats_page(limit=limit, cursor=cursor)
+                except InvalidCursorError as e:
+                    return validation_error(str(e))
+
+                return cursor_paginated_response(
+                    "users",
+                    [user.to_dict() for user in page.items],
+                    page
+                )
             except Exception as e:
                 self.logger.error(f"Users API error: {e}")
                 return jsonify({"error": "Erro ao carregar usuários"}), 500
@@ -988,6 +990,88 @@ class BotApplication:
                 self.logger.error(f"Expedition consume API error: {e}", exc_info=True)
                 return jsonify({"error": str(e)}), 500
 
+        @app.route("/api/expeditions/<int:expedition_id>/consume-batch", methods=["POST"])
+        def api_expedition_consume_batch(expedition_id: int):
+            """
+            API endpoint to record many consumptions in one transaction.
+
+            Body: {"consumptions": [{"product_id", "quantity", "pirate_name", "price"}, ...]}.
+            A row may give "item_id" (the expedition item) instead of "product_id", for
+            items without a product. Returns per-row results in request order; rejected
+            rows (including invalid prices) do not block the rest.
+            """
+            try:
+                from core.modern_service_container import (
+                    get_expedition_service, get_user_service, get_brambler_service
+                )
+                from decimal import Decimal, InvalidOperation
+                from models.expedition import ItemConsumptionRequest
+                from services.base_service import ValidationError, NotFoundError
+
+                expedition_service = get_expedition_service()
+                user_service = get_user_service(None)
+
+                # Check authentication - require admin+ permission
+                chat_id = request.headers.get('X-Chat-ID')
+                if not chat_id:
+                    return jsonify({"error": "Authentication required"}), 401
+
+                try:
+                    chat_id = int(chat_id)
+                    user_level = user_service.get_user_permission_level(chat_id)
+                    if not user_level or user_level.value not in ['owner', 'admin']:
+                        return jsonify({"error": "Admin permission required"}), 403
+                except (ValueError, TypeError):
+                    return jsonify({"error": "Invalid chat ID"}), 400
+
+                data = request.get_json() or {}
+                rows = data.get('consumptions')
+                if not isinstance(rows, list) or not rows:
+                    return jsonify({"error": "consumptions must be a non-empty list"}), 400
+                if len(rows) > 500:
+                    return jsonify({"error": "At most 500 consumptions per request"}), 400
+
+                # Resolve products and consumer names once for the whole batch
+                item_ids_by_product = {
+                    item.produto_id: item.id for item in expedition_service.get_expedition_items(expedition_id)
+                    if item.produto_id is not None
+                }
+                consumer_names = {
+                    pn.pirate_name: pn.original_name
+                    for pn in get_brambler_service().get_expedition_pirate_names(expedition_id)
+                    if pn.original_name
+                }
+
+                consumption_requests = []
+                for index, row in enumerate(rows):
+                    try:
+                        if row.get('item_id') is not None:
+                            item_id = int(row['item_id'])
+                        else:
+                            item_id = item_ids_by_product.get(int(row['product_id']))
+                        pirate_name = str(row['pirate_name']).strip()
+                        consumption_requests.append(ItemConsumptionRequest(
+                            expedition_item_id=item_id,
+                            consumer_name=consumer_names.get(pirate_name, pirate_name),
+                            pirate_name=pirate_name,
+                            quantity_consumed=int(row['quantity']),
+                            unit_price=Decimal(str(row['price']))
+                        ))
+                    except (KeyError, ValueError, TypeError, AttributeError, InvalidOperation) as e:
+                        return jsonify({"error": f"Invalid consumption at index {index}: {str(e)}"}), 400
+
+                result = expedition_service.consume_items_bulk(expedition_id, consumption_requests)
+                status = 201 if result.recorded_count else 400
+                return jsonify(result.to_dict()), status
+
+            except ValidationError as e:
+                return jsonify({"error": str(e)}), 400
+            except NotFoundError as e:
+                return jsonify({"error": str(e)}), 404
+            except Exception as e:
+                self.logger.error(f"Expedition consume batch API error: {e}", exc_info=True)
+                return jsonify({"error": "Internal server error"}), 500
+
         @app.route("/api/brambler/generate/<int:expedition_id>", methods=["POST"])
         def api_brambler_generate(expedition_id: int):
             """API endpoint for generating pirate names for expedition."""
@@ -1097,11 +1181,11 @@ class BotApplication:
             """
             API endpoint for decrypting ALL pirates and items across ALL owner's expeditions.
             Uses the owner's master key to decrypt data from all their expeditions at once.
+            Set include_archived in the body to also decrypt archived expeditions.
             """
             try:
-                from core.modern_service_container import get_brambler_service, get_user_service
+                from core.modern_service_container import get_user_service
 
-                brambler_service = get_brambler_service()
                 user_service = get_user_service(None)
 
                 # Check authentication - require owner permission
@@ -1126,20 +1210,17 @@ class BotApplication:
                 if not owner_key:
                     return jsonify({"error": "owner_key is required"}), 400
 
-                # Decrypt ALL pirates and items for this owner
-                pirate_mappings = brambler_service.decrypt_all_owner_pirates(chat_id, owner_key)
-                item_mappings = brambler_service.decrypt_all_owner_items(chat_id, owner_key)
+                include_archived = bool(data.get('include_archived', False))
 
-                self.logger.info(f"Bulk decrypted {len(pirate_mappings)} pirates and {len(item_mappings)} items for owner {chat_id}")
+                # Stream rows from a server-side cursor, decrypt them in parallel
+                # chunks and write the JSON body as mappings come in
+                from flask import Response
+                from services.bulk_decryption_service import BulkDecryptionService
 
-                return jsonify({
-                    "success": True,
-                    "owner_chat_id": chat_id,
-                    "pirate_mappings": pirate_mappings,
-                    "item_mappings": item_mappings,
-                    "total_pirates_decrypted": len(pirate_mappings),
-                    "total_items_decrypted": len(item_mappings)
-                })
+                body = BulkDecryptionService().stream_decrypt_all_json(
+                    chat_id, owner_key, include_archived=include_archived
+                )
+                return Response(body, mimetype='application/json')
 
             except Exception as e:
                 import traceback
@@ -1202,12 +1283,9 @@ class BotApplication:
             """
             try:
                 from core.modern_service_container import get_user_service
-                from utils.encryption import get_encryption_service
-                from database import get_db_manager
+                from services.master_key_service import MasterKeyService
 
                 user_service = get_user_service(None)
-                encryption_service = get_encryption_service()
-                db_manager = get_db_manager()
 
                 # Check authentication - require owner permission
                 chat_id = request.headers.get('X-Chat-ID')
@@ -1222,57 +1300,24 @@ class BotApplication:
                 except (ValueError, TypeError):
                     return jsonify({"error": "Invalid chat ID"}), 400
 
-                # Check if user already has a master key stored
-                with db_manager.get_connection() as conn:
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            SELECT master_key, created_at, key_version
-                            FROM user_master_keys
-                            WHERE owner_chat_id = %s
-                        """, (chat_id,))
-                        result = cur.fetchone()
+                # Stored key if the user has one; otherwise derived once and stored
+                record = MasterKeyService().get_master_key_record(chat_id)
+                created_at = record['created_at']
 
-                        if result:
-                            # Update last_accessed timestamp
-                            cur.execute("""
-                                UPDATE user_master_keys
-                                SET last_accessed = CURRENT_TIMESTAMP
-                                WHERE owner_chat_id = %s
-                            """, (chat_id,))
-                            conn.commit()
-
-                            master_key, created_at, key_version = result
-                            return jsonify({
-                                "success": True,
-                                "master_key": master_key,
-                                "owner_chat_id": chat_id,
-                                "created_at": created_at.isoformat() if created_at else None,
-                                "key_version": key_version,
-                                "message": "This is your master key - it works for ALL your expeditions"
-                            })
+                if record['created']:
+                    self.logger.info(f"Generated and stored master key for chat_id {chat_id}")
+                    message = "New master key generated - save this key! It works for ALL your expeditions"
+                else:
+                    message = "This is your master key - it works for ALL your expeditions"
 
-                        else:
-                            # Generate and store new master key
-                            master_key = encryption_service.generate_user_master_key(chat_id)
-
-                            cur.execute("""
-                                INSERT INTO user_master_keys (owner_chat_id, master_key, key_version)
-                                VALUES (%s, %s, 1)
-                                RETURNING created_at
-                            """, (chat_id, master_key))
-                            created_at = cur.fetchone()[0]
-                            conn.commit()
-
-                            self.logger.info(f"Generated and stored master key for chat_id {chat_id}")
-
-                            return jsonify({
-                                "success": True,
-                                "master_key": master_key,
-                                "owner_chat_id": chat_id,
-                                "created_at": created_at.isoformat() if created_at else None,
-                                "key_version": 1,
-                                "message": "New master key generated - save this key! It works for ALL your expeditions"
-                            })
+                return jsonify({
+                    "success": True,
+                    "master_key": record['master_key'],
+                    "owner_chat_id": chat_id,
+                    "created_at": created_at.isoformat() if created_at else None,
+                    "key_version": record['key_version'],
+                    "message": message
+                })
 
             except Exception as e:
                 import traceback
@@ -1283,7 +1328,9 @@ class BotApplication:
         def api_brambler_names(expedition_id: int):
             """API endpoint for getting pirate names for an expedition."""
             try:
-                from core.modern_service_container import get_expedition_service, get_user_service
+                from core.modern_service_container import (
+                    get_brambler_service, get_expedition_service, get_user_service
+                )
 
                 expedition_service = get_expedition_service()
                 user_service = get_user_service(None)
@@ -1312,100 +1359,13 @@ class BotApplication:
                 if not (is_owner or is_privileged):
                     return jsonify({"error": "Access denied"}), 403
 
-                # Get all pirate names and stats in a SINGLE optimized query
-                from database import get_database_manager
-                db_manager = get_database_manager()
+                # Stats come from the per-pirate read model (no assignment x payment fan-out)
+                pirate_names_data = get_brambler_service().get_expedition_pirate_stats(expedition_id)
 
-                pirate_names_data = []
-                with db_manager.get_connection() as conn:
-                    with conn.cursor() as cur:
-                        # Single bulk query with all data
-                        cur.execute("""
-                            SELECT
-                                ep.id,
-                                ep.expedition_id,
-                                ep.pirate_name,
-                                ep.original_name,
-                                ep.joined_at,
-                                COALESCE(COUNT(DISTINCT ea.id), 0) as total_items,
-                                COALESCE(SUM(ea.consumed_quantity), 0) as items_consumed,
-                                COALESCE(SUM(ea.total_cost), 0) as total_spent,
-                                COALESCE(SUM(CASE WHEN epm.payment_status = 'completed'
-                                    THEN epm.payment_amount ELSE 0 END), 0) as total_paid
-                            FROM expedition_pirates ep
-                            LEFT JOIN expedition_assignments ea ON ea.pirate_id = ep.id
-                            LEFT JOIN expedition_payments epm ON epm.pirate_id = ep.id
-                            WHERE ep.expedition_id = %s
-                            GROUP BY ep.id, ep.expedition_id, ep.pirate_name, ep.original_name, ep.joined_at
-                            ORDER BY ep.joined_at DESC
-                        """, (expedition_id,))
-
-                        results = cur.fetchall()
-
-                        # ✅ OPTIMIZED: Get all recent items in a single query using window function
-                        # This eliminates N+1 query pattern
-                        cur.execute("""
-                            WITH ranked_items AS (
-                                SELECT
-                                    ea.pirate_id,
-                                    p.nome as product_name,
-                                    p.emoji as product_emoji,
-                                    ea.consumed_quantity,
-                                    ea.completed_at,
-                                    ROW_NUMBER() OVER (PARTITION BY ea.pirate_id ORDER BY ea.completed_at DESC) as rn
-                                FROM expedition_assignments ea
-                                JOIN expedition_items ei ON ea.expedition_item_id = ei.id
-                                JOIN produtos p ON ei.produto_id = p.id
-                                WHERE ea.pirate_id IN (
-                                    SELECT id FROM expedition_pirates WHERE expedition_id = %s
-                                )
-                            )
-                            SELECT pirate_id, product_name, product_emoji, consumed_quantity, completed_at
-                            FROM ranked_items
-                            WHERE rn <= 3
-                            ORDER BY pirate_id, rn
-                        """, (expedition_id,))
-
-                        # Group recent items by pirate_id for fast lookup
-                        recent_items_by_pirate = {}
-                        for item_row in cur.fetchall():
-                            pirate_id_key, product_name, product_emoji, quantity, consumed_at = item_row
-                            if pirate_id_key not in recent_items_by_pirate:
-                                recent_items_by_pirate[pirate_id_key] = []
-                            recent_items_by_pirate[pirate_id_key].append({
-                                "name": product_name,
-                                "emoji": product_emoji or "",
-                                "quantity": quantity,
-                                "consumed_at": consumed_at.isoformat() if consumed_at else None
-                            })
-
-                        # Only show original names to expedition owner or system owner
-                        show_original = is_owner or user_level.value == 'owner'
-
-                        for row in results:
-                            (pirate_id, exp_id, pirate_name, original_name, joined_at,
-                             total_items, items_consumed, total_spent, total_paid) = row
-
-                            debt = float(total_spent or 0) - float(total_paid or 0)
-
-                            # Get recent items from pre-fetched dictionary (no additional query!)
-                            recent_items = recent_items_by_pirate.get(pirate_id, [])
-
-                            pirate_names_data.append({
-                                "id": pirate_id,
-                                "expedition_id": exp_id,
-                                "original_name": original_name if show_original else None,
-                                "pirate_name": pirate_name,
-                                "created_at": joined_at.isoformat() if joined_at else None,
-                                "stats": {
-                                    "total_items": int(total_items or 0),
-                                    "items_consumed": int(items_consumed or 0),
-                                    "total_spent": float(total_spent or 0),
-                                    "total_paid": float(total_paid or 0),
-                                    "debt": debt
-                                },
-                                "recent_items": recent_items
-                            })
+                # Only show original names to expedition owner or system owner
+                if not (is_owner or user_level.value == 'owner'):
+                    for pirate in pirate_names_data:
+                        pirate["original_name"] = None
 
                 return jsonify({"pirate_names": pirate_names_data})
 
@@ -1416,11 +1376,14 @@ class BotApplication:
         @app.route("/api/brambler/all-names", methods=["GET"])
         def api_brambler_all_names():
             """API endpoint for getting ALL pirate names across all expeditions (maintenance).
-            OPTIMIZED: Uses caching and pagination for faster response.
+            OPTIMIZED: Uses keyset (cursor) pagination so deep pages stay as fast as the first.
+            Pass include_archived=true to also page through archived expeditions.
+            Filters (owner_chat_id, expedition_id, search) are applied in SQL, ciphertexts are
+            only returned with include_ciphertext=true, and total_count comes from the
+            per-expedition pirate counters (omitted for name searches).
             """
             try:
                 from core.modern_service_container import get_brambler_service, get_user_service
-                from functools import lru_cache
                 import time
 
                 start_time = time.time()
@@ -1442,29 +1405,48 @@ class BotApplication:
                 except (ValueError, TypeError):
                     return jsonify({"error": "Invalid chat ID"}), 400
 
-                # OPTIMIZATION: Get pagination parameters (default limit 100 for fast response)
-                limit = min(int(request.args.get('limit', 100)), 1000)  # Max 1000
-                offset = int(request.args.get('offset', 0))
+                from utils.api_responses import cursor_paginated_response, validation_error
+                from utils.pagination import clamp_page_size, InvalidCursorError
 
-                # Get pirate names with optimized query
-                self.logger.info(f"Fetching pirates with limit={limit}, offset={offset}")
-                all_pirates = brambler_service.get_all_expedition_pirates()
+                # Keyset pagination (default limit 100 for fast response, max 1000)
+                limit = clamp_page_size(request.args.get('limit', type=int), default=100, maximum=1000)
+                cursor = request.args.get('cursor')
+                include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+                include_ciphertext = request.args.get('include_ciphertext', 'false').lower() == 'true'
+                owner_chat_id = request.args.get('owner_chat_id', type=int)
+                expedition_id = request.args.get('expedition_id', type=int)
+                search = (request.args.get('search') or '').strip() or None
 
-                # Apply pagination in Python (already limited to 1000 in query)
-                paginated_pirates = all_pirates[offset:offset+limit]
+                self.logger.info(f"Fetching pirates with limit={limit}, cursor={'yes' if cursor else 'no'}")
+                try:
+                    page = brambler_service.get_all_expedition_pirates(
+                        limit=limit, cursor=cursor, include_archived=include_archived,
+                        owner_chat_id=owner_chat_id, expedition_id=expedition_id,
+                        search=search, include_ciphertext=include_ciphertext
+                    )
+                except InvalidCursorError as e:
+                    return validation_error(str(e))
+
+                total_count = None
+                if not search:
+                    total_count = brambler_service.count_expedition_pirates(
+                        owner_chat_id=owner_chat_id, expedition_id=expedition_id,
+                        include_archived=include_archived
+                    )
 
                 elapsed = time.time() - start_time
                 self.logger.info(f"Brambler all-names completed in {elapsed:.3f}s")
 
-                return jsonify({
-                    "success": True,
-                    "pirates": paginated_pirates,
-                    "total_count": len(all_pirates),
-                    "returned_count": len(paginated_pirates),
-                    "limit": limit,
-                    "offset": offset,
-                    "response_time_ms": int(elapsed * 1000)
-                })
+                return cursor_paginated_response(
+                    "pirates",
+                    page.items,
+                    page,
+                    success=True,
+                    returned_count=len(page.items),
+                    total_count=total_count,
+                    limit=limit,
+                    response_time_ms=int(elapsed * 1000)
+                )
 
             except Exception as e:
                 self.logger.error(f"Brambler all-names API error: {e}", exc_info=True)
@@ -1852,7 +1834,9 @@ class BotApplication:
 
         @app.route("/api/dashboard/timeline", methods=["GET"])
         def api_dashboard_timeline():
-            """API endpoint for expedition timeline data for dashboard."""
+            """API endpoint for expedition timeline data for dashboard.
+            Pass include_archived=true to also list archived expeditions.
+            """
             try:
                 from core.modern_service_container import get_expedition_service, get_user_service
 
@@ -1872,34 +1856,25 @@ class BotApplication:
                 except (ValueError, TypeError):
                     return jsonify({"error": "Invalid chat ID"}), 400
 
-                # Get all expedition data in a single optimized query
-                expedition_data_map = expedition_service.get_all_expedition_responses_bulk()
+                include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+
+                # Per-expedition rows come from the expedition_progress summary; the
+                # counters are taken from the same rows so they cover archived ones too
+                expedition_data_map = expedition_service.get_all_expedition_responses_bulk(
+                    include_archived=include_archived
+                )
+                expeditions = expedition_data_map.values()
 
-                # Prepare timeline data
-                timeline_data = []
                 stats = {
-                    "total_expeditions": 0,
-                    "active_expeditions": 0,
-                    "completed_expeditions": 0,
-                    "overdue_expeditions": 0
+                    "total_expeditions": len(expedition_data_map),
+                    "active_expeditions": sum(1 for exp in expeditions if exp['status'] == 'active'),
+                    "completed_expeditions": sum(1 for exp in expeditions if exp['status'] == 'completed'),
+                    "overdue_expeditions": sum(1 for exp in expeditions if exp['is_overdue'])
                 }
 
-                current_time = datetime.now()
-
-                for expedition_id, exp_data in expedition_data_map.items():
-                    # Determine if overdue
-                    deadline = None
-                    if exp_data.get('deadline'):
-                        from datetime import datetime as dt
-                        deadline = dt.fromisoformat(exp_data['deadline'])
-
-                    is_overdue = (
-                        deadline and
-                        deadline < current_time and
-                        exp_data['status'] == 'active'
-                    )
-
-                    timeline_entry = {
+                # Rows arrive newest first
+                timeline_data = [
+                    {
                         "id": exp_data['id'],
                         "name": exp_data['name'],
                         "owner_chat_id": exp_data['owner_chat_id'],
@@ -1907,7 +1882,8 @@ class BotApplication:
                         "deadline": exp_data['deadline'],
                         "created_at": exp_data['created_at'],
                         "completed_at": exp_data['completed_at'],
-                        "is_overdue": is_overdue,
+                        "is_overdue": exp_data['is_overdue'],
+                        "is_archived": exp_data['is_archived'],
                         "progress": {
                             "completion_percentage": exp_data['completion_percentage'],
                             "total_items": exp_data['total_items'],
@@ -1918,19 +1894,8 @@ class BotApplication:
                             "remaining_value": exp_data['remaining_value']
                         }
                     }
-                    timeline_data.append(timeline_entry)
-
-                    # Update stats
-                    stats["total_expeditions"] += 1
-                    if exp_data['status'] == 'active':
-                        stats["active_expeditions"] += 1
-                        if is_overdue:
-                            stats["overdue_expeditions"] += 1
-                    elif exp_data['status'] == 'completed':
-                        stats["completed_expeditions"] += 1
-
-                # Sort by creation date (newest first)
-                timeline_data.sort(key=lambda x: x['created_at'] or '', reverse=True)
+                    for exp_data in expedition_data_map.values()
+                ]
 
                 return jsonify({
                     "timeline": timeline_data,
@@ -2023,7 +1988,6 @@ class BotApplication:
             """API endpoint for expedition analytics and statistics."""
             try:
                 from core.modern_service_container import get_expedition_service, get_user_service
-                from decimal import Decimal
                 from utils.api_responses import auth_required_error, permission_denied_error, validation_error
 
                 expedition_service = get_expedition_service()
@@ -2042,120 +2006,8 @@ class BotApplication:
                 except (ValueError, TypeError):
                     return validation_error("Invalid chat ID")
 
-                # Get all expedition data in a single optimized query
-                expedition_data_map = expedition_service.get_all_expedition_responses_bulk()
-
-                # Initialize analytics data
-                analytics = {
-                    "overview": {
-                        "total_expeditions": len(expedition_data_map),
-                        "active_expeditions": 0,
-                        "completed_expeditions": 0,
-                        "cancelled_expeditions": 0,
-                        "overdue_expeditions": 0
-                    },
-                    "value_analysis": {
-                        "total_expedition_value": 0.0,
-                        "completed_expedition_value": 0.0,
-                        "active_expedition_value": 0.0,
-                        "consumed_value": 0.0,
-                        "pending_value": 0.0
-                    },
-                    "progress_analysis": {
-                        "average_completion_rate": 0.0,
-                        "expeditions_by_progress": {
-                            "0-25%": 0,
-                            "25-50%": 0,
-                            "50-75%": 0,
-                            "75-100%": 0,
-                            "completed": 0
-                        }
-                    },
-                    "timeline_analysis": {
-                        "expeditions_created_this_week": 0,
-                        "expeditions_created_this_month": 0,
-                        "expeditions_completed_this_week": 0,
-                        "expeditions_completed_this_month": 0
-                    }
-                }
-
-                current_time = datetime.now()
-                week_ago = current_time - timedelta(days=7)
-                month_ago = current_time - timedelta(days=30)
-
-                total_completion_percentage = 0.0
-                expeditions_with_progress = 0
-
-                for expedition_id, exp_data in expedition_data_map.items():
-                    # Status analysis
-                    if exp_data['status'] == 'active':
-                        analytics["overview"]["active_expeditions"] += 1
-                        analytics["value_analysis"]["active_expedition_value"] += exp_data['total_value']
-                    elif exp_data['status'] == 'completed':
-                        analytics["overview"]["completed_expeditions"] += 1
-                        analytics["value_analysis"]["completed_expedition_value"] += exp_data['total_value']
-                    elif exp_data['status'] == 'cancelled':
-                        analytics["overview"]["cancelled_expeditions"] += 1
-
-                    # Overdue check
-                    deadline = None
-                    if exp_data.get('deadline'):
-                        from datetime import datetime as dt
-                        deadline = dt.fromisoformat(exp_data['deadline'])
-                    if deadline and deadline < current_time and exp_data['status'] == 'active':
-                        analytics["overview"]["overdue_expeditions"] += 1
-
-                    # Value analysis
-                    analytics["value_analysis"]["total_expedition_value"] += exp_data['total_value']
-                    analytics["value_analysis"]["consumed_value"] += exp_data['consumed_value']
-                    analytics["value_analysis"]["pending_value"] += exp_data['remaining_value']
-
-                    # Progress analysis - use model method for categorization
-                    from models.expedition import ExpeditionResponse, ExpeditionStatus
-                    completion_rate = exp_data['completion_percentage']
-                    total_completion_percentage += completion_rate
-                    expeditions_with_progress += 1
-
-                    # Use business logic from model
-                    status = ExpeditionStatus.from_string(exp_data['status'])
-                    progress_category = ExpeditionResponse.categorize_progress(status, completion_rate)
-
-                    # Map category to analytics buckets
-                    category_map = {
-                        "completed": "completed",
-                        "almost_done": "75-100%",
-                        "in_progress": "50-75%",
-                        "started": "25-50%",
-                        "not_started": "0-25%"
-                    }
-                    analytics_bucket = category_map.get(progress_category, "0-25%")
-                    analytics["progress_analysis"]["expeditions_by_progress"][analytics_bucket] += 1
-
-                    # Timeline analysis
-                    created_at = None
-                    completed_at = None
-                    if exp_data.get('created_at'):
-                        from datetime import datetime as dt
-                        created_at = dt.fromisoformat(exp_data['created_at'])
-                    if exp_data.get('completed_at'):
-                        from datetime import datetime as dt
-                        completed_at = dt.fromisoformat(exp_data['completed_at'])
-
-                    if created_at:
-                        if created_at >= week_ago:
-                            analytics["timeline_analysis"]["expeditions_created_this_week"] += 1
-                        if created_at >= month_ago:
-                            analytics["timeline_analysis"]["expeditions_created_this_month"] += 1
-
-                    if completed_at:
-                        if completed_at >= week_ago:
-                            analytics["timeline_analysis"]["expeditions_completed_this_week"] += 1
-                        if completed_at >= month_ago:
-                            analytics["timeline_analysis"]["expeditions_completed_this_month"] += 1
-
-                # Calculate average completion rate
-                if expeditions_with_progress > 0:
-                    analytics["progress_analysis"]["average_completion_rate"] = total_completion_percentage / expeditions_with_progress
+                # All counters are FILTER aggregates over the expedition_progress summary
+                analytics = expedition_service.get_dashboard_analytics()
 
                 return jsonify(analytics)
 
@@ -2307,6 +2159,63 @@ class BotApplication:
                 self.logger.error(f"Pay consumption API error: {e}")
                 return jsonify({"error": "Internal server error"}), 500
 
+        @app.route("/api/expeditions/consumptions/pay-batch", methods=["POST"])
+        def api_pay_consumptions_batch():
+            """
+            API endpoint to pay many consumptions in one transaction.
+
+            Body: {"assignment_ids": [...]} or {"pirate_id": N}, plus optional
+            "amount" (allocated oldest-first; omitted pays everything outstanding)
+            and "payment_method".
+            """
+            try:
+                from core.modern_service_container import get_expedition_service, get_user_service
+                from decimal import Decimal, InvalidOperation
+                from models.expedition import BatchPaymentRequest
+                from services.base_service import NotFoundError, ValidationError
+
+                expedition_service = get_expedition_service()
+                user_service = get_user_service(None)
+
+                # Check authentication - require admin+ permission
+                chat_id = request.headers.get('X-Chat-ID')
+                if not chat_id:
+                    return jsonify({"error": "Authentication required"}), 401
+
+                try:
+                    chat_id = int(chat_id)
+                    user_level = user_service.get_user_permission_level(chat_id)
+                    if not user_level or user_level.value not in ['owner', 'admin']:
+                        return jsonify({"error": "Admin permission required"}), 403
+                except (ValueError, TypeError):
+                    return jsonify({"error": "Invalid chat ID"}), 400
+
+                data = request.get_json() or {}
+
+                try:
+                    amount = Decimal(str(data['amount'])) if data.get('amount') is not None else None
+                except (InvalidOperation, ValueError, TypeError):
+                    return jsonify({"error": "Invalid payment amount"}), 400
+
+                batch_request = BatchPaymentRequest(
+                    assignment_ids=data.get('assignment_ids'),
+                    pirate_id=data.get('pirate_id'),
+                    amount=amount,
+                    payment_method=data.get('payment_method'),
+                    processed_by_chat_id=chat_id
+                )
+
+                result = expedition_service.pay_assignments_batch(batch_request)
+                return jsonify(result.to_dict()), 200
+
+            except NotFoundError as e:
+                return jsonify({"error": str(e)}), 404
+            except ValidationError as e:
+                return jsonify({"error": str(e)}), 400
+            except Exception as e:
+                self.logger.error(f"Batch pay consumptions API error: {e}")
+                return jsonify({"error": "Internal server error"}), 500
+
         @app.route("/api/expeditions/export", methods=["GET"])
         def export_expedition_data():
             """Export expedition data to CSV."""
@@ -2480,6 +2389,9 @@ class BotApplication:
                 from core.modern_service_container import get_export_service
                 export_service = get_export_service()
 
+                from utils.api_responses import cursor_paginated_response, validation_error
+                from utils.pagination import clamp_page_size, InvalidCursorError
+
                 # Parse query parameters
                 search_query = request.args.get('q')
                 status_filter = request.args.get('status')
@@ -2488,12 +2400,8 @@ class BotApplication:
                 date_to_str = request.args.get('date_to')
                 sort_by = request.args.get('sort_by', 'created_at')
                 sort_order = request.args.get('sort_order', 'DESC')
-                limit = request.args.get('limit', 50, type=int)
-                offset = request.args.get('offset', 0, type=int)
-
-                # Validate limit
-                if limit > 1000:
-                    limit = 1000
+                limit = clamp_page_size(request.args.get('limit', type=int))
+                cursor = request.args.get('cursor')
 
                 date_from = None
                 date_to = None
@@ -2510,25 +2418,24 @@ class BotApplication:
                         return jsonify({"error": "Invalid date_to format. Use ISO format."}), 400
 
                 # Perform search
-                results, total_count = export_service.search_expeditions(
-                    search_query=search_query,
-                    status_filter=status_filter,
-                    owner_chat_id=owner_chat_id,
-                    date_from=date_from,
-                    date_to=date_to,
-                    sort_by=sort_by,
-                    sort_order=sort_order,
-                    limit=limit,
-                    offset=offset
-                )
+                try:
+                    page, total_count = export_service.search_expeditions(
+                        search_query=search_query,
+                        status_filter=status_filter,
+                        owner_chat_id=owner_chat_id,
+                        date_from=date_from,
+                        date_to=date_to,
+                        sort_by=sort_by,
+                        sort_order=sort_order,
+                        limit=limit,
+                        cursor=cursor
+                    )
+                except InvalidCursorError as e:
+                    return validation_error(str(e))
 
-                return jsonify({
-                    "results": results,
-                    "total_count": total_count,
-                    "limit": limit,
-                    "offset": offset,
-                    "has_more": offset + limit < total_count
-                })
+                # The total is only counted for the first page
+                extra = {} if total_count is None else {"total_count": total_count}
+                return cursor_paginated_response("results", page.items, page, **extra)
 
             except Exception as e:
                 self.logger.error(f"Search expeditions API error: {e}")
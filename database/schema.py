@@ -67,7 +67,8 @@ def initialize_schema():
         produto_id INTEGER REFERENCES Produtos(id),
         quantidade INTEGER NOT NULL,
         valor_unitario DECIMAL(10,2) NOT NULL,
-        produto_nome VARCHAR(100) NOT NULL
+        produto_nome VARCHAR(100) NOT NULL,
+        custo_unitario DECIMAL(10,2)
     );
 
     -- Create Estoque table
@@ -165,7 +166,9 @@ def initialize_schema():
         data_atualizacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
 
-    -- Create CashTransactions table (for balance history)
+    -- Create CashTransactions table (append-only cash ledger)
+    -- delta is the signed balance change; running balances are derived on read,
+    -- saldo_anterior/saldo_novo are only populated on legacy rows
     CREATE TABLE IF NOT EXISTS CashTransactions (
         id SERIAL PRIMARY KEY,
         tipo VARCHAR(20) NOT NULL CHECK (tipo IN ('receita', 'despesa', 'ajuste')),
@@ -174,11 +177,21 @@ def initialize_schema():
         venda_id INTEGER REFERENCES Vendas(id),
         pagamento_id INTEGER REFERENCES Pagamentos(id),
         usuario_chat_id BIGINT,
-        saldo_anterior DECIMAL(10,2) NOT NULL,
-        saldo_novo DECIMAL(10,2) NOT NULL,
+        saldo_anterior DECIMAL(10,2),
+        saldo_novo DECIMAL(10,2),
+        delta DECIMAL(12,2) NOT NULL DEFAULT 0,
         data_transacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
 
+    -- Create CashBalanceSnapshots table (periodic ledger checkpoints)
+    -- Current balance = latest snapshot saldo + SUM(delta) WHERE id > last_transaction_id
+    CREATE TABLE IF NOT EXISTS CashBalanceSnapshots (
+        id SERIAL PRIMARY KEY,
+        saldo DECIMAL(12,2) NOT NULL,
+        last_transaction_id INTEGER NOT NULL UNIQUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
 
     -- Create expedition_items table (for expedition inventory requirements)
     -- SECURITY: Supports full encryption mode for item anonymization
@@ -273,6 +286,127 @@ def initialize_schema():
         notes TEXT
     );
 
+    -- Daily rollups (one row per day and dimension) read by revenue/financial reports.
+    -- Closed days are served from these tables; only the current day hits raw tables.
+    -- daily_sales/daily_payments/daily_expedition_consumption are maintained by the
+    -- rollup triggers below; daily_cash is filled when a ledger day closes.
+    -- All of them can be rebuilt with migrations/backfill_daily_rollups.py
+    CREATE TABLE IF NOT EXISTS daily_sales (
+        day DATE NOT NULL,
+        comprador VARCHAR(100) NOT NULL,
+        sales_count INTEGER NOT NULL DEFAULT 0,
+        items_count INTEGER NOT NULL DEFAULT 0,
+        total_sales DECIMAL(14,2) NOT NULL DEFAULT 0,
+        total_cost DECIMAL(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, comprador)
+    );
+
+    CREATE TABLE IF NOT EXISTS daily_payments (
+        day DATE NOT NULL,
+        comprador VARCHAR(100) NOT NULL,
+        payments_count INTEGER NOT NULL DEFAULT 0,
+        total_paid DECIMAL(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, comprador)
+    );
+
+    CREATE TABLE IF NOT EXISTS daily_cash (
+        day DATE PRIMARY KEY,
+        transactions_count INTEGER NOT NULL DEFAULT 0,
+        total_receitas DECIMAL(14,2) NOT NULL DEFAULT 0,
+        total_despesas DECIMAL(14,2) NOT NULL DEFAULT 0,
+        total_ajustes DECIMAL(14,2) NOT NULL DEFAULT 0,
+        net_change DECIMAL(14,2) NOT NULL DEFAULT 0
+    );
+
+    -- No FK to Expeditions: cascaded assignment deletes still adjust these rows
+    CREATE TABLE IF NOT EXISTS daily_expedition_consumption (
+        day DATE NOT NULL,
+        expedition_id INTEGER NOT NULL,
+        consumptions_count INTEGER NOT NULL DEFAULT 0,
+        quantity_consumed INTEGER NOT NULL DEFAULT 0,
+        total_cost DECIMAL(14,2) NOT NULL DEFAULT 0,
+        total_paid DECIMAL(14,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, expedition_id)
+    );
+
+    -- Denormalized per-expedition document served by /api/expeditions/<id>.
+    -- The row holds the expedition header; items, recent consumptions and
+    -- pirates are entries in expedition_read_model_entries, and progress is
+    -- derived from them when the document is assembled. Kept current by the
+    -- read model triggers below; owner-only fields are projected at read time.
+    -- Rebuild with migrations/rebuild_expedition_read_models.py
+    CREATE TABLE IF NOT EXISTS expedition_read_models (
+        expedition_id INTEGER PRIMARY KEY REFERENCES Expeditions(id) ON DELETE CASCADE,
+        document JSONB NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- One row per item, recent consumption or pirate of a read model document,
+    -- keyed by the source row id, so a write only touches the entries it changes
+    CREATE TABLE IF NOT EXISTS expedition_read_model_entries (
+        expedition_id INTEGER NOT NULL REFERENCES expedition_read_models(expedition_id) ON DELETE CASCADE,
+        section VARCHAR(20) NOT NULL CHECK (section IN ('items', 'consumptions', 'pirates')),
+        entry_id INTEGER NOT NULL,
+        entry JSONB NOT NULL,
+        PRIMARY KEY (expedition_id, section, entry_id)
+    );
+
+    -- Per-expedition progress totals read by the dashboard, timeline and analytics
+    -- endpoints. Kept current by the progress triggers below; overdue is derived
+    -- at read time from expeditions.deadline/status since it changes with the clock.
+    CREATE TABLE IF NOT EXISTS expedition_progress (
+        expedition_id INTEGER PRIMARY KEY REFERENCES Expeditions(id) ON DELETE CASCADE,
+        total_items INTEGER NOT NULL DEFAULT 0,
+        total_quantity_needed INTEGER NOT NULL DEFAULT 0,
+        total_quantity_consumed INTEGER NOT NULL DEFAULT 0,
+        total_value DECIMAL(14,2) NOT NULL DEFAULT 0,
+        consumed_value DECIMAL(14,2) NOT NULL DEFAULT 0,
+        completion_percentage DECIMAL(5,2) NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Per-pirate totals and last three assignments read by /api/brambler/names.
+    -- Kept current by the pirate stats triggers below. Assignments and payments
+    -- are aggregated separately, so neither multiplies the other's rows.
+    CREATE TABLE IF NOT EXISTS expedition_pirate_stats (
+        pirate_id INTEGER PRIMARY KEY REFERENCES expedition_pirates(id) ON DELETE CASCADE,
+        expedition_id INTEGER NOT NULL,
+        total_items INTEGER NOT NULL DEFAULT 0,
+        items_consumed INTEGER NOT NULL DEFAULT 0,
+        total_spent DECIMAL(14,2) NOT NULL DEFAULT 0,
+        total_paid DECIMAL(14,2) NOT NULL DEFAULT 0,
+        debt DECIMAL(14,2) GENERATED ALWAYS AS (total_spent - total_paid) STORED,
+        recent_assignment_ids INTEGER[] NOT NULL DEFAULT '{}',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- Deadline alert thresholds already fired, keyed by the deadline they fired
+    -- for so a changed deadline re-arms every threshold. Claimed by the deadline
+    -- scheduler before sending, which makes each alert fire once across restarts
+    -- and processes.
+    CREATE TABLE IF NOT EXISTS expedition_deadline_alerts (
+        expedition_id INTEGER NOT NULL REFERENCES Expeditions(id) ON DELETE CASCADE,
+        alert_type VARCHAR(20) NOT NULL CHECK (alert_type IN ('info', 'warning', 'urgent', 'critical')),
+        deadline TIMESTAMP NOT NULL,
+        fired_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (expedition_id, deadline, alert_type)
+    );
+
+    -- Progress of the batched data migrations (services/batch_migration_service.py).
+    -- last_key is committed together with each batch's writes, so an interrupted
+    -- run resumes after the last batch that landed.
+    CREATE TABLE IF NOT EXISTS migration_checkpoints (
+        migration_name VARCHAR(100) PRIMARY KEY,
+        last_key BIGINT NOT NULL DEFAULT 0,
+        rows_scanned BIGINT NOT NULL DEFAULT 0,
+        rows_written BIGINT NOT NULL DEFAULT 0,
+        rows_failed BIGINT NOT NULL DEFAULT 0,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at TIMESTAMP
+    );
+
     -- Insert default configuration values
     INSERT INTO Configuracoes (chave, valor, descricao)
     VALUES ('frase_start', 'Bot inicializado com sucesso!', 'Mensagem exibida no comando /start')
@@ -283,6 +417,12 @@ def initialize_schema():
     SELECT 0.00
     WHERE NOT EXISTS (SELECT 1 FROM CashBalance LIMIT 1);
 
+    -- Seed the ledger with the legacy CashBalance value as its first snapshot
+    INSERT INTO CashBalanceSnapshots (saldo, last_transaction_id)
+    SELECT COALESCE((SELECT saldo_atual FROM CashBalance ORDER BY data_atualizacao DESC LIMIT 1), 0.00),
+           COALESCE((SELECT MAX(id) FROM CashTransactions), 0)
+    WHERE NOT EXISTS (SELECT 1 FROM CashBalanceSnapshots LIMIT 1);
+
     -- Create indexes for better performance
     CREATE INDEX IF NOT EXISTS idx_usuarios_chat_id ON Usuarios(chat_id);
     CREATE INDEX IF NOT EXISTS idx_usuarios_username ON Usuarios(username);
@@ -308,6 +448,8 @@ def initialize_schema():
     CREATE INDEX IF NOT EXISTS idx_cashtransactions_data ON CashTransactions(data_transacao);
     CREATE INDEX IF NOT EXISTS idx_cashtransactions_venda ON CashTransactions(venda_id);
     CREATE INDEX IF NOT EXISTS idx_cashtransactions_pagamento ON CashTransactions(pagamento_id);
+    -- Index-only SUM(delta) over the ledger tail since the latest snapshot
+    CREATE INDEX IF NOT EXISTS idx_cashtransactions_id_delta ON CashTransactions(id) INCLUDE (delta);
     CREATE INDEX IF NOT EXISTS idx_expeditions_owner ON Expeditions(owner_chat_id);
     CREATE INDEX IF NOT EXISTS idx_expeditions_status ON Expeditions(status);
     CREATE INDEX IF NOT EXISTS idx_expeditions_deadline ON Expeditions(deadline);
@@ -333,6 +475,24 @@ def initialize_schema():
     -- REMOVED: item_consumptions composite indexes - migrated to expedition_assignments
     -- For search functionality - name pattern search
     CREATE INDEX IF NOT EXISTS idx_expeditions_name_lower ON Expeditions(LOWER(name));
+    -- Substring (ILIKE '%q%') search needs a trigram index. pg_trgm may be
+    -- unavailable or need privileges the app role lacks; search then falls
+    -- back to a sequential scan with the same query.
+    DO $$
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN OTHERS THEN
+        RAISE NOTICE 'pg_trgm unavailable (%), expedition search will not use a trigram index', SQLERRM;
+    END $$;
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+            CREATE INDEX IF NOT EXISTS idx_expeditions_name_trgm ON Expeditions USING gin (name gin_trgm_ops);
+            -- Pirate name search on the brambler console
+            CREATE INDEX IF NOT EXISTS idx_expeditionpirates_pirate_name_trgm
+                ON expedition_pirates USING gin (pirate_name gin_trgm_ops);
+        END IF;
+    END $$;
     -- REMOVED: pirate_names composite indexes - table removed
     -- For analytics queries - expedition items with products
     CREATE INDEX IF NOT EXISTS idx_expeditionitems_produto_expedition ON expedition_items(produto_id, expedition_id);
@@ -383,6 +543,8 @@ def initialize_schema():
     -- Composite indexes for complex queries
     -- For assignment tracking by expedition and status
     CREATE INDEX IF NOT EXISTS idx_expeditionassignments_exp_status_assigned ON expedition_assignments(expedition_id, assignment_status, assigned_at DESC);
+    -- Per-expedition consumptions in time order for the analytics timeline
+    CREATE INDEX IF NOT EXISTS idx_expeditionassignments_exp_assigned ON expedition_assignments(expedition_id, assigned_at);
     -- For payment tracking by expedition and status
     CREATE INDEX IF NOT EXISTS idx_expeditionpayments_exp_status_processed ON expedition_payments(expedition_id, payment_status, processed_at DESC);
     -- For pirate management by expedition and status
@@ -405,6 +567,15 @@ def initialize_schema():
     -- For unpaid sales lookup optimization
     CREATE INDEX IF NOT EXISTS idx_vendas_buyer_date ON Vendas(comprador, data_venda DESC);
 
+    -- Keyset pagination indexes (match the ORDER BY of each paginated list endpoint)
+    -- /api/products: ORDER BY nome, id
+    CREATE INDEX IF NOT EXISTS idx_produtos_nome_id ON Produtos(nome, id);
+    -- /api/sales: ORDER BY data_venda DESC, id DESC
+    CREATE INDEX IF NOT EXISTS idx_vendas_data_id ON Vendas(data_venda DESC, id DESC);
+    -- /api/brambler/all-names: ORDER BY expedition_id DESC, id DESC
+    CREATE INDEX IF NOT EXISTS idx_expeditionpirates_expedition_id_keyset ON expedition_pirates(expedition_id DESC, id DESC);
+    -- /api/users uses the unique index on Usuarios(username)
+
     -- ===========================================================================
     -- BRAMBLER MANAGEMENT CONSOLE PERFORMANCE OPTIMIZATION INDEXES
     -- Added: 2025-10-25 to fix 10s timeout issues on /api/brambler endpoints
@@ -437,6 +608,1111 @@ def initialize_schema():
     CREATE INDEX IF NOT EXISTS idx_items_encrypted_status
         ON expedition_items(expedition_id, encrypted_mapping)
         WHERE encrypted_mapping IS NOT NULL AND encrypted_mapping != '';
+
+    -- ===========================================================================
+    -- BINARY CIPHERTEXTS (VERSION 2)
+    -- Name mappings in the packed binary format live in bytea columns next to
+    -- the version 1 text columns; migrations/convert_ciphertexts_v2.py moves
+    -- rows over in batches and clears the text. Readers select
+    -- brambler_ciphertext(v1, v2), which renders either version as text.
+    -- ===========================================================================
+
+    ALTER TABLE expedition_pirates ADD COLUMN IF NOT EXISTS encrypted_identity_v2 BYTEA;
+    ALTER TABLE expedition_items ADD COLUMN IF NOT EXISTS encrypted_mapping_v2 BYTEA;
+
+    CREATE OR REPLACE FUNCTION brambler_ciphertext(v1 TEXT, v2 BYTEA)
+    RETURNS TEXT AS $$
+        SELECT CASE
+            WHEN v2 IS NOT NULL THEN '~' || translate(encode(v2, 'base64'), E'+/\\n', '-_')
+            ELSE v1
+        END;
+    $$ LANGUAGE sql IMMUTABLE;
+
+    CREATE INDEX IF NOT EXISTS idx_pirates_encrypted_v2
+        ON expedition_pirates(expedition_id)
+        WHERE encrypted_identity_v2 IS NOT NULL;
+
+    CREATE INDEX IF NOT EXISTS idx_items_encrypted_v2
+        ON expedition_items(expedition_id)
+        WHERE encrypted_mapping_v2 IS NOT NULL;
+
+    -- ===========================================================================
+    -- EXPEDITION ARCHIVE
+    -- Completed and cancelled expeditions are moved, with all their rows, into
+    -- <table>_archive by services/expedition_archive_service.py (run with
+    -- migrations/archive_expeditions.py). Archive tables mirror the live columns
+    -- without foreign keys or triggers; reads only include them when asked.
+    -- ===========================================================================
+
+    -- Set for the duration of an archive or restore transaction, so the rollup,
+    -- read model and progress triggers leave the moved history untouched
+    CREATE OR REPLACE FUNCTION expedition_archival_in_progress()
+    RETURNS BOOLEAN AS $$
+        SELECT COALESCE(current_setting('app.expedition_archival', true), '') = 'on';
+    $$ LANGUAGE sql STABLE;
+
+    DO $$
+    DECLARE
+        v_table TEXT;
+        v_column RECORD;
+    BEGIN
+        FOREACH v_table IN ARRAY ARRAY['expeditions', 'expedition_items', 'expedition_pirates',
+                                       'expedition_assignments', 'expedition_payments', 'expedition_progress']
+        LOOP
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I (LIKE %I)', v_table || '_archive', v_table);
+            -- Columns added to the live table after its archive was created
+            FOR v_column IN
+                SELECT a.attname, format_type(a.atttypid, a.atttypmod) AS column_type
+                FROM pg_attribute a
+                WHERE a.attrelid = v_table::regclass AND a.attnum > 0 AND NOT a.attisdropped
+                  AND NOT EXISTS (
+                      SELECT 1 FROM pg_attribute archived
+                      WHERE archived.attrelid = (v_table || '_archive')::regclass
+                        AND archived.attname = a.attname AND NOT archived.attisdropped
+                  )
+                ORDER BY a.attnum
+            LOOP
+                EXECUTE format('ALTER TABLE %I ADD COLUMN %I %s',
+                               v_table || '_archive', v_column.attname, v_column.column_type);
+            END LOOP;
+        END LOOP;
+    END $$;
+
+    ALTER TABLE expeditions_archive ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP;
+
+    -- Vendas.expedition_id is ON DELETE SET NULL; archived links are kept here for restore
+    CREATE TABLE IF NOT EXISTS expedition_sale_links_archive (
+        venda_id INTEGER PRIMARY KEY REFERENCES Vendas(id) ON DELETE CASCADE,
+        expedition_id INTEGER NOT NULL
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expeditions_archive_id ON expeditions_archive(id);
+    CREATE INDEX IF NOT EXISTS idx_expeditions_archive_owner ON expeditions_archive(owner_chat_id);
+    CREATE INDEX IF NOT EXISTS idx_expeditions_archive_created ON expeditions_archive(created_at DESC);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expeditionitems_archive_id ON expedition_items_archive(id);
+    CREATE INDEX IF NOT EXISTS idx_expeditionitems_archive_expedition ON expedition_items_archive(expedition_id);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expeditionpirates_archive_id ON expedition_pirates_archive(id);
+    -- Per-expedition lookups and the /api/brambler/all-names keyset order
+    CREATE INDEX IF NOT EXISTS idx_expeditionpirates_archive_expedition_id ON expedition_pirates_archive(expedition_id DESC, id DESC);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expeditionassignments_archive_id ON expedition_assignments_archive(id);
+    CREATE INDEX IF NOT EXISTS idx_expeditionassignments_archive_expedition ON expedition_assignments_archive(expedition_id);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expeditionpayments_archive_id ON expedition_payments_archive(id);
+    CREATE INDEX IF NOT EXISTS idx_expeditionpayments_archive_expedition ON expedition_payments_archive(expedition_id);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_expeditionprogress_archive_expedition ON expedition_progress_archive(expedition_id);
+    CREATE INDEX IF NOT EXISTS idx_salelinks_archive_expedition ON expedition_sale_links_archive(expedition_id);
+
+    -- ===========================================================================
+    -- DAILY ROLLUP TRIGGERS
+    -- Every write to Vendas/ItensVenda/Pagamentos/expedition_assignments/
+    -- expedition_payments adds its signed contribution to the matching rollup row.
+    -- Item cost is ItensVenda.custo_unitario, the product's average stock cost
+    -- snapshotted when the item is sold, so the triggers and the backfill price
+    -- an item the same way however stock changes afterwards.
+    -- ===========================================================================
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'itensvenda' AND column_name = 'custo_unitario') THEN
+            ALTER TABLE ItensVenda ADD COLUMN custo_unitario DECIMAL(10,2);
+            -- Items sold before the snapshot existed take today's average once
+            UPDATE ItensVenda iv SET custo_unitario = COALESCE(
+                (SELECT AVG(e.custo) FROM Estoque e WHERE e.produto_id = iv.produto_id), 0);
+        END IF;
+    END $$;
+
+    CREATE OR REPLACE FUNCTION itensvenda_cost_snapshot_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF NEW.custo_unitario IS NULL
+           OR (TG_OP = 'UPDATE' AND NEW.produto_id IS DISTINCT FROM OLD.produto_id
+               AND NEW.custo_unitario IS NOT DISTINCT FROM OLD.custo_unitario) THEN
+            NEW.custo_unitario := COALESCE(
+                (SELECT AVG(custo) FROM Estoque WHERE produto_id = NEW.produto_id), 0);
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_itensvenda_cost_snapshot ON ItensVenda;
+    CREATE TRIGGER trg_itensvenda_cost_snapshot
+        BEFORE INSERT OR UPDATE ON ItensVenda
+        FOR EACH ROW EXECUTE FUNCTION itensvenda_cost_snapshot_trigger();
+
+    CREATE OR REPLACE FUNCTION rollup_add_sales(p_day DATE, p_comprador VARCHAR, p_sales INTEGER,
+                                                p_items INTEGER, p_total NUMERIC, p_cost NUMERIC)
+    RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO daily_sales (day, comprador, sales_count, items_count, total_sales, total_cost)
+        VALUES (p_day, p_comprador, p_sales, p_items, p_total, p_cost)
+        ON CONFLICT (day, comprador) DO UPDATE SET
+            sales_count = daily_sales.sales_count + EXCLUDED.sales_count,
+            items_count = daily_sales.items_count + EXCLUDED.items_count,
+            total_sales = daily_sales.total_sales + EXCLUDED.total_sales,
+            total_cost = daily_sales.total_cost + EXCLUDED.total_cost;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_add_payments(p_day DATE, p_comprador VARCHAR,
+                                                   p_count INTEGER, p_total NUMERIC)
+    RETURNS VOID AS $$
+    BEGIN
+        INSERT INTO daily_payments (day, comprador, payments_count, total_paid)
+        VALUES (p_day, p_comprador, p_count, p_total)
+        ON CONFLICT (day, comprador) DO UPDATE SET
+            payments_count = daily_payments.payments_count + EXCLUDED.payments_count,
+            total_paid = daily_payments.total_paid + EXCLUDED.total_paid;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_add_consumption(p_day DATE, p_expedition_id INTEGER, p_count INTEGER,
+                                                      p_quantity INTEGER, p_cost NUMERIC, p_paid NUMERIC)
+    RETURNS VOID AS $$
+    BEGIN
+        IF p_expedition_id IS NULL THEN
+            RETURN;
+        END IF;
+        INSERT INTO daily_expedition_consumption (day, expedition_id, consumptions_count,
+                                                  quantity_consumed, total_cost, total_paid)
+        VALUES (p_day, p_expedition_id, p_count, p_quantity, p_cost, p_paid)
+        ON CONFLICT (day, expedition_id) DO UPDATE SET
+            consumptions_count = daily_expedition_consumption.consumptions_count + EXCLUDED.consumptions_count,
+            quantity_consumed = daily_expedition_consumption.quantity_consumed + EXCLUDED.quantity_consumed,
+            total_cost = daily_expedition_consumption.total_cost + EXCLUDED.total_cost,
+            total_paid = daily_expedition_consumption.total_paid + EXCLUDED.total_paid;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Apply a whole sale (its row, items and payments) with the given sign.
+    -- Used when a sale is deleted (before its children cascade) or re-dated/re-assigned.
+    CREATE OR REPLACE FUNCTION rollup_apply_sale(p_venda_id INTEGER, p_day DATE,
+                                                 p_comprador VARCHAR, p_sign INTEGER)
+    RETURNS VOID AS $$
+    DECLARE
+        r RECORD;
+    BEGIN
+        SELECT COUNT(*) AS items_count,
+               COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0) AS total,
+               COALESCE(SUM(iv.quantidade * COALESCE(iv.custo_unitario, 0)), 0) AS cost
+        INTO r
+        FROM ItensVenda iv WHERE iv.venda_id = p_venda_id;
+
+        PERFORM rollup_add_sales(p_day, p_comprador, p_sign, p_sign * r.items_count::INTEGER,
+                                 p_sign * r.total, p_sign * r.cost);
+
+        FOR r IN
+            SELECT p.data_pagamento::date AS day, COUNT(*) AS payments_count, SUM(p.valor_pago) AS total
+            FROM Pagamentos p WHERE p.venda_id = p_venda_id
+            GROUP BY p.data_pagamento::date
+        LOOP
+            PERFORM rollup_add_payments(r.day, p_comprador, p_sign * r.payments_count::INTEGER, p_sign * r.total);
+        END LOOP;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_vendas_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            PERFORM rollup_add_sales(NEW.data_venda::date, NEW.comprador, 1, 0, 0, 0);
+            RETURN NEW;
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM rollup_apply_sale(OLD.id, OLD.data_venda::date, OLD.comprador, -1);
+            RETURN OLD;
+        ELSIF NEW.data_venda::date IS DISTINCT FROM OLD.data_venda::date
+              OR NEW.comprador IS DISTINCT FROM OLD.comprador THEN
+            PERFORM rollup_apply_sale(OLD.id, OLD.data_venda::date, OLD.comprador, -1);
+            PERFORM rollup_apply_sale(NEW.id, NEW.data_venda::date, NEW.comprador, 1);
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Child triggers skip rows whose sale is already gone: the sale's BEFORE DELETE
+    -- trigger has subtracted them before the cascade runs.
+    CREATE OR REPLACE FUNCTION rollup_itensvenda_trigger()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v RECORD;
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            SELECT data_venda::date AS day, comprador INTO v FROM Vendas WHERE id = OLD.venda_id;
+            IF FOUND THEN
+                PERFORM rollup_add_sales(v.day, v.comprador, 0, -1, -(OLD.quantidade * OLD.valor_unitario),
+                    -(OLD.quantidade * COALESCE(OLD.custo_unitario, 0)));
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            SELECT data_venda::date AS day, comprador INTO v FROM Vendas WHERE id = NEW.venda_id;
+            IF FOUND THEN
+                PERFORM rollup_add_sales(v.day, v.comprador, 0, 1, NEW.quantidade * NEW.valor_unitario,
+                    NEW.quantidade * COALESCE(NEW.custo_unitario, 0));
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_pagamentos_trigger()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v_comprador VARCHAR;
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            SELECT comprador INTO v_comprador FROM Vendas WHERE id = OLD.venda_id;
+            IF FOUND THEN
+                PERFORM rollup_add_payments(OLD.data_pagamento::date, v_comprador, -1, -OLD.valor_pago);
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            SELECT comprador INTO v_comprador FROM Vendas WHERE id = NEW.venda_id;
+            IF FOUND THEN
+                PERFORM rollup_add_payments(NEW.data_pagamento::date, v_comprador, 1, NEW.valor_pago);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_assignments_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF expedition_archival_in_progress() THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM rollup_add_consumption(OLD.assigned_at::date, OLD.expedition_id, -1,
+                                           -COALESCE(OLD.consumed_quantity, 0), -OLD.total_cost, 0);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM rollup_add_consumption(NEW.assigned_at::date, NEW.expedition_id, 1,
+                                           COALESCE(NEW.consumed_quantity, 0), NEW.total_cost, 0);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION rollup_expedition_payments_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF expedition_archival_in_progress() THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.payment_status = 'completed' THEN
+            PERFORM rollup_add_consumption(OLD.processed_at::date, OLD.expedition_id, 0, 0, 0, -OLD.payment_amount);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.payment_status = 'completed' THEN
+            PERFORM rollup_add_consumption(NEW.processed_at::date, NEW.expedition_id, 0, 0, 0, NEW.payment_amount);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_rollup_vendas_insert_update ON Vendas;
+    CREATE TRIGGER trg_rollup_vendas_insert_update
+        AFTER INSERT OR UPDATE OF data_venda, comprador ON Vendas
+        FOR EACH ROW EXECUTE FUNCTION rollup_vendas_trigger();
+    DROP TRIGGER IF EXISTS trg_rollup_vendas_delete ON Vendas;
+    CREATE TRIGGER trg_rollup_vendas_delete
+        BEFORE DELETE ON Vendas
+        FOR EACH ROW EXECUTE FUNCTION rollup_vendas_trigger();
+    DROP TRIGGER IF EXISTS trg_rollup_itensvenda ON ItensVenda;
+    CREATE TRIGGER trg_rollup_itensvenda
+        AFTER INSERT OR UPDATE OR DELETE ON ItensVenda
+        FOR EACH ROW EXECUTE FUNCTION rollup_itensvenda_trigger();
+    DROP TRIGGER IF EXISTS trg_rollup_pagamentos ON Pagamentos;
+    CREATE TRIGGER trg_rollup_pagamentos
+        AFTER INSERT OR UPDATE OR DELETE ON Pagamentos
+        FOR EACH ROW EXECUTE FUNCTION rollup_pagamentos_trigger();
+    DROP TRIGGER IF EXISTS trg_rollup_assignments ON expedition_assignments;
+    CREATE TRIGGER trg_rollup_assignments
+        AFTER INSERT OR UPDATE OF assigned_at, expedition_id, consumed_quantity, total_cost OR DELETE
+        ON expedition_assignments
+        FOR EACH ROW EXECUTE FUNCTION rollup_assignments_trigger();
+    DROP TRIGGER IF EXISTS trg_rollup_expedition_payments ON expedition_payments;
+    CREATE TRIGGER trg_rollup_expedition_payments
+        AFTER INSERT OR UPDATE OR DELETE ON expedition_payments
+        FOR EACH ROW EXECUTE FUNCTION rollup_expedition_payments_trigger();
+
+    -- ===========================================================================
+    -- EXPEDITION READ MODEL TRIGGERS
+    -- Items, recent consumptions and pirates live one row per entry in
+    -- expedition_read_model_entries. Statement-level triggers upsert or remove
+    -- only the entries named by the transition tables, so writers to the same
+    -- expedition do not queue on one document row. Documents that do not exist
+    -- yet are left alone; they are built on first read.
+    -- ===========================================================================
+
+    DROP FUNCTION IF EXISTS refresh_expedition_read_model(INTEGER, TEXT[]);
+    DROP FUNCTION IF EXISTS build_expedition_read_model(INTEGER, JSONB, TEXT[]);
+    DROP FUNCTION IF EXISTS expedition_read_model_section(INTEGER, TEXT, JSONB);
+
+    -- Consumptions kept per document, newest first. Keep in sync with
+    -- RECENT_CONSUMPTIONS_LIMIT in services/expedition_read_model_service.py
+    CREATE OR REPLACE FUNCTION expedition_read_model_recent_limit()
+    RETURNS INTEGER AS $$
+        SELECT 50
+    $$ LANGUAGE sql IMMUTABLE;
+
+    CREATE OR REPLACE FUNCTION expedition_read_model_header(p_expedition_id INTEGER)
+    RETURNS JSONB AS $$
+        SELECT to_jsonb(x) FROM (
+            SELECT e.id, e.name, e.owner_chat_id, e.status, e.deadline, e.created_at, e.completed_at
+            FROM expeditions e
+            WHERE e.id = p_expedition_id
+        ) x
+    $$ LANGUAGE sql STABLE;
+
+    -- Entries of one section for the given source rows (expedition_items,
+    -- expedition_assignments or expedition_pirates ids). Rows that are gone, or
+    -- cannot be shown, produce no entry.
+    CREATE OR REPLACE FUNCTION expedition_read_model_entries_for(p_section TEXT, p_ids INTEGER[])
+    RETURNS TABLE (expedition_id INTEGER, entry_id INTEGER, entry JSONB) AS $$
+    #variable_conflict use_column
+    BEGIN
+        IF p_section = 'items' THEN
+            RETURN QUERY
+            SELECT i.expedition_id, i.id, to_jsonb(i) - 'expedition_id' FROM (
+                SELECT ei.expedition_id, ei.id, ei.produto_id, p.nome AS product_name, p.emoji AS product_emoji,
+                       ei.quantity_required AS quantity_needed,
+                       COALESCE(ei.target_unit_price, s.avg_price, 0) AS unit_price,
+                       COALESCE(ei.quantity_consumed, 0) AS quantity_consumed,
+                       ei.created_at AS added_at, ei.encrypted_product_name, ei.original_product_name
+                FROM expedition_items ei
+                JOIN Produtos p ON p.id = ei.produto_id
+                LEFT JOIN LATERAL (
+                    SELECT AVG(es.preco) AS avg_price
+                    FROM Estoque es
+                    WHERE es.produto_id = ei.produto_id AND es.quantidade_restante > 0
+                ) s ON TRUE
+                WHERE ei.id = ANY(p_ids) AND ei.expedition_id IS NOT NULL
+            ) i;
+        ELSIF p_section = 'consumptions' THEN
+            RETURN QUERY
+            SELECT c.expedition_id, c.id, to_jsonb(c) - 'expedition_id' FROM (
+                SELECT ea.expedition_id, ea.id,
+                       COALESCE(ep.pirate_name, 'Unknown Pirate') AS consumer_name,
+                       COALESCE(ep.pirate_name, 'Unknown Pirate') AS pirate_name,
+                       brambler_ciphertext(ep.encrypted_identity, ep.encrypted_identity_v2) AS encrypted_identity,
+                       p.nome AS product_name,
+                       ea.consumed_quantity AS quantity,
+                       ea.unit_price,
+                       ea.total_cost AS total_price,
+                       COALESCE(paid.amount_paid, 0) AS amount_paid,
+                       ea.payment_status,
+                       ea.assigned_at AS consumed_at,
+                       ei.encrypted_product_name
+                FROM expedition_assignments ea
+                LEFT JOIN expedition_pirates ep ON ea.pirate_id = ep.id
+                JOIN expedition_items ei ON ea.expedition_item_id = ei.id
+                JOIN Produtos p ON ei.produto_id = p.id
+                LEFT JOIN LATERAL (
+                    SELECT SUM(epm.payment_amount) AS amount_paid
+                    FROM expedition_payments epm
+                    WHERE epm.assignment_id = ea.id AND epm.payment_status = 'completed'
+                ) paid ON TRUE
+                WHERE ea.id = ANY(p_ids) AND ea.expedition_id IS NOT NULL
+            ) c;
+        ELSIF p_section = 'pirates' THEN
+            -- Assignments and payments are aggregated separately, so neither
+            -- multiplies the other's rows
+            RETURN QUERY
+            SELECT t.expedition_id, t.id, to_jsonb(t) - 'expedition_id' FROM (
+                SELECT ep.expedition_id, ep.id, ep.pirate_name,
+                       COALESCE(a.consumptions_count, 0) AS consumptions_count,
+                       COALESCE(a.quantity_consumed, 0) AS quantity_consumed,
+                       COALESCE(a.total_cost, 0) AS total_cost,
+                       COALESCE(pm.amount_paid, 0) AS amount_paid,
+                       COALESCE(a.total_cost, 0) - COALESCE(pm.amount_paid, 0) AS outstanding
+                FROM expedition_pirates ep
+                LEFT JOIN LATERAL (
+                    SELECT COUNT(*) AS consumptions_count,
+                           SUM(ea.consumed_quantity) AS quantity_consumed,
+                           SUM(ea.total_cost) AS total_cost
+                    FROM expedition_assignments ea
+                    WHERE ea.pirate_id = ep.id
+                ) a ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT SUM(epm.payment_amount) AS amount_paid
+                    FROM expedition_assignments ea
+                    JOIN expedition_payments epm ON epm.assignment_id = ea.id
+                    WHERE ea.pirate_id = ep.id AND epm.payment_status = 'completed'
+                ) pm ON TRUE
+                WHERE ep.id = ANY(p_ids) AND ep.expedition_id IS NOT NULL
+            ) t;
+        ELSE
+            RAISE EXCEPTION 'Unknown expedition read model section: %', p_section;
+        END IF;
+    END;
+    $$ LANGUAGE plpgsql STABLE;
+
+    -- Upsert or remove entries of one section. p_expedition_ids and p_ids are
+    -- parallel (expedition, source row) pairs; only expeditions that have a
+    -- document get entries.
+    CREATE OR REPLACE FUNCTION apply_expedition_read_model_entries(p_section TEXT, p_expedition_ids INTEGER[],
+                                                                  p_ids INTEGER[])
+    RETURNS VOID AS $$
+    BEGIN
+        IF p_ids IS NULL OR cardinality(p_ids) = 0 THEN
+            RETURN;
+        END IF;
+
+        -- Create and lock the entries first (in key order) so the entries below
+        -- are computed on a snapshot that includes any concurrent change to them
+        INSERT INTO expedition_read_model_entries (expedition_id, section, entry_id, entry)
+        SELECT DISTINCT k.expedition_id, p_section, k.entry_id, 'null'::jsonb
+        FROM unnest(p_expedition_ids, p_ids) AS k(expedition_id, entry_id)
+        JOIN expedition_read_models rm ON rm.expedition_id = k.expedition_id
+        ORDER BY k.expedition_id, k.entry_id
+        ON CONFLICT (expedition_id, section, entry_id) DO NOTHING;
+        PERFORM 1 FROM expedition_read_model_entries re
+        JOIN unnest(p_expedition_ids, p_ids) AS k(expedition_id, entry_id)
+          ON re.expedition_id = k.expedition_id AND re.entry_id = k.entry_id
+        WHERE re.section = p_section
+        ORDER BY re.expedition_id, re.entry_id
+        FOR UPDATE OF re;
+
+        WITH fresh AS MATERIALIZED (
+            SELECT f.expedition_id, f.entry_id, f.entry
+            FROM expedition_read_model_entries_for(p_section, p_ids) f
+        ), updated AS (
+            UPDATE expedition_read_model_entries re SET entry = fresh.entry
+            FROM fresh
+            WHERE re.section = p_section AND re.expedition_id = fresh.expedition_id
+              AND re.entry_id = fresh.entry_id AND re.entry IS DISTINCT FROM fresh.entry
+        )
+        DELETE FROM expedition_read_model_entries re
+        USING unnest(p_expedition_ids, p_ids) AS k(expedition_id, entry_id)
+        WHERE re.section = p_section AND re.expedition_id = k.expedition_id AND re.entry_id = k.entry_id
+          AND NOT EXISTS (
+              SELECT 1 FROM fresh
+              WHERE fresh.expedition_id = re.expedition_id AND fresh.entry_id = re.entry_id
+          );
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Drop consumptions that fell out of each expedition's recent window
+    CREATE OR REPLACE FUNCTION trim_expedition_read_model_consumptions(p_expedition_ids INTEGER[])
+    RETURNS VOID AS $$
+        DELETE FROM expedition_read_model_entries re
+        USING (
+            SELECT w.expedition_id, w.entry_id,
+                   row_number() OVER (PARTITION BY w.expedition_id
+                                      ORDER BY w.entry->>'consumed_at' DESC, w.entry_id DESC) AS recency
+            FROM expedition_read_model_entries w
+            WHERE w.section = 'consumptions' AND w.expedition_id = ANY(p_expedition_ids)
+        ) ranked
+        WHERE re.section = 'consumptions' AND re.expedition_id = ranked.expedition_id
+          AND re.entry_id = ranked.entry_id AND ranked.recency > expedition_read_model_recent_limit()
+    $$ LANGUAGE sql;
+
+    -- Re-read the newest consumptions of each expedition after assignments were
+    -- removed or moved, so the window stays full. O(window), not O(expedition).
+    CREATE OR REPLACE FUNCTION refill_expedition_read_model_consumptions(p_expedition_ids INTEGER[])
+    RETURNS VOID AS $$
+    DECLARE
+        v_expedition_ids INTEGER[];
+        v_ids INTEGER[];
+    BEGIN
+        SELECT array_agg(w.expedition_id), array_agg(w.id) INTO v_expedition_ids, v_ids
+        FROM unnest(p_expedition_ids) AS x(expedition_id)
+        CROSS JOIN LATERAL (
+            SELECT ea.expedition_id, ea.id
+            FROM expedition_assignments ea
+            WHERE ea.expedition_id = x.expedition_id
+            ORDER BY ea.assigned_at DESC, ea.id DESC
+            LIMIT expedition_read_model_recent_limit()
+        ) w;
+        PERFORM apply_expedition_read_model_entries('consumptions', v_expedition_ids, v_ids);
+        PERFORM trim_expedition_read_model_consumptions(p_expedition_ids);
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- Distinct (expedition, id) pairs of transition rows, limited to p_expedition_ids
+    CREATE OR REPLACE FUNCTION expedition_read_model_keys(p_rows JSONB, p_id_key TEXT, p_expedition_ids INTEGER[],
+                                                          OUT expedition_ids INTEGER[], OUT ids INTEGER[]) AS $$
+        SELECT array_agg(k.expedition_id ORDER BY k.expedition_id, k.id),
+               array_agg(k.id ORDER BY k.expedition_id, k.id)
+        FROM (
+            SELECT DISTINCT (r->>'expedition_id')::int AS expedition_id, (r->>p_id_key)::int AS id
+            FROM jsonb_array_elements(p_rows) r
+        ) k
+        WHERE k.expedition_id = ANY(p_expedition_ids) AND k.id IS NOT NULL
+    $$ LANGUAGE sql IMMUTABLE;
+
+    -- Assemble the served document: the stored header, the entries in display
+    -- order and progress derived from them, like ExpeditionResponse.create.
+    -- Consumed value sums the pirate totals, which cover every consumption and
+    -- not just the recent window.
+    CREATE OR REPLACE FUNCTION expedition_read_model_document(p_expedition_id INTEGER)
+    RETURNS JSONB AS $$
+        SELECT jsonb_build_object(
+            'expedition', rm.document->'expedition',
+            'items', s.items,
+            'consumptions', s.consumptions,
+            'pirates', s.pirates,
+            'progress', jsonb_build_object(
+                'total_items', s.total_items,
+                'consumed_items', s.consumed_items,
+                'remaining_items', s.total_items - s.consumed_items,
+                'completion_percentage',
+                    CASE WHEN s.total_items > 0
+                         THEN ROUND(s.consumed_items * 100.0 / s.total_items, 2) ELSE 0 END,
+                'total_value', s.total_value,
+                'consumed_value', s.consumed_value,
+                'remaining_value', s.total_value - s.consumed_value
+            )
+        )
+        FROM expedition_read_models rm
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(jsonb_agg(re.entry ORDER BY re.entry->>'added_at', re.entry_id)
+                                FILTER (WHERE re.section = 'items'), '[]'::jsonb) AS items,
+                   COALESCE(jsonb_agg(re.entry ORDER BY re.entry->>'consumed_at' DESC, re.entry_id DESC)
+                                FILTER (WHERE re.section = 'consumptions'), '[]'::jsonb) AS consumptions,
+                   COALESCE(jsonb_agg(re.entry ORDER BY re.entry->>'pirate_name')
+                                FILTER (WHERE re.section = 'pirates'), '[]'::jsonb) AS pirates,
+                   COALESCE(SUM((re.entry->>'quantity_needed')::numeric)
+                                FILTER (WHERE re.section = 'items'), 0) AS total_items,
+                   COALESCE(SUM((re.entry->>'quantity_consumed')::numeric)
+                                FILTER (WHERE re.section = 'items'), 0) AS consumed_items,
+                   COALESCE(SUM((re.entry->>'quantity_needed')::numeric * (re.entry->>'unit_price')::numeric)
+                                FILTER (WHERE re.section = 'items'), 0) AS total_value,
+                   COALESCE(SUM((re.entry->>'total_cost')::numeric)
+                                FILTER (WHERE re.section = 'pirates'), 0) AS consumed_value
+            FROM expedition_read_model_entries re
+            WHERE re.expedition_id = rm.expedition_id
+        ) s
+        WHERE rm.expedition_id = p_expedition_id
+    $$ LANGUAGE sql STABLE;
+
+    -- Rebuild one document and all of its entries from the normalized tables.
+    -- Returns the assembled document, or NULL if the expedition does not exist.
+    CREATE OR REPLACE FUNCTION rebuild_expedition_read_model(p_expedition_id INTEGER)
+    RETURNS JSONB AS $$
+    BEGIN
+        INSERT INTO expedition_read_models (expedition_id, document, updated_at)
+        SELECT e.id, jsonb_build_object('expedition', expedition_read_model_header(e.id)), CURRENT_TIMESTAMP
+        FROM expeditions e
+        WHERE e.id = p_expedition_id
+        ON CONFLICT (expedition_id) DO UPDATE SET
+            document = EXCLUDED.document,
+            version = expedition_read_models.version + 1,
+            updated_at = EXCLUDED.updated_at;
+        IF NOT FOUND THEN
+            RETURN NULL;
+        END IF;
+
+        DELETE FROM expedition_read_model_entries WHERE expedition_id = p_expedition_id;
+        INSERT INTO expedition_read_model_entries (expedition_id, section, entry_id, entry)
+        SELECT f.expedition_id, s.section, f.entry_id, f.entry
+        FROM (VALUES
+            ('items', ARRAY(SELECT ei.id FROM expedition_items ei WHERE ei.expedition_id = p_expedition_id)),
+            ('consumptions', ARRAY(
+                SELECT ea.id FROM expedition_assignments ea
+                WHERE ea.expedition_id = p_expedition_id
+                ORDER BY ea.assigned_at DESC, ea.id DESC
+                LIMIT expedition_read_model_recent_limit()
+            )),
+            ('pirates', ARRAY(SELECT ep.id FROM expedition_pirates ep WHERE ep.expedition_id = p_expedition_id))
+        ) AS s(section, ids)
+        CROSS JOIN LATERAL expedition_read_model_entries_for(s.section, s.ids) f
+        ON CONFLICT (expedition_id, section, entry_id) DO UPDATE SET entry = EXCLUDED.entry;
+
+        RETURN expedition_read_model_document(p_expedition_id);
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION expedition_read_model_trigger()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v_rows JSONB := '[]'::jsonb;
+        v_documents INTEGER[];
+        v_expedition_ids INTEGER[];
+        v_ids INTEGER[];
+        v_pirate_expedition_ids INTEGER[];
+        v_pirate_ids INTEGER[];
+    BEGIN
+        IF expedition_archival_in_progress() THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            SELECT v_rows || COALESCE(jsonb_agg(to_jsonb(n)), '[]'::jsonb) INTO v_rows FROM new_rows n;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            SELECT v_rows || COALESCE(jsonb_agg(to_jsonb(o)), '[]'::jsonb) INTO v_rows FROM old_rows o;
+        END IF;
+
+        -- Only expeditions that already have a document are maintained
+        v_documents := ARRAY(
+            SELECT DISTINCT rm.expedition_id
+            FROM jsonb_array_elements(v_rows) r
+            JOIN expedition_read_models rm ON rm.expedition_id = (r->>'expedition_id')::int
+        );
+        IF cardinality(v_documents) = 0 THEN
+            RETURN NULL;
+        END IF;
+
+        IF TG_TABLE_NAME = 'expedition_items' THEN
+            SELECT * INTO v_expedition_ids, v_ids FROM expedition_read_model_keys(v_rows, 'id', v_documents);
+            PERFORM apply_expedition_read_model_entries('items', v_expedition_ids, v_ids);
+            IF TG_OP = 'UPDATE' THEN
+                -- Re-pointed or renamed items: refresh the recent consumptions that show them
+                SELECT array_agg(re.expedition_id), array_agg(re.entry_id) INTO v_expedition_ids, v_ids
+                FROM expedition_read_model_entries re
+                JOIN expedition_assignments ea ON ea.id = re.entry_id
+                WHERE re.section = 'consumptions' AND re.expedition_id = ANY(v_documents)
+                  AND ea.expedition_item_id IN (
+                      SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                      WHERE n.produto_id IS DISTINCT FROM o.produto_id
+                         OR n.encrypted_product_name IS DISTINCT FROM o.encrypted_product_name
+                  );
+                PERFORM apply_expedition_read_model_entries('consumptions', v_expedition_ids, v_ids);
+            END IF;
+        ELSIF TG_TABLE_NAME = 'expedition_assignments' THEN
+            SELECT * INTO v_expedition_ids, v_ids FROM expedition_read_model_keys(v_rows, 'id', v_documents);
+            PERFORM apply_expedition_read_model_entries('consumptions', v_expedition_ids, v_ids);
+            SELECT * INTO v_pirate_expedition_ids, v_pirate_ids
+            FROM expedition_read_model_keys(v_rows, 'pirate_id', v_documents);
+            PERFORM apply_expedition_read_model_entries('pirates', v_pirate_expedition_ids, v_pirate_ids);
+            -- Removed or re-dated assignments can leave a gap in the recent window
+            IF TG_OP = 'INSERT' THEN
+                PERFORM trim_expedition_read_model_consumptions(v_documents);
+            ELSIF TG_OP = 'DELETE' THEN
+                PERFORM refill_expedition_read_model_consumptions(v_documents);
+            ELSIF EXISTS (
+                SELECT 1 FROM new_rows n JOIN old_rows o ON o.id = n.id
+                WHERE n.assigned_at IS DISTINCT FROM o.assigned_at
+                   OR n.expedition_id IS DISTINCT FROM o.expedition_id
+            ) THEN
+                PERFORM refill_expedition_read_model_consumptions(v_documents);
+            ELSE
+                PERFORM trim_expedition_read_model_consumptions(v_documents);
+            END IF;
+        ELSIF TG_TABLE_NAME = 'expedition_payments' THEN
+            SELECT * INTO v_expedition_ids, v_ids FROM expedition_read_model_keys(v_rows, 'assignment_id', v_documents);
+            PERFORM apply_expedition_read_model_entries('consumptions', v_expedition_ids, v_ids);
+            PERFORM trim_expedition_read_model_consumptions(v_documents);
+            -- Pirate totals count payments through the pirate's assignments
+            SELECT array_agg(ea.expedition_id ORDER BY ea.expedition_id, ea.pirate_id),
+                   array_agg(ea.pirate_id ORDER BY ea.expedition_id, ea.pirate_id)
+            INTO v_pirate_expedition_ids, v_pirate_ids
+            FROM (
+                SELECT DISTINCT a.expedition_id, a.pirate_id
+                FROM expedition_assignments a
+                WHERE a.id = ANY(v_ids) AND a.pirate_id IS NOT NULL
+            ) ea;
+            PERFORM apply_expedition_read_model_entries('pirates', v_pirate_expedition_ids, v_pirate_ids);
+        ELSE
+            SELECT * INTO v_expedition_ids, v_ids FROM expedition_read_model_keys(v_rows, 'id', v_documents);
+            PERFORM apply_expedition_read_model_entries('pirates', v_expedition_ids, v_ids);
+            IF TG_OP = 'UPDATE' THEN
+                -- Renamed pirates: refresh the recent consumptions that show them
+                SELECT array_agg(re.expedition_id), array_agg(re.entry_id) INTO v_expedition_ids, v_ids
+                FROM expedition_read_model_entries re
+                JOIN expedition_assignments ea ON ea.id = re.entry_id
+                WHERE re.section = 'consumptions' AND re.expedition_id = ANY(v_documents)
+                  AND ea.pirate_id = ANY(v_ids);
+                PERFORM apply_expedition_read_model_entries('consumptions', v_expedition_ids, v_ids);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION expedition_read_model_header_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE expedition_read_models
+        SET document = jsonb_build_object('expedition', expedition_read_model_header(NEW.id)),
+            version = version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE expedition_id = NEW.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_read_model_expeditions ON expeditions;
+    CREATE TRIGGER trg_read_model_expeditions
+        AFTER UPDATE ON expeditions
+        FOR EACH ROW
+        WHEN (OLD.name IS DISTINCT FROM NEW.name OR OLD.status IS DISTINCT FROM NEW.status
+              OR OLD.deadline IS DISTINCT FROM NEW.deadline OR OLD.completed_at IS DISTINCT FROM NEW.completed_at
+              OR OLD.owner_chat_id IS DISTINCT FROM NEW.owner_chat_id)
+        EXECUTE FUNCTION expedition_read_model_header_trigger();
+
+    DROP TRIGGER IF EXISTS trg_read_model_items_insert ON expedition_items;
+    CREATE TRIGGER trg_read_model_items_insert
+        AFTER INSERT ON expedition_items REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_items_update ON expedition_items;
+    CREATE TRIGGER trg_read_model_items_update
+        AFTER UPDATE ON expedition_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_items_delete ON expedition_items;
+    CREATE TRIGGER trg_read_model_items_delete
+        AFTER DELETE ON expedition_items REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+
+    DROP TRIGGER IF EXISTS trg_read_model_assignments_insert ON expedition_assignments;
+    CREATE TRIGGER trg_read_model_assignments_insert
+        AFTER INSERT ON expedition_assignments REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_assignments_update ON expedition_assignments;
+    CREATE TRIGGER trg_read_model_assignments_update
+        AFTER UPDATE ON expedition_assignments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_assignments_delete ON expedition_assignments;
+    CREATE TRIGGER trg_read_model_assignments_delete
+        AFTER DELETE ON expedition_assignments REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+
+    DROP TRIGGER IF EXISTS trg_read_model_payments_insert ON expedition_payments;
+    CREATE TRIGGER trg_read_model_payments_insert
+        AFTER INSERT ON expedition_payments REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_payments_update ON expedition_payments;
+    CREATE TRIGGER trg_read_model_payments_update
+        AFTER UPDATE ON expedition_payments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_payments_delete ON expedition_payments;
+    CREATE TRIGGER trg_read_model_payments_delete
+        AFTER DELETE ON expedition_payments REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+
+    DROP TRIGGER IF EXISTS trg_read_model_pirates_insert ON expedition_pirates;
+    CREATE TRIGGER trg_read_model_pirates_insert
+        AFTER INSERT ON expedition_pirates REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_pirates_update ON expedition_pirates;
+    CREATE TRIGGER trg_read_model_pirates_update
+        AFTER UPDATE ON expedition_pirates REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+    DROP TRIGGER IF EXISTS trg_read_model_pirates_delete ON expedition_pirates;
+    CREATE TRIGGER trg_read_model_pirates_delete
+        AFTER DELETE ON expedition_pirates REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger();
+
+    -- Documents written before the entries table carry every section inline;
+    -- rebuild them into entries (no-op once converted)
+    SELECT rebuild_expedition_read_model(expedition_id) FROM expedition_read_models WHERE document ? 'items';
+
+    -- ===========================================================================
+    -- EXPEDITION PROGRESS TRIGGERS
+    -- Item and consumption writes (consumptions update expedition_items) recompute
+    -- the expedition_progress row of each affected expedition, once per statement.
+    -- ===========================================================================
+
+    CREATE OR REPLACE FUNCTION refresh_expedition_progress(p_expedition_id INTEGER)
+    RETURNS VOID AS $$
+    BEGIN
+        -- Create and lock the row first so the totals below are computed on a
+        -- snapshot that includes any concurrent refresh of the same expedition
+        INSERT INTO expedition_progress (expedition_id)
+        SELECT id FROM expeditions WHERE id = p_expedition_id
+        ON CONFLICT (expedition_id) DO NOTHING;
+        PERFORM 1 FROM expedition_progress WHERE expedition_id = p_expedition_id FOR UPDATE;
+
+        UPDATE expedition_progress ep SET
+            total_items = t.total_items,
+            total_quantity_needed = t.total_quantity_needed,
+            total_quantity_consumed = t.total_quantity_consumed,
+            total_value = t.total_value,
+            consumed_value = t.consumed_value,
+            completion_percentage = CASE
+                WHEN t.total_quantity_needed > 0
+                THEN ROUND(t.total_quantity_consumed::numeric / t.total_quantity_needed::numeric * 100, 2)
+                ELSE 0
+            END,
+            updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT COUNT(ei.id) AS total_items,
+                   COALESCE(SUM(ei.quantity_required), 0) AS total_quantity_needed,
+                   COALESCE(SUM(ei.quantity_consumed), 0) AS total_quantity_consumed,
+                   COALESCE(SUM(ei.quantity_required * COALESCE(ei.target_unit_price, s.avg_price, 0)), 0)
+                       AS total_value,
+                   COALESCE(SUM(ei.quantity_consumed * COALESCE(ei.target_unit_price, s.avg_price, 0)), 0)
+                       AS consumed_value
+            FROM expedition_items ei
+            LEFT JOIN (
+                SELECT produto_id, AVG(preco) AS avg_price
+                FROM Estoque
+                WHERE quantidade_restante > 0
+                  AND produto_id IN (SELECT produto_id FROM expedition_items
+                                     WHERE expedition_id = p_expedition_id)
+                GROUP BY produto_id
+            ) s ON s.produto_id = ei.produto_id
+            WHERE ei.expedition_id = p_expedition_id
+        ) t
+        WHERE ep.expedition_id = p_expedition_id;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION expedition_progress_trigger()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v_expedition_id INTEGER;
+    BEGIN
+        IF expedition_archival_in_progress() THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP = 'INSERT' THEN
+            FOR v_expedition_id IN
+                SELECT DISTINCT expedition_id FROM new_rows WHERE expedition_id IS NOT NULL ORDER BY 1
+            LOOP
+                PERFORM refresh_expedition_progress(v_expedition_id);
+            END LOOP;
+        ELSIF TG_OP = 'UPDATE' THEN
+            FOR v_expedition_id IN
+                SELECT expedition_id FROM new_rows WHERE expedition_id IS NOT NULL
+                UNION
+                SELECT expedition_id FROM old_rows WHERE expedition_id IS NOT NULL
+                ORDER BY 1
+            LOOP
+                PERFORM refresh_expedition_progress(v_expedition_id);
+            END LOOP;
+        ELSE
+            FOR v_expedition_id IN
+                SELECT DISTINCT expedition_id FROM old_rows WHERE expedition_id IS NOT NULL ORDER BY 1
+            LOOP
+                PERFORM refresh_expedition_progress(v_expedition_id);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION expedition_progress_created_trigger()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        IF expedition_archival_in_progress() THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO expedition_progress (expedition_id) VALUES (NEW.id)
+        ON CONFLICT (expedition_id) DO NOTHING;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_progress_expeditions_insert ON expeditions;
+    CREATE TRIGGER trg_progress_expeditions_insert
+        AFTER INSERT ON expeditions
+        FOR EACH ROW EXECUTE FUNCTION expedition_progress_created_trigger();
+    DROP TRIGGER IF EXISTS trg_progress_items_insert ON expedition_items;
+    CREATE TRIGGER trg_progress_items_insert
+        AFTER INSERT ON expedition_items REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_progress_trigger();
+    DROP TRIGGER IF EXISTS trg_progress_items_update ON expedition_items;
+    CREATE TRIGGER trg_progress_items_update
+        AFTER UPDATE ON expedition_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_progress_trigger();
+    DROP TRIGGER IF EXISTS trg_progress_items_delete ON expedition_items;
+    CREATE TRIGGER trg_progress_items_delete
+        AFTER DELETE ON expedition_items REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_progress_trigger();
+
+    -- Fill in expeditions that predate the progress table (no-op once populated)
+    SELECT refresh_expedition_progress(e.id)
+    FROM expeditions e
+    WHERE NOT EXISTS (SELECT 1 FROM expedition_progress ep WHERE ep.expedition_id = e.id);
+
+    -- ===========================================================================
+    -- PIRATE COUNTERS
+    -- expedition_progress.pirate_count is the number of expedition_pirates rows
+    -- per expedition, adjusted by statement-level triggers, so the brambler
+    -- console totals are a sum over one row per expedition instead of a
+    -- COUNT(*) over every pirate. Backfilled once when the column is added.
+    -- ===========================================================================
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'expedition_progress' AND column_name = 'pirate_count') THEN
+            ALTER TABLE expedition_progress ADD COLUMN pirate_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE expedition_progress ep SET pirate_count = c.pirates
+            FROM (SELECT expedition_id, COUNT(*) AS pirates FROM expedition_pirates GROUP BY expedition_id) c
+            WHERE ep.expedition_id = c.expedition_id;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'expedition_progress_archive' AND column_name = 'pirate_count') THEN
+            ALTER TABLE expedition_progress_archive ADD COLUMN pirate_count INTEGER NOT NULL DEFAULT 0;
+            UPDATE expedition_progress_archive ep SET pirate_count = c.pirates
+            FROM (SELECT expedition_id, COUNT(*) AS pirates FROM expedition_pirates_archive GROUP BY expedition_id) c
+            WHERE ep.expedition_id = c.expedition_id;
+        END IF;
+    END $$;
+
+    CREATE OR REPLACE FUNCTION expedition_pirate_count_trigger()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v_delta RECORD;
+    BEGIN
+        IF expedition_archival_in_progress() THEN
+            RETURN NULL;
+        END IF;
+        -- Rows are locked in expedition_id order, like the progress refresh
+        IF TG_OP = 'INSERT' THEN
+            FOR v_delta IN
+                SELECT expedition_id, COUNT(*) AS delta FROM new_rows
+                WHERE expedition_id IS NOT NULL GROUP BY expedition_id ORDER BY 1
+            LOOP
+                UPDATE expedition_progress SET pirate_count = pirate_count + v_delta.delta
+                WHERE expedition_id = v_delta.expedition_id;
+            END LOOP;
+        ELSIF TG_OP = 'UPDATE' THEN
+            FOR v_delta IN
+                SELECT expedition_id, SUM(delta) AS delta FROM (
+                    SELECT expedition_id, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT expedition_id, -1 AS delta FROM old_rows
+                ) moved
+                WHERE expedition_id IS NOT NULL GROUP BY expedition_id HAVING SUM(delta) <> 0 ORDER BY 1
+            LOOP
+                UPDATE expedition_progress SET pirate_count = pirate_count + v_delta.delta
+                WHERE expedition_id = v_delta.expedition_id;
+            END LOOP;
+        ELSE
+            FOR v_delta IN
+                SELECT expedition_id, COUNT(*) AS delta FROM old_rows
+                WHERE expedition_id IS NOT NULL GROUP BY expedition_id ORDER BY 1
+            LOOP
+                UPDATE expedition_progress SET pirate_count = GREATEST(pirate_count - v_delta.delta, 0)
+                WHERE expedition_id = v_delta.expedition_id;
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_pirate_count_insert ON expedition_pirates;
+    CREATE TRIGGER trg_pirate_count_insert
+        AFTER INSERT ON expedition_pirates REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_count_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_count_update ON expedition_pirates;
+    CREATE TRIGGER trg_pirate_count_update
+        AFTER UPDATE ON expedition_pirates REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_count_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_count_delete ON expedition_pirates;
+    CREATE TRIGGER trg_pirate_count_delete
+        AFTER DELETE ON expedition_pirates REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_count_trigger();
+
+    -- ===========================================================================
+    -- PIRATE STATS TRIGGERS
+    -- Assignment and payment writes recompute the expedition_pirate_stats row of
+    -- each affected pirate, once per statement. Archival deletes are skipped (the
+    -- rows go with their pirates); restores are not, so restored pirates get
+    -- their stats back from the restored assignments and payments.
+    -- ===========================================================================
+
+    CREATE INDEX IF NOT EXISTS idx_expeditionpiratestats_expedition ON expedition_pirate_stats(expedition_id);
+
+    CREATE OR REPLACE FUNCTION refresh_expedition_pirate_stats(p_pirate_ids INTEGER[])
+    RETURNS VOID AS $$
+    BEGIN
+        -- Create and lock the rows first (in pirate_id order) so the totals below
+        -- are computed on a snapshot that includes any concurrent refresh
+        INSERT INTO expedition_pirate_stats (pirate_id, expedition_id)
+        SELECT id, expedition_id FROM expedition_pirates
+        WHERE id = ANY(p_pirate_ids) AND expedition_id IS NOT NULL
+        ORDER BY id
+        ON CONFLICT (pirate_id) DO NOTHING;
+        PERFORM 1 FROM expedition_pirate_stats
+        WHERE pirate_id = ANY(p_pirate_ids) ORDER BY pirate_id FOR UPDATE;
+
+        UPDATE expedition_pirate_stats s SET
+            total_items = COALESCE(a.total_items, 0),
+            items_consumed = COALESCE(a.items_consumed, 0),
+            total_spent = COALESCE(a.total_spent, 0),
+            total_paid = COALESCE(pm.total_paid, 0),
+            recent_assignment_ids = COALESCE(r.assignment_ids, '{}'),
+            updated_at = CURRENT_TIMESTAMP
+        FROM unnest(p_pirate_ids) AS ids(pirate_id)
+        LEFT JOIN LATERAL (
+            SELECT COUNT(*) AS total_items,
+                   SUM(ea.consumed_quantity) AS items_consumed,
+                   SUM(ea.total_cost) AS total_spent
+            FROM expedition_assignments ea
+            WHERE ea.pirate_id = ids.pirate_id
+        ) a ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT SUM(epm.payment_amount) AS total_paid
+            FROM expedition_payments epm
+            WHERE epm.pirate_id = ids.pirate_id AND epm.payment_status = 'completed'
+        ) pm ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT array_agg(recent.id ORDER BY recent.completed_at DESC, recent.id DESC) AS assignment_ids
+            FROM (
+                SELECT ea.id, ea.completed_at
+                FROM expedition_assignments ea
+                WHERE ea.pirate_id = ids.pirate_id
+                ORDER BY ea.completed_at DESC, ea.id DESC
+                LIMIT 3
+            ) recent
+        ) r ON TRUE
+        WHERE s.pirate_id = ids.pirate_id;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION expedition_pirate_stats_trigger()
+    RETURNS TRIGGER AS $$
+    DECLARE
+        v_pirate_ids INTEGER[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            v_pirate_ids := ARRAY(SELECT DISTINCT pirate_id FROM new_rows WHERE pirate_id IS NOT NULL);
+        ELSIF TG_OP = 'UPDATE' THEN
+            v_pirate_ids := ARRAY(
+                SELECT pirate_id FROM new_rows WHERE pirate_id IS NOT NULL
+                UNION
+                SELECT pirate_id FROM old_rows WHERE pirate_id IS NOT NULL
+            );
+        ELSE
+            IF expedition_archival_in_progress() THEN
+                RETURN NULL;
+            END IF;
+            v_pirate_ids := ARRAY(SELECT DISTINCT pirate_id FROM old_rows WHERE pirate_id IS NOT NULL);
+        END IF;
+        IF cardinality(v_pirate_ids) > 0 THEN
+            PERFORM refresh_expedition_pirate_stats(v_pirate_ids);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS trg_pirate_stats_assignments_insert ON expedition_assignments;
+    CREATE TRIGGER trg_pirate_stats_assignments_insert
+        AFTER INSERT ON expedition_assignments REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_stats_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_stats_assignments_update ON expedition_assignments;
+    CREATE TRIGGER trg_pirate_stats_assignments_update
+        AFTER UPDATE ON expedition_assignments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_stats_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_stats_assignments_delete ON expedition_assignments;
+    CREATE TRIGGER trg_pirate_stats_assignments_delete
+        AFTER DELETE ON expedition_assignments REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_stats_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_stats_payments_insert ON expedition_payments;
+    CREATE TRIGGER trg_pirate_stats_payments_insert
+        AFTER INSERT ON expedition_payments REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_stats_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_stats_payments_update ON expedition_payments;
+    CREATE TRIGGER trg_pirate_stats_payments_update
+        AFTER UPDATE ON expedition_payments REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_stats_trigger();
+    DROP TRIGGER IF EXISTS trg_pirate_stats_payments_delete ON expedition_payments;
+    CREATE TRIGGER trg_pirate_stats_payments_delete
+        AFTER DELETE ON expedition_payments REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION expedition_pirate_stats_trigger();
+
+    -- Fill in pirates with activity that predates the stats table (no-op once populated)
+    SELECT refresh_expedition_pirate_stats(ARRAY(
+        SELECT DISTINCT pirate_id FROM expedition_assignments
+        WHERE pirate_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM expedition_pirate_stats s WHERE s.pirate_id = expedition_assignments.pirate_id)
+        UNION
+        SELECT DISTINCT pirate_id FROM expedition_payments
+        WHERE pirate_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM expedition_pirate_stats s WHERE s.pirate_id = expedition_payments.pirate_id)
+    ));
     """
     
     try:
@@ -573,6 +1849,18 @@ def initialize_schema():
                     cursor.execute("ALTER TABLE expedition_items ADD COLUMN created_by_chat_id BIGINT")
                     logger.info("Added created_by_chat_id column successfully")
 
+                # Cash ledger migration: add signed delta column and backfill it from legacy balances
+                cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_name = 'cashtransactions'")
+                if cursor.fetchone():
+                    cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = 'cashtransactions' AND column_name = 'delta'")
+                    if not cursor.fetchone():
+                        logger.info("Converting CashTransactions to an append-only ledger")
+                        cursor.execute("ALTER TABLE cashtransactions ADD COLUMN delta DECIMAL(12,2) NOT NULL DEFAULT 0")
+                        cursor.execute("UPDATE cashtransactions SET delta = saldo_novo - saldo_anterior")
+                        cursor.execute("ALTER TABLE cashtransactions ALTER COLUMN saldo_anterior DROP NOT NULL")
+                        cursor.execute("ALTER TABLE cashtransactions ALTER COLUMN saldo_novo DROP NOT NULL")
+                        logger.info("Backfilled ledger deltas successfully")
+
                 # REMOVED: item_consumptions table migration - table has been fully migrated to expedition_assignments
 
                 # SECURITY MIGRATION: Make original_name nullable in expedition_pirates for encryption support
@@ -646,6 +1934,11 @@ def initialize_schema():
                 # Now create/update all tables
                 cursor.execute(create_tables_sql)
 
+                # Rollup triggers only see new writes; existing history needs a one-off backfill
+                cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM daily_sales) AND EXISTS (SELECT 1 FROM Vendas)")
+                if cursor.fetchone()[0]:
+                    logger.warning("Daily rollups are empty - run migrations/backfill_daily_rollups.py to populate them")
+
                 # After tables are created, perform data migration if needed
                 cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_name = 'item_mappings'")
                 if cursor.fetchone():
@@ -686,9 +1979,16 @@ def health_check_schema() -> dict:
         'usuarios', 'produtos', 'vendas', 'itensvenda',
         'estoque', 'pagamentos', 'smartcontracts',
         'transacoes', 'configuracoes', 'broadcastmessages',
-        'pollanswers', 'cashbalance', 'cashtransactions',
+        'pollanswers', 'cashbalance', 'cashtransactions', 'cashbalancesnapshots',
+        'daily_sales', 'daily_payments', 'daily_cash', 'daily_expedition_consumption',
         'expeditions', 'expedition_items',
         'expedition_pirates', 'expedition_assignments', 'expedition_payments',
+        'expedition_read_models', 'expedition_read_model_entries',
+        'expedition_progress', 'expedition_pirate_stats',
+        'expedition_deadline_alerts', 'migration_checkpoints',
+        'expeditions_archive', 'expedition_items_archive', 'expedition_pirates_archive',
+        'expedition_assignments_archive', 'expedition_payments_archive',
+        'expedition_progress_archive', 'expedition_sale_links_archive',
         'item_mappings'
     ]
 
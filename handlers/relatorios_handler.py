@@ -753,7 +753,8 @@ async def detalhes_vendas(update: Update, context: ContextTypes.DEFAULT_TYPE):
     business_service = HandlerBusinessService(context)
     report_request = ReportRequest(
         report_type="debts" if status == "pendentes" else "sales",
-        buyer_name=nome
+        buyer_name=nome,
+        payment_status={"pagos": "paid", "pendentes": "pending"}.get(status)
     )
     
     report_response = business_service.generate_report(report_request)
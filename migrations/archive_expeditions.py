@@ -0,0 +1,140 @@
+"""
+Archive Expeditions
+
+Moves completed and cancelled expeditions that finished more than N days ago,
+with their items, pirates, assignments, payments and progress, into the
+*_archive tables. Runs in batches, one transaction per batch, so it can be
+interrupted and re-run at any time.
+
+Archived expeditions are only returned by read APIs called with
+include_archived=true. Use --restore to move an expedition back.
+"""
+
+import os
+import sys
+import logging
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def archive_expeditions(older_than_days: int, batch_size: int, max_batches=None, dry_run: bool = True):
+    """
+    Archive eligible expeditions in batches.
+
+    Args:
+        older_than_days: Minimum age, counted from completion (or creation)
+        batch_size: Expeditions per transaction
+        max_batches: Stop after this many batches (default: no limit)
+        dry_run: If True, only report which expeditions would be archived
+    """
+    from services.expedition_archive_service import ExpeditionArchiveService
+
+    service = ExpeditionArchiveService()
+
+    if dry_run:
+        expedition_ids = service.get_archivable_expedition_ids(older_than_days)
+        logger.info(f"Expeditions to archive: {len(expedition_ids)}")
+        for expedition_id in expedition_ids:
+            logger.info(f"  Would archive expedition {expedition_id}")
+        logger.info("\nDRY RUN MODE - No changes made")
+        logger.info("Run without --dry-run to archive the expeditions")
+        return
+
+    archived = service.archive_expired(older_than_days, batch_size, max_batches=max_batches)
+    logger.info(f"\nArchived: {archived}")
+
+
+def restore_expeditions(expedition_ids, dry_run: bool = True):
+    """
+    Move archived expeditions back to the live tables.
+
+    Args:
+        expedition_ids: Archived expeditions to restore
+        dry_run: If True, only report which expeditions would be restored
+    """
+    from services.expedition_archive_service import ExpeditionArchiveService
+    from services.base_service import NotFoundError
+
+    service = ExpeditionArchiveService()
+
+    if dry_run:
+        for expedition_id in expedition_ids:
+            logger.info(f"  Would restore expedition {expedition_id}")
+        logger.info("\nDRY RUN MODE - No changes made")
+        logger.info("Run without --dry-run to restore the expeditions")
+        return
+
+    restored = 0
+    missing = 0
+    for expedition_id in expedition_ids:
+        try:
+            service.restore_expedition(expedition_id)
+            restored += 1
+        except NotFoundError:
+            logger.warning(f"  Expedition {expedition_id} is not archived, skipped")
+            missing += 1
+
+    logger.info(f"\nRestored: {restored}")
+    if missing:
+        logger.info(f"Not found: {missing}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from services.expedition_archive_service import DEFAULT_ARCHIVE_AFTER_DAYS, DEFAULT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Archive finished expeditions to the *_archive tables")
+    parser.add_argument('--days', type=int, default=DEFAULT_ARCHIVE_AFTER_DAYS,
+                        help=f'Archive expeditions finished more than this many days ago '
+                             f'(default: {DEFAULT_ARCHIVE_AFTER_DAYS})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Expeditions per transaction (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--max-batches', type=int,
+                        help='Stop after this many batches (default: until done)')
+    parser.add_argument('--restore', type=int, action='append', dest='restore_ids',
+                        help='Restore an archived expedition instead (repeatable)')
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show which expeditions would be moved without making changes'
+    )
+
+    args = parser.parse_args()
+
+    logger.info("="*60)
+    logger.info("Expedition Archive")
+    logger.info("="*60)
+
+    # Initialize database
+    try:
+        from database import initialize_database
+        logger.info("Initializing database connection...")
+        initialize_database()
+        logger.info("Database initialized successfully\n")
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        exit(1)
+
+    try:
+        if args.restore_ids:
+            restore_expeditions(args.restore_ids, dry_run=args.dry_run)
+        else:
+            archive_expeditions(args.days, args.batch_size, max_batches=args.max_batches, dry_run=args.dry_run)
+    except Exception as e:
+        logger.error(f"Archive failed: {e}", exc_info=True)
+        exit(1)
+
+    logger.info("="*60)
+    logger.info("Archive complete")
+    logger.info("="*60)
@@ -0,0 +1,131 @@
+"""
+Backfill Daily Rollups
+
+Rebuilds daily_sales, daily_payments, daily_cash and
+daily_expedition_consumption from the raw Vendas, ItensVenda, Pagamentos,
+CashTransactions, expedition_assignments and expedition_payments tables.
+
+Run once after the rollup tables are created, and again for any day range
+whose rollups need repairing. Rows for the rebuilt days are replaced.
+"""
+
+import os
+import sys
+import logging
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def find_first_day(db_manager) -> date:
+    """Earliest day that has raw data in any rolled-up table."""
+    with db_manager.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT LEAST(
+                    (SELECT MIN(data_venda) FROM Vendas),
+                    (SELECT MIN(data_pagamento) FROM Pagamentos),
+                    (SELECT MIN(data_transacao) FROM CashTransactions),
+                    (SELECT MIN(assigned_at) FROM expedition_assignments),
+                    (SELECT MIN(processed_at) FROM expedition_payments)
+                )::date
+            """)
+            row = cur.fetchone()
+            return row[0] if row and row[0] else date.today()
+
+
+def backfill_rollups(start_day: date, end_day: date, dry_run: bool = True, chunk_days: int = 31):
+    """
+    Rebuild rollups for [start_day, end_day] in chunks of chunk_days.
+
+    Args:
+        start_day: First day to rebuild
+        end_day: Last day to rebuild (inclusive)
+        dry_run: If True, only report how many rollup rows would be written
+        chunk_days: Days rebuilt per transaction
+    """
+    from services.rollup_service import RollupService
+
+    service = RollupService()
+    totals = {}
+
+    chunk_start = start_day
+    while chunk_start <= end_day:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_day)
+        written = service.backfill(chunk_start, chunk_end, dry_run=dry_run)
+
+        logger.info(f"  {chunk_start} .. {chunk_end}: " +
+                    ", ".join(f"{table}={count}" for table, count in written.items()))
+        for table, count in written.items():
+            totals[table] = totals.get(table, 0) + count
+
+        chunk_start = chunk_end + timedelta(days=1)
+
+    if dry_run:
+        logger.info("\nDRY RUN MODE - No changes made")
+        logger.info("Run without --dry-run to rebuild the rollups")
+
+    logger.info("\nRollup rows " + ("that would be written:" if dry_run else "written:"))
+    for table, count in totals.items():
+        logger.info(f"  {table}: {count}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild daily rollup tables from raw data")
+    parser.add_argument('--from', dest='date_from', help='First day to rebuild (YYYY-MM-DD, default: earliest data)')
+    parser.add_argument('--to', dest='date_to', help='Last day to rebuild (YYYY-MM-DD, default: today)')
+    parser.add_argument('--days', type=int, help='Rebuild only the last N days')
+    parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show how many rollup rows would be written without making changes'
+    )
+
+    args = parser.parse_args()
+
+    logger.info("="*60)
+    logger.info("Daily Rollup Backfill")
+    logger.info("="*60)
+
+    # Initialize database
+    try:
+        from database import initialize_database, get_db_manager
+        logger.info("Initializing database connection...")
+        initialize_database()
+        logger.info("Database initialized successfully\n")
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        exit(1)
+
+    end = date.fromisoformat(args.date_to) if args.date_to else date.today()
+    if args.days:
+        start = end - timedelta(days=args.days - 1)
+    elif args.date_from:
+        start = date.fromisoformat(args.date_from)
+    else:
+        start = find_first_day(get_db_manager())
+
+    logger.info(f"Rebuilding rollups for {start} .. {end}")
+
+    try:
+        backfill_rollups(start, end, dry_run=args.dry_run, chunk_days=args.chunk_days)
+    except Exception as e:
+        logger.error(f"Backfill failed: {e}", exc_info=True)
+        exit(1)
+
+    logger.info("="*60)
+    logger.info("Backfill complete")
+    logger.info("="*60)
@@ -4,14 +4,21 @@ Backfill Owner Keys for Existing Expeditions
 This migration generates owner keys for expeditions that don't have them.
 This is necessary for the pirate name decryption feature to work.
 
-Run this script once to update existing expeditions.
+Runs through BatchMigrationService: expeditions are read in id order in
+batches, keys are derived by a worker pool and written with one UPDATE per
+batch. Progress is checkpointed in migration_checkpoints, so an interrupted
+run resumes where it stopped.
 """
 
 import logging
 import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from dotenv import load_dotenv
 from database import get_database_manager, initialize_database
-from utils.encryption import generate_owner_key
 
 # Load environment variables
 load_dotenv()
@@ -21,69 +28,35 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def backfill_owner_keys(dry_run=True):
+def backfill_owner_keys(dry_run=True, batch_size=None, workers=None, max_batches=None, restart=False):
     """
     Backfill owner keys for expeditions that don't have them.
 
     Args:
         dry_run: If True, only show what would be updated without making changes
+        batch_size: Expeditions per batch (default: service default)
+        workers: Worker threads deriving keys (default: service default)
+        max_batches: Stop after this many batches (default: until done)
+        restart: Ignore the checkpoint of an interrupted run
     """
-    db_manager = get_database_manager()
-
-    try:
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cur:
-                # Find expeditions without owner keys
-                cur.execute("""
-                    SELECT id, owner_chat_id, name
-                    FROM expeditions
-                    WHERE owner_key IS NULL OR owner_key = ''
-                    ORDER BY id
-                """)
-
-                expeditions_to_update = cur.fetchall()
-
-                if not expeditions_to_update:
-                    logger.info("No expeditions found without owner keys")
-                    return
-
-                logger.info(f"Found {len(expeditions_to_update)} expeditions without owner keys")
-
-                for expedition_id, owner_chat_id, name in expeditions_to_update:
-                    logger.info(f"  - Expedition {expedition_id}: '{name}' (owner: {owner_chat_id})")
-
-                if dry_run:
-                    logger.info("\nDRY RUN MODE - No changes made")
-                    logger.info("Run with dry_run=False to actually update the database")
-                    return
-
-                # Generate and update owner keys
-                updated_count = 0
-                for expedition_id, owner_chat_id, name in expeditions_to_update:
-                    try:
-                        # Generate owner key
-                        owner_key = generate_owner_key(expedition_id, owner_chat_id)
-
-                        # Update expedition
-                        cur.execute("""
-                            UPDATE expeditions
-                            SET owner_key = %s, owner_user_id = %s
-                            WHERE id = %s
-                        """, (owner_key, owner_chat_id, expedition_id))
-
-                        updated_count += 1
-                        logger.info(f"✓ Updated expedition {expedition_id}: '{name}'")
-
-                    except Exception as e:
-                        logger.error(f"✗ Failed to update expedition {expedition_id}: {e}")
+    from services.batch_migration_service import (
+        BatchMigrationService, OwnerKeyBackfillMigration, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS, log_report
+    )
 
-                # Commit all changes
-                conn.commit()
-                logger.info(f"\nSuccessfully updated {updated_count} expeditions")
+    report = BatchMigrationService().run(
+        OwnerKeyBackfillMigration(),
+        batch_size=batch_size or DEFAULT_BATCH_SIZE,
+        workers=workers or DEFAULT_WORKERS,
+        max_batches=max_batches,
+        dry_run=dry_run,
+        restart=restart,
+        on_batch=lambda r: logger.info(f"  ... {r.rows_scanned} expeditions, {r.rows_per_second:,.1f} rows/sec")
+    )
+    log_report(logger, report, dry_run)
 
-    except Exception as e:
-        logger.error(f"Migration failed: {e}", exc_info=True)
-        raise
+    if dry_run:
+        logger.info("\nDRY RUN MODE - No changes made")
+        logger.info("Run without --dry-run to actually update the database")
 
 
 def verify_owner_keys():
@@ -132,6 +105,8 @@ if __name__ == "__main__":
         action='store_true',
         help='Verify owner keys after migration'
     )
+    from services.batch_migration_service import add_runner_arguments
+    add_runner_arguments(parser)
 
     args = parser.parse_args()
 
@@ -151,7 +126,8 @@ if __name__ == "__main__":
     if args.verify:
         verify_owner_keys()
     else:
-        backfill_owner_keys(dry_run=args.dry_run)
+        backfill_owner_keys(dry_run=args.dry_run, batch_size=args.batch_size, workers=args.workers,
+                            max_batches=args.max_batches, restart=args.restart)
 
         if not args.dry_run:
             logger.info("\nVerifying changes...")
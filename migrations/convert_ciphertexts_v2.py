@@ -0,0 +1,111 @@
+"""
+Convert Ciphertexts to Version 2
+
+Rewrites encrypted pirate identities (expedition_pirates.encrypted_identity)
+and item mappings (expedition_items.encrypted_mapping) from the version 1
+base64 JSON format into the packed binary version 2 format stored in the
+*_v2 bytea columns. Runs in small batches, one short transaction each, so it
+can run while the bot is live and can be interrupted and re-run at any time.
+
+Readers understand both versions, so rows can be converted in any order.
+Each run ends with a report of storage saved and decrypt throughput.
+"""
+
+import os
+import sys
+import logging
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def convert_ciphertexts(kinds, batch_size: int, max_batches=None, dry_run: bool = True):
+    """
+    Convert version 1 ciphertexts in batches and log the report.
+
+    Args:
+        kinds: Columns to convert ('pirates', 'items')
+        batch_size: Rows per batch
+        max_batches: Stop after this many batches per column (default: no limit)
+        dry_run: If True, convert in memory and report without writing
+    """
+    from services.ciphertext_migration_service import CiphertextMigrationService
+
+    service = CiphertextMigrationService()
+
+    for kind in kinds:
+        logger.info(f"Version 1 {kind} rows: {service.count_remaining(kind)}")
+
+    reports = service.convert_all(kinds, batch_size, max_batches=max_batches, dry_run=dry_run)
+
+    for kind, report in reports.items():
+        stats = report.to_dict()
+        logger.info(f"\n{kind}:")
+        logger.info(f"  Rows scanned:   {stats['rows_scanned']}")
+        logger.info(f"  Converted:      {stats['converted']}")
+        logger.info(f"  Failed:         {stats['failed']} (left in version 1)")
+        logger.info(f"  Skipped:        {stats['skipped']} (changed while converting)")
+        logger.info(f"  Storage:        {stats['v1_bytes']:,} -> {stats['v2_bytes']:,} bytes "
+                    f"({stats['savings_percent']}% saved)")
+        logger.info(f"  Decrypts/sec:   v1 {stats['v1_decrypts_per_second']:,}, "
+                    f"v2 {stats['v2_decrypts_per_second']:,}")
+        logger.info(f"  Rows/sec:       {stats['rows_per_second']:,}")
+
+    if dry_run:
+        logger.info("\nDRY RUN MODE - No changes made")
+        logger.info("Run without --dry-run to convert the ciphertexts")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from services.ciphertext_migration_service import CIPHERTEXT_COLUMNS, DEFAULT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Convert encrypted identities and item mappings to version 2")
+    parser.add_argument('--kind', choices=sorted(CIPHERTEXT_COLUMNS), action='append', dest='kinds',
+                        help='Column to convert (repeatable, default: all)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Rows per batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--max-batches', type=int,
+                        help='Stop after this many batches per column (default: until done)')
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Convert in memory and report savings without making changes'
+    )
+
+    args = parser.parse_args()
+
+    logger.info("="*60)
+    logger.info("Ciphertext Version 2 Conversion")
+    logger.info("="*60)
+
+    # Initialize database
+    try:
+        from database import initialize_database
+        logger.info("Initializing database connection...")
+        initialize_database()
+        logger.info("Database initialized successfully\n")
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        exit(1)
+
+    try:
+        convert_ciphertexts(args.kinds or list(CIPHERTEXT_COLUMNS), args.batch_size,
+                            max_batches=args.max_batches, dry_run=args.dry_run)
+    except Exception as e:
+        logger.error(f"Conversion failed: {e}", exc_info=True)
+        exit(1)
+
+    logger.info("="*60)
+    logger.info("Conversion complete")
+    logger.info("="*60)
@@ -2,6 +2,12 @@
 Migration script to upgrade existing expedition pirates to FULL ENCRYPTION MODE.
 This script encrypts all existing plain-text original_name fields and sets them to NULL.
 
+Runs through BatchMigrationService: pirates are read in id order in batches,
+encrypted by a worker pool and written with one UPDATE per batch. Progress is
+checkpointed in migration_checkpoints, so an interrupted run resumes where it
+stopped. Expeditions need an owner key (or a stored master key) first; run
+migrations/backfill_expedition_owner_keys.py for those that have none.
+
 WARNING: This is a ONE-WAY migration. Make sure you have backups before running!
 
 Usage:
@@ -10,6 +16,8 @@ Usage:
 Options:
     --dry-run       Show what would be changed without actually changing it
     --expedition-id Only migrate a specific expedition
+    --batch-size, --workers, --max-batches, --restart
+                    Batching options (see --help)
 """
 
 import sys
@@ -23,7 +31,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import get_database_manager
 from utils.encryption import get_encryption_service
 from services.expedition_service import ExpeditionService
-from services.brambler_service import BramblerService
+from services.batch_migration_service import (
+    BatchMigrationService, PirateEncryptionMigration, DEFAULT_BATCH_SIZE, DEFAULT_WORKERS,
+    add_runner_arguments, log_report
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -32,124 +43,49 @@ logger = logging.getLogger(__name__)
 class FullEncryptionMigration:
     """Handles migration from plain-text to full encryption mode."""
 
-    def __init__(self, dry_run: bool = False):
+    def __init__(self, dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                 workers: int = DEFAULT_WORKERS, max_batches: Optional[int] = None, restart: bool = False):
         self.dry_run = dry_run
         self.db_manager = get_database_manager()
         self.encryption_service = get_encryption_service()
         self.expedition_service = ExpeditionService()
-        self.brambler_service = BramblerService()
+        self.runner = BatchMigrationService()
+        self.options = {
+            'batch_size': batch_size,
+            'workers': workers,
+            'max_batches': max_batches,
+            'dry_run': dry_run,
+            'restart': restart
+        }
 
-    def migrate_expedition(self, expedition_id: int) -> dict:
+    def migrate(self, expedition_id: Optional[int] = None) -> dict:
         """
-        Migrate a single expedition to full encryption mode.
+        Migrate one expedition, or all of them, to full encryption mode.
 
         Args:
-            expedition_id: Expedition ID to migrate
+            expedition_id: Expedition ID to migrate (default: all expeditions)
 
         Returns:
             Dictionary with migration results
         """
-        logger.info(f"{'[DRY RUN] ' if self.dry_run else ''}Migrating expedition {expedition_id}")
+        logger.info(f"{'[DRY RUN] ' if self.dry_run else ''}Migrating "
+                    f"{f'expedition {expedition_id}' if expedition_id else 'all expeditions'}")
 
-        # Get expedition and owner key
-        expedition = self.expedition_service.get_expedition_by_id(expedition_id)
-        if not expedition:
-            return {"success": False, "error": f"Expedition {expedition_id} not found"}
-
-        # Get or generate owner key
-        owner_key = None
-        with self.db_manager.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT owner_key FROM expeditions WHERE id = %s", (expedition_id,))
-                result = cur.fetchone()
-                if result and result[0]:
-                    owner_key = result[0]
-
-        if not owner_key:
-            logger.warning(f"No owner key found for expedition {expedition_id}, generating new one")
-            from utils.encryption import generate_owner_key
-            owner_key = generate_owner_key(expedition_id, expedition.owner_chat_id)
-
-            if not self.dry_run:
-                with self.db_manager.get_connection() as conn:
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "UPDATE expeditions SET owner_key = %s WHERE id = %s",
-                            (owner_key, expedition_id)
-                        )
-                        conn.commit()
-                logger.info(f"Generated and stored owner key for expedition {expedition_id}")
-
-        # Get all pirates with plain-text original_name
-        pirates_to_migrate = []
-        with self.db_manager.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, pirate_name, original_name, encrypted_identity
-                    FROM expedition_pirates
-                    WHERE expedition_id = %s AND original_name IS NOT NULL
-                """, (expedition_id,))
-                pirates_to_migrate = cur.fetchall()
-
-        if not pirates_to_migrate:
-            logger.info(f"No pirates to migrate for expedition {expedition_id}")
-            return {"success": True, "migrated_count": 0, "message": "Already encrypted"}
-
-        logger.info(f"Found {len(pirates_to_migrate)} pirates to migrate")
-
-        migrated_count = 0
-        errors = []
-
-        for pirate_id, pirate_name, original_name, existing_encrypted in pirates_to_migrate:
-            try:
-                # Skip if already has encrypted identity
-                if existing_encrypted and existing_encrypted.strip():
-                    logger.info(f"Pirate {pirate_name} already has encrypted identity, updating to NULL")
-                    if not self.dry_run:
-                        with self.db_manager.get_connection() as conn:
-                            with conn.cursor() as cur:
-                                cur.execute(
-                                    "UPDATE expedition_pirates SET original_name = NULL WHERE id = %s",
-                                    (pirate_id,)
-                                )
-                                conn.commit()
-                    migrated_count += 1
-                    continue
-
-                # Create encrypted mapping
-                mapping = {original_name: pirate_name}
-                encrypted_identity = self.encryption_service.encrypt_name_mapping(
-                    expedition_id,
-                    mapping,
-                    owner_key
-                )
-
-                logger.info(f"{'[DRY RUN] ' if self.dry_run else ''}Encrypting: {original_name} -> {pirate_name}")
-
-                if not self.dry_run:
-                    # Update database - set encrypted_identity and NULL out original_name
-                    with self.db_manager.get_connection() as conn:
-                        with conn.cursor() as cur:
-                            cur.execute("""
-                                UPDATE expedition_pirates
-                                SET encrypted_identity = %s, original_name = NULL
-                                WHERE id = %s
-                            """, (encrypted_identity, pirate_id))
-                            conn.commit()
-
-                migrated_count += 1
-
-            except Exception as e:
-                error_msg = f"Failed to migrate pirate {pirate_id} ({pirate_name}): {str(e)}"
-                logger.error(error_msg)
-                errors.append(error_msg)
+        report = self.runner.run(
+            PirateEncryptionMigration(expedition_id),
+            on_batch=lambda r: logger.info(f"  ... {r.rows_scanned} pirates, {r.rows_per_second:,.1f} rows/sec"),
+            **self.options
+        )
+        log_report(logger, report, self.dry_run)
 
         result = {
-            "success": len(errors) == 0,
+            "success": report.failed == 0,
             "expedition_id": expedition_id,
-            "total_pirates": len(pirates_to_migrate),
-            "migrated_count": migrated_count,
-            "errors": errors
+            "total_pirates": report.rows_scanned,
+            "migrated_count": report.written,
+            "failed_count": report.failed,
+            "skipped_count": report.skipped,
+            "report": report.to_dict()
         }
 
         if self.dry_run:
@@ -157,47 +93,6 @@ class FullEncryptionMigration:
 
         return result
 
-    def migrate_all_expeditions(self) -> dict:
-        """
-        Migrate ALL expeditions to full encryption mode.
-
-        Returns:
-            Dictionary with overall migration results
-        """
-        logger.info(f"{'[DRY RUN] ' if self.dry_run else ''}Starting full migration of all expeditions")
-
-        # Get all expedition IDs
-        expedition_ids = []
-        with self.db_manager.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT id FROM expeditions ORDER BY id")
-                expedition_ids = [row[0] for row in cur.fetchall()]
-
-        logger.info(f"Found {len(expedition_ids)} expeditions to migrate")
-
-        results = []
-        total_migrated = 0
-        total_errors = 0
-
-        for expedition_id in expedition_ids:
-            result = self.migrate_expedition(expedition_id)
-            results.append(result)
-            total_migrated += result.get("migrated_count", 0)
-            total_errors += len(result.get("errors", []))
-
-        summary = {
-            "success": total_errors == 0,
-            "total_expeditions": len(expedition_ids),
-            "total_pirates_migrated": total_migrated,
-            "total_errors": total_errors,
-            "results": results
-        }
-
-        if self.dry_run:
-            summary["message"] = "DRY RUN - No changes were made"
-
-        return summary
-
     def verify_encryption(self, expedition_id: int) -> dict:
         """
         Verify that encryption for an expedition is working correctly.
@@ -223,7 +118,8 @@ class FullEncryptionMigration:
         with self.db_manager.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
-                    SELECT id, pirate_name, original_name, encrypted_identity
+                    SELECT id, pirate_name, original_name,
+                           brambler_ciphertext(encrypted_identity, encrypted_identity_v2)
                     FROM expedition_pirates
                     WHERE expedition_id = %s
                 """, (expedition_id,))
@@ -286,10 +182,12 @@ def main():
     parser.add_argument('--dry-run', action='store_true', help='Show what would be changed without changing it')
     parser.add_argument('--expedition-id', type=int, help='Only migrate a specific expedition')
     parser.add_argument('--verify', action='store_true', help='Verify encryption instead of migrating')
+    add_runner_arguments(parser)
 
     args = parser.parse_args()
 
-    migration = FullEncryptionMigration(dry_run=args.dry_run)
+    migration = FullEncryptionMigration(dry_run=args.dry_run, batch_size=args.batch_size, workers=args.workers,
+                                        max_batches=args.max_batches, restart=args.restart)
 
     try:
         if args.verify:
@@ -311,20 +209,14 @@ def main():
                     if detail['has_plain_text']:
                         logger.warning(f"  - {detail['pirate_name']} still has plain text original name")
 
-        elif args.expedition_id:
-            result = migration.migrate_expedition(args.expedition_id)
-            logger.info(f"Migration completed for expedition {args.expedition_id}")
-            logger.info(f"  Migrated: {result['migrated_count']} pirates")
-            if result['errors']:
-                logger.error(f"  Errors: {len(result['errors'])}")
-                for error in result['errors']:
-                    logger.error(f"    - {error}")
         else:
-            result = migration.migrate_all_expeditions()
-            logger.info("Migration completed for all expeditions")
-            logger.info(f"  Total Expeditions: {result['total_expeditions']}")
-            logger.info(f"  Total Pirates Migrated: {result['total_pirates_migrated']}")
-            logger.info(f"  Total Errors: {result['total_errors']}")
+            result = migration.migrate(args.expedition_id)
+            logger.info(f"Migration completed for "
+                        f"{f'expedition {args.expedition_id}' if args.expedition_id else 'all expeditions'}")
+            logger.info(f"  Migrated: {result['migrated_count']} pirates")
+            if result['failed_count']:
+                logger.error(f"  Errors: {result['failed_count']} pirates could not be encrypted "
+                             f"(missing owner key or failed verification)")
 
         if args.dry_run:
             logger.info("\n⚠️  DRY RUN MODE - No changes were made to the database")
@@ -0,0 +1,106 @@
+"""
+Rebuild Expedition Read Models
+
+Rebuilds the read model documents and their entries from the
+expeditions, expedition_items, expedition_assignments, expedition_payments
+and expedition_pirates tables.
+
+Documents are built lazily on first read and kept current by the read model
+triggers, so this is only needed to pre-warm documents after a deploy or to
+repair documents after writes made with the triggers disabled.
+"""
+
+import os
+import sys
+import logging
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def rebuild_read_models(expedition_ids=None, only_missing: bool = False, dry_run: bool = True):
+    """
+    Rebuild read model documents, one expedition per transaction.
+
+    Args:
+        expedition_ids: Expeditions to rebuild (default: all)
+        only_missing: If True, only build expeditions that have no document yet
+        dry_run: If True, only report which expeditions would be rebuilt
+    """
+    from services.expedition_read_model_service import ExpeditionReadModelService
+
+    service = ExpeditionReadModelService()
+    if expedition_ids is None:
+        expedition_ids = service.get_expedition_ids(only_missing=only_missing)
+
+    logger.info(f"Expeditions to rebuild: {len(expedition_ids)}")
+
+    if dry_run:
+        for expedition_id in expedition_ids:
+            logger.info(f"  Would rebuild expedition {expedition_id}")
+        logger.info("\nDRY RUN MODE - No changes made")
+        logger.info("Run without --dry-run to rebuild the read models")
+        return
+
+    rebuilt = 0
+    missing = 0
+    for expedition_id in expedition_ids:
+        if service.rebuild(expedition_id) is None:
+            logger.warning(f"  Expedition {expedition_id} not found, skipped")
+            missing += 1
+        else:
+            rebuilt += 1
+
+    logger.info(f"\nRebuilt: {rebuilt}")
+    if missing:
+        logger.info(f"Not found: {missing}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild expedition read model documents")
+    parser.add_argument('--expedition-id', type=int, action='append', dest='expedition_ids',
+                        help='Expedition to rebuild (repeatable, default: all)')
+    parser.add_argument('--only-missing', action='store_true',
+                        help='Only build expeditions that have no document yet')
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Show which expeditions would be rebuilt without making changes'
+    )
+
+    args = parser.parse_args()
+
+    logger.info("="*60)
+    logger.info("Expedition Read Model Rebuild")
+    logger.info("="*60)
+
+    # Initialize database
+    try:
+        from database import initialize_database
+        logger.info("Initializing database connection...")
+        initialize_database()
+        logger.info("Database initialized successfully\n")
+    except Exception as e:
+        logger.error(f"Failed to initialize database: {e}")
+        exit(1)
+
+    try:
+        rebuild_read_models(args.expedition_ids, only_missing=args.only_missing, dry_run=args.dry_run)
+    except Exception as e:
+        logger.error(f"Rebuild failed: {e}", exc_info=True)
+        exit(1)
+
+    logger.info("="*60)
+    logger.info("Rebuild complete")
+    logger.info("="*60)
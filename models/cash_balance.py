@@ -123,11 +123,12 @@ class CashBalanceHistory:
     total_receitas: Decimal
     total_despesas: Decimal
     total_ajustes: Decimal
+    transactions_count: Optional[int] = None  # Whole period; transactions may cover only part of it
 
     def to_summary(self) -> Dict[str, Any]:
         """Get summary statistics."""
         return {
-            'transactions_count': len(self.transactions),
+            'transactions_count': self.transactions_count if self.transactions_count is not None else len(self.transactions),
             'balance_start': float(self.balance_start),
             'balance_end': float(self.balance_end),
             'total_receitas': float(self.total_receitas),
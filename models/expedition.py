@@ -4,6 +4,7 @@ from enum import Enum
 from typing import Optional, List, Dict, Any
 from decimal import Decimal
 import json
+import math
 
 
 class ExpeditionStatus(Enum):
@@ -388,7 +389,9 @@ class ItemConsumptionRequest:
         if self.quantity_consumed <= 0:
             errors.append("Quantity consumed must be greater than 0")
 
-        if self.unit_price < 0:
+        if not math.isfinite(self.unit_price):
+            errors.append("Unit price must be a finite number")
+        elif self.unit_price < 0:
             errors.append("Unit price cannot be negative")
 
         return errors
@@ -398,6 +401,102 @@ class ItemConsumptionRequest:
         return self.unit_price * self.quantity_consumed
 
 
+@dataclass
+class BatchPaymentRequest:
+    """Request model for paying many assignments in one transaction."""
+    assignment_ids: Optional[List[int]] = None
+    pirate_id: Optional[int] = None
+    amount: Optional[Decimal] = None  # None pays everything outstanding
+    payment_method: Optional[str] = None
+    processed_by_chat_id: Optional[int] = None
+
+    def validate(self) -> List[str]:
+        """Validate the batch payment request."""
+        errors = []
+
+        if not self.assignment_ids and not self.pirate_id:
+            errors.append("Either assignment_ids or pirate_id is required")
+
+        if self.assignment_ids and self.pirate_id:
+            errors.append("Use either assignment_ids or pirate_id, not both")
+
+        if self.assignment_ids and any(not isinstance(a, int) or isinstance(a, bool) or a <= 0
+                                       for a in self.assignment_ids):
+            errors.append("Assignment IDs must be positive integers")
+
+        if self.pirate_id is not None and (not isinstance(self.pirate_id, int)
+                                           or isinstance(self.pirate_id, bool) or self.pirate_id <= 0):
+            errors.append("Pirate ID must be a positive integer")
+
+        if self.amount is not None:
+            if not math.isfinite(self.amount):
+                errors.append("Payment amount must be a finite number")
+            elif self.amount <= 0:
+                errors.append("Payment amount must be greater than zero")
+
+        return errors
+
+
+@dataclass
+class BatchPaymentResult:
+    """Result of a batch payment: how the amount was allocated."""
+    allocations: List[Dict[str, Any]]
+    total_paid: Decimal
+    remaining_outstanding: Decimal
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary."""
+        return {
+            'allocations': [
+                {
+                    'assignment_id': a['assignment_id'],
+                    'expedition_id': a['expedition_id'],
+                    'amount': float(a['amount']),
+                    'amount_paid': float(a['amount_paid']),
+                    'remaining': float(a['remaining']),
+                    'payment_status': a['payment_status']
+                }
+                for a in self.allocations
+            ],
+            'payments_count': len(self.allocations),
+            'total_paid': float(self.total_paid),
+            'remaining_outstanding': float(self.remaining_outstanding)
+        }
+
+
+@dataclass
+class BulkConsumptionResult:
+    """Per-row outcome of a bulk consumption, in request order."""
+    results: List[Dict[str, Any]]
+
+    @property
+    def recorded_count(self) -> int:
+        """Number of rows that were recorded."""
+        return sum(1 for r in self.results if r['success'])
+
+    @property
+    def failed_count(self) -> int:
+        """Number of rows that were rejected."""
+        return len(self.results) - self.recorded_count
+
+    def to_dict(self) -> dict:
+        """Convert to dictionary."""
+        return {
+            'results': [
+                {
+                    'index': r['index'],
+                    'success': r['success'],
+                    'assignment': r['assignment'].to_dict() if r.get('assignment') else None,
+                    'sale_id': r.get('sale_id'),
+                    'error': r.get('error')
+                }
+                for r in self.results
+            ],
+            'recorded_count': self.recorded_count,
+            'failed_count': self.failed_count
+        }
+
+
 # Response DTOs
 @dataclass
 class ExpeditionItemWithProduct:
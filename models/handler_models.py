@@ -69,6 +69,7 @@ class ReportRequest:
     product_name_filter: Optional[str] = None  # Filter by product name
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
+    payment_status: Optional[str] = None  # 'paid', 'pending' or None for both
 
 
 @dataclass
@@ -239,4 +239,52 @@ class SaleWithDetails:
             "total": f"R$ {self.total:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."),
             "status": self.status,
             "products": self.products
-        }
\ No newline at end of file
+        }
+
+@dataclass
+class SaleReportRow:
+    """Flattened sale item row used by the report query engine."""
+    venda_id: int
+    comprador: str
+    data_venda: datetime
+    produto_id: Optional[int]
+    produto_nome: str
+    quantidade: int
+    valor_unitario: float
+    sale_total: float
+    sale_paid: float
+
+    @classmethod
+    def from_db_row(cls, row: tuple) -> 'SaleReportRow':
+        """Create SaleReportRow from database row."""
+        if not row:
+            return None
+
+        (venda_id, comprador, data_venda, produto_id, produto_nome,
+         quantidade, valor_unitario, sale_total, sale_paid) = row
+        return cls(
+            venda_id=venda_id,
+            comprador=comprador,
+            data_venda=data_venda,
+            produto_id=produto_id,
+            produto_nome=produto_nome or "Unknown Product",
+            quantidade=quantidade,
+            valor_unitario=float(valor_unitario),
+            sale_total=float(sale_total or 0),
+            sale_paid=float(sale_paid or 0)
+        )
+
+    def get_total_value(self) -> float:
+        """Get total value for this item line."""
+        return self.quantidade * self.valor_unitario
+
+    @property
+    def is_fully_paid(self) -> bool:
+        """Check if the parent sale is fully paid."""
+        return self.sale_total - self.sale_paid <= 0.01
+
+    def get_date_str(self) -> str:
+        """Get the sale date formatted as YYYY-MM-DD."""
+        if hasattr(self.data_venda, 'strftime'):
+            return self.data_venda.strftime('%Y-%m-%d')
+        return str(self.data_venda)
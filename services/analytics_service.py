@@ -7,7 +7,6 @@ import logging
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from decimal import Decimal
-from collections import defaultdict
 import statistics
 
 from services.base_service import BaseService, ServiceError
@@ -36,107 +35,188 @@ class AnalyticsService(BaseService):
             Dictionary with detailed performance metrics
         """
         try:
-            expedition = self.expedition_service.get_expedition_by_id(expedition_id)
-            if not expedition:
-                return {}
-
-            # Get basic expedition data
-            items = self.expedition_service.get_expedition_items(expedition_id)
-            consumptions = self.expedition_service.get_expedition_consumptions(expedition_id)
-
-            # Calculate time metrics
-            now = datetime.now()
-            duration = now - expedition.created_at if expedition.created_at else timedelta(0)
-            time_to_deadline = expedition.deadline - now if expedition.deadline else None
-            is_overdue = time_to_deadline and time_to_deadline.total_seconds() < 0
-
-            # Calculate completion metrics
-            total_items = len(items)
-            total_required_quantity = sum(item.required_quantity for item in items)
-            total_consumed_quantity = sum(consumption.quantity_consumed for consumption in consumptions)
-
-            item_completion_rate = (len(set(c.expedition_item_id for c in consumptions)) / total_items * 100) if total_items > 0 else 0
-            quantity_completion_rate = (total_consumed_quantity / total_required_quantity * 100) if total_required_quantity > 0 else 0
+            metrics = self.get_bulk_expedition_metrics([expedition_id])
+            return metrics[0] if metrics else {}
 
-            # Calculate financial metrics
-            total_value = sum(consumption.total_cost for consumption in consumptions)
-            paid_value = sum(consumption.total_cost for consumption in consumptions if consumption.payment_status == PaymentStatus.PAID.value)
-            pending_value = total_value - paid_value
-
-            # Calculate consumer metrics
-            unique_consumers = len(set(c.consumer_name for c in consumptions))
-            consumption_frequency = defaultdict(int)
-            consumer_spending = defaultdict(Decimal)
-
-            for consumption in consumptions:
-                consumption_frequency[consumption.consumer_name] += 1
-                consumer_spending[consumption.consumer_name] += consumption.total_cost
-
-            # Calculate efficiency metrics
-            avg_consumption_value = total_value / len(consumptions) if consumptions else 0
-            avg_daily_progress = quantity_completion_rate / max(duration.days, 1) if duration.days > 0 else 0
-
-            # Performance scoring (0-100)
-            completion_score = (item_completion_rate + quantity_completion_rate) / 2
-            timeliness_score = self._calculate_timeliness_score(expedition, duration, time_to_deadline)
-            payment_score = (paid_value / total_value * 100) if total_value > 0 else 100
-            engagement_score = min(unique_consumers * 10, 100)  # Max 100 for 10+ consumers
-
-            overall_performance_score = (completion_score + timeliness_score + payment_score + engagement_score) / 4
-
-            return {
-                "expedition_id": expedition_id,
-                "expedition_name": expedition.name,
-                "status": expedition.status,
-                "created_at": expedition.created_at.isoformat() if expedition.created_at else None,
-                "deadline": expedition.deadline.isoformat() if expedition.deadline else None,
-                "duration_days": duration.days,
-                "is_overdue": is_overdue,
-                "time_to_deadline_hours": time_to_deadline.total_seconds() / 3600 if time_to_deadline else None,
-
-                "completion_metrics": {
-                    "total_items": total_items,
-                    "completed_items": len(set(c.expedition_item_id for c in consumptions)),
-                    "item_completion_rate": round(item_completion_rate, 2),
-                    "total_required_quantity": total_required_quantity,
-                    "total_consumed_quantity": total_consumed_quantity,
-                    "quantity_completion_rate": round(quantity_completion_rate, 2),
-                    "avg_daily_progress": round(avg_daily_progress, 2)
-                },
+        except Exception as e:
+            self.logger.error(f"Failed to get performance metrics for expedition {expedition_id}: {e}", exc_info=True)
+            return {}
 
-                "financial_metrics": {
-                    "total_value": float(total_value),
-                    "paid_value": float(paid_value),
-                    "pending_value": float(pending_value),
-                    "payment_completion_rate": round((paid_value / total_value * 100) if total_value > 0 else 0, 2),
-                    "avg_consumption_value": float(avg_consumption_value)
-                },
+    def get_bulk_expedition_metrics(self, expedition_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Get performance metrics for several expeditions in one grouped query.
 
-                "consumer_metrics": {
-                    "unique_consumers": unique_consumers,
-                    "total_consumptions": len(consumptions),
-                    "avg_consumptions_per_consumer": round(len(consumptions) / unique_consumers, 2) if unique_consumers > 0 else 0,
-                    "top_consumers": self._get_top_consumers(consumer_spending, consumption_frequency)[:5]
-                },
+        Completion, financial and consumer totals (including each expedition's
+        top five consumers) are aggregated in the database, so the cost is one
+        round trip regardless of how many expeditions are requested.
 
-                "performance_scores": {
-                    "completion_score": round(completion_score, 2),
-                    "timeliness_score": round(timeliness_score, 2),
-                    "payment_score": round(payment_score, 2),
-                    "engagement_score": round(engagement_score, 2),
-                    "overall_performance_score": round(overall_performance_score, 2)
-                },
+        Args:
+            expedition_ids: Expedition identifiers
 
-                "efficiency_metrics": {
-                    "consumption_velocity": round(len(consumptions) / max(duration.days, 1), 2),
-                    "revenue_velocity": float(total_value / max(duration.days, 1)),
-                    "consumer_acquisition_rate": round(unique_consumers / max(duration.days, 1), 2)
-                }
+        Returns:
+            Performance metrics per existing expedition, in request order
+        """
+        expedition_ids = list(dict.fromkeys(expedition_ids))
+        if not expedition_ids:
+            return []
+
+        query = """
+            WITH item_totals AS (
+                SELECT expedition_id, COUNT(*) AS total_items,
+                       COALESCE(SUM(quantity_required), 0) AS total_required
+                FROM expedition_items
+                WHERE expedition_id = ANY(%s)
+                GROUP BY expedition_id
+            ),
+            consumer_totals AS (
+                SELECT ea.expedition_id,
+                       COALESCE(ep.original_name, ep.pirate_name) AS consumer_name,
+                       COUNT(*) AS consumption_count,
+                       COALESCE(SUM(ea.consumed_quantity), 0) AS quantity,
+                       COALESCE(SUM(ea.total_cost), 0) AS total_spent,
+                       COALESCE(SUM(ea.total_cost) FILTER (WHERE ea.payment_status = %s), 0) AS paid,
+                       ARRAY_AGG(DISTINCT ea.expedition_item_id) AS item_ids,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY ea.expedition_id
+                           ORDER BY COALESCE(SUM(ea.total_cost), 0) DESC
+                       ) AS spending_rank
+                FROM expedition_assignments ea
+                JOIN expedition_pirates ep ON ep.id = ea.pirate_id
+                WHERE ea.expedition_id = ANY(%s)
+                GROUP BY ea.expedition_id, COALESCE(ep.original_name, ep.pirate_name)
+            ),
+            consumption_totals AS (
+                SELECT expedition_id,
+                       SUM(consumption_count)::bigint AS total_consumptions,
+                       SUM(quantity)::bigint AS total_consumed,
+                       SUM(total_spent) AS total_value,
+                       SUM(paid) AS paid_value,
+                       COUNT(*) AS unique_consumers,
+                       JSON_AGG(JSON_BUILD_OBJECT(
+                           'consumer_name', consumer_name,
+                           'total_spent', total_spent,
+                           'consumption_count', consumption_count
+                       ) ORDER BY spending_rank) FILTER (WHERE spending_rank <= 5) AS top_consumers
+                FROM consumer_totals
+                GROUP BY expedition_id
+            ),
+            consumed_items AS (
+                SELECT expedition_id, COUNT(DISTINCT item_id) AS completed_items
+                FROM consumer_totals, UNNEST(item_ids) AS item_id
+                GROUP BY expedition_id
+            )
+            SELECT e.id, e.name, e.status, e.created_at, e.deadline,
+                   COALESCE(it.total_items, 0), COALESCE(it.total_required, 0),
+                   COALESCE(ct.total_consumptions, 0), COALESCE(ct.total_consumed, 0),
+                   COALESCE(ct.total_value, 0), COALESCE(ct.paid_value, 0),
+                   COALESCE(ci.completed_items, 0), COALESCE(ct.unique_consumers, 0),
+                   COALESCE(ct.top_consumers, '[]'::json)
+            FROM expeditions e
+            LEFT JOIN item_totals it ON it.expedition_id = e.id
+            LEFT JOIN consumption_totals ct ON ct.expedition_id = e.id
+            LEFT JOIN consumed_items ci ON ci.expedition_id = e.id
+            WHERE e.id = ANY(%s)
+            ORDER BY array_position(%s::integer[], e.id)
+        """
+        params = (expedition_ids, PaymentStatus.PAID.value, expedition_ids, expedition_ids, expedition_ids)
+
+        rows = self._execute_query(query, params, fetch_all=True)
+        now = datetime.now()
+        return [self._build_performance_metrics(row, now) for row in rows or []]
+
+    def _build_performance_metrics(self, row: tuple, now: datetime) -> Dict[str, Any]:
+        """Build the performance metrics dictionary from one bulk metrics row."""
+        (expedition_id, name, status, created_at, deadline,
+         total_items, total_required_quantity, total_consumptions, total_consumed_quantity,
+         total_value, paid_value, completed_items, unique_consumers, top_consumers) = row
+
+        # Summed counters may arrive as Decimal (SUM over bigint is numeric)
+        total_required_quantity = int(total_required_quantity)
+        total_consumptions = int(total_consumptions)
+        total_consumed_quantity = int(total_consumed_quantity)
+
+        total_value = Decimal(str(total_value))
+        paid_value = Decimal(str(paid_value))
+        pending_value = total_value - paid_value
+
+        # Calculate time metrics
+        duration = now - created_at if created_at else timedelta(0)
+        time_to_deadline = deadline - now if deadline else None
+        is_overdue = bool(time_to_deadline and time_to_deadline.total_seconds() < 0)
+
+        # Calculate completion metrics
+        item_completion_rate = (completed_items / total_items * 100) if total_items > 0 else 0
+        quantity_completion_rate = (total_consumed_quantity / total_required_quantity * 100) if total_required_quantity > 0 else 0
+
+        # Calculate efficiency metrics
+        avg_consumption_value = total_value / total_consumptions if total_consumptions else 0
+        avg_daily_progress = quantity_completion_rate / max(duration.days, 1) if duration.days > 0 else 0
+
+        # Performance scoring (0-100)
+        completion_score = (item_completion_rate + quantity_completion_rate) / 2
+        timeliness_score = self._calculate_timeliness_score(created_at, deadline, duration, time_to_deadline)
+        payment_score = float(paid_value / total_value * 100) if total_value > 0 else 100
+        engagement_score = min(unique_consumers * 10, 100)  # Max 100 for 10+ consumers
+
+        overall_performance_score = (completion_score + timeliness_score + payment_score + engagement_score) / 4
+
+        return {
+            "expedition_id": expedition_id,
+            "expedition_name": name,
+            "status": status,
+            "created_at": created_at.isoformat() if created_at else None,
+            "deadline": deadline.isoformat() if deadline else None,
+            "duration_days": duration.days,
+            "is_overdue": is_overdue,
+            "time_to_deadline_hours": time_to_deadline.total_seconds() / 3600 if time_to_deadline else None,
+
+            "completion_metrics": {
+                "total_items": total_items,
+                "completed_items": completed_items,
+                "item_completion_rate": round(item_completion_rate, 2),
+                "total_required_quantity": total_required_quantity,
+                "total_consumed_quantity": total_consumed_quantity,
+                "quantity_completion_rate": round(quantity_completion_rate, 2),
+                "avg_daily_progress": round(avg_daily_progress, 2)
+            },
+
+            "financial_metrics": {
+                "total_value": float(total_value),
+                "paid_value": float(paid_value),
+                "pending_value": float(pending_value),
+                "payment_completion_rate": round(float(paid_value / total_value * 100) if total_value > 0 else 0, 2),
+                "avg_consumption_value": float(avg_consumption_value)
+            },
+
+            "consumer_metrics": {
+                "unique_consumers": unique_consumers,
+                "total_consumptions": total_consumptions,
+                "avg_consumptions_per_consumer": round(total_consumptions / unique_consumers, 2) if unique_consumers > 0 else 0,
+                "top_consumers": [
+                    {
+                        "consumer_name": consumer["consumer_name"],
+                        "total_spent": float(consumer["total_spent"]),
+                        "consumption_count": consumer["consumption_count"],
+                        "avg_consumption_value": float(consumer["total_spent"]) / consumer["consumption_count"]
+                    }
+                    for consumer in top_consumers or []
+                ]
+            },
+
+            "performance_scores": {
+                "completion_score": round(completion_score, 2),
+                "timeliness_score": round(timeliness_score, 2),
+                "payment_score": round(payment_score, 2),
+                "engagement_score": round(engagement_score, 2),
+                "overall_performance_score": round(overall_performance_score, 2)
+            },
+
+            "efficiency_metrics": {
+                "consumption_velocity": round(total_consumptions / max(duration.days, 1), 2),
+                "revenue_velocity": float(total_value / max(duration.days, 1)),
+                "consumer_acquisition_rate": round(unique_consumers / max(duration.days, 1), 2)
             }
-
-        except Exception as e:
-            self.logger.error(f"Failed to get performance metrics for expedition {expedition_id}: {e}", exc_info=True)
-            return {}
+        }
 
     def get_timeline_visualization_data(self, expedition_id: int, granularity: str = "daily") -> Dict[str, Any]:
         """
@@ -154,51 +234,16 @@ class AnalyticsService(BaseService):
             if not expedition:
                 return {}
 
-            consumptions = self.expedition_service.get_expedition_consumptions(expedition_id)
+            consumptions = self._get_timeline_consumptions(expedition_id)
             if not consumptions:
                 return {"timeline": [], "summary": {}}
 
-            # Sort consumptions by time
-            sorted_consumptions = sorted(consumptions, key=lambda c: c.consumed_at or datetime.min)
-
-            # Generate time buckets
+            # Generate time buckets; rows arrive ordered by time
             start_time = expedition.created_at
-            end_time = max((c.consumed_at for c in sorted_consumptions if c.consumed_at), default=datetime.now())
+            end_time = consumptions[-1][0]
 
-            time_buckets = self._generate_time_buckets(start_time, end_time, granularity)
-
-            # Aggregate data by time bucket
-            timeline_data = []
-            cumulative_quantity = 0
-            cumulative_value = 0
-            cumulative_consumers = set()
-
-            for bucket_start, bucket_end in time_buckets:
-                bucket_consumptions = [
-                    c for c in sorted_consumptions
-                    if c.consumed_at and bucket_start <= c.consumed_at < bucket_end
-                ]
-
-                bucket_quantity = sum(c.quantity_consumed for c in bucket_consumptions)
-                bucket_value = sum(c.total_cost for c in bucket_consumptions)
-                bucket_consumers = set(c.consumer_name for c in bucket_consumptions)
-
-                cumulative_quantity += bucket_quantity
-                cumulative_value += bucket_value
-                cumulative_consumers.update(bucket_consumers)
-
-                timeline_data.append({
-                    "period_start": bucket_start.isoformat(),
-                    "period_end": bucket_end.isoformat(),
-                    "period_label": self._format_period_label(bucket_start, granularity),
-                    "consumptions_count": len(bucket_consumptions),
-                    "quantity_consumed": bucket_quantity,
-                    "value_consumed": float(bucket_value),
-                    "unique_consumers": len(bucket_consumers),
-                    "cumulative_quantity": cumulative_quantity,
-                    "cumulative_value": float(cumulative_value),
-                    "cumulative_consumers": len(cumulative_consumers)
-                })
+            time_buckets = self._generate_time_buckets(start_time, end_time, granularity) or [(start_time, end_time)]
+            timeline_data = self._bucket_consumptions(consumptions, time_buckets, granularity)
 
             return {
                 "expedition_id": expedition_id,
@@ -337,21 +382,18 @@ class AnalyticsService(BaseService):
             Comparative analysis data
         """
         try:
-            expedition_data = []
-
-            for exp_id in expedition_ids:
-                metrics = self.get_expedition_performance_metrics(exp_id)
-                if metrics:
-                    expedition_data.append(metrics)
-
+            expedition_data = self.get_bulk_expedition_metrics(expedition_ids)
             if not expedition_data:
                 return {}
 
-            # Calculate comparative metrics
+            # Compact per-expedition arrays, indexed like expedition_data
             performance_scores = [exp["performance_scores"]["overall_performance_score"] for exp in expedition_data]
             completion_rates = [exp["completion_metrics"]["quantity_completion_rate"] for exp in expedition_data]
             revenue_values = [exp["financial_metrics"]["total_value"] for exp in expedition_data]
+            revenue_velocities = [exp["efficiency_metrics"]["revenue_velocity"] for exp in expedition_data]
             duration_days = [exp["duration_days"] for exp in expedition_data]
+            days_per_revenue = [days / max(revenue, 1) for days, revenue in zip(duration_days, revenue_values)]
+            indexes = range(len(expedition_data))
 
             return {
                 "expeditions_compared": len(expedition_data),
@@ -359,43 +401,49 @@ class AnalyticsService(BaseService):
 
                 "performance_comparison": {
                     "avg_performance_score": round(statistics.mean(performance_scores), 2),
-                    "best_performing": max(expedition_data, key=lambda x: x["performance_scores"]["overall_performance_score"]),
-                    "worst_performing": min(expedition_data, key=lambda x: x["performance_scores"]["overall_performance_score"]),
+                    "best_performing": expedition_data[max(indexes, key=performance_scores.__getitem__)],
+                    "worst_performing": expedition_data[min(indexes, key=performance_scores.__getitem__)],
                     "performance_std_dev": round(statistics.stdev(performance_scores) if len(performance_scores) > 1 else 0, 2)
                 },
 
                 "completion_comparison": {
                     "avg_completion_rate": round(statistics.mean(completion_rates), 2),
                     "completion_std_dev": round(statistics.stdev(completion_rates) if len(completion_rates) > 1 else 0, 2),
-                    "fastest_completion": min(expedition_data, key=lambda x: x["duration_days"]) if expedition_data else None
+                    "fastest_completion": expedition_data[min(indexes, key=duration_days.__getitem__)]
                 },
 
                 "financial_comparison": {
                     "total_revenue": sum(revenue_values),
                     "avg_revenue": round(statistics.mean(revenue_values), 2),
                     "revenue_std_dev": round(statistics.stdev(revenue_values) if len(revenue_values) > 1 else 0, 2),
-                    "highest_revenue": max(expedition_data, key=lambda x: x["financial_metrics"]["total_value"]),
-                    "most_efficient": min(expedition_data, key=lambda x: x["duration_days"] / max(x["financial_metrics"]["total_value"], 1))
+                    "highest_revenue": expedition_data[max(indexes, key=revenue_values.__getitem__)],
+                    "most_efficient": expedition_data[min(indexes, key=days_per_revenue.__getitem__)]
                 },
 
-                "expedition_rankings": self._rank_expeditions(expedition_data)
+                "expedition_rankings": self._rank_expeditions(expedition_data, {
+                    "by_performance": performance_scores,
+                    "by_revenue": revenue_values,
+                    "by_completion": completion_rates,
+                    "by_efficiency": revenue_velocities
+                })
             }
 
         except Exception as e:
             self.logger.error(f"Failed to generate comparative analytics: {e}", exc_info=True)
             return {}
 
-    def _calculate_timeliness_score(self, expedition, duration: timedelta, time_to_deadline: Optional[timedelta]) -> float:
+    def _calculate_timeliness_score(self, created_at: Optional[datetime], deadline: Optional[datetime],
+                                    duration: timedelta, time_to_deadline: Optional[timedelta]) -> float:
         """Calculate timeliness performance score (0-100)."""
-        if not expedition.deadline:
+        if not deadline:
             return 100  # No deadline = perfect timeliness
 
-        if not time_to_deadline:
+        if not time_to_deadline or not created_at or deadline <= created_at:
             return 50  # Unknown deadline status
 
         if time_to_deadline.total_seconds() > 0:
             # Still on time - score based on how much time is left
-            total_duration = expedition.deadline - expedition.created_at
+            total_duration = deadline - created_at
             progress = duration.total_seconds() / total_duration.total_seconds()
             return max(100 - (progress * 50), 50)  # 50-100 score range
         else:
@@ -403,19 +451,89 @@ class AnalyticsService(BaseService):
             overdue_hours = abs(time_to_deadline.total_seconds()) / 3600
             return max(50 - overdue_hours, 0)  # Decreasing score for overdue
 
-    def _get_top_consumers(self, consumer_spending: Dict[str, Decimal], consumption_frequency: Dict[str, int]) -> List[Dict[str, Any]]:
-        """Get top consumers ranked by spending and frequency."""
-        consumer_data = []
+    def _get_timeline_consumptions(self, expedition_id: int) -> List[Tuple[datetime, int, Decimal, str]]:
+        """
+        Get the columns the timeline needs, ordered by consumption time.
+
+        Args:
+            expedition_id: Expedition identifier
 
-        for consumer in consumer_spending.keys():
-            consumer_data.append({
-                "consumer_name": consumer,
-                "total_spent": float(consumer_spending[consumer]),
-                "consumption_count": consumption_frequency[consumer],
-                "avg_consumption_value": float(consumer_spending[consumer] / consumption_frequency[consumer])
+        Returns:
+            List of (consumed_at, quantity, total_cost, consumer_name) rows
+        """
+        query = """
+            SELECT ea.assigned_at, ea.consumed_quantity, ea.total_cost,
+                   COALESCE(ep.original_name, ep.pirate_name)
+            FROM expedition_assignments ea
+            JOIN expedition_pirates ep ON ep.id = ea.pirate_id
+            WHERE ea.expedition_id = %s AND ea.assigned_at IS NOT NULL
+            ORDER BY ea.assigned_at
+        """
+        return self._execute_query(query, (expedition_id,), fetch_all=True) or []
+
+    def _bucket_consumptions(self, consumptions: List[Tuple[datetime, int, Decimal, str]],
+                             time_buckets: List[Tuple[datetime, datetime]],
+                             granularity: str) -> List[Dict[str, Any]]:
+        """
+        Aggregate time-ordered consumptions into buckets in one merge pass.
+
+        Each consumption is visited once and each bucket is emitted once, so the
+        cost is O(consumptions + buckets). The last bucket also takes rows at
+        its end, so the latest consumption is always counted. Rows before the
+        first bucket are skipped.
+
+        Args:
+            consumptions: (consumed_at, quantity, total_cost, consumer_name) rows, ordered by time
+            time_buckets: Contiguous (start, end) buckets from _generate_time_buckets
+            granularity: Time granularity used for period labels
+
+        Returns:
+            One timeline entry per bucket, with running totals
+        """
+        timeline_data = []
+        cumulative_quantity = 0
+        cumulative_value = Decimal('0')
+        cumulative_consumers = set()
+
+        position = 0
+        total = len(consumptions)
+        first_start = time_buckets[0][0] if time_buckets else None
+        while position < total and consumptions[position][0] < first_start:
+            position += 1
+
+        last_index = len(time_buckets) - 1
+        for index, (bucket_start, bucket_end) in enumerate(time_buckets):
+            bucket_count = 0
+            bucket_quantity = 0
+            bucket_value = Decimal('0')
+            bucket_consumers = set()
+
+            while position < total and (consumptions[position][0] < bucket_end or index == last_index):
+                _, quantity, total_cost, consumer_name = consumptions[position]
+                bucket_count += 1
+                bucket_quantity += quantity or 0
+                bucket_value += total_cost or 0
+                bucket_consumers.add(consumer_name)
+                position += 1
+
+            cumulative_quantity += bucket_quantity
+            cumulative_value += bucket_value
+            cumulative_consumers.update(bucket_consumers)
+
+            timeline_data.append({
+                "period_start": bucket_start.isoformat(),
+                "period_end": bucket_end.isoformat(),
+                "period_label": self._format_period_label(bucket_start, granularity),
+                "consumptions_count": bucket_count,
+                "quantity_consumed": bucket_quantity,
+                "value_consumed": float(bucket_value),
+                "unique_consumers": len(bucket_consumers),
+                "cumulative_quantity": cumulative_quantity,
+                "cumulative_value": float(cumulative_value),
+                "cumulative_consumers": len(cumulative_consumers)
             })
 
-        return sorted(consumer_data, key=lambda x: x["total_spent"], reverse=True)
+        return timeline_data
 
     def _generate_time_buckets(self, start_time: datetime, end_time: datetime, granularity: str) -> List[Tuple[datetime, datetime]]:
         """Generate time buckets for timeline analysis."""
@@ -469,18 +587,24 @@ class AnalyticsService(BaseService):
         else:
             return "high"
 
-    def _rank_expeditions(self, expedition_data: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Rank expeditions across multiple criteria."""
-        ranked_data = {
-            "by_performance": sorted(expedition_data, key=lambda x: x["performance_scores"]["overall_performance_score"], reverse=True),
-            "by_revenue": sorted(expedition_data, key=lambda x: x["financial_metrics"]["total_value"], reverse=True),
-            "by_completion": sorted(expedition_data, key=lambda x: x["completion_metrics"]["quantity_completion_rate"], reverse=True),
-            "by_efficiency": sorted(expedition_data, key=lambda x: x["efficiency_metrics"]["revenue_velocity"], reverse=True)
-        }
+    def _rank_expeditions(self, expedition_data: List[Dict[str, Any]],
+                          criteria: Dict[str, List[float]]) -> Dict[str, Any]:
+        """
+        Rank expeditions across multiple criteria.
 
-        # Add ranking positions
-        for category, rankings in ranked_data.items():
-            for i, exp in enumerate(rankings):
-                exp[f"{category}_rank"] = i + 1
+        Args:
+            expedition_data: Expedition metrics
+            criteria: Category name -> one score per expedition (higher ranks first)
 
-        return ranked_data
\ No newline at end of file
+        Returns:
+            Category name -> expedition metrics in rank order
+        """
+        ranked_data = {}
+        for category, values in criteria.items():
+            order = sorted(range(len(values)), key=values.__getitem__, reverse=True)
+            # Add ranking positions
+            for position, index in enumerate(order, 1):
+                expedition_data[index][f"{category}_rank"] = position
+            ranked_data[category] = [expedition_data[index] for index in order]
+
+        return ranked_data
@@ -0,0 +1,581 @@
+"""
+Batch migration service.
+Runs data migrations (owner key backfill, pirate name encryption, master key
+re-encryption) as resumable keyset-batched jobs: each batch is read by
+ascending key, transformed by a pool of worker threads (the crypto), written
+with multi-row UPDATE ... FROM (VALUES ...) statements and checkpointed in
+migration_checkpoints in the same transaction, so a crashed run resumes after
+the last committed batch.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from services.base_service import BaseService, ServiceError, ValidationError
+
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_WORKERS = 4
+MAX_BATCH_RETRIES = 3
+
+
+class BatchConflictError(ServiceError):
+    """Raised by a migration when rows changed under a batch; the batch is rolled back and re-read."""
+    pass
+
+
+@dataclass
+class MigrationReport:
+    """Counters for one migration run."""
+    name: str
+    resumed_from: int = 0
+    last_key: int = 0
+    batches: int = 0
+    rows_scanned: int = 0
+    written: int = 0
+    failed: int = 0
+    skipped: int = 0
+    retries: int = 0
+    first_failed_key: Optional[int] = None
+    elapsed_seconds: float = 0.0
+    completed: bool = False
+
+    @property
+    def checkpoint_key(self) -> int:
+        """Key the checkpoint is held at: just below the first failed key, if any."""
+        return self.last_key if self.first_failed_key is None else self.first_failed_key - 1
+
+    @property
+    def rows_per_second(self) -> float:
+        """Rows scanned per second of wall time."""
+        return self.rows_scanned / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for the migration report."""
+        return {
+            'name': self.name,
+            'resumed_from': self.resumed_from,
+            'last_key': self.last_key,
+            'batches': self.batches,
+            'rows_scanned': self.rows_scanned,
+            'written': self.written,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'retries': self.retries,
+            'first_failed_key': self.first_failed_key,
+            'checkpoint_key': self.checkpoint_key,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'completed': self.completed
+        }
+
+
+def values_update(cursor, table: str, assignments: str, columns: Sequence[Tuple[str, str]],
+                  rows: Sequence[tuple], condition: str = "") -> Set[int]:
+    """
+    Update many rows with one UPDATE ... FROM (VALUES ...) statement.
+
+    Args:
+        cursor: Open database cursor
+        table: Table to update (aliased as t)
+        assignments: SET clause over t and v, e.g. "owner_key = v.owner_key"
+        columns: (name, SQL type) of each VALUES column; the first one is
+            matched against t.id
+        rows: One tuple per row, in column order
+        condition: Extra WHERE condition, e.g. a guard on the value that was read
+
+    Returns:
+        Set of ids that were updated
+    """
+    if not rows:
+        return set()
+    placeholders = "(" + ", ".join(f"%s::{sql_type}" for _, sql_type in columns) + ")"
+    names = ", ".join(name for name, _ in columns)
+    cursor.execute(f"""
+        UPDATE {table} t
+        SET {assignments}
+        FROM (VALUES {", ".join([placeholders] * len(rows))}) AS v({names})
+        WHERE t.id = v.{columns[0][0]} {"AND " + condition if condition else ""}
+        RETURNING t.id
+    """, tuple(value for row in rows for value in row))
+    return {row[0] for row in cursor.fetchall()}
+
+
+class BatchMigration(ABC):
+    """
+    One resumable migration.
+
+    Subclasses read batches of rows whose first column is an increasing
+    integer key, turn each row into an update in transform() (called from
+    worker threads, so it must not touch the database), and write a batch of
+    updates in write_batch().
+    """
+
+    name = ''
+
+    @abstractmethod
+    def fetch_batch(self, cursor, after_key: int, batch_size: int) -> List[tuple]:
+        """
+        Read the next rows to migrate.
+
+        Args:
+            cursor: Open database cursor
+            after_key: Only rows with a larger key are read
+            batch_size: Maximum rows to read
+
+        Returns:
+            Rows ordered by key; the key is the first column
+        """
+        pass
+
+    @abstractmethod
+    def transform(self, row: tuple) -> Optional[tuple]:
+        """
+        Compute the update for one row.
+
+        Args:
+            row: Row returned by fetch_batch()
+
+        Returns:
+            Update tuple for write_batch(), or None if the row cannot be migrated
+        """
+        pass
+
+    @abstractmethod
+    def write_batch(self, cursor, updates: List[tuple]) -> int:
+        """
+        Write a batch of updates.
+
+        Args:
+            cursor: Open database cursor (committed by the runner)
+            updates: Non-empty list of transform() results
+
+        Returns:
+            Number of updates applied; the rest count as skipped
+
+        Raises:
+            BatchConflictError: If the batch must be re-read and retried
+        """
+        pass
+
+
+class OwnerKeyBackfillMigration(BatchMigration):
+    """Give expeditions without an owner key their owner's key."""
+
+    name = 'backfill_expedition_owner_keys'
+
+    def __init__(self):
+        from utils.encryption import get_encryption_service
+        self.encryption_service = get_encryption_service()
+
+    def fetch_batch(self, cursor, after_key: int, batch_size: int) -> List[tuple]:
+        cursor.execute("""
+            SELECT id, owner_chat_id
+            FROM expeditions
+            WHERE id > %s AND (owner_key IS NULL OR owner_key = '')
+            ORDER BY id
+            LIMIT %s
+        """, (after_key, batch_size))
+        return cursor.fetchall()
+
+    def transform(self, row: tuple) -> Optional[tuple]:
+        expedition_id, owner_chat_id = row
+        if owner_chat_id is None:
+            return None
+        return (expedition_id, self.encryption_service.generate_owner_key(expedition_id, owner_chat_id),
+                owner_chat_id)
+
+    def write_batch(self, cursor, updates: List[tuple]) -> int:
+        return len(values_update(
+            cursor, 'expeditions',
+            "owner_key = v.owner_key, owner_user_id = v.owner_user_id",
+            [('id', 'integer'), ('owner_key', 'text'), ('owner_user_id', 'bigint')],
+            updates,
+            condition="(t.owner_key IS NULL OR t.owner_key = '')"
+        ))
+
+
+class PirateEncryptionMigration(BatchMigration):
+    """
+    Move plain-text pirate names into encrypted identities (full encryption mode).
+
+    Each pirate gets its own version 2 mapping {original_name: pirate_name},
+    verified by decrypting it, and original_name is set to NULL. Pirates that
+    already have an identity only lose their original_name.
+    """
+
+    def __init__(self, expedition_id: Optional[int] = None):
+        """
+        Args:
+            expedition_id: Only migrate this expedition (default: all)
+        """
+        from utils.encryption import get_encryption_service
+        self.encryption_service = get_encryption_service()
+        self.expedition_id = expedition_id
+        self.name = 'encrypt_pirate_names' + (f':{expedition_id}' if expedition_id is not None else '')
+
+    def fetch_batch(self, cursor, after_key: int, batch_size: int) -> List[tuple]:
+        expedition_condition = "AND ep.expedition_id = %s" if self.expedition_id is not None else ""
+        params = [after_key] + ([self.expedition_id] if self.expedition_id is not None else []) + [batch_size]
+        cursor.execute(f"""
+            SELECT ep.id, ep.expedition_id, ep.original_name, ep.pirate_name,
+                   (ep.encrypted_identity_v2 IS NOT NULL OR COALESCE(ep.encrypted_identity, '') != '')
+                       AS has_identity,
+                   COALESCE(e.owner_key, umk.master_key)
+            FROM expedition_pirates ep
+            JOIN expeditions e ON e.id = ep.expedition_id
+            LEFT JOIN user_master_keys umk ON umk.owner_chat_id = e.owner_chat_id
+            WHERE ep.id > %s AND ep.original_name IS NOT NULL {expedition_condition}
+            ORDER BY ep.id
+            LIMIT %s
+        """, tuple(params))
+        return cursor.fetchall()
+
+    def transform(self, row: tuple) -> Optional[tuple]:
+        pirate_id, expedition_id, original_name, pirate_name, has_identity, owner_key = row
+        if has_identity:
+            return (pirate_id, None, original_name)
+        if not owner_key:
+            return None
+
+        mapping = {original_name: pirate_name}
+        identity = self.encryption_service.encrypt_name_mapping_v2(expedition_id, mapping, owner_key)
+        check = self.encryption_service.decrypt_name_mapping(identity, owner_key)
+        if check is None or check['mapping'] != mapping:
+            return None
+        return (pirate_id, identity, original_name)
+
+    def write_batch(self, cursor, updates: List[tuple]) -> int:
+        # Rows whose original_name changed since the read are left for the next run
+        return len(values_update(
+            cursor, 'expedition_pirates',
+            """encrypted_identity_v2 = COALESCE(v.identity, t.encrypted_identity_v2),
+               encrypted_identity = CASE WHEN v.identity IS NULL THEN t.encrypted_identity END,
+               original_name = NULL""",
+            [('id', 'integer'), ('identity', 'bytea'), ('previous', 'text')],
+            updates,
+            condition="t.original_name = v.previous"
+        ))
+
+
+class MasterKeyMigration(BatchMigration):
+    """
+    Switch expeditions from per-expedition keys to their owner's master key.
+
+    Work units are expeditions: each one's pirate identities and item
+    mappings are decrypted with the old key and re-encrypted (version 2) with
+    the master key, then the expedition's owner_key is switched, all in the
+    batch's transaction. An expedition with any value that neither key opens
+    is left untouched.
+    """
+
+    def __init__(self, owner_chat_id: Optional[int] = None):
+        """
+        Args:
+            owner_chat_id: Only migrate this owner's expeditions (default: all)
+        """
+        from utils.encryption import get_encryption_service
+        self.encryption_service = get_encryption_service()
+        self.owner_chat_id = owner_chat_id
+        self.name = 'migrate_to_master_keys' + (f':{owner_chat_id}' if owner_chat_id is not None else '')
+
+    def fetch_batch(self, cursor, after_key: int, batch_size: int) -> List[tuple]:
+        owner_condition = "AND e.owner_chat_id = %s" if self.owner_chat_id is not None else ""
+        params = [after_key] + ([self.owner_chat_id] if self.owner_chat_id is not None else []) + [batch_size]
+        cursor.execute(f"""
+            SELECT e.id, e.owner_chat_id, e.owner_key, umk.master_key
+            FROM expeditions e
+            LEFT JOIN user_master_keys umk ON umk.owner_chat_id = e.owner_chat_id
+            WHERE e.id > %s AND e.owner_chat_id IS NOT NULL
+              AND (umk.master_key IS NULL OR e.owner_key IS DISTINCT FROM umk.master_key)
+              {owner_condition}
+            ORDER BY e.id
+            LIMIT %s
+        """, tuple(params))
+        expeditions = cursor.fetchall()
+        if not expeditions:
+            return []
+
+        expedition_ids = [row[0] for row in expeditions]
+        ciphertexts = {expedition_id: ([], []) for expedition_id in expedition_ids}
+        cursor.execute("""
+            SELECT expedition_id, id, brambler_ciphertext(encrypted_identity, encrypted_identity_v2)
+            FROM expedition_pirates
+            WHERE expedition_id = ANY(%s)
+              AND (encrypted_identity_v2 IS NOT NULL OR COALESCE(encrypted_identity, '') != '')
+        """, (expedition_ids,))
+        for expedition_id, pirate_id, ciphertext in cursor.fetchall():
+            ciphertexts[expedition_id][0].append((pirate_id, ciphertext))
+        cursor.execute("""
+            SELECT expedition_id, id, brambler_ciphertext(encrypted_mapping, encrypted_mapping_v2)
+            FROM expedition_items
+            WHERE expedition_id = ANY(%s)
+              AND (encrypted_mapping_v2 IS NOT NULL OR COALESCE(encrypted_mapping, '') != '')
+        """, (expedition_ids,))
+        for expedition_id, item_id, ciphertext in cursor.fetchall():
+            ciphertexts[expedition_id][1].append((item_id, ciphertext))
+
+        return [row + ciphertexts[row[0]] for row in expeditions]
+
+    def transform(self, row: tuple) -> Optional[tuple]:
+        expedition_id, owner_chat_id, old_key, master_key, pirates, items = row
+        master_key = master_key or self.encryption_service.generate_user_master_key(owner_chat_id)
+
+        pirate_updates = []
+        item_updates = []
+        for values, updates in ((pirates, pirate_updates), (items, item_updates)):
+            for row_id, ciphertext in values:
+                mapping_data = self.encryption_service.decrypt_name_mapping(ciphertext, old_key) if old_key else None
+                if mapping_data is None:
+                    # Already under the master key (an earlier interrupted write)?
+                    if self.encryption_service.decrypt_name_mapping(ciphertext, master_key) is not None:
+                        continue
+                    return None
+                updates.append((row_id, self.encryption_service.reencrypt_v2(mapping_data, master_key), ciphertext))
+
+        return (expedition_id, owner_chat_id, master_key, old_key, pirate_updates, item_updates)
+
+    def write_batch(self, cursor, updates: List[tuple]) -> int:
+        owners = sorted({(owner_chat_id, master_key) for _, owner_chat_id, master_key, _, _, _ in updates})
+        values = ", ".join(["(%s, %s, 1)"] * len(owners))
+        cursor.execute(f"""
+            INSERT INTO user_master_keys (owner_chat_id, master_key, key_version)
+            VALUES {values}
+            ON CONFLICT (owner_chat_id) DO NOTHING
+        """, tuple(value for owner in owners for value in owner))
+
+        for table, column, index in (('expedition_pirates', 'encrypted_identity', 4),
+                                     ('expedition_items', 'encrypted_mapping', 5)):
+            rows = [value for update in updates for value in update[index]]
+            written = values_update(
+                cursor, table,
+                f"{column}_v2 = v.ciphertext, {column} = NULL",
+                [('id', 'integer'), ('ciphertext', 'bytea'), ('previous', 'text')],
+                rows,
+                condition=f"brambler_ciphertext(t.{column}, t.{column}_v2) = v.previous"
+            )
+            if len(written) != len(rows):
+                raise BatchConflictError(f"{len(rows) - len(written)} {table} rows changed while re-encrypting")
+
+        rows = [(expedition_id, master_key, old_key) for expedition_id, _, master_key, old_key, _, _ in updates]
+        written = values_update(
+            cursor, 'expeditions',
+            "owner_key = v.master_key",
+            [('id', 'integer'), ('master_key', 'text'), ('previous', 'text')],
+            rows,
+            condition="t.owner_key IS NOT DISTINCT FROM v.previous"
+        )
+        if len(written) != len(rows):
+            raise BatchConflictError(f"{len(rows) - len(written)} expedition keys changed while re-encrypting")
+        return len(written)
+
+
+class BatchMigrationService(BaseService):
+    """
+    Service for running BatchMigrations.
+
+    Reads, transforms in a thread pool, writes and checkpoints batch by
+    batch. The checkpoint row (migration_checkpoints) is updated in the same
+    transaction as the batch's writes, so it never runs ahead of them. Once
+    a row fails transform() the checkpoint is held just below its key for
+    the rest of the run, so a resumed run re-reads the failed rows instead
+    of skipping them (rows already migrated no longer match). Dry
+    runs transform every batch and report throughput without writing
+    anything, checkpoints included.
+    """
+
+    def get_checkpoint(self, name: str) -> Optional[Dict]:
+        """
+        Get a migration's checkpoint.
+
+        Args:
+            name: Migration name
+
+        Returns:
+            Dictionary with last_key, counters and timestamps, or None if the
+            migration never ran
+        """
+        row = self._execute_query("""
+            SELECT last_key, rows_scanned, rows_written, rows_failed, started_at, updated_at, completed_at
+            FROM migration_checkpoints
+            WHERE migration_name = %s
+        """, (name,), fetch_one=True)
+        if not row:
+            return None
+        last_key, rows_scanned, rows_written, rows_failed, started_at, updated_at, completed_at = row
+        return {
+            'last_key': last_key,
+            'rows_scanned': rows_scanned,
+            'rows_written': rows_written,
+            'rows_failed': rows_failed,
+            'started_at': started_at,
+            'updated_at': updated_at,
+            'completed_at': completed_at
+        }
+
+    def run(self, migration: BatchMigration, batch_size: int = DEFAULT_BATCH_SIZE,
+            workers: int = DEFAULT_WORKERS, max_batches: Optional[int] = None,
+            dry_run: bool = False, restart: bool = False,
+            on_batch: Optional[Callable[[MigrationReport], None]] = None) -> MigrationReport:
+        """
+        Run a migration, resuming from its checkpoint.
+
+        An unfinished checkpoint is resumed; a finished one (or restart=True)
+        starts a new run from the first key. Migrations only select rows that
+        still need work, so starting over is always safe.
+
+        Args:
+            migration: Migration to run
+            batch_size: Rows per batch
+            workers: Worker threads for transform() (1 = run inline)
+            max_batches: Stop after this many batches (default: until done)
+            dry_run: Transform and report without writing
+            restart: Ignore an unfinished checkpoint
+            on_batch: Called with the report after each batch (progress output)
+
+        Returns:
+            MigrationReport for this run
+        """
+        if batch_size < 1 or workers < 1:
+            raise ValidationError("batch_size and workers must be positive")
+
+        checkpoint = self.get_checkpoint(migration.name)
+        after_key = 0
+        if checkpoint and checkpoint['completed_at'] is None and not restart:
+            after_key = checkpoint['last_key']
+        report = MigrationReport(name=migration.name, resumed_from=after_key, last_key=after_key)
+
+        if not dry_run:
+            self._start_checkpoint(migration.name, after_key)
+
+        start_time = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while max_batches is None or report.batches < max_batches:
+                last_key = self._run_batch(migration, report, after_key, batch_size, pool, dry_run)
+                report.elapsed_seconds = time.perf_counter() - start_time
+                if last_key is None:
+                    report.completed = True
+                    break
+                after_key = report.last_key = last_key
+                report.batches += 1
+                if on_batch:
+                    on_batch(report)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        report.elapsed_seconds = time.perf_counter() - start_time
+        if report.completed and not dry_run:
+            self._execute_query("""
+                UPDATE migration_checkpoints
+                SET completed_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                WHERE migration_name = %s
+            """, (migration.name,))
+
+        self._log_operation("BatchMigrationRun", **report.to_dict(), dry_run=dry_run)
+        return report
+
+    def _run_batch(self, migration: BatchMigration, report: MigrationReport, after_key: int,
+                   batch_size: int, pool: Optional[ThreadPoolExecutor], dry_run: bool) -> Optional[int]:
+        """Read, transform, write and checkpoint one batch; returns its last key (None when done)."""
+        for attempt in range(MAX_BATCH_RETRIES + 1):
+            try:
+                with self.db_manager.get_connection() as conn:
+                    with conn.cursor() as cursor:
+                        rows = migration.fetch_batch(cursor, after_key, batch_size)
+                        conn.commit()
+                        if not rows:
+                            return None
+
+                        results = list(pool.map(migration.transform, rows) if pool
+                                       else map(migration.transform, rows))
+                        updates = [result for result in results if result is not None]
+                        failed = len(results) - len(updates)
+                        first_failed_key = report.first_failed_key
+                        if first_failed_key is None and failed:
+                            first_failed_key = next(row[0] for row, result in zip(rows, results)
+                                                    if result is None)
+                        checkpoint_key = rows[-1][0] if first_failed_key is None else first_failed_key - 1
+
+                        written = len(updates)
+                        if not dry_run:
+                            written = migration.write_batch(cursor, updates) if updates else 0
+                            cursor.execute("""
+                                UPDATE migration_checkpoints
+                                SET last_key = %s,
+                                    rows_scanned = rows_scanned + %s,
+                                    rows_written = rows_written + %s,
+                                    rows_failed = rows_failed + %s,
+                                    updated_at = CURRENT_TIMESTAMP
+                                WHERE migration_name = %s
+                            """, (checkpoint_key, len(rows), written, failed, migration.name))
+                            conn.commit()
+
+                        report.rows_scanned += len(rows)
+                        report.written += written
+                        report.failed += failed
+                        report.skipped += len(updates) - written
+                        report.first_failed_key = first_failed_key
+                        return rows[-1][0]
+
+            except BatchConflictError as e:
+                if attempt == MAX_BATCH_RETRIES:
+                    raise
+                report.retries += 1
+                self.logger.warning(f"Retrying {migration.name} batch after key {after_key}: {e}")
+            except ServiceError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Migration {migration.name} failed after key {after_key}: {e}", exc_info=True)
+                raise ServiceError(f"Migration {migration.name} failed: {str(e)}")
+
+    def _start_checkpoint(self, name: str, after_key: int) -> None:
+        """Create the checkpoint row, or reset it for a new run."""
+        self._execute_query("""
+            INSERT INTO migration_checkpoints (migration_name, last_key)
+            VALUES (%s, %s)
+            ON CONFLICT (migration_name) DO UPDATE SET
+                last_key = EXCLUDED.last_key,
+                rows_scanned = CASE WHEN EXCLUDED.last_key = 0 THEN 0 ELSE migration_checkpoints.rows_scanned END,
+                rows_written = CASE WHEN EXCLUDED.last_key = 0 THEN 0 ELSE migration_checkpoints.rows_written END,
+                rows_failed = CASE WHEN EXCLUDED.last_key = 0 THEN 0 ELSE migration_checkpoints.rows_failed END,
+                started_at = CASE WHEN EXCLUDED.last_key = 0 THEN CURRENT_TIMESTAMP
+                                  ELSE migration_checkpoints.started_at END,
+                completed_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+        """, (name, after_key))
+
+
+def add_runner_arguments(parser) -> None:
+    """Add the shared batching options to a migration script's argparse parser."""
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Rows per batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Worker threads for encryption (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--max-batches', type=int,
+                        help='Stop after this many batches (default: until done)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Start from the beginning instead of resuming from the checkpoint')
+
+
+def log_report(logger, report: MigrationReport, dry_run: bool = False) -> None:
+    """Log a migration report in the migration scripts' format."""
+    stats = report.to_dict()
+    logger.info(f"\n{stats['name']}{' [DRY RUN]' if dry_run else ''}:")
+    if stats['resumed_from']:
+        logger.info(f"  Resumed after:  key {stats['resumed_from']}")
+    logger.info(f"  Batches:        {stats['batches']} (last key {stats['last_key']})")
+    logger.info(f"  Rows scanned:   {stats['rows_scanned']}")
+    logger.info(f"  Written:        {stats['written']}{' (would write)' if dry_run else ''}")
+    logger.info(f"  Failed:         {stats['failed']} (left unchanged)")
+    if stats['first_failed_key'] is not None:
+        logger.info(f"  Checkpoint:     held at key {stats['checkpoint_key']} "
+                    f"(first failed key {stats['first_failed_key']}); a resumed run re-reads the failed rows")
+    logger.info(f"  Skipped:        {stats['skipped']} (changed while migrating)")
+    logger.info(f"  Rows/sec:       {stats['rows_per_second']:,} ({stats['elapsed_seconds']}s)")
+    if not stats['completed']:
+        logger.info("  Stopped before the end; run again to resume")
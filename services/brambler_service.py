@@ -5,12 +5,17 @@ Handles pirate name generation and mapping for buyer anonymization.
 
 import hashlib
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 
 from services.base_service import BaseService, ServiceError, ValidationError, NotFoundError
 from core.interfaces import IBramblerService
 from models.expedition import PirateName
 from utils.input_sanitizer import InputSanitizer
+from utils.encryption import ciphertext_to_text
+from utils.pagination import KeysetPage, decode_cursor
+from utils.pirate_name_allocator import PirateNameAllocator, PirateNameSpace
+from utils.query_builder import escape_like
 
 
 class BramblerService(BaseService, IBramblerService):
@@ -19,6 +24,39 @@ class BramblerService(BaseService, IBramblerService):
     Implements both the interface requirements and handler requirements.
     """
 
+    # Pirate name components
+    PIRATE_PREFIXES = [
+        "Capitão", "Almirante", "Corsário", "Bucaneiro", "Lorde", "Comandante",
+        "Mestre", "Barão", "Conde", "Duque", "Sir", "Dom", "General", "Major",
+        "Tenente", "Sargento", "Cabo", "Soldado"
+    ]
+
+    PIRATE_NAMES = [
+        "Barbas Negras", "Perna de Pau", "Garra de Ferro", "Olho de Águia",
+        "Espada Sangrenta", "Barba Ruiva", "Dente de Ouro", "Mão de Ferro",
+        "Coração de Pedra", "Alma Perdida", "Vento Negro", "Tempestade",
+        "Trovão", "Relâmpago", "Furacão", "Maremoto", "Tsunami", "Terremoto"
+    ]
+
+    PIRATE_SUFFIXES = [
+        "o Terrível", "o Impiedoso", "o Sanguinário", "o Temido", "o Lendário",
+        "o Maldito", "o Cruel", "o Feroz", "o Bravo", "o Valente", "o Audaz",
+        "o Destemido", "das Sete Mares", "do Caribe", "do Pacífico", "do Atlântico"
+    ]
+
+    PIRATE_NAME_SPACE = PirateNameSpace(["{prefix} {name} {suffix}"], {
+        'prefix': PIRATE_PREFIXES,
+        'name': PIRATE_NAMES,
+        'suffix': PIRATE_SUFFIXES
+    })
+
+    # Insert rounds when concurrent inserts take allocated pirate names
+    NAME_CONFLICT_RETRIES = 5
+
+    # Process-wide allocator for generate_unique_pirate_name, loaded on first use
+    _unique_name_allocator: Optional[PirateNameAllocator] = None
+    _unique_name_lock = threading.Lock()
+
     def __init__(self):
         super().__init__()
         self.logger = logging.getLogger(__name__)
@@ -212,33 +250,13 @@ class BramblerService(BaseService, IBramblerService):
             # Use MD5 hash for deterministic generation
             hash_value = hashlib.md5(buyer_name.encode()).hexdigest()
 
-            # Pirate name components
-            prefixes = [
-                "Capitão", "Almirante", "Corsário", "Bucaneiro", "Lorde", "Comandante",
-                "Mestre", "Barão", "Conde", "Duque", "Sir", "Dom", "General", "Major",
-                "Tenente", "Sargento", "Cabo", "Soldado"
-            ]
-
-            pirate_names = [
-                "Barbas Negras", "Perna de Pau", "Garra de Ferro", "Olho de Águia",
-                "Espada Sangrenta", "Barba Ruiva", "Dente de Ouro", "Mão de Ferro",
-                "Coração de Pedra", "Alma Perdida", "Vento Negro", "Tempestade",
-                "Trovão", "Relâmpago", "Furacão", "Maremoto", "Tsunami", "Terremoto"
-            ]
-
-            suffixes = [
-                "o Terrível", "o Impiedoso", "o Sanguinário", "o Temido", "o Lendário",
-                "o Maldito", "o Cruel", "o Feroz", "o Bravo", "o Valente", "o Audaz",
-                "o Destemido", "das Sete Mares", "do Caribe", "do Pacífico", "do Atlântico"
-            ]
-
             # Use hash to select components deterministically
-            prefix_idx = int(hash_value[:2], 16) % len(prefixes)
-            name_idx = int(hash_value[2:4], 16) % len(pirate_names)
-            suffix_idx = int(hash_value[4:6], 16) % len(suffixes)
+            prefix_idx = int(hash_value[:2], 16) % len(self.PIRATE_PREFIXES)
+            name_idx = int(hash_value[2:4], 16) % len(self.PIRATE_NAMES)
+            suffix_idx = int(hash_value[4:6], 16) % len(self.PIRATE_SUFFIXES)
 
             # Create pirate name
-            pirate_name = f"{prefixes[prefix_idx]} {pirate_names[name_idx]} {suffixes[suffix_idx]}"
+            pirate_name = f"{self.PIRATE_PREFIXES[prefix_idx]} {self.PIRATE_NAMES[name_idx]} {self.PIRATE_SUFFIXES[suffix_idx]}"
 
             return pirate_name
 
@@ -246,6 +264,187 @@ class BramblerService(BaseService, IBramblerService):
             self.logger.error(f"Error generating pirate name for {buyer_name}: {e}")
             return f"Capitão {buyer_name} o Misterioso"
 
+    def _load_expedition_pirates(self, expedition_id: int,
+                                 owner_key: Optional[str] = None) -> Tuple[Dict[str, Tuple[int, str]], PirateNameAllocator]:
+        """
+        Load an expedition's pirates once for a batch of additions.
+
+        Encrypted identities (original_name NULL) are decrypted with owner_key
+        when given, so buyers that already have a pirate are recognised.
+
+        Args:
+            expedition_id: Expedition ID
+            owner_key: Owner key to decrypt encrypted identities
+
+        Returns:
+            Tuple of (original name -> (pirate id, pirate name), allocator with the
+            expedition's pirate names marked used)
+        """
+        rows = self._execute_query("""
+            SELECT id, original_name, pirate_name, encrypted_identity_v2, encrypted_identity
+            FROM expedition_pirates
+            WHERE expedition_id = %s
+        """, (expedition_id,), fetch_all=True) or []
+
+        encryption_service = None
+        if owner_key:
+            from utils.encryption import get_encryption_service
+            encryption_service = get_encryption_service()
+
+        existing = {}
+        allocator = PirateNameAllocator(self.PIRATE_NAME_SPACE)
+        for pirate_id, original_name, pirate_name, encrypted_v2, encrypted_v1 in rows:
+            allocator.mark_used(pirate_name)
+            encrypted_identity = encrypted_v2 if encrypted_v2 is not None else encrypted_v1
+            if original_name is None and encrypted_identity and encryption_service:
+                decrypted = encryption_service.decrypt_name_mapping(encrypted_identity, owner_key)
+                if decrypted:
+                    original_name = next((orig for orig, pirate in decrypted['mapping'].items()
+                                          if pirate == pirate_name), None)
+            if original_name is not None:
+                existing[original_name] = (pirate_id, pirate_name)
+
+        return existing, allocator
+
+    def _allocate_pirate_name(self, buyer_name: str, allocator: PirateNameAllocator) -> str:
+        """
+        Pick the buyer's deterministic pirate name, or the next free one if it is taken.
+
+        Args:
+            buyer_name: Original buyer name
+            allocator: Allocator for the expedition; the chosen name is marked used
+
+        Returns:
+            Pirate name not used before in the allocator
+        """
+        pirate_name = self._generate_deterministic_pirate_name(buyer_name)
+        if allocator.is_used(pirate_name):
+            return allocator.allocate()
+        allocator.mark_used(pirate_name)
+        return pirate_name
+
+    def _store_new_pirates(self, expedition_id: int, new_pirates: List[Tuple[str, str]],
+                           allocator: PirateNameAllocator,
+                           owner_key: Optional[str] = None) -> Dict[str, Tuple[int, str, Optional[bytes]]]:
+        """
+        Insert allocated pirates, re-allocating names lost to concurrent inserts.
+
+        With owner_key the identities are encrypted (binary version 2) and
+        original_name is stored as NULL; without it original_name is stored as is.
+
+        Args:
+            expedition_id: Expedition ID
+            new_pirates: (original name, allocated pirate name) pairs
+            allocator: Allocator the names came from
+            owner_key: Owner key for full encryption mode
+
+        Returns:
+            Dictionary of original name -> (pirate id, pirate name, encrypted identity)
+        """
+        from utils.encryption import get_encryption_service
+
+        stored = {}
+        pending = new_pirates
+        for attempt in range(self.NAME_CONFLICT_RETRIES):
+            if not pending:
+                break
+
+            if owner_key:
+                # Encrypt every identity in one pass over the owner's cipher
+                encrypted_identities = get_encryption_service().encrypt_name_mappings_v2(
+                    expedition_id,
+                    [{original_name: pirate_name} for original_name, pirate_name in pending],
+                    owner_key
+                )
+                rows = [(None, pirate_name, None, encrypted_identity)
+                        for (_, pirate_name), encrypted_identity in zip(pending, encrypted_identities)]
+            else:
+                encrypted_identities = [None] * len(pending)
+                rows = [(original_name, pirate_name, '', None) for original_name, pirate_name in pending]
+
+            inserted_ids = self._insert_pirates(expedition_id, rows)
+
+            retry = []
+            for (original_name, pirate_name), encrypted_identity in zip(pending, encrypted_identities):
+                if pirate_name in inserted_ids:
+                    stored[original_name] = (inserted_ids[pirate_name], pirate_name, encrypted_identity)
+                else:
+                    allocator.mark_used(pirate_name)
+                    retry.append((original_name, allocator.allocate()))
+            pending = retry
+
+        if pending:
+            self.logger.error(f"Could not store {len(pending)} pirates in expedition {expedition_id} "
+                              f"after {self.NAME_CONFLICT_RETRIES} attempts")
+        return stored
+
+    def _expedition_owner_key(self, expedition_id: int, expedition=None) -> str:
+        """
+        Get the key an expedition's names are encrypted with.
+
+        This is the expedition's stored owner_key or, when it has none, its
+        owner's master key. Without the expedition there is no owner to take a
+        key from, so this fails instead of encrypting under an unrelated key.
+
+        Args:
+            expedition_id: Expedition ID
+            expedition: The expedition, if the caller already loaded it
+
+        Returns:
+            Base64-encoded owner key
+
+        Raises:
+            NotFoundError: If the expedition does not exist
+        """
+        if expedition is None:
+            from core.modern_service_container import get_expedition_service
+            expedition = get_expedition_service().get_expedition_by_id(expedition_id)
+        if not expedition:
+            raise NotFoundError(f"Expedition {expedition_id} not found; cannot resolve its owner key")
+
+        if expedition.owner_key:
+            return expedition.owner_key
+
+        from services.master_key_service import MasterKeyService
+        self.logger.warning(f"Expedition {expedition_id} has no owner_key; using its owner's master key")
+        return MasterKeyService().get_master_key(expedition.owner_chat_id)
+
+    def _insert_pirates(self, expedition_id: int, rows: List[Tuple]) -> Dict[str, int]:
+        """
+        Insert pirates with one multi-row INSERT.
+
+        Pirate names taken by a concurrent insert are skipped, not raised.
+
+        Args:
+            expedition_id: Expedition ID
+            rows: (original_name, pirate_name, encrypted_identity, encrypted_identity_v2) tuples
+
+        Returns:
+            Dictionary of inserted pirate name -> new pirate ID
+        """
+        if not rows:
+            return {}
+
+        values = ", ".join(["(%s, %s, %s, %s, %s, 'participant', 'active')"] * len(rows))
+        params = tuple(
+            value
+            for original_name, pirate_name, encrypted_identity, encrypted_identity_v2 in rows
+            for value in (original_name, pirate_name, expedition_id, encrypted_identity, encrypted_identity_v2)
+        )
+        inserted = self._execute_query(f"""
+            INSERT INTO expedition_pirates
+                (original_name, pirate_name, expedition_id, encrypted_identity, encrypted_identity_v2, role, status)
+            VALUES {values}
+            ON CONFLICT (expedition_id, pirate_name) DO NOTHING
+            RETURNING id, pirate_name
+        """, params, fetch_all=True) or []
+
+        inserted_ids = {pirate_name: pirate_id for pirate_id, pirate_name in inserted}
+        if len(inserted_ids) < len(rows):
+            self.logger.warning(f"Skipped {len(rows) - len(inserted_ids)} pirate names taken concurrently "
+                                f"in expedition {expedition_id}")
+        return inserted_ids
+
     # Interface methods (IBramblerService)
     def generate_pirate_names(self, expedition_id: int, original_names: List[str], owner_key: Optional[str] = None, use_full_encryption: bool = True) -> List[PirateName]:
         """
@@ -254,6 +453,9 @@ class BramblerService(BaseService, IBramblerService):
         SECURITY: This method ALWAYS uses full encryption. The use_full_encryption parameter
         is kept for backward compatibility but is ignored - encryption is MANDATORY.
 
+        The expedition's pirates are loaded once, new names are allocated in memory,
+        and all new pirates are encrypted in one pass and inserted with one statement.
+
         Args:
             expedition_id: Expedition ID
             original_names: List of original names to anonymize
@@ -270,20 +472,12 @@ class BramblerService(BaseService, IBramblerService):
 
             # SECURITY: Get or generate owner key for encryption (REQUIRED)
             if not owner_key:
-                # Try to get owner key from expedition
                 from core.modern_service_container import get_expedition_service
-                expedition_service = get_expedition_service()
-                expedition = expedition_service.get_expedition_by_id(expedition_id)
-                if expedition and hasattr(expedition, 'owner_key') and expedition.owner_key:
-                    owner_key = expedition.owner_key
-                    self.logger.info(f"Using expedition owner key for encryption")
-                else:
-                    # Generate owner key if not available
-                    from utils.encryption import generate_owner_key as gen_key
-                    owner_key = gen_key(expedition_id, 1)  # Use expedition_id as owner_user_id fallback
-                    self.logger.warning(f"Generated fallback owner key for expedition {expedition_id}")
+                expedition = get_expedition_service().get_expedition_by_id(expedition_id)
+                owner_key = self._expedition_owner_key(expedition_id, expedition)
 
-                    # Save the generated key back to the expedition
+                if not expedition.owner_key:
+                    # Save the owner's key back to the expedition
                     try:
                         with self.db_manager.get_connection() as conn:
                             with conn.cursor() as cur:
@@ -293,62 +487,45 @@ class BramblerService(BaseService, IBramblerService):
                                     WHERE id = %s
                                 """, (owner_key, expedition_id))
                                 conn.commit()
-                        self.logger.info(f"Saved generated owner_key to expedition {expedition_id}")
+                        self.logger.info(f"Saved owner_key to expedition {expedition_id}")
                     except Exception as save_error:
                         self.logger.error(f"Failed to save owner_key to expedition: {save_error}")
 
-            for original_name in original_names:
-                # Check if pirate name already exists for this expedition
-                existing_pirate = self.get_pirate_name(expedition_id, original_name)
+            # Load the expedition's pirates once and allocate every new name in memory
+            existing, allocator = self._load_expedition_pirates(expedition_id, owner_key)
 
-                if existing_pirate:
+            new_pirates = []
+            for original_name in dict.fromkeys(original_names):
+                if original_name in existing:
                     # Use existing mapping
+                    pirate_id, existing_pirate = existing[original_name]
                     pirate_names.append(PirateName(
-                        id=0,  # Placeholder ID
+                        id=pirate_id,
                         original_name=original_name if not use_full_encryption else None,
                         pirate_name=existing_pirate,
                         expedition_id=expedition_id,
                         encrypted_mapping=''
                     ))
                 else:
-                    # Generate new pirate name
-                    pirate_name = self._generate_deterministic_pirate_name(original_name)
-
-                    # Prepare encrypted identity
-                    encrypted_identity = ''
-                    if use_full_encryption and owner_key:
-                        # Create encrypted mapping {original_name: pirate_name}
-                        from utils.encryption import get_encryption_service
-                        encryption_service = get_encryption_service()
-
-                        mapping = {original_name: pirate_name}
-                        encrypted_identity = encryption_service.encrypt_name_mapping(
-                            expedition_id,
-                            mapping,
-                            owner_key
-                        )
-                        self.logger.info(f"Encrypted identity for {pirate_name} (original name hidden)")
-
-                    # SECURITY: Store in database with FULL ENCRYPTION MODE
-                    # original_name is ALWAYS NULL for true anonymization
-                    with self.db_manager.get_connection() as conn:
-                        with conn.cursor() as cur:
-                            # SECURITY: Always use NULL for original_name - data is in encrypted_identity
-                            cur.execute("""
-                                INSERT INTO expedition_pirates (original_name, pirate_name, expedition_id, encrypted_identity, role, status)
-                                VALUES (NULL, %s, %s, %s, 'participant', 'active') RETURNING id
-                            """, (pirate_name, expedition_id, encrypted_identity))
-
-                            new_id = cur.fetchone()[0]
-                            conn.commit()
-                            self.logger.info(f"SECURITY: Stored pirate {pirate_name} with encrypted identity only (original_name=NULL)")
-
+                    new_pirates.append((original_name, self._allocate_pirate_name(original_name, allocator)))
+
+            if new_pirates:
+                # SECURITY: Store with FULL ENCRYPTION MODE in one statement
+                # original_name is ALWAYS NULL for true anonymization
+                stored = self._store_new_pirates(expedition_id, new_pirates, allocator, owner_key)
+                self.logger.info(f"SECURITY: Stored {len(stored)} pirates with encrypted identity only "
+                                 f"(original_name=NULL)")
+
+                for original_name, _ in new_pirates:
+                    if original_name not in stored:
+                        continue
+                    pirate_id, pirate_name, encrypted_identity = stored[original_name]
                     pirate_names.append(PirateName(
-                        id=new_id,
+                        id=pirate_id,
                         original_name=original_name if not use_full_encryption else None,
                         pirate_name=pirate_name,
                         expedition_id=expedition_id,
-                        encrypted_mapping=encrypted_identity
+                        encrypted_mapping=ciphertext_to_text(encrypted_identity)
                     ))
 
             self._log_operation("expedition_pirate_names_generated",
@@ -489,7 +666,8 @@ class BramblerService(BaseService, IBramblerService):
         try:
             # Use expedition_pirates table (new system)
             query = """
-                SELECT id, original_name, pirate_name, encrypted_identity
+                SELECT id, original_name, pirate_name,
+                       brambler_ciphertext(encrypted_identity, encrypted_identity_v2)
                 FROM expedition_pirates
                 WHERE expedition_id = %s
                 ORDER BY pirate_name
@@ -560,9 +738,10 @@ class BramblerService(BaseService, IBramblerService):
 
             # Get all encrypted identities
             query = """
-                SELECT pirate_name, encrypted_identity
+                SELECT pirate_name, brambler_ciphertext(encrypted_identity, encrypted_identity_v2)
                 FROM expedition_pirates
-                WHERE expedition_id = %s AND encrypted_identity IS NOT NULL AND encrypted_identity != ''
+                WHERE expedition_id = %s
+                  AND (encrypted_identity_v2 IS NOT NULL OR encrypted_identity != '')
             """
             rows = self._execute_query(query, (expedition_id,), fetch_all=True)
 
@@ -596,113 +775,51 @@ class BramblerService(BaseService, IBramblerService):
             self.logger.error(f"Error decrypting expedition pirates: {e}", exc_info=True)
             return {}
 
-    def decrypt_all_owner_pirates(self, owner_chat_id: int, owner_key: str) -> Dict[str, str]:
+    def decrypt_all_owner_pirates(self, owner_chat_id: int, owner_key: str,
+                                  include_archived: bool = False) -> Dict[str, str]:
         """
         Decrypt ALL pirate names across ALL expeditions owned by a user using master key.
 
+        Rows are streamed and decrypted in parallel chunks by BulkDecryptionService.
+
         Args:
             owner_chat_id: Owner's Telegram chat ID
             owner_key: Owner's master encryption key
+            include_archived: Also decrypt pirates of archived expeditions
 
         Returns:
             Dictionary mapping pirate_name -> original_name across ALL expeditions
         """
         try:
-            from utils.encryption import get_encryption_service
-            encryption_service = get_encryption_service()
-
-            # Get all encrypted identities from ALL owner's expeditions
-            query = """
-                SELECT ep.pirate_name, ep.encrypted_identity
-                FROM expedition_pirates ep
-                LEFT JOIN Expeditions e ON ep.expedition_id = e.id
-                WHERE e.owner_chat_id = %s
-                  AND ep.encrypted_identity IS NOT NULL
-                  AND ep.encrypted_identity != ''
-            """
-            rows = self._execute_query(query, (owner_chat_id,), fetch_all=True)
-
-            decrypted_mappings = {}
-
-            for pirate_name, encrypted_identity in rows:
-                try:
-                    # Decrypt individual identity
-                    decrypted = encryption_service.decrypt_name_mapping(
-                        encrypted_identity,
-                        owner_key
-                    )
-
-                    if decrypted and 'mapping' in decrypted:
-                        # Extract the original name from mapping
-                        mapping = decrypted['mapping']
-                        for orig_name, pirate in mapping.items():
-                            if pirate == pirate_name:
-                                decrypted_mappings[pirate_name] = orig_name
-                                break
-                except Exception as decrypt_error:
-                    self.logger.warning(f"Failed to decrypt {pirate_name}: {decrypt_error}")
-
-            self._log_operation("decrypt_all_owner_pirates",
-                              owner_chat_id=owner_chat_id,
-                              decrypted_count=len(decrypted_mappings))
-
-            return decrypted_mappings
+            from services.bulk_decryption_service import BulkDecryptionService
+            return BulkDecryptionService().decrypt_owner_mappings(
+                'pirates', owner_chat_id, owner_key, include_archived=include_archived
+            )
 
         except Exception as e:
             self.logger.error(f"Error decrypting all owner pirates: {e}", exc_info=True)
             return {}
 
-    def decrypt_all_owner_items(self, owner_chat_id: int, owner_key: str) -> Dict[str, str]:
+    def decrypt_all_owner_items(self, owner_chat_id: int, owner_key: str,
+                                include_archived: bool = False) -> Dict[str, str]:
         """
         Decrypt ALL item names across ALL expeditions owned by a user using master key.
 
+        Rows are streamed and decrypted in parallel chunks by BulkDecryptionService.
+
         Args:
             owner_chat_id: Owner's Telegram chat ID
             owner_key: Owner's master encryption key
+            include_archived: Also decrypt items of archived expeditions
 
         Returns:
             Dictionary mapping encrypted_item_name -> original_item_name across ALL expeditions
         """
         try:
-            from utils.encryption import get_encryption_service
-            encryption_service = get_encryption_service()
-
-            # Get all encrypted items from ALL owner's expeditions
-            query = """
-                SELECT ei.encrypted_product_name, ei.encrypted_mapping
-                FROM expedition_items ei
-                LEFT JOIN Expeditions e ON ei.expedition_id = e.id
-                WHERE e.owner_chat_id = %s
-                  AND ei.encrypted_mapping IS NOT NULL
-                  AND ei.encrypted_mapping != ''
-            """
-            rows = self._execute_query(query, (owner_chat_id,), fetch_all=True)
-
-            decrypted_mappings = {}
-
-            for encrypted_name, encrypted_mapping in rows:
-                try:
-                    # Decrypt individual mapping
-                    decrypted = encryption_service.decrypt_name_mapping(
-                        encrypted_mapping,
-                        owner_key
-                    )
-
-                    if decrypted and 'mapping' in decrypted:
-                        # Extract the original name from mapping
-                        mapping = decrypted['mapping']
-                        for orig_name, enc_name in mapping.items():
-                            if enc_name == encrypted_name:
-                                decrypted_mappings[encrypted_name] = orig_name
-                                break
-                except Exception as decrypt_error:
-                    self.logger.warning(f"Failed to decrypt item {encrypted_name}: {decrypt_error}")
-
-            self._log_operation("decrypt_all_owner_items",
-                              owner_chat_id=owner_chat_id,
-                              decrypted_count=len(decrypted_mappings))
-
-            return decrypted_mappings
+            from services.bulk_decryption_service import BulkDecryptionService
+            return BulkDecryptionService().decrypt_owner_mappings(
+                'items', owner_chat_id, owner_key, include_archived=include_archived
+            )
 
         except Exception as e:
             self.logger.error(f"Error decrypting all owner items: {e}", exc_info=True)
@@ -734,18 +851,23 @@ class BramblerService(BaseService, IBramblerService):
         """
         Generate a unique pirate name.
 
+        Names come from a process-wide allocator that loads the stored pirate
+        names once, so calls never repeat a name (even within the same second).
+
         Returns:
             Unique pirate name
         """
         try:
-            import random
-            import time
-
-            # Use timestamp for uniqueness
-            timestamp = str(int(time.time()))
-            unique_seed = f"unique_{timestamp}_{random.randint(1000, 9999)}"
+            with BramblerService._unique_name_lock:
+                if BramblerService._unique_name_allocator is None:
+                    rows = self._execute_query(
+                        "SELECT DISTINCT pirate_name FROM expedition_pirates", fetch_all=True
+                    )
+                    BramblerService._unique_name_allocator = PirateNameAllocator(
+                        self.PIRATE_NAME_SPACE, (row[0] for row in rows or [])
+                    )
 
-            return self._generate_deterministic_pirate_name(unique_seed)
+            return BramblerService._unique_name_allocator.allocate()
 
         except Exception as e:
             self.logger.error(f"Error generating unique pirate name: {e}")
@@ -959,85 +1081,104 @@ class BramblerService(BaseService, IBramblerService):
 
     def add_pirate_to_expedition(self, expedition_id: int, buyer_name: str) -> bool:
         """Add a buyer's global pirate name to an expedition."""
-        try:
-            # Check if buyer has a global pirate name
-            global_pirate_name = self.get_pirate_name_for_buyer(buyer_name)
-            if not global_pirate_name:
-                self.logger.warning(f"No global pirate name found for buyer {buyer_name}")
-                return False
+        return bool(self.add_pirates_to_expedition(expedition_id, [buyer_name]))
 
-            # Check if this buyer is already in this expedition
-            existing_pirates = self.get_expedition_pirate_names(expedition_id)
-            if any(p.original_name == buyer_name for p in existing_pirates):
-                self.logger.info(f"Buyer {buyer_name} already in expedition {expedition_id}")
-                return True  # Already added
+    def add_pirates_to_expedition(self, expedition_id: int, buyer_names: List[str]) -> List[str]:
+        """
+        Add buyers' global pirate names to an expedition in one batch.
 
-            # Add the global pirate name to this expedition
-            query = """
-                INSERT INTO expedition_pirates (expedition_id, original_name, pirate_name, encrypted_identity)
-                VALUES (%s, %s, %s, %s)
-            """
+        Args:
+            expedition_id: Expedition ID
+            buyer_names: Buyer names to add
 
-            from utils.encryption import get_encryption_service, generate_owner_key
-            encryption_service = get_encryption_service()
+        Returns:
+            Buyer names that are in the expedition after the call (added or already there)
+        """
+        try:
+            buyer_names = list(dict.fromkeys(InputSanitizer.sanitize_text(name) for name in buyer_names))
+            if not buyer_names:
+                return []
 
-            # Create encrypted mapping for expedition reference (copying global mapping)
-            mapping = {buyer_name: global_pirate_name}
-            owner_key = generate_owner_key(expedition_id, 1)  # Using owner_user_id=1 as default
-            encrypted_mapping = encryption_service.encrypt_name_mapping(expedition_id, mapping, owner_key)
+            # Global pirate names for every buyer in one query
+            rows = self._execute_query("""
+                SELECT original_name, pirate_name FROM pirate_names
+                WHERE original_name = ANY(%s) AND expedition_id IS NULL
+            """, (buyer_names,), fetch_all=True) or []
+            global_names = {original_name: pirate_name for original_name, pirate_name in rows}
+            for buyer_name in buyer_names:
+                if buyer_name not in global_names:
+                    self.logger.warning(f"No global pirate name found for buyer {buyer_name}")
 
-            self._execute_query(query, (expedition_id, buyer_name, global_pirate_name, encrypted_mapping))
+            # Check which buyers are already in this expedition
+            existing, _ = self._load_expedition_pirates(expedition_id)
+            present = [name for name in buyer_names if name in global_names and name in existing]
+            to_add = [name for name in buyer_names if name in global_names and name not in existing]
 
-            self._log_operation("add_pirate_to_expedition",
-                              expedition_id=expedition_id,
-                              buyer_name=buyer_name,
-                              pirate_name=global_pirate_name)
+            if to_add:
+                from utils.encryption import get_encryption_service
 
-            return True
+                # Create encrypted mappings for expedition reference (copying global mappings)
+                owner_key = self._expedition_owner_key(expedition_id)
+                encrypted_mappings = get_encryption_service().encrypt_name_mappings_v2(
+                    expedition_id,
+                    [{buyer_name: global_names[buyer_name]} for buyer_name in to_add],
+                    owner_key
+                )
+                inserted_ids = self._insert_pirates(expedition_id, [
+                    (buyer_name, global_names[buyer_name], None, encrypted_mapping)
+                    for buyer_name, encrypted_mapping in zip(to_add, encrypted_mappings)
+                ])
+                present.extend(name for name in to_add if global_names[name] in inserted_ids)
+
+                self._log_operation("add_pirates_to_expedition",
+                                  expedition_id=expedition_id,
+                                  added=len(inserted_ids))
+
+            return [name for name in buyer_names if name in present]
 
         except Exception as e:
-            self.logger.error(f"Failed to add pirate to expedition: {e}", exc_info=True)
-            return False
+            self.logger.error(f"Failed to add pirates to expedition: {e}", exc_info=True)
+            return []
 
     def generate_random_pirate_names_for_buyers(self, expedition_id: int, buyer_names: List[str]) -> List[PirateName]:
         """Generate consistent pirate names for a list of buyers."""
         try:
+            buyer_names = list(dict.fromkeys(name.strip() for name in buyer_names if name and name.strip()))
             if not buyer_names:
                 return []
 
-            generated_names = []
+            # Load the expedition's pirates once and allocate every new name in memory
+            existing, allocator = self._load_expedition_pirates(expedition_id)
 
+            generated_names = []
+            new_pirates = []
             for buyer_name in buyer_names:
-                buyer_name = buyer_name.strip()
-                if not buyer_name:
-                    continue
-
-                # Check if name already exists for this expedition
-                existing_pirate = self.get_pirate_name(expedition_id, buyer_name)
-                if existing_pirate:
+                if buyer_name in existing:
                     # Name already exists, add to list
+                    pirate_id, existing_pirate = existing[buyer_name]
                     generated_names.append(PirateName(
+                        id=pirate_id,
                         original_name=buyer_name,
                         pirate_name=existing_pirate,
-                        expedition_id=expedition_id
+                        expedition_id=expedition_id,
+                        encrypted_mapping=''
                     ))
-                    continue
-
-                # Generate new pirate name
-                pirate_name = self._generate_deterministic_pirate_name(buyer_name)
-
-                # Store in database
-                query = """
-                    INSERT INTO expedition_pirates (original_name, pirate_name, expedition_id, encrypted_identity)
-                    VALUES (%s, %s, %s, '')
-                """
-                self._execute_query(query, (buyer_name, pirate_name, expedition_id))
+                else:
+                    new_pirates.append((buyer_name, self._allocate_pirate_name(buyer_name, allocator)))
 
-                generated_names.append(PirateName(
+            # Store all new names in one statement
+            stored = self._store_new_pirates(expedition_id, new_pirates, allocator)
+            generated_names.extend(
+                PirateName(
+                    id=stored[buyer_name][0],
                     original_name=buyer_name,
-                    pirate_name=pirate_name,
-                    expedition_id=expedition_id
-                ))
+                    pirate_name=stored[buyer_name][1],
+                    expedition_id=expedition_id,
+                    encrypted_mapping=''
+                )
+                for buyer_name, _ in new_pirates
+                if buyer_name in stored
+            )
 
             self._log_operation("generate_random_pirate_names_for_buyers",
                               expedition_id=expedition_id, count=len(generated_names))
@@ -1115,57 +1256,263 @@ class BramblerService(BaseService, IBramblerService):
             self.logger.error(f"Error removing pirate name: {e}", exc_info=True)
             return False
 
-    def get_all_expedition_pirates(self) -> List[Dict]:
+    def get_expedition_pirate_stats(self, expedition_id: int) -> List[Dict]:
         """
-        Get ALL pirate names across all expeditions for maintenance.
+        Get an expedition's pirates with their consumption and payment stats.
 
-        PERFORMANCE OPTIMIZED: Uses indexed columns and LIMIT for faster response
+        Totals come from the trigger-maintained expedition_pirate_stats read
+        model, and the last three items from its recent_assignment_ids, so
+        the cost is one row per pirate plus at most three primary key lookups.
+        Items without a product are listed under their item name or code.
+
+        Args:
+            expedition_id: Expedition ID
 
         Returns:
-            List of pirate data dictionaries with expedition context
+            List of pirate dictionaries (newest first) with stats and recent items
+
+        Raises:
+            ServiceError: If the stats could not be read
         """
         try:
-            # OPTIMIZATION: Use indexed expedition_id and add LIMIT for pagination
-            # This prevents full table scans and reduces response time from 10s to <1s
-            query = """
+            rows = self._execute_query("""
+                SELECT ep.id, ep.expedition_id, ep.pirate_name, ep.original_name, ep.joined_at,
+                       COALESCE(s.total_items, 0), COALESCE(s.items_consumed, 0),
+                       COALESCE(s.total_spent, 0), COALESCE(s.total_paid, 0), COALESCE(s.debt, 0)
+                FROM expedition_pirates ep
+                LEFT JOIN expedition_pirate_stats s ON s.pirate_id = ep.id
+                WHERE ep.expedition_id = %s
+                ORDER BY ep.joined_at DESC
+            """, (expedition_id,), fetch_all=True) or []
+
+            recent_rows = self._execute_query("""
+                SELECT s.pirate_id,
+                       COALESCE(p.nome, ei.original_product_name, ei.anonymized_item_code, 'Item'),
+                       p.emoji, ea.consumed_quantity, ea.completed_at
+                FROM expedition_pirate_stats s
+                CROSS JOIN LATERAL unnest(s.recent_assignment_ids) WITH ORDINALITY AS r(assignment_id, position)
+                JOIN expedition_assignments ea ON ea.id = r.assignment_id
+                JOIN expedition_items ei ON ea.expedition_item_id = ei.id
+                LEFT JOIN produtos p ON ei.produto_id = p.id
+                WHERE s.expedition_id = %s
+                ORDER BY s.pirate_id, r.position
+            """, (expedition_id,), fetch_all=True) if rows else []
+
+            recent_items_by_pirate = {}
+            for pirate_id, product_name, product_emoji, quantity, consumed_at in recent_rows or []:
+                recent_items_by_pirate.setdefault(pirate_id, []).append({
+                    "name": product_name,
+                    "emoji": product_emoji or "",
+                    "quantity": quantity,
+                    "consumed_at": consumed_at.isoformat() if consumed_at else None
+                })
+
+            pirates = []
+            for row in rows:
+                (pirate_id, exp_id, pirate_name, original_name, joined_at,
+                 total_items, items_consumed, total_spent, total_paid, debt) = row
+                pirates.append({
+                    "id": pirate_id,
+                    "expedition_id": exp_id,
+                    "original_name": original_name,
+                    "pirate_name": pirate_name,
+                    "created_at": joined_at.isoformat() if joined_at else None,
+                    "stats": {
+                        "total_items": int(total_items),
+                        "items_consumed": int(items_consumed),
+                        "total_spent": float(total_spent),
+                        "total_paid": float(total_paid),
+                        "debt": float(debt)
+                    },
+                    "recent_items": recent_items_by_pirate.get(pirate_id, [])
+                })
+
+            self._log_operation("expedition_pirate_stats_retrieved",
+                              expedition_id=expedition_id, count=len(pirates))
+            return pirates
+
+        except Exception as e:
+            self.logger.error(f"Error getting expedition pirate stats: {e}", exc_info=True)
+            raise ServiceError(f"Failed to get pirate stats: {e}")
+
+    def get_all_expedition_pirates(self, limit: int = 100, cursor: Optional[str] = None,
+                                   include_archived: bool = False,
+                                   owner_chat_id: Optional[int] = None,
+                                   expedition_id: Optional[int] = None,
+                                   search: Optional[str] = None,
+                                   include_ciphertext: bool = False) -> KeysetPage:
+        """
+        Get one keyset page of pirate names across all expeditions for maintenance.
+
+        Pirates are ordered by (expedition_id DESC, id DESC), backed by
+        idx_expeditionpirates_expedition_id_keyset, so deep pages cost the same
+        as the first one. Filters are applied in SQL; the pirate name search is
+        a substring ILIKE served by idx_expeditionpirates_pirate_name_trgm when
+        pg_trgm is available. Ciphertexts are only read when asked for.
+
+        Args:
+            limit: Page size
+            cursor: Opaque cursor from the previous page (None for first page)
+            include_archived: Also page through pirates of archived expeditions
+            owner_chat_id: Only pirates of this owner's expeditions (optional)
+            expedition_id: Only pirates of this expedition (optional)
+            search: Substring of the pirate name (optional)
+            include_ciphertext: Add each pirate's encrypted_identity
+
+        Returns:
+            KeysetPage of pirate data dictionaries with expedition context
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
+        after = decode_cursor(cursor, expected_length=2)
+
+        try:
+            where_conditions, where_params = self._pirate_filter_conditions(
+                owner_chat_id, expedition_id, search
+            )
+            if after:
+                where_conditions.append("(ep.expedition_id, ep.id) < (%s, %s)")
+                where_params.extend(after)
+            where_clause = "WHERE " + " AND ".join(where_conditions)
+
+            sources = [("expedition_pirates", "Expeditions")]
+            if include_archived:
+                sources.append(("expedition_pirates_archive", "expeditions_archive"))
+
+            ciphertext = (
+                "brambler_ciphertext(ep.encrypted_identity, ep.encrypted_identity_v2)"
+                if include_ciphertext else "NULL"
+            )
+            select = """
                 SELECT
                     ep.id,
                     ep.pirate_name,
                     ep.original_name,
                     ep.expedition_id,
-                    ep.encrypted_identity,
+                    {ciphertext} AS encrypted_identity,
                     e.name as expedition_name,
                     e.owner_chat_id,
                     ep.joined_at
-                FROM expedition_pirates ep
-                INNER JOIN Expeditions e ON ep.expedition_id = e.id
-                WHERE ep.expedition_id IS NOT NULL
-                ORDER BY ep.expedition_id DESC, ep.joined_at DESC
-                LIMIT 1000
+                FROM {pirates} ep
+                INNER JOIN {expeditions} e ON ep.expedition_id = e.id
+                {where_clause}
             """
-            rows = self._execute_query(query, fetch_all=True)
+            query = " UNION ALL ".join(
+                select.format(ciphertext=ciphertext, pirates=pirates, expeditions=expeditions,
+                              where_clause=where_clause)
+                for pirates, expeditions in sources
+            ) + """
+                ORDER BY expedition_id DESC, id DESC
+                LIMIT %s
+            """
+            params = where_params * len(sources) + [limit + 1]
 
-            pirates = []
-            if rows:
-                for row in rows:
-                    pirate_id, pirate_name, original_name, expedition_id, encrypted_identity, expedition_name, owner_chat_id, joined_at = row
-                    pirates.append({
-                        'id': pirate_id,
-                        'pirate_name': pirate_name,
-                        'original_name': original_name,
-                        'expedition_id': expedition_id,
-                        'expedition_name': expedition_name or f'Expedition #{expedition_id}',
-                        'encrypted_identity': encrypted_identity or '',
-                        'owner_chat_id': owner_chat_id,
-                        'created_at': joined_at.isoformat() if joined_at else None
-                    })
+            rows = self._execute_query(query, tuple(params), fetch_all=True)
 
-            self._log_operation("all_expedition_pirates_retrieved", count=len(pirates))
-            return pirates
+            def convert(row: tuple) -> Dict:
+                pirate = self._pirate_row_to_dict(row)
+                if not include_ciphertext:
+                    del pirate['encrypted_identity']
+                return pirate
+
+            page = KeysetPage.from_rows(
+                rows, limit,
+                cursor_key=lambda row: (row[3], row[0]),
+                convert=convert
+            )
+
+            self._log_operation("all_expedition_pirates_retrieved", count=len(page.items))
+            return page
 
         except Exception as e:
             self.logger.error(f"Error getting all expedition pirates: {e}", exc_info=True)
-            return []
+            return KeysetPage(items=[], limit=limit)
+
+    def count_expedition_pirates(self, owner_chat_id: Optional[int] = None,
+                                 expedition_id: Optional[int] = None,
+                                 include_archived: bool = False) -> Optional[int]:
+        """
+        Count pirates from the trigger-maintained expedition_progress.pirate_count.
+
+        One counter row per expedition is summed, so the total costs the same
+        however many pirates there are. Name searches have no counter; callers
+        should leave the total out for them.
+
+        Args:
+            owner_chat_id: Only pirates of this owner's expeditions (optional)
+            expedition_id: Only pirates of this expedition (optional)
+            include_archived: Also count pirates of archived expeditions
+
+        Returns:
+            Number of pirates, or None if the counters could not be read
+        """
+        try:
+            where_conditions = []
+            where_params = []
+            if owner_chat_id is not None:
+                where_conditions.append("e.owner_chat_id = %s")
+                where_params.append(owner_chat_id)
+            if expedition_id is not None:
+                where_conditions.append("p.expedition_id = %s")
+                where_params.append(expedition_id)
+            where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+
+            sources = [("expedition_progress", "expeditions")]
+            if include_archived:
+                sources.append(("expedition_progress_archive", "expeditions_archive"))
+
+            select = """
+                SELECT COALESCE(SUM(p.pirate_count), 0)
+                FROM {progress} p
+                {join}
+                {where_clause}
+            """
+            join = "INNER JOIN {expeditions} e ON e.id = p.expedition_id" if owner_chat_id is not None else ""
+            query = "SELECT " + " + ".join(
+                "(" + select.format(progress=progress, join=join.format(expeditions=expeditions),
+                                    where_clause=where_clause) + ")"
+                for progress, expeditions in sources
+            )
+
+            result = self._execute_query(query, tuple(where_params * len(sources)), fetch_one=True)
+            return int(result[0]) if result else 0
+
+        except Exception as e:
+            self.logger.error(f"Error counting expedition pirates: {e}", exc_info=True)
+            return None
+
+    @staticmethod
+    def _pirate_filter_conditions(owner_chat_id: Optional[int], expedition_id: Optional[int],
+                                  search: Optional[str]) -> Tuple[List[str], List]:
+        """Build the WHERE conditions and params shared by the pirate listing queries."""
+        conditions = ["ep.expedition_id IS NOT NULL"]
+        params = []
+        if owner_chat_id is not None:
+            conditions.append("e.owner_chat_id = %s")
+            params.append(owner_chat_id)
+        if expedition_id is not None:
+            conditions.append("ep.expedition_id = %s")
+            params.append(expedition_id)
+        if search:
+            conditions.append("ep.pirate_name ILIKE %s")
+            params.append(f"%{escape_like(search)}%")
+        return conditions, params
+
+    @staticmethod
+    def _pirate_row_to_dict(row: tuple) -> Dict:
+        """Convert an expedition_pirates row with expedition context into a dictionary."""
+        pirate_id, pirate_name, original_name, expedition_id, encrypted_identity, expedition_name, owner_chat_id, joined_at = row
+        return {
+            'id': pirate_id,
+            'pirate_name': pirate_name,
+            'original_name': original_name,
+            'expedition_id': expedition_id,
+            'expedition_name': expedition_name or f'Expedition #{expedition_id}',
+            'encrypted_identity': encrypted_identity or '',
+            'owner_chat_id': owner_chat_id,
+            'created_at': joined_at.isoformat() if joined_at else None
+        }
 
     def update_pirate_name_by_id(self, pirate_id: int, new_pirate_name: str) -> bool:
         """
@@ -1238,38 +1585,17 @@ class BramblerService(BaseService, IBramblerService):
 
             # SECURITY: Get or generate owner key for encryption (REQUIRED)
             if not owner_key:
-                from core.modern_service_container import get_expedition_service
-                expedition_service = get_expedition_service()
-                expedition = expedition_service.get_expedition_by_id(expedition_id)
-                if expedition and hasattr(expedition, 'owner_key') and expedition.owner_key:
-                    owner_key = expedition.owner_key
-                else:
-                    from utils.encryption import generate_owner_key as gen_key
-                    owner_key = gen_key(expedition_id, 1)
-                    self.logger.warning(f"Generated fallback owner_key for create_pirate")
+                owner_key = self._expedition_owner_key(expedition_id)
 
             # SECURITY: Always encrypt the identity
-            encrypted_identity = ''
-            try:
-                from utils.encryption import get_encryption_service
-                encryption_service = get_encryption_service()
-
-                mapping = {original_name: pirate_name}
-                encrypted_identity = encryption_service.encrypt_name_mapping(
-                    expedition_id,
-                    mapping,
-                    owner_key
-                )
-                self.logger.info(f"SECURITY: Encrypted identity for new pirate {pirate_name}")
-            except Exception as encrypt_error:
-                self.logger.error(f"CRITICAL: Failed to encrypt identity: {encrypt_error}")
-                raise ServiceError(f"Encryption failed: {encrypt_error}")
+            encrypted_identity = self.encrypt_pirate_identity(expedition_id, original_name, pirate_name, owner_key)
 
             # SECURITY: Insert into expedition_pirates table with NULL original_name
             query = """
-                INSERT INTO expedition_pirates (expedition_id, original_name, pirate_name, encrypted_identity, status, role)
+                INSERT INTO expedition_pirates (expedition_id, original_name, pirate_name, encrypted_identity_v2, status, role)
                 VALUES (%s, NULL, %s, %s, 'active', 'participant')
-                RETURNING id, pirate_name, original_name, expedition_id, encrypted_identity, joined_at
+                RETURNING id, pirate_name, original_name, expedition_id,
+                          brambler_ciphertext(encrypted_identity, encrypted_identity_v2), joined_at
             """
             row = self._execute_query(query, (expedition_id, pirate_name, encrypted_identity), fetch_one=True)
 
@@ -1298,6 +1624,41 @@ class BramblerService(BaseService, IBramblerService):
             self.logger.error(f"Error creating pirate: {e}", exc_info=True)
             return None
 
+    def encrypt_pirate_identity(self, expedition_id: int, original_name: str, pirate_name: str,
+                                owner_key: str) -> bytes:
+        """
+        Encrypt the original_name -> pirate_name mapping stored in encrypted_identity_v2.
+
+        Runs entirely in memory so callers can prepare the identity before opening
+        a transaction that inserts the pirate row.
+
+        Args:
+            expedition_id: Expedition ID
+            original_name: Original buyer/consumer name
+            pirate_name: Pirate name the identity maps to
+            owner_key: Owner key for encryption
+
+        Returns:
+            Encrypted identity in the binary version 2 format
+
+        Raises:
+            ServiceError: If encryption fails
+        """
+        try:
+            from utils.encryption import get_encryption_service
+            encryption_service = get_encryption_service()
+
+            encrypted_identity = encryption_service.encrypt_name_mapping_v2(
+                expedition_id,
+                {original_name: pirate_name},
+                owner_key
+            )
+            self.logger.info(f"SECURITY: Encrypted identity for new pirate {pirate_name}")
+            return encrypted_identity
+        except Exception as encrypt_error:
+            self.logger.error(f"CRITICAL: Failed to encrypt identity: {encrypt_error}")
+            raise ServiceError(f"Encryption failed: {encrypt_error}")
+
     def generate_encrypted_item_name(self, original_item_name: str) -> str:
         """
         Generate a deterministic encrypted item name from original name.
@@ -1387,21 +1748,16 @@ class BramblerService(BaseService, IBramblerService):
 
             # SECURITY: Get or generate owner key for encryption (REQUIRED)
             if not owner_key:
-                if hasattr(expedition, 'owner_key') and expedition.owner_key:
-                    owner_key = expedition.owner_key
-                else:
-                    from utils.encryption import generate_owner_key as gen_key
-                    owner_key = gen_key(expedition_id, 1)
-                    self.logger.warning(f"Generated fallback owner_key for create_encrypted_item")
+                owner_key = self._expedition_owner_key(expedition_id, expedition)
 
             # SECURITY: Always encrypt the original item name
-            encrypted_mapping = ''
+            encrypted_mapping = None
             try:
                 from utils.encryption import get_encryption_service
                 encryption_service = get_encryption_service()
 
                 mapping = {original_item_name: encrypted_name}
-                encrypted_mapping = encryption_service.encrypt_name_mapping(
+                encrypted_mapping = encryption_service.encrypt_name_mapping_v2(
                     expedition_id,
                     mapping,
                     owner_key
@@ -1418,12 +1774,13 @@ class BramblerService(BaseService, IBramblerService):
             query = """
                 INSERT INTO expedition_items (
                     expedition_id, original_product_name, encrypted_product_name,
-                    encrypted_mapping, anonymized_item_code, item_type,
+                    encrypted_mapping_v2, anonymized_item_code, item_type,
                     quantity_required, quantity_consumed, item_status,
                     created_by_chat_id, produto_id
                 )
                 VALUES (%s, NULL, %s, %s, %s, %s, 0, 0, 'active', %s, %s)
-                RETURNING id, encrypted_product_name, encrypted_mapping, anonymized_item_code,
+                RETURNING id, encrypted_product_name, brambler_ciphertext(encrypted_mapping, encrypted_mapping_v2),
+                          anonymized_item_code,
                           item_type, created_at, produto_id
             """
 
@@ -1485,7 +1842,7 @@ class BramblerService(BaseService, IBramblerService):
                     ei.expedition_id,
                     e.name as expedition_name,
                     ei.encrypted_product_name,
-                    ei.encrypted_mapping,
+                    brambler_ciphertext(ei.encrypted_mapping, ei.encrypted_mapping_v2),
                     ei.anonymized_item_code,
                     ei.item_type,
                     ei.quantity_required,
@@ -1496,8 +1853,7 @@ class BramblerService(BaseService, IBramblerService):
                 FROM expedition_items ei
                 INNER JOIN Expeditions e ON ei.expedition_id = e.id
                 WHERE e.owner_chat_id = %s
-                  AND ei.encrypted_mapping IS NOT NULL
-                  AND ei.encrypted_mapping != ''
+                  AND (ei.encrypted_mapping_v2 IS NOT NULL OR ei.encrypted_mapping != '')
                 ORDER BY ei.created_at DESC
                 LIMIT 1000
             """
@@ -1547,11 +1903,10 @@ class BramblerService(BaseService, IBramblerService):
 
             # Get all encrypted items for this expedition
             query = """
-                SELECT encrypted_product_name, encrypted_mapping
+                SELECT encrypted_product_name, brambler_ciphertext(encrypted_mapping, encrypted_mapping_v2)
                 FROM expedition_items
                 WHERE expedition_id = %s
-                  AND encrypted_mapping IS NOT NULL
-                  AND encrypted_mapping != ''
+                  AND (encrypted_mapping_v2 IS NOT NULL OR encrypted_mapping != '')
             """
             rows = self._execute_query(query, (expedition_id,), fetch_all=True)
 
@@ -0,0 +1,255 @@
+"""
+Bulk decryption service for Brambler decrypt-all.
+Streams an owner's encrypted pirate identities and item mappings from a
+server-side cursor and decrypts them chunk by chunk on a thread pool, so
+memory stays bounded by the chunks in flight and the AES-GCM work (which
+releases the GIL) runs in parallel.
+"""
+
+import json
+import os
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from services.base_service import BaseService, ValidationError
+
+
+DECRYPT_CHUNK_SIZE = 500
+DECRYPT_WORKERS = min(8, (os.cpu_count() or 1) + 1)
+
+# Mapping entries written per chunk of the streamed JSON response
+RESPONSE_FLUSH_ENTRIES = 500
+
+# kind -> (live table, archive table, alias, label column, ciphertext column);
+# the ciphertext column has a bytea <column>_v2 twin for the binary format
+BULK_DECRYPT_SOURCES = {
+    'pirates': ('expedition_pirates', 'expedition_pirates_archive', 'ep', 'pirate_name', 'encrypted_identity'),
+    'items': ('expedition_items', 'expedition_items_archive', 'ei', 'encrypted_product_name', 'encrypted_mapping'),
+}
+
+
+@dataclass
+class BulkDecryptionStats:
+    """Counters for one bulk decryption run."""
+    rows: int = 0
+    decrypted: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """Rows processed per second of wall time."""
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.rows / self.elapsed_seconds
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for API responses."""
+        return {
+            'rows': self.rows,
+            'decrypted': self.decrypted,
+            'failed': self.failed,
+            'elapsed_ms': int(self.elapsed_seconds * 1000),
+            'rows_per_second': round(self.rows_per_second, 1)
+        }
+
+
+class BulkDecryptionService(BaseService):
+    """
+    Decrypts every pirate identity or item mapping an owner has.
+
+    Rows are read ``chunk_size`` at a time from a named (server-side) cursor.
+    Each chunk is decrypted on the pool while the next one is fetched; at most
+    two chunks per worker are in flight, and results are yielded in row order.
+    """
+
+    def __init__(self, workers: int = DECRYPT_WORKERS, chunk_size: int = DECRYPT_CHUNK_SIZE):
+        super().__init__()
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+
+    def iter_owner_mappings(self, kind: str, owner_chat_id: int, owner_key: str,
+                            include_archived: bool = False,
+                            stats: Optional[BulkDecryptionStats] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Stream (label, original_name) pairs for one kind of encrypted row.
+
+        Labels are pirate names for 'pirates' and encrypted product names for
+        'items'. Rows that fail to decrypt, or whose mapping does not contain
+        their label, are counted as failed and skipped.
+
+        Args:
+            kind: 'pirates' or 'items'
+            owner_chat_id: Owner's Telegram chat ID
+            owner_key: Owner's master encryption key
+            include_archived: Also decrypt rows of archived expeditions
+            stats: Counters to update as the stream is consumed
+
+        Returns:
+            Iterator of (label, original_name) pairs
+        """
+        query, params = self._owner_query(kind, owner_chat_id, include_archived)
+        stats = stats if stats is not None else BulkDecryptionStats()
+
+        from utils.encryption import get_encryption_service
+        encryption_service = get_encryption_service()
+
+        start_time = time.perf_counter()
+        pending: Deque[Future] = deque()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-decrypt")
+        try:
+            for rows in self._stream_rows(query, params):
+                stats.rows += len(rows)
+                pending.append(executor.submit(self._decrypt_chunk, encryption_service, rows, owner_key))
+                while len(pending) >= 2 * self.workers:
+                    yield from self._collect(pending.popleft(), stats)
+
+            while pending:
+                yield from self._collect(pending.popleft(), stats)
+
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            stats.elapsed_seconds = time.perf_counter() - start_time
+            self._log_operation("BulkDecryption", kind=kind, owner_chat_id=owner_chat_id,
+                                rows=stats.rows, decrypted=stats.decrypted, failed=stats.failed,
+                                rows_per_second=f"{stats.rows_per_second:.0f}")
+
+    def decrypt_owner_mappings(self, kind: str, owner_chat_id: int, owner_key: str,
+                               include_archived: bool = False) -> Dict[str, str]:
+        """
+        Decrypt all rows of one kind into a dictionary.
+
+        Args:
+            kind: 'pirates' or 'items'
+            owner_chat_id: Owner's Telegram chat ID
+            owner_key: Owner's master encryption key
+            include_archived: Also decrypt rows of archived expeditions
+
+        Returns:
+            Dictionary mapping label -> original_name
+        """
+        return dict(self.iter_owner_mappings(kind, owner_chat_id, owner_key, include_archived))
+
+    def stream_decrypt_all_json(self, owner_chat_id: int, owner_key: str,
+                                include_archived: bool = False) -> Iterator[str]:
+        """
+        Stream the /api/brambler/decrypt-all response body.
+
+        Mappings are written as they are decrypted; totals, throughput and
+        ``success`` come last, so a failure partway through still ends in
+        valid JSON with ``success: false``. A label seen twice keeps its
+        first original name.
+
+        Args:
+            owner_chat_id: Owner's Telegram chat ID
+            owner_key: Owner's master encryption key
+            include_archived: Also decrypt rows of archived expeditions
+
+        Returns:
+            Iterator of JSON text fragments
+        """
+        sections = (('pirates', 'pirate_mappings'), ('items', 'item_mappings'))
+        stats = {kind: BulkDecryptionStats() for kind, _ in sections}
+        totals = {kind: 0 for kind, _ in sections}
+        in_object = False
+
+        yield '{"owner_chat_id": ' + json.dumps(owner_chat_id)
+        try:
+            for kind, field in sections:
+                yield f', "{field}": {{'
+                in_object = True
+                seen = set()
+                buffer = []
+                for label, original in self.iter_owner_mappings(kind, owner_chat_id, owner_key,
+                                                                include_archived, stats[kind]):
+                    if label in seen:
+                        continue
+                    seen.add(label)
+                    buffer.append(f"{json.dumps(label)}: {json.dumps(original)}")
+                    if len(buffer) >= RESPONSE_FLUSH_ENTRIES:
+                        yield (", " if len(seen) > len(buffer) else "") + ", ".join(buffer)
+                        buffer = []
+                if buffer:
+                    yield (", " if len(seen) > len(buffer) else "") + ", ".join(buffer)
+                yield '}'
+                in_object = False
+                totals[kind] = len(seen)
+
+            yield (', "total_pirates_decrypted": ' + json.dumps(totals['pirates'])
+                   + ', "total_items_decrypted": ' + json.dumps(totals['items'])
+                   + ', "decryption_stats": ' + json.dumps({kind: s.to_dict() for kind, s in stats.items()})
+                   + ', "success": true}')
+
+        except Exception as e:
+            self.logger.error(f"Bulk decryption failed for owner {owner_chat_id}: {e}", exc_info=True)
+            yield ('}' if in_object else '') + ', "success": false, "error": ' + json.dumps(str(e)) + '}'
+
+    @staticmethod
+    def _owner_query(kind: str, owner_chat_id: int, include_archived: bool) -> Tuple[str, tuple]:
+        """Build the (label, ciphertext) query for an owner's rows."""
+        if kind not in BULK_DECRYPT_SOURCES:
+            raise ValidationError(f"Unknown bulk decryption kind: {kind}")
+
+        table, archive_table, alias, label, ciphertext = BULK_DECRYPT_SOURCES[kind]
+        sources = [(table, "Expeditions")]
+        if include_archived:
+            sources.append((archive_table, "expeditions_archive"))
+
+        select = f"""
+            SELECT {alias}.{label}, COALESCE({alias}.{ciphertext}_v2, convert_to({alias}.{ciphertext}, 'UTF8'))
+            FROM {{table}} {alias}
+            JOIN {{expeditions}} e ON {alias}.expedition_id = e.id
+            WHERE e.owner_chat_id = %s
+              AND ({alias}.{ciphertext}_v2 IS NOT NULL OR {alias}.{ciphertext} != '')
+        """
+        query = " UNION ALL ".join(
+            select.format(table=source, expeditions=expeditions) for source, expeditions in sources
+        )
+        return query, (owner_chat_id,) * len(sources)
+
+    def _stream_rows(self, query: str, params: tuple) -> Iterator[List[tuple]]:
+        """Yield result chunks from a server-side cursor."""
+        with self.db_manager.get_connection() as conn:
+            try:
+                with conn.cursor(name=f"bulk_decrypt_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = self.chunk_size
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(self.chunk_size)
+                        if not rows:
+                            break
+                        yield rows
+            finally:
+                # Read-only; ends the transaction holding the named cursor
+                conn.rollback()
+
+    @staticmethod
+    def _decrypt_chunk(encryption_service, rows: List[tuple], owner_key: str) -> Tuple[List[Tuple[str, str]], int]:
+        """Decrypt one chunk on a worker thread. Returns (pairs, failed count)."""
+        pairs = []
+        failed = 0
+        for label, ciphertext in rows:
+            decrypted = encryption_service.decrypt_name_mapping(ciphertext, owner_key)
+            mapping = decrypted.get('mapping') if decrypted else None
+            original = None
+            if mapping:
+                original = next((orig for orig, name in mapping.items() if name == label), None)
+            if original is None:
+                failed += 1
+            else:
+                pairs.append((label, original))
+        return pairs, failed
+
+    @staticmethod
+    def _collect(future: Future, stats: BulkDecryptionStats) -> Iterator[Tuple[str, str]]:
+        """Wait for a chunk and yield its pairs."""
+        pairs, failed = future.result()
+        stats.decrypted += len(pairs)
+        stats.failed += failed
+        yield from pairs
@@ -5,7 +5,7 @@ Handles balance updates, transaction logging, and revenue reports.
 
 from decimal import Decimal
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from services.base_service import BaseService, ServiceError, ValidationError
 from core.interfaces import ICashBalanceService
 from models.cash_balance import (
@@ -14,23 +14,78 @@ from models.cash_balance import (
 )
 
 
+# CashTransactions is an append-only ledger: every write is a plain INSERT of a
+# signed delta, so concurrent writers never contend on a shared balance row.
+# The current balance is the latest snapshot plus the deltas appended after it.
+SNAPSHOT_INTERVAL = 500
+
+LATEST_SNAPSHOT_QUERY = """
+    SELECT saldo, last_transaction_id, created_at FROM (
+        (SELECT saldo, last_transaction_id, created_at
+         FROM CashBalanceSnapshots
+         ORDER BY last_transaction_id DESC
+         LIMIT 1)
+        UNION ALL
+        SELECT 0.00, 0, CURRENT_TIMESTAMP
+    ) s
+    ORDER BY last_transaction_id DESC
+    LIMIT 1
+"""
+
+# Returns (last ledger id, saldo_atual, data_atualizacao)
+CURRENT_BALANCE_QUERY = f"""
+    WITH snap AS ({LATEST_SNAPSHOT_QUERY})
+    SELECT COALESCE(MAX(t.id), snap.last_transaction_id),
+           snap.saldo + COALESCE(SUM(t.delta), 0),
+           GREATEST(snap.created_at, MAX(t.data_transacao))
+    FROM snap
+    LEFT JOIN CashTransactions t ON t.id > snap.last_transaction_id
+    GROUP BY snap.saldo, snap.last_transaction_id, snap.created_at
+"""
+
+# Ledger rows with running balances derived by a window function over the
+# deltas newer than each row, anchored on the current balance. With
+# ORDER BY id DESC + LIMIT the window is streamed, so only the requested rows
+# are read. Format with {where}, which may only apply a lower bound (e.g.
+# "WHERE t.data_transacao >= %s") so every newer delta stays in the window,
+# and append ORDER BY / LIMIT as needed.
+RUNNING_BALANCE_QUERY = f"""
+    WITH balance AS (
+        SELECT saldo_atual FROM (
+            {CURRENT_BALANCE_QUERY}
+        ) AS current_balance (last_id, saldo_atual, data_atualizacao)
+    )
+    SELECT t.id, t.tipo, t.valor, t.descricao, t.venda_id, t.pagamento_id,
+           t.usuario_chat_id,
+           b.saldo_atual - SUM(t.delta) OVER newest_first AS saldo_anterior,
+           b.saldo_atual - SUM(t.delta) OVER newest_first + t.delta AS saldo_novo,
+           t.data_transacao
+    FROM CashTransactions t
+    CROSS JOIN balance b
+    {{where}}
+    WINDOW newest_first AS (ORDER BY t.id DESC)
+"""
+
+
 class CashBalanceService(BaseService, ICashBalanceService):
     """Service for cash balance and revenue management."""
 
+    # Day on which finished ledger days were last folded into daily_cash
+    _cash_days_closed_on: Optional[date] = None
+
+    def __init__(self):
+        super().__init__()
+        # Imported here: rollup_service reuses this module's ledger queries
+        from services.rollup_service import RollupService
+        self.rollup_service = RollupService()
+
     def get_current_balance(self) -> CashBalance:
-        """Get the current cash balance."""
+        """Get the current cash balance (latest snapshot plus newer deltas)."""
         try:
-            query = """
-                SELECT id, saldo_atual, data_atualizacao
-                FROM CashBalance
-                ORDER BY data_atualizacao DESC
-                LIMIT 1
-            """
-            row = self._execute_query(query, fetch_one=True)
+            row = self._execute_query(CURRENT_BALANCE_QUERY, fetch_one=True)
 
             if not row:
-                # Initialize with zero balance if none exists
-                return self._initialize_balance()
+                return CashBalance(id=None, saldo_atual=Decimal('0.00'), data_atualizacao=datetime.now())
 
             return CashBalance.from_db_row(row)
 
@@ -38,25 +93,41 @@ class CashBalanceService(BaseService, ICashBalanceService):
             self.logger.error(f"Failed to get current balance: {e}")
             raise ServiceError(f"Failed to get current balance: {str(e)}")
 
-    def _initialize_balance(self) -> CashBalance:
-        """Initialize cash balance with zero."""
+    def create_snapshot(self) -> Optional[CashBalance]:
+        """
+        Fold the deltas appended since the latest snapshot into a new snapshot.
+
+        Returns:
+            The new snapshot as a CashBalance, or None if nothing was appended
+        """
         try:
             with self.db_manager.get_connection() as conn:
                 with conn.cursor() as cursor:
-                    cursor.execute("""
-                        INSERT INTO CashBalance (saldo_atual, data_atualizacao)
-                        VALUES (%s, CURRENT_TIMESTAMP)
-                        RETURNING id, saldo_atual, data_atualizacao
-                    """, (Decimal('0.00'),))
-
+                    # SHARE mode waits for in-flight inserts and briefly holds new
+                    # ones back, so no lower id can commit after the snapshot and
+                    # be skipped by "id > last_transaction_id".
+                    cursor.execute("LOCK TABLE CashTransactions IN SHARE MODE")
+                    cursor.execute(f"""
+                        WITH current_balance (last_id, saldo, data_atualizacao) AS (
+                            {CURRENT_BALANCE_QUERY}
+                        )
+                        INSERT INTO CashBalanceSnapshots (saldo, last_transaction_id)
+                        SELECT saldo, last_id FROM current_balance
+                        WHERE last_id > (SELECT last_transaction_id FROM ({LATEST_SNAPSHOT_QUERY}) s)
+                        RETURNING last_transaction_id, saldo, created_at
+                    """)
                     row = cursor.fetchone()
                     conn.commit()
 
-                    return CashBalance.from_db_row(row)
+            if not row:
+                return None
+
+            self.logger.info(f"Created cash balance snapshot at transaction {row[0]}: {row[1]}")
+            return CashBalance.from_db_row(row)
 
         except Exception as e:
-            self.logger.error(f"Failed to initialize balance: {e}")
-            raise ServiceError(f"Failed to initialize balance: {str(e)}")
+            self.logger.error(f"Failed to create balance snapshot: {e}")
+            raise ServiceError(f"Failed to create balance snapshot: {str(e)}")
 
     def add_revenue_from_payment(self, pagamento_id: int, valor: Decimal, venda_id: Optional[int] = None) -> CashTransaction:
         """
@@ -115,184 +186,148 @@ class CashBalanceService(BaseService, ICashBalanceService):
             raise ServiceError(f"Failed to adjust balance: {str(e)}")
 
     def _create_transaction(self, request: CreateCashTransactionRequest, adjustment_amount: Optional[Decimal] = None) -> CashTransaction:
-        """Create a cash transaction and update balance."""
+        """
+        Append a cash transaction to the ledger.
+
+        The write is a single INSERT of the signed delta; saldo_anterior and
+        saldo_novo on the returned transaction are the balance as seen by that
+        statement. Every SNAPSHOT_INTERVAL transactions a new snapshot is taken.
+        """
         # Validate request
         errors = request.validate()
         if errors:
             raise ValidationError(f"Transaction validation failed: {', '.join(errors)}")
 
-        try:
-            with self.db_manager.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Get current balance
-                    cursor.execute("""
-                        SELECT saldo_atual FROM CashBalance
-                        ORDER BY data_atualizacao DESC
-                        LIMIT 1
-                    """)
-                    balance_row = cursor.fetchone()
-
-                    if not balance_row:
-                        saldo_anterior = Decimal('0.00')
-                    else:
-                        saldo_anterior = balance_row[0]
-
-                    # Calculate new balance based on transaction type
-                    if request.tipo == 'receita':
-                        saldo_novo = saldo_anterior + request.valor
-                    elif request.tipo == 'despesa':
-                        saldo_novo = saldo_anterior - request.valor
-                    elif request.tipo == 'ajuste':
-                        # Use adjustment_amount if provided, otherwise treat as positive
-                        amount = adjustment_amount if adjustment_amount is not None else request.valor
-                        saldo_novo = saldo_anterior + amount
-                    else:
-                        raise ValidationError(f"Invalid transaction type: {request.tipo}")
-
-                    # Create transaction record
-                    cursor.execute("""
-                        INSERT INTO CashTransactions (
-                            tipo, valor, descricao, venda_id, pagamento_id,
-                            usuario_chat_id, saldo_anterior, saldo_novo
-                        )
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        RETURNING id, tipo, valor, descricao, venda_id, pagamento_id,
-                                  usuario_chat_id, saldo_anterior, saldo_novo, data_transacao
-                    """, (
-                        request.tipo,
-                        request.valor,
-                        request.descricao,
-                        request.venda_id,
-                        request.pagamento_id,
-                        request.usuario_chat_id,
-                        saldo_anterior,
-                        saldo_novo
-                    ))
-
-                    transaction_row = cursor.fetchone()
-
-                    # Update cash balance
-                    cursor.execute("""
-                        UPDATE CashBalance
-                        SET saldo_atual = %s, data_atualizacao = CURRENT_TIMESTAMP
-                        WHERE id = (SELECT id FROM CashBalance ORDER BY data_atualizacao DESC LIMIT 1)
-                    """, (saldo_novo,))
-
-                    # If no balance record exists, create one
-                    if cursor.rowcount == 0:
-                        cursor.execute("""
-                            INSERT INTO CashBalance (saldo_atual)
-                            VALUES (%s)
-                        """, (saldo_novo,))
+        if request.tipo == 'receita':
+            delta = request.valor
+        elif request.tipo == 'despesa':
+            delta = -request.valor
+        elif request.tipo == 'ajuste':
+            # Use adjustment_amount if provided, otherwise treat as positive
+            delta = adjustment_amount if adjustment_amount is not None else request.valor
+        else:
+            raise ValidationError(f"Invalid transaction type: {request.tipo}")
 
-                    conn.commit()
+        try:
+            query = f"""
+                WITH snap AS ({LATEST_SNAPSHOT_QUERY}),
+                base AS (
+                    SELECT snap.saldo + COALESCE(SUM(t.delta), 0) AS saldo
+                    FROM snap
+                    LEFT JOIN CashTransactions t ON t.id > snap.last_transaction_id
+                    GROUP BY snap.saldo
+                ),
+                ins AS (
+                    INSERT INTO CashTransactions (
+                        tipo, valor, descricao, venda_id, pagamento_id,
+                        usuario_chat_id, delta
+                    )
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id, tipo, valor, descricao, venda_id, pagamento_id,
+                              usuario_chat_id, delta, data_transacao
+                )
+                SELECT ins.id, ins.tipo, ins.valor, ins.descricao, ins.venda_id,
+                       ins.pagamento_id, ins.usuario_chat_id,
+                       base.saldo, base.saldo + ins.delta, ins.data_transacao
+                FROM ins CROSS JOIN base
+            """
+            row = self._execute_query(query, (
+                request.tipo,
+                request.valor,
+                request.descricao,
+                request.venda_id,
+                request.pagamento_id,
+                request.usuario_chat_id,
+                delta
+            ), fetch_one=True)
 
-                    self.logger.info(f"Created {request.tipo} transaction: {request.valor}, new balance: {saldo_novo}")
+            if not row:
+                raise ServiceError("Transaction insert returned no row")
 
-                    return CashTransaction.from_db_row(transaction_row)
+            transaction = CashTransaction.from_db_row(row)
+            self.logger.info(f"Created {request.tipo} transaction: {request.valor}, new balance: {transaction.saldo_novo}")
 
         except Exception as e:
             self.logger.error(f"Failed to create transaction: {e}")
             raise ServiceError(f"Failed to create transaction: {str(e)}")
 
+        if transaction.id and transaction.id % SNAPSHOT_INTERVAL == 0:
+            try:
+                self.create_snapshot()
+            except ServiceError as e:
+                # The ledger row is committed; the next interval will snapshot
+                self.logger.warning(f"Deferred balance snapshot: {e}")
+
+        self._close_finished_cash_days()
+        return transaction
+
+    def _close_finished_cash_days(self) -> None:
+        """
+        Fold finished ledger days into daily_cash on the first write of a day.
+
+        Reports never write; days not folded yet are read from CashTransactions.
+        """
+        today = date.today()
+        if CashBalanceService._cash_days_closed_on == today:
+            return
+
+        try:
+            self.rollup_service.close_cash_days()
+            CashBalanceService._cash_days_closed_on = today
+        except Exception as e:
+            # The ledger row is committed; the next write retries
+            self.logger.warning(f"Deferred closing cash days: {e}")
+
     def get_transactions_history(self, limit: int = 50, offset: int = 0) -> List[CashTransaction]:
-        """Get transaction history."""
+        """Get transaction history (newest first) with running balances."""
         try:
-            # Try different table name formats to handle case sensitivity
-            for table_name in ['CashTransactions', 'cashtransactions', '"CashTransactions"']:
-                try:
-                    query = f"""
-                        SELECT id, tipo, valor, descricao, venda_id, pagamento_id,
-                               usuario_chat_id, saldo_anterior, saldo_novo, data_transacao
-                        FROM {table_name}
-                        ORDER BY data_transacao DESC
-                        LIMIT %s OFFSET %s
-                    """
-                    rows = self._execute_query(query, (limit, offset))
-                    self.logger.info(f"Successfully queried {table_name} table")
-                    return [CashTransaction.from_db_row(row) for row in rows]
-
-                except Exception as table_error:
-                    self.logger.warning(f"Table {table_name} query failed: {table_error}")
-                    continue
-
-            # If no table format worked, return empty list
-            self.logger.warning("No CashTransactions table found, returning empty list")
-            return []
+            query = RUNNING_BALANCE_QUERY.format(where="") + """
+                ORDER BY t.id DESC
+                LIMIT %s OFFSET %s
+            """
+            rows = self._execute_query(query, (limit, offset), fetch_all=True)
+            return [CashTransaction.from_db_row(row) for row in rows or []]
 
         except Exception as e:
             self.logger.error(f"Failed to get transactions history: {e}")
             raise ServiceError(f"Failed to get transactions history: {str(e)}")
 
     def get_revenue_report(self, days: int = 30) -> RevenueReport:
-        """Generate revenue report for the specified number of days."""
+        """
+        Generate revenue report for the specified number of days.
+
+        Closed days come from the daily rollups; only today is read from the
+        raw Vendas, Pagamentos and CashTransactions tables.
+        """
         try:
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
+            start_day = end_date.date() - timedelta(days=days)
 
-            with self.db_manager.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Get sales data
-                    cursor.execute("""
-                        SELECT
-                            COALESCE(COUNT(DISTINCT v.id), 0) as vendas_count,
-                            COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0) as total_vendas,
-                            COALESCE(SUM(iv.quantidade * e.custo), 0) as total_custos
-                        FROM vendas v
-                        LEFT JOIN itensvenda iv ON v.id = iv.venda_id
-                        LEFT JOIN estoque e ON iv.produto_id = e.produto_id
-                        WHERE v.data_venda >= %s AND v.data_venda <= %s
-                    """, (start_date, end_date))
-
-                    sales_row = cursor.fetchone()
-                    vendas_count = sales_row[0] or 0
-                    total_vendas = sales_row[1] or Decimal('0.00')
-                    total_custos = sales_row[2] or Decimal('0.00')
-
-                    # Get payments data
-                    cursor.execute("""
-                        SELECT COALESCE(SUM(valor_pago), 0) as total_pagamentos
-                        FROM pagamentos
-                        WHERE data_pagamento >= %s AND data_pagamento <= %s
-                    """, (start_date, end_date))
-
-                    payments_row = cursor.fetchone()
-                    total_pagamentos = payments_row[0] or Decimal('0.00')
-
-                    # Get cash transactions data
-                    cursor.execute("""
-                        SELECT
-                            COUNT(*) as transacoes_count,
-                            COALESCE(SUM(CASE WHEN tipo = 'despesa' THEN valor ELSE 0 END), 0) as total_despesas
-                        FROM CashTransactions
-                        WHERE data_transacao >= %s AND data_transacao <= %s
-                    """, (start_date, end_date))
-
-                    transactions_row = cursor.fetchone()
-                    transacoes_count = transactions_row[0] or 0
-                    total_despesas = transactions_row[1] or Decimal('0.00')
-
-                    # Get current balance
-                    current_balance = self.get_current_balance()
+            sales = self.rollup_service.get_sales_summary(start_day)
+            payments = self.rollup_service.get_payments_summary(start_day)
+            cash = self.rollup_service.get_cash_summary(start_day)
+            current_balance = self.get_current_balance()
 
-                    conn.commit()
+            total_vendas = sales["total_sales"]
+            total_custos = sales["total_cost"]
+            total_despesas = cash["total_despesas"]
 
             # Calculate metrics
             lucro_bruto = total_vendas - total_custos
             lucro_liquido = lucro_bruto - total_despesas
 
             return RevenueReport(
-                periodo_inicio=start_date,
+                periodo_inicio=datetime.combine(start_day, datetime.min.time()),
                 periodo_fim=end_date,
                 total_vendas=total_vendas,
-                total_pagamentos=total_pagamentos,
+                total_pagamentos=payments["total_paid"],
                 total_custos=total_custos,
                 lucro_bruto=lucro_bruto,
                 lucro_liquido=lucro_liquido,
                 saldo_atual=current_balance.saldo_atual,
                 total_despesas=total_despesas,
-                transacoes_count=transacoes_count,
-                vendas_count=vendas_count
+                transacoes_count=cash["transactions_count"],
+                vendas_count=sales["sales_count"]
             )
 
         except Exception as e:
@@ -300,46 +335,37 @@ class CashBalanceService(BaseService, ICashBalanceService):
             raise ServiceError(f"Failed to generate revenue report: {str(e)}")
 
     def get_balance_history(self, days: int = 30) -> CashBalanceHistory:
-        """Get balance history for a period."""
+        """
+        Get balance history for a period.
+
+        Totals come from the daily rollups plus today's ledger rows; the
+        returned transactions are today's (the open day) with running balances.
+        """
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-
-            # Get transactions in period
-            query = """
-                SELECT id, tipo, valor, descricao, venda_id, pagamento_id,
-                       usuario_chat_id, saldo_anterior, saldo_novo, data_transacao
-                FROM CashTransactions
-                WHERE data_transacao >= %s AND data_transacao <= %s
-                ORDER BY data_transacao ASC
-            """
-            rows = self._execute_query(query, (start_date, end_date))
-            transactions = [CashTransaction.from_db_row(row) for row in rows]
-
-            # Calculate summary
-            if transactions:
-                balance_start = transactions[0].saldo_anterior
-                balance_end = transactions[-1].saldo_novo
-            else:
-                current_balance = self.get_current_balance()
-                balance_start = balance_end = current_balance.saldo_atual
-
-            total_receitas = sum(t.valor for t in transactions if t.tipo == 'receita')
-            total_despesas = sum(t.valor for t in transactions if t.tipo == 'despesa')
-            total_ajustes = sum(
-                t.saldo_novo - t.saldo_anterior - (t.valor if t.tipo == 'receita' else -t.valor)
-                for t in transactions if t.tipo == 'ajuste'
-            )
+            today_start = datetime.combine(datetime.now().date(), datetime.min.time())
+            start_day = today_start.date() - timedelta(days=days)
+
+            cash = self.rollup_service.get_cash_summary(start_day)
+            current_balance = self.get_current_balance()
+
+            query = RUNNING_BALANCE_QUERY.format(
+                where="WHERE t.data_transacao >= %s"
+            ) + " ORDER BY t.id ASC"
+            rows = self._execute_query(query, (today_start,), fetch_all=True)
+            transactions = [CashTransaction.from_db_row(row) for row in rows or []]
+
+            balance_end = current_balance.saldo_atual
 
             return CashBalanceHistory(
                 transactions=transactions,
-                balance_start=balance_start,
+                balance_start=balance_end - cash["net_change"],
                 balance_end=balance_end,
-                total_receitas=total_receitas,
-                total_despesas=total_despesas,
-                total_ajustes=total_ajustes
+                total_receitas=cash["total_receitas"],
+                total_despesas=cash["total_despesas"],
+                total_ajustes=cash["total_ajustes"],
+                transactions_count=cash["transactions_count"]
             )
 
         except Exception as e:
             self.logger.error(f"Failed to get balance history: {e}")
-            raise ServiceError(f"Failed to get balance history: {str(e)}")
\ No newline at end of file
+            raise ServiceError(f"Failed to get balance history: {str(e)}")
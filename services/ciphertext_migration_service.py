@@ -0,0 +1,240 @@
+"""
+Ciphertext migration service.
+Converts version 1 name mappings (urlsafe base64 JSON ciphertexts in text
+columns) to the packed binary version 2 format in the <column>_v2 bytea
+columns, in small batches that never hold locks across batches, so it can run
+while the bot is serving traffic.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from services.base_service import BaseService, ServiceError, ValidationError
+
+
+# kind -> (table, version 1 text column); version 2 lives in <column>_v2
+CIPHERTEXT_COLUMNS = {
+    'pirates': ('expedition_pirates', 'encrypted_identity'),
+    'items': ('expedition_items', 'encrypted_mapping'),
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class ConversionReport:
+    """Counters for converting one ciphertext column."""
+    rows_scanned: int = 0
+    converted: int = 0
+    failed: int = 0
+    skipped: int = 0
+    v1_bytes: int = 0
+    v2_bytes: int = 0
+    v1_decrypts: int = 0
+    v1_decrypt_seconds: float = 0.0
+    v2_decrypts: int = 0
+    v2_decrypt_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        """Ciphertext bytes saved by the rows converted so far."""
+        return self.v1_bytes - self.v2_bytes
+
+    @property
+    def savings_percent(self) -> float:
+        """Storage saved as a percentage of the version 1 size."""
+        if not self.v1_bytes:
+            return 0.0
+        return 100.0 * self.bytes_saved / self.v1_bytes
+
+    @staticmethod
+    def _rate(count: int, seconds: float) -> float:
+        return count / seconds if seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for the migration report."""
+        return {
+            'rows_scanned': self.rows_scanned,
+            'converted': self.converted,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'v1_bytes': self.v1_bytes,
+            'v2_bytes': self.v2_bytes,
+            'bytes_saved': self.bytes_saved,
+            'savings_percent': round(self.savings_percent, 1),
+            'v1_decrypts_per_second': round(self._rate(self.v1_decrypts, self.v1_decrypt_seconds), 1),
+            'v2_decrypts_per_second': round(self._rate(self.v2_decrypts, self.v2_decrypt_seconds), 1),
+            'rows_per_second': round(self._rate(self.rows_scanned, self.elapsed_seconds), 1)
+        }
+
+
+class CiphertextMigrationService(BaseService):
+    """
+    Service for converting version 1 ciphertexts to version 2.
+
+    Each batch reads rows by ascending id, decrypts them with the expedition's
+    owner key (or the owner's stored master key), re-encrypts and verifies them,
+    and writes all of them with one UPDATE. The UPDATE only applies where the
+    text column still holds the value that was read, so rows rewritten
+    concurrently are skipped rather than overwritten. Rows that cannot be
+    decrypted are counted and left as they are.
+    """
+
+    def __init__(self):
+        super().__init__()
+        from utils.encryption import get_encryption_service
+        self.encryption_service = get_encryption_service()
+
+    def convert_batch(self, kind: str, after_id: int = 0, batch_size: int = DEFAULT_BATCH_SIZE,
+                      report: Optional[ConversionReport] = None, dry_run: bool = False) -> Optional[int]:
+        """
+        Convert the next batch of version 1 rows.
+
+        Args:
+            kind: 'pirates' or 'items'
+            after_id: Only rows with a larger id are read
+            batch_size: Maximum rows per batch
+            report: Counters to update
+            dry_run: Convert and measure in memory without writing
+
+        Returns:
+            Last id read, or None when no rows are left
+        """
+        table, column = self._columns(kind)
+        report = report if report is not None else ConversionReport()
+
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(f"""
+                        SELECT t.id, t.{column}, COALESCE(e.owner_key, umk.master_key)
+                        FROM {table} t
+                        JOIN expeditions e ON e.id = t.expedition_id
+                        LEFT JOIN user_master_keys umk ON umk.owner_chat_id = e.owner_chat_id
+                        WHERE t.id > %s
+                          AND t.{column}_v2 IS NULL
+                          AND t.{column} IS NOT NULL
+                          AND t.{column} != ''
+                        ORDER BY t.id
+                        LIMIT %s
+                    """, (after_id, batch_size))
+                    rows = cursor.fetchall()
+                    conn.commit()
+
+                    if not rows:
+                        return None
+
+                    updates = []
+                    for row_id, v1_value, owner_key in rows:
+                        report.rows_scanned += 1
+                        v2_value = self._convert(v1_value, owner_key, report) if owner_key else None
+                        if v2_value is None:
+                            report.failed += 1
+                            continue
+                        updates.append((row_id, v2_value, v1_value))
+
+                    if updates and not dry_run:
+                        values = ", ".join(["(%s, %s, %s)"] * len(updates))
+                        cursor.execute(f"""
+                            UPDATE {table} t
+                            SET {column}_v2 = v.ciphertext, {column} = NULL
+                            FROM (VALUES {values}) AS v(id, ciphertext, previous)
+                            WHERE t.id = v.id AND t.{column} = v.previous
+                            RETURNING t.id
+                        """, tuple(value for update in updates for value in update))
+                        written = {row[0] for row in cursor.fetchall()}
+                        conn.commit()
+                    else:
+                        written = {row_id for row_id, _, _ in updates}
+
+                    for row_id, v2_value, v1_value in updates:
+                        if row_id not in written:
+                            report.skipped += 1
+                            continue
+                        report.converted += 1
+                        report.v1_bytes += len(v1_value)
+                        report.v2_bytes += len(v2_value)
+
+                    self._log_operation("CiphertextBatchConverted", kind=kind, rows=len(rows),
+                                        converted=len(written), dry_run=dry_run)
+                    return rows[-1][0]
+
+        except ServiceError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Ciphertext conversion failed for {kind}: {e}", exc_info=True)
+            raise ServiceError(f"Failed to convert {kind} ciphertexts: {str(e)}")
+
+    def convert_all(self, kinds: Iterable[str] = tuple(CIPHERTEXT_COLUMNS), batch_size: int = DEFAULT_BATCH_SIZE,
+                    max_batches: Optional[int] = None, dry_run: bool = False) -> Dict[str, ConversionReport]:
+        """
+        Convert every version 1 row, batch by batch.
+
+        Args:
+            kinds: Columns to convert ('pirates', 'items')
+            batch_size: Maximum rows per batch
+            max_batches: Stop after this many batches per kind (default: no limit)
+            dry_run: Convert and measure in memory without writing
+
+        Returns:
+            Dictionary of kind -> ConversionReport
+        """
+        reports = {}
+        for kind in kinds:
+            report = ConversionReport()
+            start_time = time.perf_counter()
+            after_id = 0
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                after_id = self.convert_batch(kind, after_id, batch_size, report, dry_run)
+                if after_id is None:
+                    break
+                batches += 1
+            report.elapsed_seconds = time.perf_counter() - start_time
+            reports[kind] = report
+        return reports
+
+    def count_remaining(self, kind: str) -> int:
+        """
+        Count rows still stored in the version 1 format.
+
+        Args:
+            kind: 'pirates' or 'items'
+
+        Returns:
+            Number of version 1 rows
+        """
+        table, column = self._columns(kind)
+        row = self._execute_query(f"""
+            SELECT COUNT(*) FROM {table}
+            WHERE {column}_v2 IS NULL AND {column} IS NOT NULL AND {column} != ''
+        """, fetch_one=True)
+        return row[0] if row else 0
+
+    def _convert(self, v1_value: str, owner_key: str, report: ConversionReport) -> Optional[bytes]:
+        """Decrypt, re-encrypt and verify one value, timing both decrypts."""
+        start_time = time.perf_counter()
+        mapping_data = self.encryption_service.decrypt_name_mapping(v1_value, owner_key)
+        report.v1_decrypt_seconds += time.perf_counter() - start_time
+        report.v1_decrypts += 1
+        if mapping_data is None:
+            return None
+
+        v2_value = self.encryption_service.reencrypt_v2(mapping_data, owner_key)
+
+        start_time = time.perf_counter()
+        check = self.encryption_service.decrypt_name_mapping(v2_value, owner_key)
+        report.v2_decrypt_seconds += time.perf_counter() - start_time
+        report.v2_decrypts += 1
+        if check is None or check['mapping'] != mapping_data['mapping']:
+            return None
+        return v2_value
+
+    @staticmethod
+    def _columns(kind: str):
+        """Resolve a kind to its (table, column)."""
+        if kind not in CIPHERTEXT_COLUMNS:
+            raise ValidationError(f"Unknown ciphertext kind: {kind}")
+        return CIPHERTEXT_COLUMNS[kind]
@@ -0,0 +1,342 @@
+"""
+Deadline alert scheduler.
+Keeps a timer heap with the next threshold crossing of every active expedition
+with a deadline, so each tick only looks at alerts that are actually due
+instead of scanning every expedition. Fired thresholds are recorded in
+expedition_deadline_alerts, which is what the scheduler recovers from at
+startup.
+"""
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from services.base_service import BaseService
+from models.expedition import ExpeditionStatus
+
+
+# Alert type -> time before the deadline at which it fires
+DEFAULT_ALERT_THRESHOLDS = {
+    'critical': timedelta(hours=1),
+    'urgent': timedelta(hours=6),
+    'warning': timedelta(days=1),
+    'info': timedelta(days=3)
+}
+
+# Upper bound on how long the worker sleeps, so clock jumps are picked up
+MAX_WAIT_SECONDS = 60.0
+
+AlertSender = Callable[[int, str, Dict], bool]
+
+
+class DeadlineAlertScheduler(BaseService):
+    """
+    Fires each deadline alert threshold once per expedition deadline.
+
+    Heap entries are (fire_at, sequence, expedition_id). Rescheduling or
+    cancelling an expedition replaces its entry in ``_armed``; superseded heap
+    entries are skipped when popped. A tick costs O(1) when nothing is due and
+    O(log n) per alert fired.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        super().__init__()
+        self._clock = clock
+        self._send_alert: Optional[AlertSender] = None
+        self._thresholds: List[Tuple[str, timedelta]] = self._order_thresholds(DEFAULT_ALERT_THRESHOLDS)
+        self._heap: List[Tuple[datetime, int, int]] = []
+        # expedition_id -> (sequence, deadline, index of the next threshold)
+        self._armed: Dict[int, Tuple[int, datetime, int]] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the heap has been built from the database."""
+        return self._loaded
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the background worker is running."""
+        return self._running
+
+    @staticmethod
+    def _order_thresholds(thresholds: Dict[str, timedelta]) -> List[Tuple[str, timedelta]]:
+        """Order thresholds from the earliest to fire (largest lead) to the last."""
+        return sorted(thresholds.items(), key=lambda item: item[1], reverse=True)
+
+    def load(self, send_alert: Optional[AlertSender] = None,
+             thresholds: Optional[Dict[str, timedelta]] = None) -> int:
+        """
+        Build the heap from the database, replacing any in-memory state.
+
+        Args:
+            send_alert: Callable(expedition_id, alert_type, alert_data) used to deliver alerts
+            thresholds: Alert type -> lead time before the deadline
+
+        Returns:
+            Number of expeditions armed
+        """
+        if send_alert is not None:
+            self._send_alert = send_alert
+        if thresholds is not None:
+            self._thresholds = self._order_thresholds(thresholds)
+
+        query = """
+            SELECT e.id, e.deadline,
+                   COALESCE(array_agg(a.alert_type) FILTER (WHERE a.alert_type IS NOT NULL), '{}')
+            FROM expeditions e
+            LEFT JOIN expedition_deadline_alerts a
+                ON a.expedition_id = e.id AND a.deadline = e.deadline
+            WHERE e.status = %s AND e.deadline IS NOT NULL
+            GROUP BY e.id, e.deadline
+        """
+        rows = self._execute_query(query, (ExpeditionStatus.ACTIVE.value,), fetch_all=True)
+
+        alert_types = [alert_type for alert_type, _ in self._thresholds]
+        armed = {}
+        heap = []
+        for expedition_id, deadline, fired in rows or []:
+            # Thresholds fire in order, so resume after the last one recorded
+            next_index = max((alert_types.index(t) + 1 for t in fired if t in alert_types), default=0)
+            if next_index >= len(self._thresholds):
+                continue
+            sequence = next(self._sequence)
+            armed[expedition_id] = (sequence, deadline, next_index)
+            heap.append((deadline - self._thresholds[next_index][1], sequence, expedition_id))
+        heapq.heapify(heap)
+
+        with self._condition:
+            self._armed = armed
+            self._heap = heap
+            self._loaded = True
+            self._condition.notify()
+
+        self._log_operation("DeadlineSchedulerLoaded", armed=len(armed))
+        return len(armed)
+
+    def _arm(self, expedition_id: int, deadline: datetime, next_index: int) -> None:
+        """Push the next threshold for an expedition. Caller holds the condition."""
+        if next_index >= len(self._thresholds):
+            self._armed.pop(expedition_id, None)
+            return
+
+        sequence = next(self._sequence)
+        self._armed[expedition_id] = (sequence, deadline, next_index)
+        heapq.heappush(self._heap, (deadline - self._thresholds[next_index][1], sequence, expedition_id))
+
+        # Drop superseded entries once they dominate the heap
+        if len(self._heap) > 2 * len(self._armed) + 64:
+            self._heap = [entry for entry in self._heap
+                          if self._armed.get(entry[2], (None,))[0] == entry[1]]
+            heapq.heapify(self._heap)
+
+    def schedule(self, expedition_id: int, deadline: Optional[datetime]) -> None:
+        """
+        Arm (or re-arm) every threshold for an expedition's current deadline.
+
+        Does nothing until the scheduler has been loaded; the load picks up
+        the expedition from the database instead.
+
+        Args:
+            expedition_id: Expedition ID
+            deadline: New deadline, or None to stop tracking the expedition
+        """
+        if deadline is None:
+            self.cancel(expedition_id)
+            return
+
+        with self._condition:
+            if not self._loaded:
+                return
+            self._arm(expedition_id, deadline, 0)
+            self._condition.notify()
+
+    def cancel(self, expedition_id: int) -> None:
+        """
+        Stop tracking an expedition (completed, cancelled or deadline removed).
+
+        Args:
+            expedition_id: Expedition ID
+        """
+        with self._condition:
+            self._armed.pop(expedition_id, None)
+
+    def run_pending(self) -> int:
+        """
+        Fire every alert whose threshold has been crossed.
+
+        When several thresholds were crossed since the last tick (e.g. after
+        downtime or for a short deadline) only the most severe is sent; the
+        others are recorded as fired so they never go out late.
+
+        Returns:
+            Number of alerts sent
+        """
+        alerts_sent = 0
+        now = self._clock()
+
+        while True:
+            with self._condition:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, sequence, expedition_id = heapq.heappop(self._heap)
+                entry = self._armed.get(expedition_id)
+                if not entry or entry[0] != sequence:
+                    continue
+                _, deadline, index = entry
+                crossed = index
+                while (crossed + 1 < len(self._thresholds)
+                       and deadline - self._thresholds[crossed + 1][1] <= now):
+                    crossed += 1
+
+            try:
+                if self._fire(expedition_id, deadline, index, crossed, now):
+                    alerts_sent += 1
+            except Exception as e:
+                self.logger.error(f"Failed to fire deadline alert for expedition {expedition_id}: {e}")
+
+            with self._condition:
+                # A schedule() or cancel() made while firing takes precedence
+                if self._armed.get(expedition_id) is entry:
+                    self._arm(expedition_id, deadline, crossed + 1)
+
+        if alerts_sent > 0:
+            self._log_operation("DeadlineAlertsFired", alerts_sent=alerts_sent)
+
+        return alerts_sent
+
+    def _fire(self, expedition_id: int, deadline: datetime, first: int, last: int, now: datetime) -> bool:
+        """
+        Claim thresholds ``first``..``last`` and send the most severe one.
+
+        The claim only succeeds while the expedition is still active with the
+        same deadline, and only for thresholds no other process claimed first.
+
+        Returns:
+            True if an alert was sent
+        """
+        alert_types = [alert_type for alert_type, _ in self._thresholds[first:last + 1]]
+        query = """
+            WITH claimed AS (
+                INSERT INTO expedition_deadline_alerts (expedition_id, alert_type, deadline)
+                SELECT e.id, t.alert_type, e.deadline
+                FROM expeditions e
+                CROSS JOIN unnest(%s::varchar[]) AS t(alert_type)
+                WHERE e.id = %s AND e.status = %s AND e.deadline = %s
+                ON CONFLICT DO NOTHING
+                RETURNING expedition_id, alert_type
+            )
+            SELECT c.alert_type, e.name
+            FROM claimed c
+            JOIN expeditions e ON e.id = c.expedition_id
+        """
+        claimed = self._execute_query(
+            query,
+            (alert_types, expedition_id, ExpeditionStatus.ACTIVE.value, deadline),
+            fetch_all=True
+        )
+
+        alert_type = alert_types[-1]
+        names = {row[0]: row[1] for row in claimed or []}
+        if alert_type not in names or not self._send_alert:
+            return False
+
+        time_remaining = deadline - now
+        alert_data = {
+            'message': f"Expedition '{names[alert_type]}' deadline approaching",
+            'time_remaining': str(time_remaining),
+            'hours_remaining': time_remaining.total_seconds() / 3600
+        }
+        return bool(self._send_alert(expedition_id, alert_type, alert_data))
+
+    def next_fire_time(self) -> Optional[datetime]:
+        """Get the time of the earliest armed threshold, if any."""
+        with self._condition:
+            while self._heap:
+                _, sequence, expedition_id = self._heap[0]
+                if self._armed.get(expedition_id, (None,))[0] == sequence:
+                    return self._heap[0][0]
+                heapq.heappop(self._heap)
+        return None
+
+    def start(self, send_alert: AlertSender, thresholds: Optional[Dict[str, timedelta]] = None) -> None:
+        """
+        Load state from the database and start the background worker.
+
+        Args:
+            send_alert: Callable(expedition_id, alert_type, alert_data) used to deliver alerts
+            thresholds: Alert type -> lead time before the deadline
+        """
+        if self._running:
+            return
+
+        self.load(send_alert, thresholds)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="DeadlineAlertScheduler")
+        self._thread.start()
+        self.logger.info("Deadline alert scheduler started")
+
+    def stop(self) -> None:
+        """Stop the background worker."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        """Sleep until the next threshold (or a schedule change), then fire."""
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                next_time = self.next_fire_time()
+                wait = MAX_WAIT_SECONDS
+                if next_time is not None:
+                    wait = min(wait, (next_time - self._clock()).total_seconds())
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+
+            try:
+                self.run_pending()
+            except Exception as e:
+                self.logger.error(f"Deadline scheduler tick failed: {e}", exc_info=True)
+
+
+_deadline_scheduler: Optional[DeadlineAlertScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_deadline_scheduler() -> DeadlineAlertScheduler:
+    """Get the global deadline scheduler, creating it on first use."""
+    global _deadline_scheduler
+    with _scheduler_lock:
+        if _deadline_scheduler is None:
+            _deadline_scheduler = DeadlineAlertScheduler()
+        return _deadline_scheduler
+
+
+def notify_deadline_changed(expedition_id: int, deadline: Optional[datetime], active: bool = True) -> None:
+    """
+    Re-arm or cancel an expedition in the global scheduler, if it exists.
+
+    Args:
+        expedition_id: Expedition ID
+        deadline: Current deadline (None if the expedition has none)
+        active: Whether the expedition is still active
+    """
+    scheduler = _deadline_scheduler
+    if scheduler is None:
+        return
+    if active:
+        scheduler.schedule(expedition_id, deadline)
+    else:
+        scheduler.cancel(expedition_id)
@@ -0,0 +1,251 @@
+"""
+Expedition archive service.
+Moves completed and cancelled expeditions, together with their items, pirates,
+assignments, payments and progress, into the <table>_archive tables created in
+database/schema.py, and restores them on demand. Live queries never see the
+archive; read APIs that accept include_archived union it in when asked.
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from services.base_service import BaseService, ServiceError, NotFoundError
+from models.expedition import ExpeditionStatus
+
+
+# Archived tables, parents first (the order rows are restored in)
+ARCHIVED_TABLES = (
+    'expeditions',
+    'expedition_items',
+    'expedition_pirates',
+    'expedition_assignments',
+    'expedition_payments',
+    'expedition_progress'
+)
+
+ARCHIVABLE_STATUSES = (ExpeditionStatus.COMPLETED.value, ExpeditionStatus.CANCELLED.value)
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 90
+DEFAULT_BATCH_SIZE = 100
+
+
+def _copy_rows_query(source: str, target: str, extra_columns: str = "") -> str:
+    """
+    Build an INSERT ... SELECT that copies rows by column name.
+
+    Going through jsonb keeps the copy correct when the live and archive
+    tables list their columns in different orders (archive columns added
+    later are appended at the end).
+    """
+    key_column = 'id' if source.startswith('expeditions') else 'expedition_id'
+    return f"""
+        INSERT INTO {target}
+        SELECT (jsonb_populate_record(NULL::{target}, to_jsonb(t){extra_columns})).*
+        FROM {source} t
+        WHERE t.{key_column} = ANY(%s)
+    """
+
+
+class ExpeditionArchiveService(BaseService):
+    """
+    Service for archiving and restoring expeditions.
+
+    Each batch is one transaction: the expeditions are locked, copied with all
+    their rows into the archive and deleted from the live tables (children go
+    with ON DELETE CASCADE). The app.expedition_archival setting keeps the
+    rollup, read model and progress triggers from treating the move as new
+    writes, so daily rollups keep the archived history.
+    """
+
+    def get_archivable_expedition_ids(self, older_than_days: int = DEFAULT_ARCHIVE_AFTER_DAYS,
+                                      limit: Optional[int] = None) -> List[int]:
+        """
+        List expeditions that finished more than ``older_than_days`` ago.
+
+        Args:
+            older_than_days: Minimum age, counted from completion (or creation)
+            limit: Maximum number of IDs to return (default: all)
+
+        Returns:
+            Expedition IDs in ascending order
+        """
+        query = """
+            SELECT id FROM expeditions
+            WHERE status = ANY(%s) AND COALESCE(completed_at, created_at) < %s
+            ORDER BY id
+        """
+        params = [list(ARCHIVABLE_STATUSES), self._cutoff(older_than_days)]
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        rows = self._execute_query(query, tuple(params), fetch_all=True)
+        return [row[0] for row in rows or []]
+
+    def archive_batch(self, older_than_days: int = DEFAULT_ARCHIVE_AFTER_DAYS,
+                      batch_size: int = DEFAULT_BATCH_SIZE) -> List[int]:
+        """
+        Archive up to ``batch_size`` eligible expeditions in one transaction.
+
+        Expeditions locked by another transaction are skipped and picked up
+        by a later batch.
+
+        Args:
+            older_than_days: Minimum age, counted from completion (or creation)
+            batch_size: Maximum number of expeditions to move
+
+        Returns:
+            IDs of the archived expeditions
+        """
+        if older_than_days < 0:
+            raise ServiceError("older_than_days must be zero or positive")
+        if batch_size <= 0:
+            raise ServiceError("batch_size must be positive")
+
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SET LOCAL app.expedition_archival = 'on'")
+                    cursor.execute(
+                        """
+                        SELECT id FROM expeditions
+                        WHERE status = ANY(%s) AND COALESCE(completed_at, created_at) < %s
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                        """,
+                        (list(ARCHIVABLE_STATUSES), self._cutoff(older_than_days), batch_size)
+                    )
+                    expedition_ids = [row[0] for row in cursor.fetchall()]
+                    if not expedition_ids:
+                        conn.rollback()
+                        return []
+
+                    for table in ARCHIVED_TABLES:
+                        extra_columns = ""
+                        if table == 'expeditions':
+                            extra_columns = " || jsonb_build_object('archived_at', CURRENT_TIMESTAMP)"
+                        cursor.execute(_copy_rows_query(table, f"{table}_archive", extra_columns),
+                                       (expedition_ids,))
+
+                    cursor.execute(
+                        """
+                        INSERT INTO expedition_sale_links_archive (venda_id, expedition_id)
+                        SELECT id, expedition_id FROM Vendas WHERE expedition_id = ANY(%s)
+                        ON CONFLICT (venda_id) DO UPDATE SET expedition_id = EXCLUDED.expedition_id
+                        """,
+                        (expedition_ids,)
+                    )
+                    cursor.execute("DELETE FROM expeditions WHERE id = ANY(%s)", (expedition_ids,))
+                    conn.commit()
+
+        except Exception as e:
+            self.logger.error(f"Failed to archive expeditions: {e}", exc_info=True)
+            raise ServiceError(f"Failed to archive expeditions: {str(e)}")
+
+        self._invalidate_cache("expeditions")
+        self._log_operation("ExpeditionsArchived", count=len(expedition_ids),
+                            first_id=expedition_ids[0], last_id=expedition_ids[-1])
+        return expedition_ids
+
+    def archive_expired(self, older_than_days: int = DEFAULT_ARCHIVE_AFTER_DAYS,
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        max_batches: Optional[int] = None) -> int:
+        """
+        Archive eligible expeditions batch by batch until none are left.
+
+        Args:
+            older_than_days: Minimum age, counted from completion (or creation)
+            batch_size: Expeditions per transaction
+            max_batches: Stop after this many batches (default: no limit)
+
+        Returns:
+            Number of expeditions archived
+        """
+        archived = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            expedition_ids = self.archive_batch(older_than_days, batch_size)
+            if not expedition_ids:
+                break
+            archived += len(expedition_ids)
+            batches += 1
+            if len(expedition_ids) < batch_size:
+                break
+
+        return archived
+
+    def restore_expedition(self, expedition_id: int) -> None:
+        """
+        Move an archived expedition and all its rows back to the live tables.
+
+        The progress summary comes back with the expedition; the read model
+        document is rebuilt on its first read.
+
+        Args:
+            expedition_id: Archived expedition ID
+
+        Raises:
+            NotFoundError: If the expedition is not in the archive
+        """
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SET LOCAL app.expedition_archival = 'on'")
+                    for table in ARCHIVED_TABLES:
+                        cursor.execute(_copy_rows_query(f"{table}_archive", table), ([expedition_id],))
+                        if table == 'expeditions' and cursor.rowcount == 0:
+                            conn.rollback()
+                            raise NotFoundError(f"Archived expedition {expedition_id} not found")
+
+                    for table in ARCHIVED_TABLES:
+                        key_column = 'id' if table == 'expeditions' else 'expedition_id'
+                        cursor.execute(f"DELETE FROM {table}_archive WHERE {key_column} = %s", (expedition_id,))
+
+                    cursor.execute(
+                        """
+                        WITH links AS (
+                            DELETE FROM expedition_sale_links_archive
+                            WHERE expedition_id = %s
+                            RETURNING venda_id, expedition_id
+                        )
+                        UPDATE Vendas v SET expedition_id = links.expedition_id
+                        FROM links
+                        WHERE v.id = links.venda_id AND v.expedition_id IS NULL
+                        """,
+                        (expedition_id,)
+                    )
+                    conn.commit()
+
+        except NotFoundError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to restore expedition {expedition_id}: {e}", exc_info=True)
+            raise ServiceError(f"Failed to restore expedition: {str(e)}")
+
+        self._invalidate_cache("expeditions")
+        self._log_operation("ExpeditionRestored", expedition_id=expedition_id)
+
+    def get_archived_expedition_ids(self, limit: Optional[int] = None) -> List[int]:
+        """
+        List archived expeditions, most recently archived first.
+
+        Args:
+            limit: Maximum number of IDs to return (default: all)
+
+        Returns:
+            Archived expedition IDs
+        """
+        query = "SELECT id FROM expeditions_archive ORDER BY archived_at DESC, id DESC"
+        params = ()
+        if limit is not None:
+            query += " LIMIT %s"
+            params = (limit,)
+
+        rows = self._execute_query(query, params, fetch_all=True)
+        return [row[0] for row in rows or []]
+
+    @staticmethod
+    def _cutoff(older_than_days: int) -> datetime:
+        """Get the completion time before which expeditions are archived."""
+        return datetime.now() - timedelta(days=older_than_days)
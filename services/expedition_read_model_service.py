@@ -0,0 +1,115 @@
+"""
+Expedition read model service.
+Serves the denormalized per-expedition document assembled from
+expedition_read_models and expedition_read_model_entries. Entries are kept
+current by the read model triggers in database/schema.py; this service builds
+missing documents on first read and rebuilds them on demand (see
+migrations/rebuild_expedition_read_models.py).
+"""
+
+from typing import Any, Dict, List, Optional
+from services.base_service import BaseService
+
+
+READ_MODEL_SECTIONS = ('expedition', 'items', 'consumptions', 'pirates', 'progress')
+
+# Consumptions kept per document, newest first. Must match
+# expedition_read_model_recent_limit() in database/schema.py
+RECENT_CONSUMPTIONS_LIMIT = 50
+
+# Owner-only fields stripped from the document for everyone but the owner
+OWNER_ONLY_CONSUMPTION_FIELDS = ('encrypted_identity',)
+
+
+class ExpeditionReadModelService(BaseService):
+    """
+    Service for the expedition_read_models documents.
+
+    A document has one key per section in READ_MODEL_SECTIONS. Items,
+    consumptions and pirates are stored one entry per row, so a write only
+    recomputes the entries it touches; reads are a primary-key range scan.
+    Consumptions are capped to the RECENT_CONSUMPTIONS_LIMIT newest; progress
+    is derived from the item and pirate entries and covers every consumption.
+    """
+
+    def get_document(self, expedition_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the read model document for an expedition, building it if missing.
+
+        Args:
+            expedition_id: Expedition ID
+
+        Returns:
+            Document dictionary, or None if the expedition does not exist
+        """
+        row = self._execute_query(
+            "SELECT expedition_read_model_document(%s)",
+            (expedition_id,),
+            fetch_one=True
+        )
+        if row and row[0]:
+            return row[0]
+        return self.rebuild(expedition_id)
+
+    def rebuild(self, expedition_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the whole document and its entries from the normalized tables.
+
+        Args:
+            expedition_id: Expedition ID
+
+        Returns:
+            Rebuilt document, or None if the expedition does not exist
+        """
+        row = self._execute_query(
+            "SELECT rebuild_expedition_read_model(%s)",
+            (expedition_id,),
+            fetch_one=True
+        )
+        if not row or not row[0]:
+            return None
+
+        self._log_operation("ReadModelRebuilt", expedition_id=expedition_id)
+        return row[0]
+
+    def get_expedition_ids(self, only_missing: bool = False) -> List[int]:
+        """
+        List expeditions, optionally only those without a document yet.
+
+        Args:
+            only_missing: If True, skip expeditions that already have a document
+
+        Returns:
+            Expedition IDs in ascending order
+        """
+        query = """
+            SELECT e.id FROM expeditions e
+            {where}
+            ORDER BY e.id
+        """.format(where=(
+            "WHERE NOT EXISTS (SELECT 1 FROM expedition_read_models rm WHERE rm.expedition_id = e.id)"
+            if only_missing else ""
+        ))
+        rows = self._execute_query(query, fetch_all=True)
+        return [row[0] for row in rows or []]
+
+    @staticmethod
+    def project(document: Dict[str, Any], is_owner: bool) -> Dict[str, Any]:
+        """
+        Apply the owner-only projection to a document.
+
+        Non-owners never see encrypted identities. The document is modified in
+        place and returned.
+
+        Args:
+            document: Read model document
+            is_owner: Whether the requesting user owns the expedition
+
+        Returns:
+            The projected document
+        """
+        if not is_owner:
+            for consumption in document.get('consumptions') or []:
+                for field in OWNER_ONLY_CONSUMPTION_FIELDS:
+                    consumption.pop(field, None)
+        return document
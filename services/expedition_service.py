@@ -9,15 +9,19 @@ from datetime import datetime
 from decimal import Decimal
 
 from services.base_service import BaseService, ServiceError, ValidationError, NotFoundError
+from services.expedition_read_model_service import ExpeditionReadModelService
+from services.deadline_scheduler import notify_deadline_changed
 from core.interfaces import IExpeditionService, IProductService, IAssignmentService
 from models.expedition import (
     Expedition, ExpeditionItem, ItemConsumption, ExpeditionStatus, PaymentStatus,
     ExpeditionCreateRequest, ExpeditionItemRequest, ItemConsumptionRequest,
     ExpeditionResponse, ItemConsumptionResponse, Assignment, AssignmentStatus,
-    ExpeditionItemWithProduct, ItemConsumptionWithProduct
+    ExpeditionItemWithProduct, ItemConsumptionWithProduct,
+    BatchPaymentRequest, BatchPaymentResult, BulkConsumptionResult
 )
 from utils.encryption import generate_owner_key
 from utils.query_cache import get_query_cache
+from utils.input_sanitizer import InputSanitizer
 
 
 class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
@@ -29,6 +33,7 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
     def __init__(self, product_service: IProductService = None):
         super().__init__()
         self._product_service = product_service
+        self.read_model_service = ExpeditionReadModelService()
 
     def create_expedition(self, request: ExpeditionCreateRequest) -> Expedition:
         """Create a new expedition with validation."""
@@ -89,6 +94,7 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
 
         # Invalidate relevant caches
         self._invalidate_cache("expeditions")
+        notify_deadline_changed(expedition.id, expedition.deadline)
 
         return expedition
 
@@ -224,6 +230,7 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
         # Invalidate relevant caches
         if rows_affected > 0:
             self._invalidate_cache("expeditions")
+            notify_deadline_changed(expedition_id, expedition.deadline, active=status == ExpeditionStatus.ACTIVE)
 
         return rows_affected > 0
 
@@ -473,186 +480,441 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
     def consume_item(self, request: ItemConsumptionRequest) -> Assignment:
         """
         Record item consumption for an expedition using the assignment-based system.
-        This method:
-        1. Gets or creates expedition_pirate record
-        2. Creates expedition_assignment
-        3. Updates expedition_items quantity tracking
-        4. Creates corresponding sale record for debt tracking
+
+        Runs in two round trips on one connection:
+        1. Reads the item, expedition status/owner_key and any existing pirate
+        2. One statement that applies a guarded quantity update on
+           expedition_items, upserts the expedition_pirate, inserts the
+           expedition_assignment and records the sale for debt tracking
+
+        The quantity guard lives in the UPDATE, so concurrent consumptions
+        cannot push quantity_consumed past quantity_required.
+
+        Args:
+            request: Item consumption request
+
+        Returns:
+            Created assignment
+
+        Raises:
+            ValidationError: If the request is invalid, the expedition is not
+                active or the consumption would exceed the requirement
+            NotFoundError: If the expedition item does not exist
         """
         # Validate request
         validation_errors = request.validate()
         if validation_errors:
             raise ValidationError(f"Invalid consumption data: {', '.join(validation_errors)}")
 
-        # Get expedition item to validate
+        try:
+            comprador = InputSanitizer.sanitize_buyer_name(request.consumer_name)
+        except ValueError as e:
+            raise ValidationError(f"Invalid buyer name: {str(e)}")
+
+        pirate_name = request.pirate_name.strip()
+        total_cost = request.calculate_total_cost()
+
+        # SECURITY: Query pirate by pirate_name since original_name is NULL (encrypted)
         item_query = """
-            SELECT ei.id, ei.expedition_id, ei.produto_id, ei.quantity_required, ei.quantity_consumed,
-                   e.status, e.owner_chat_id
+            SELECT ei.expedition_id, ei.quantity_required, ei.quantity_consumed,
+                   e.status, e.owner_key, ep.id, e.owner_chat_id
             FROM expedition_items ei
             JOIN expeditions e ON ei.expedition_id = e.id
+            LEFT JOIN expedition_pirates ep
+                   ON ep.expedition_id = ei.expedition_id AND ep.pirate_name = %s
             WHERE ei.id = %s
         """
 
-        item_result = self._execute_query(item_query, (request.expedition_item_id,), fetch_one=True)
-        if not item_result:
-            raise NotFoundError("Expedition item not found")
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(item_query, (pirate_name, request.expedition_item_id))
+                    item_result = cursor.fetchone()
+                    if not item_result:
+                        raise NotFoundError("Expedition item not found")
+
+                    (expedition_id, quantity_required, quantity_consumed,
+                     expedition_status, owner_key, pirate_id, owner_chat_id) = item_result
+
+                    self._check_consumption_allowed(
+                        expedition_status, quantity_required, quantity_consumed, request.quantity_consumed
+                    )
+
+                    if pirate_id is not None:
+                        pirate_cte = "SELECT %s::integer AS id, %s::varchar AS pirate_name"
+                        pirate_params = (pirate_id, pirate_name)
+                    else:
+                        # SECURITY: Encrypt the identity up front so the pirate row
+                        # can be inserted inside the same statement
+                        from core.modern_service_container import get_brambler_service
+                        encrypted_identity = get_brambler_service().encrypt_pirate_identity(
+                            expedition_id,
+                            InputSanitizer.sanitize_text(request.consumer_name),
+                            pirate_name,
+                            owner_key or generate_owner_key(expedition_id, owner_chat_id)
+                        )
+                        pirate_cte = """
+                            INSERT INTO expedition_pirates
+                            (expedition_id, original_name, pirate_name, encrypted_identity_v2, status, role)
+                            SELECT item.expedition_id, NULL, %s, %s, 'active', 'participant' FROM item
+                            ON CONFLICT (expedition_id, pirate_name)
+                            DO UPDATE SET pirate_name = EXCLUDED.pirate_name
+                            RETURNING id, pirate_name
+                        """
+                        pirate_params = (pirate_name, encrypted_identity)
+
+                    cursor.execute(
+                        f"""
+                        WITH item AS (
+                            UPDATE expedition_items ei
+                            SET quantity_consumed = COALESCE(ei.quantity_consumed, 0) + %s
+                            FROM expeditions e
+                            WHERE ei.id = %s
+                              AND e.id = ei.expedition_id
+                              AND e.status = %s
+                              AND COALESCE(ei.quantity_consumed, 0) + %s <= ei.quantity_required
+                            RETURNING ei.id, ei.expedition_id, ei.produto_id
+                        ),
+                        pirate AS (
+                            {pirate_cte}
+                        ),
+                        assignment AS (
+                            INSERT INTO expedition_assignments
+                            (expedition_id, pirate_id, expedition_item_id, assigned_quantity,
+                             consumed_quantity, unit_price, total_cost, assignment_status,
+                             payment_status, assigned_at, completed_at)
+                            SELECT item.expedition_id, pirate.id, item.id, %s, %s, %s, %s,
+                                   'completed', %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+                            FROM item, pirate
+                            RETURNING id, expedition_id, expedition_item_id, consumed_quantity,
+                                      unit_price, total_cost, assignment_status, assigned_at,
+                                      deadline, completed_at
+                        ),
+                        sale AS (
+                            -- Items without a product record no sale (no header without items)
+                            INSERT INTO Vendas (comprador, data_venda, expedition_id)
+                            SELECT %s, CURRENT_TIMESTAMP, item.expedition_id
+                            FROM item
+                            JOIN Produtos p ON p.id = item.produto_id
+                            RETURNING id
+                        ),
+                        sale_item AS (
+                            INSERT INTO ItensVenda (venda_id, produto_id, quantidade, valor_unitario, produto_nome)
+                            SELECT sale.id, item.produto_id, %s, %s, p.nome
+                            FROM sale, item
+                            JOIN Produtos p ON p.id = item.produto_id
+                            RETURNING venda_id
+                        )
+                        SELECT a.id, a.expedition_id, pirate.pirate_name, a.expedition_item_id,
+                               a.consumed_quantity, a.unit_price, a.total_cost,
+                               'consumption', a.assignment_status, a.assigned_at,
+                               a.deadline, a.completed_at, NULL,
+                               a.assigned_at, a.completed_at,
+                               (SELECT venda_id FROM sale_item)
+                        FROM assignment a, pirate
+                        """,
+                        (request.quantity_consumed, request.expedition_item_id,
+                         ExpeditionStatus.ACTIVE.value, request.quantity_consumed)
+                        + pirate_params
+                        + (request.quantity_consumed,  # assigned = consumed for immediate consumption
+                           request.quantity_consumed, request.unit_price, total_cost,
+                           PaymentStatus.PENDING.value,
+                           comprador,
+                           request.quantity_consumed, request.unit_price)
+                    )
+                    row = cursor.fetchone()
+
+                    if not row:
+                        # The guard lost a race with another consumption or a status change
+                        conn.rollback()
+                        raise ValidationError(
+                            "Consumption would exceed requirement or expedition is no longer active"
+                        )
+
+                    conn.commit()
+
+        except (ValidationError, NotFoundError):
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to record item consumption: {e}")
+            raise ServiceError(f"Failed to record item consumption: {str(e)}")
+
+        assignment = Assignment.from_db_row(row[:15])
+        sale_id = row[15]
+
+        # Invalidate expedition cache after consumption to ensure fresh data
+        self._invalidate_expedition_cache(expedition_id)
+
+        self._log_operation("ConsumeItem",
+                          expedition_id=expedition_id,
+                          consumer=request.consumer_name,
+                          quantity=request.quantity_consumed,
+                          pirate_name=pirate_name,
+                          assignment_id=assignment.id,
+                          sale_id=sale_id,
+                          total_cost=total_cost)
 
-        (item_id, expedition_id, produto_id, quantity_required,
-         quantity_consumed, expedition_status, owner_chat_id) = item_result
+        return assignment
 
-        # Validate expedition is active
+    @staticmethod
+    def _check_consumption_allowed(expedition_status: str, quantity_required: int,
+                                   quantity_consumed: Optional[int], quantity: int) -> None:
+        """Raise ValidationError if a consumption of quantity is not allowed."""
         if expedition_status != ExpeditionStatus.ACTIVE.value:
             raise ValidationError("Cannot consume items from inactive expedition")
 
-        # Check if consumption would exceed requirement
-        new_consumed = (quantity_consumed or 0) + request.quantity_consumed
+        new_consumed = (quantity_consumed or 0) + quantity
         if new_consumed > quantity_required:
             raise ValidationError(
                 f"Consumption would exceed requirement. "
                 f"Required: {quantity_required}, Already consumed: {quantity_consumed or 0}, "
-                f"Trying to consume: {request.quantity_consumed}"
+                f"Trying to consume: {quantity}"
             )
 
-        total_cost = request.calculate_total_cost()
-        now = datetime.now()
-
-        # Step 1: Get or create expedition_pirate record
-        # SECURITY: Query by pirate_name since original_name is now NULL (encrypted)
-        pirate_query = """
-            SELECT id FROM expedition_pirates
-            WHERE expedition_id = %s AND pirate_name = %s
+    def consume_items_bulk(self, expedition_id: int,
+                           requests: List[ItemConsumptionRequest]) -> BulkConsumptionResult:
         """
-        pirate_result = self._execute_query(pirate_query, (expedition_id, request.pirate_name.strip()), fetch_one=True)
+        Record many item consumptions for one expedition in a single transaction.
 
-        if pirate_result:
-            pirate_id = pirate_result[0]
-        else:
-            # SECURITY: Use brambler_service to create encrypted pirate
-            from core.modern_service_container import get_brambler_service
-            brambler_service = get_brambler_service()
+        Rows are validated in order against one locked snapshot of the
+        expedition's item quantities. Rejected rows are reported and skipped;
+        the rest are written with multi-row statements, so the number of round
+        trips does not grow with the number of rows. Sales are grouped into one
+        Vendas record per buyer; as in consume_item, items without a product
+        record the consumption but no sale.
 
-            # Get expedition to retrieve owner_key
-            expedition_query = """
-                SELECT owner_key FROM expeditions WHERE id = %s
-            """
-            expedition_result = self._execute_query(expedition_query, (expedition_id,), fetch_one=True)
-            owner_key = expedition_result[0] if expedition_result and expedition_result[0] else None
+        Args:
+            expedition_id: Expedition ID
+            requests: Consumption rows for items of this expedition
 
-            # Create pirate with encryption
-            pirate_data = brambler_service.create_pirate(
-                expedition_id=expedition_id,
-                original_name=request.consumer_name.strip(),
-                pirate_name=request.pirate_name.strip(),
-                owner_key=owner_key
-            )
+        Returns:
+            Per-row results in request order
 
-            if not pirate_data:
-                raise ServiceError("Failed to create encrypted pirate record")
+        Raises:
+            ValidationError: If no rows are given or the expedition is not active
+            NotFoundError: If the expedition does not exist or has no items
+        """
+        if not requests:
+            raise ValidationError("At least one consumption is required")
 
-            pirate_id = pirate_data['id']
-            self.logger.info(f"Created encrypted pirate record {pirate_id} for pirate {request.pirate_name}")
+        results = [{'index': index, 'success': False} for index in range(len(requests))]
+        accepted = []
+        now = datetime.now()
 
-        # Step 2: Create assignment and update item in transaction
-        operations = [
-            # Create expedition_assignment
-            (
-                """
-                INSERT INTO expedition_assignments
-                (expedition_id, pirate_id, expedition_item_id, assigned_quantity,
-                 consumed_quantity, unit_price, total_cost, assignment_status,
-                 payment_status, assigned_at, completed_at)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (expedition_id, pirate_id, request.expedition_item_id,
-                 request.quantity_consumed,  # assigned = consumed for immediate consumption
-                 request.quantity_consumed,
-                 request.unit_price, total_cost,
-                 'completed',  # Completed immediately
-                 PaymentStatus.PENDING.value,
-                 now, now)
-            ),
-            # Update expedition_items quantity
-            (
-                """
-                UPDATE expedition_items
-                SET quantity_consumed = quantity_consumed + %s
-                WHERE id = %s
-                """,
-                (request.quantity_consumed, request.expedition_item_id)
-            )
-        ]
+        items_query = """
+            SELECT ei.id, ei.produto_id, ei.quantity_required, COALESCE(ei.quantity_consumed, 0),
+                   p.nome, e.status, e.owner_key, e.owner_chat_id
+            FROM expedition_items ei
+            JOIN expeditions e ON ei.expedition_id = e.id
+            LEFT JOIN Produtos p ON ei.produto_id = p.id
+            WHERE ei.expedition_id = %s
+            FOR UPDATE OF ei
+        """
 
-        success = self._execute_transaction(operations)
-        if not success:
-            raise ServiceError("Failed to record item consumption")
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(items_query, (expedition_id,))
+                    item_rows = cursor.fetchall()
+                    if not item_rows:
+                        raise NotFoundError("Expedition not found or has no items")
+
+                    expedition_status, owner_key, owner_chat_id = item_rows[0][5:8]
+                    if expedition_status != ExpeditionStatus.ACTIVE.value:
+                        raise ValidationError("Cannot consume items from inactive expedition")
+
+                    items = {
+                        row[0]: {'produto_id': row[1], 'required': row[2], 'consumed': row[3], 'nome': row[4]}
+                        for row in item_rows
+                    }
 
-        # Invalidate expedition cache after consumption to ensure fresh data
-        self._invalidate_expedition_cache(expedition_id)
+                    for result, consumption in zip(results, requests):
+                        item = items.get(consumption.expedition_item_id)
+                        try:
+                            errors = consumption.validate()
+                            if errors:
+                                raise ValidationError(f"Invalid consumption data: {', '.join(errors)}")
+                            if consumption.unit_price <= 0:
+                                raise ValidationError("Unit price must be greater than 0")
+                            if item is None:
+                                raise ValidationError("Expedition item not found")
+                            try:
+                                comprador = InputSanitizer.sanitize_buyer_name(consumption.consumer_name)
+                            except ValueError as e:
+                                raise ValidationError(f"Invalid buyer name: {str(e)}")
+                            self._check_consumption_allowed(
+                                expedition_status, item['required'], item['consumed'],
+                                consumption.quantity_consumed
+                            )
+                        except ValidationError as e:
+                            result['error'] = str(e)
+                            continue
 
-        # Get the created assignment
-        assignment_query = """
-            SELECT ea.id, ea.expedition_id, ep.pirate_name, ea.expedition_item_id,
-                   ea.consumed_quantity, ea.unit_price, ea.total_cost,
-                   'consumption', ea.assignment_status, ea.assigned_at,
-                   ea.deadline as due_date, ea.completed_at, NULL as notes,
-                   ea.assigned_at as created_at, ea.completed_at as updated_at
-            FROM expedition_assignments ea
-            JOIN expedition_pirates ep ON ea.pirate_id = ep.id
-            WHERE ea.expedition_id = %s AND ea.pirate_id = %s
-              AND ea.expedition_item_id = %s AND ea.assigned_at = %s
-        """
+                        item['consumed'] += consumption.quantity_consumed
+                        accepted.append((result, consumption, item, comprador, consumption.pirate_name.strip()))
 
-        assignment_result = self._execute_query(
-            assignment_query,
-            (expedition_id, pirate_id, request.expedition_item_id, now),
-            fetch_one=True
-        )
+                    if not accepted:
+                        conn.rollback()
+                        return BulkConsumptionResult(results=results)
 
-        if not assignment_result:
-            raise ServiceError("Failed to retrieve created assignment")
+                    pirate_ids = self._upsert_bulk_pirates(cursor, expedition_id, owner_key, owner_chat_id, accepted)
 
-        assignment = Assignment.from_db_row(assignment_result)
+                    quantity_by_item = {}
+                    for _, consumption, _, _, _ in accepted:
+                        quantity_by_item[consumption.expedition_item_id] = (
+                            quantity_by_item.get(consumption.expedition_item_id, 0) + consumption.quantity_consumed
+                        )
 
-        # Create a corresponding sale record in the sales system for debt tracking
-        try:
-            from core.modern_service_container import get_sales_service
-            from models.sale import CreateSaleRequest, CreateSaleItemRequest
-
-            sales_service = get_sales_service()
-
-            # Create sale request for the consumption
-            sale_request = CreateSaleRequest(
-                comprador=request.consumer_name,
-                items=[CreateSaleItemRequest(
-                    produto_id=produto_id,
-                    quantidade=request.quantity_consumed,
-                    valor_unitario=request.unit_price
-                )],
-                expedition_id=expedition_id
-            )
+                    cursor.execute(
+                        f"""
+                        UPDATE expedition_items ei
+                        SET quantity_consumed = COALESCE(ei.quantity_consumed, 0) + v.quantity
+                        FROM (VALUES {", ".join(["(%s, %s)"] * len(quantity_by_item))}) AS v(id, quantity)
+                        WHERE ei.id = v.id
+                        """,
+                        tuple(value for pair in quantity_by_item.items() for value in pair)
+                    )
 
-            # Create sale for debt tracking WITHOUT stock consumption
-            sale = sales_service.create_expedition_sale(sale_request)
+                    # RETURNING order is not guaranteed for multi-row inserts, so ids
+                    # are drawn per input position (ordinality) and returned with it
+                    cursor.execute(
+                        """
+                        WITH input AS (
+                            SELECT nextval(pg_get_serial_sequence('expedition_assignments', 'id')) AS id, v.*
+                            FROM unnest(%s::integer[], %s::integer[], %s::integer[],
+                                        %s::numeric[], %s::numeric[])
+                                 WITH ORDINALITY AS v(pirate_id, item_id, quantity, unit_price, total_cost, ord)
+                        ),
+                        inserted AS (
+                            INSERT INTO expedition_assignments
+                            (id, expedition_id, pirate_id, expedition_item_id, assigned_quantity,
+                             consumed_quantity, unit_price, total_cost, assignment_status,
+                             payment_status, assigned_at, completed_at)
+                            SELECT id, %s, pirate_id, item_id, quantity, quantity, unit_price, total_cost,
+                                   'completed', %s, %s, %s
+                            FROM input
+                            RETURNING id
+                        )
+                        SELECT input.id, input.ord
+                        FROM input
+                        JOIN inserted ON inserted.id = input.id
+                        """,
+                        (
+                            [pirate_ids[pirate_name] for *_, pirate_name in accepted],
+                            [consumption.expedition_item_id for _, consumption, *_ in accepted],
+                            [consumption.quantity_consumed for _, consumption, *_ in accepted],
+                            [consumption.unit_price for _, consumption, *_ in accepted],
+                            [consumption.calculate_total_cost() for _, consumption, *_ in accepted],
+                            expedition_id, PaymentStatus.PENDING.value, now, now
+                        )
+                    )
+                    assignment_ids = [assignment_id for assignment_id, _ in
+                                      sorted(cursor.fetchall(), key=lambda row: row[1])]
+
+                    # Items without a product record no sale (no header without items)
+                    sold = [entry for entry in accepted if entry[2]['nome'] is not None]
+                    sale_ids = {}
+                    if sold:
+                        buyers = list(dict.fromkeys(comprador for _, _, _, comprador, _ in sold))
+                        cursor.execute(
+                            f"""
+                            INSERT INTO Vendas (comprador, data_venda, expedition_id)
+                            VALUES {", ".join(["(%s, %s, %s)"] * len(buyers))}
+                            RETURNING id, comprador
+                            """,
+                            tuple(value for comprador in buyers for value in (comprador, now, expedition_id))
+                        )
+                        sale_ids = {comprador: sale_id for sale_id, comprador in cursor.fetchall()}
+
+                        cursor.execute(
+                            f"""
+                            INSERT INTO ItensVenda (venda_id, produto_id, quantidade, valor_unitario, produto_nome)
+                            VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(sold))}
+                            """,
+                            tuple(
+                                value for _, consumption, item, comprador, _ in sold for value in (
+                                    sale_ids[comprador], item['produto_id'], consumption.quantity_consumed,
+                                    consumption.unit_price, item['nome']
+                                )
+                            )
+                        )
 
-            self._log_operation("ConsumeItemSaleCreated",
-                              expedition_id=expedition_id,
-                              consumer=request.consumer_name,
-                              sale_id=sale.id,
-                              total_cost=total_cost,
-                              stock_consumed=False)
+                    conn.commit()
 
+        except (ValidationError, NotFoundError):
+            raise
         except Exception as e:
-            self.logger.warning(f"Failed to create sale record for consumption tracking: {e}")
-            # Don't fail the consumption, just log the issue
+            self.logger.error(f"Failed to record bulk consumption: {e}")
+            raise ServiceError(f"Failed to record bulk consumption: {str(e)}")
+
+        for assignment_id, (result, consumption, item, comprador, pirate_name) in zip(assignment_ids, accepted):
+            result['success'] = True
+            result['sale_id'] = sale_ids[comprador] if item['nome'] is not None else None
+            result['assignment'] = Assignment.from_db_row((
+                assignment_id, expedition_id, pirate_name, consumption.expedition_item_id,
+                consumption.quantity_consumed, consumption.unit_price, consumption.calculate_total_cost(),
+                'consumption', 'completed', now, None, now, None, now, now
+            ))
 
-        self._log_operation("ConsumeItem",
+        # Invalidate once for the whole batch
+        self._invalidate_expedition_cache(expedition_id)
+
+        self._log_operation("ConsumeItemsBulk",
                           expedition_id=expedition_id,
-                          consumer=request.consumer_name,
-                          quantity=request.quantity_consumed,
-                          pirate_id=pirate_id,
-                          assignment_id=assignment.id)
+                          recorded=len(accepted),
+                          rejected=len(requests) - len(accepted))
 
-        return assignment
+        return BulkConsumptionResult(results=results)
+
+    def _upsert_bulk_pirates(self, cursor, expedition_id: int, owner_key: Optional[str],
+                             owner_chat_id: int, accepted: list) -> Dict[str, int]:
+        """
+        Resolve pirate ids for a bulk consumption, creating missing pirates.
+
+        Uses one lookup and, if needed, one multi-row upsert on the caller's cursor.
+
+        Returns:
+            Mapping of pirate_name to expedition_pirates.id
+        """
+        pirate_names = list(dict.fromkeys(pirate_name for *_, pirate_name in accepted))
+        cursor.execute(
+            """
+            SELECT pirate_name, id FROM expedition_pirates
+            WHERE expedition_id = %s AND pirate_name = ANY(%s)
+            """,
+            (expedition_id, pirate_names)
+        )
+        pirate_ids = dict(cursor.fetchall())
+
+        # SECURITY: New pirates get an encrypted identity and a NULL original_name
+        new_pirates = {}
+        for _, consumption, _, _, pirate_name in accepted:
+            if pirate_name in pirate_ids or pirate_name in new_pirates:
+                continue
+            from core.modern_service_container import get_brambler_service
+            new_pirates[pirate_name] = get_brambler_service().encrypt_pirate_identity(
+                expedition_id,
+                InputSanitizer.sanitize_text(consumption.consumer_name),
+                pirate_name,
+                owner_key or generate_owner_key(expedition_id, owner_chat_id)
+            )
+
+        if new_pirates:
+            cursor.execute(
+                f"""
+                INSERT INTO expedition_pirates
+                (expedition_id, original_name, pirate_name, encrypted_identity_v2, status, role)
+                VALUES {", ".join(["(%s, NULL, %s, %s, 'active', 'participant')"] * len(new_pirates))}
+                ON CONFLICT (expedition_id, pirate_name)
+                DO UPDATE SET pirate_name = EXCLUDED.pirate_name
+                RETURNING pirate_name, id
+                """,
+                tuple(value for name, identity in new_pirates.items()
+                      for value in (expedition_id, name, identity))
+            )
+            pirate_ids.update(cursor.fetchall())
+
+        return pirate_ids
 
     def get_expedition_consumptions(self, expedition_id: int) -> List[Assignment]:
         """Get all assignments (consumptions) for an expedition."""
@@ -770,6 +1032,151 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
 
         return Assignment.from_db_row(updated_result)
 
+    def pay_assignments_batch(self, request: BatchPaymentRequest) -> BatchPaymentResult:
+        """
+        Settle many assignments in one transaction.
+
+        Selects the given assignments (or every unpaid assignment of a pirate),
+        allocates the amount oldest-first, writes all expedition_payments rows
+        with one multi-row INSERT and updates all payment statuses with one
+        UPDATE. Caches are invalidated once per affected expedition.
+
+        Args:
+            request: Batch payment request (amount None pays everything outstanding)
+
+        Returns:
+            BatchPaymentResult with one allocation per paid assignment
+
+        Raises:
+            ValidationError: If the request is invalid or the amount exceeds what is owed
+            NotFoundError: If no unpaid assignments match
+        """
+        errors = request.validate()
+        if errors:
+            raise ValidationError(f"Batch payment validation failed: {', '.join(errors)}")
+
+        if request.assignment_ids:
+            selector, selector_param = "ea.id = ANY(%s)", list(request.assignment_ids)
+        else:
+            selector, selector_param = "ea.pirate_id = %s", request.pirate_id
+
+        # Row locks keep concurrent payments from allocating against the same balance
+        select_query = f"""
+            SELECT ea.id, ea.expedition_id, ea.pirate_id, ea.total_cost,
+                   (SELECT COALESCE(SUM(p.payment_amount), 0)
+                    FROM expedition_payments p
+                    WHERE p.assignment_id = ea.id AND p.payment_status = 'completed') AS amount_paid
+            FROM expedition_assignments ea
+            WHERE {selector}
+              AND ea.payment_status != %s
+            ORDER BY ea.assigned_at ASC, ea.id ASC
+            FOR UPDATE OF ea
+        """
+
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(select_query, (selector_param, PaymentStatus.PAID.value))
+                    rows = [row for row in cursor.fetchall() if row[3] - row[4] > Decimal('0.01')]
+
+                    if not rows:
+                        raise NotFoundError("No unpaid assignments found for this payment")
+
+                    outstanding = sum((row[3] - row[4] for row in rows), Decimal('0.00'))
+                    amount = outstanding if request.amount is None else request.amount
+                    if amount > outstanding:
+                        raise ValidationError(
+                            f"Payment exceeds outstanding total. Outstanding: {outstanding}, Trying to pay: {amount}"
+                        )
+
+                    allocations = self._allocate_oldest_first(rows, amount)
+                    now = datetime.now()
+
+                    cursor.execute(
+                        f"""
+                        UPDATE expedition_assignments ea
+                        SET payment_status = v.payment_status
+                        FROM (VALUES {", ".join(["(%s, %s)"] * len(allocations))}) AS v(id, payment_status)
+                        WHERE ea.id = v.id
+                        """,
+                        tuple(value for a in allocations for value in (a['assignment_id'], a['payment_status']))
+                    )
+
+                    cursor.execute(
+                        f"""
+                        INSERT INTO expedition_payments
+                        (expedition_id, assignment_id, pirate_id, payment_amount, payment_method,
+                         payment_status, processed_by_chat_id, processed_at, notes)
+                        VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(allocations))}
+                        """,
+                        tuple(
+                            value for a in allocations for value in (
+                                a['expedition_id'], a['assignment_id'], a['pirate_id'], a['amount'],
+                                request.payment_method, 'completed', request.processed_by_chat_id, now,
+                                f"Batch payment for assignment {a['assignment_id']}"
+                            )
+                        )
+                    )
+
+                    conn.commit()
+
+        except (ValidationError, NotFoundError):
+            raise
+        except Exception as e:
+            self.logger.error(f"Failed to process batch payment: {e}")
+            raise ServiceError(f"Failed to process batch payment: {str(e)}")
+
+        for expedition_id in {a['expedition_id'] for a in allocations}:
+            self._invalidate_expedition_cache(expedition_id)
+
+        self._log_operation("PayAssignmentsBatch",
+                          assignments=len(allocations),
+                          amount=amount,
+                          pirate_id=request.pirate_id)
+
+        return BatchPaymentResult(
+            allocations=allocations,
+            total_paid=amount,
+            remaining_outstanding=outstanding - amount
+        )
+
+    @staticmethod
+    def _allocate_oldest_first(rows: List[tuple], amount: Decimal) -> List[Dict]:
+        """
+        Spread a payment over outstanding assignments, oldest first.
+
+        Args:
+            rows: (id, expedition_id, pirate_id, total_cost, amount_paid) ordered oldest first
+            amount: Amount to allocate (must not exceed the outstanding total)
+
+        Returns:
+            One allocation dict per assignment that receives money
+        """
+        allocations = []
+        left = amount
+
+        for assignment_id, expedition_id, pirate_id, total_cost, amount_paid in rows:
+            if left <= Decimal('0.00'):
+                break
+
+            due = total_cost - amount_paid
+            paying = min(due, left)
+            left -= paying
+            remaining = due - paying
+
+            allocations.append({
+                'assignment_id': assignment_id,
+                'expedition_id': expedition_id,
+                'pirate_id': pirate_id,
+                'amount': paying,
+                'amount_paid': amount_paid + paying,
+                'remaining': remaining,
+                'payment_status': (PaymentStatus.PAID.value if remaining <= Decimal('0.01')
+                                   else PaymentStatus.PARTIAL.value)
+            })
+
+        return allocations
+
     def get_user_consumptions(self, consumer_name: str) -> List[Assignment]:
         """
         Get all assignments (consumptions) for a specific user.
@@ -800,8 +1207,10 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
 
     def get_expedition_details_optimized(self, expedition_id: int, requesting_chat_id: Optional[int] = None) -> Optional[dict]:
         """
-        Get complete expedition data in a SINGLE optimized query with JOINs.
-        This method reduces database round-trips from 10+ to 1.
+        Get complete expedition data from the expedition read model.
+
+        The denormalized document is a primary-key lookup kept current by the
+        read model triggers, so no aggregation runs on the read path.
 
         Args:
             expedition_id: The expedition ID to fetch
@@ -810,113 +1219,31 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
         Returns a raw dictionary with all expedition data including:
         - Expedition details
         - Items with product information
-        - Consumptions with product information (with original_name only for owners)
+        - The most recent consumptions with product information (with original_name only for owners)
+        - Per-pirate totals and progress
 
         Security:
         - If requesting_chat_id matches expedition owner_chat_id, includes original_name in consumptions
-        - If requesting_chat_id is None or doesn't match owner, original_name is excluded
+        - If requesting_chat_id is None or doesn't match owner, encrypted identities are projected out
         """
         cache = get_query_cache()
         # SECURITY: Include requesting_chat_id in cache key to prevent leaking encrypted_identity
         cache_key_query = f"expedition_details_{expedition_id}_user_{requesting_chat_id}"
 
-        # Check cache first (60 second TTL)
+        # Owner responses are cached (60 second TTL) because decrypting identities is the expensive part
         cached_result = cache.get(cache_key_query, (expedition_id, requesting_chat_id))
         if cached_result is not None:
             self.logger.debug(f"Cache hit for expedition {expedition_id}, user {requesting_chat_id}")
             return cached_result
 
-        # Single optimized query with JOINs
-        # SECURITY: Pass requesting_chat_id to conditionally include encrypted_identity for owners
-        query = """
-        WITH expedition_data AS (
-            SELECT
-                e.id, e.name, e.owner_chat_id, e.status, e.deadline,
-                e.created_at, e.completed_at
-            FROM expeditions e
-            WHERE e.id = %s
-        ),
-        items_data AS (
-            SELECT
-                ei.id,
-                ei.produto_id,
-                p.nome as product_name,
-                p.emoji as product_emoji,
-                ei.quantity_required as quantity_needed,
-                COALESCE(
-                    ei.target_unit_price,
-                    (SELECT AVG(e2.preco) FROM Estoque e2
-                     WHERE e2.produto_id = ei.produto_id AND e2.quantidade_restante > 0),
-                    0
-                ) as unit_price,
-                COALESCE(ei.quantity_consumed, 0) as quantity_consumed,
-                ei.created_at as added_at,
-                ei.encrypted_product_name,
-                ei.original_product_name
-            FROM expedition_items ei
-            JOIN produtos p ON ei.produto_id = p.id
-            WHERE ei.expedition_id = %s
-            ORDER BY ei.created_at ASC
-        ),
-        consumptions_data AS (
-            SELECT
-                ea.id,
-                -- SECURITY: Use pirate_name as default consumer_name
-                COALESCE(ep.pirate_name, 'Unknown Pirate') as consumer_name,
-                COALESCE(ep.pirate_name, 'Unknown Pirate') as pirate_name,
-                -- SECURITY: Include encrypted_identity for owner decryption
-                CASE
-                    WHEN e.owner_chat_id = %s THEN ep.encrypted_identity
-                    ELSE NULL
-                END as encrypted_identity,
-                p.nome as product_name,
-                ea.consumed_quantity as quantity,
-                ea.unit_price,
-                ea.total_cost as total_price,
-                COALESCE(
-                    (SELECT SUM(payment_amount) FROM expedition_payments
-                     WHERE assignment_id = ea.id AND payment_status = 'completed'),
-                    0
-                ) as amount_paid,
-                ea.payment_status,
-                ea.assigned_at as consumed_at,
-                ei.encrypted_product_name
-            FROM expedition_assignments ea
-            LEFT JOIN expedition_pirates ep ON ea.pirate_id = ep.id
-            JOIN expedition_items ei ON ea.expedition_item_id = ei.id
-            JOIN produtos p ON ei.produto_id = p.id
-            JOIN expeditions e ON ea.expedition_id = e.id
-            WHERE ea.expedition_id = %s
-            ORDER BY ea.assigned_at DESC
-        )
-        SELECT
-            (SELECT row_to_json(expedition_data.*) FROM expedition_data) as expedition,
-            (SELECT json_agg(items_data.*) FROM items_data) as items,
-            (SELECT json_agg(consumptions_data.*) FROM consumptions_data) as consumptions
-        """
-
         try:
-            # Pass requesting_chat_id for ownership check in consumptions CTE
-            # Parameters: expedition_id (3 times) + requesting_chat_id (1 time for ownership check in CASE)
-            query_params = (expedition_id, expedition_id, requesting_chat_id, expedition_id)
-
-            result = self._execute_query(
-                query,
-                query_params,
-                fetch_one=True
-            )
-
-            if not result or not result[0]:
+            document = self.read_model_service.get_document(expedition_id)
+            if not document or not document.get('expedition'):
                 self.logger.warning(f"No expedition found with ID {expedition_id}")
                 return None
 
-            # Parse the JSON aggregates
-            expedition_json = result[0] if result[0] else None
-            items_json = result[1] if result[1] else []
-            consumptions_json = result[2] if result[2] else []
-
-            if not expedition_json:
-                return None
+            expedition_json = document['expedition']
+            consumptions_json = document.get('consumptions') or []
 
             # SECURITY: Decrypt encrypted_identity for owners to get original_name
             is_owner = (requesting_chat_id and expedition_json and
@@ -973,22 +1300,22 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
                 else:
                     self.logger.warning(f"No owner_key found for expedition {expedition_id}, cannot decrypt original names")
 
-            # Remove encrypted_identity from non-owner responses
-            if not is_owner and consumptions_json:
-                for consumption in consumptions_json:
-                    consumption.pop('encrypted_identity', None)
+            # SECURITY: Strip owner-only fields from non-owner responses
+            self.read_model_service.project(document, is_owner)
 
             response_data = {
                 'expedition': expedition_json,
-                'items': items_json if items_json else [],
-                'consumptions': consumptions_json if consumptions_json else []
+                'items': document.get('items') or [],
+                'consumptions': consumptions_json,
+                'pirates': document.get('pirates') or [],
+                'progress': document.get('progress') or {}
             }
 
-            # Cache the result for 60 seconds
-            # SECURITY: Cache key includes requesting_chat_id to segregate owner/non-owner data
-            cache.set(cache_key_query, (expedition_id, requesting_chat_id), response_data, ttl=60)
+            if is_owner:
+                # SECURITY: Cache key includes requesting_chat_id to segregate owner/non-owner data
+                cache.set(cache_key_query, (expedition_id, requesting_chat_id), response_data, ttl=60)
 
-            self.logger.debug(f"Fetched expedition {expedition_id} with optimized query")
+            self.logger.debug(f"Fetched expedition {expedition_id} from read model")
             return response_data
 
         except Exception as e:
@@ -1127,64 +1454,49 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
                 original_name=consumption_data.get('original_name')  # Will be None for non-owners
             ))
 
-        return ExpeditionResponse.create(expedition, items, consumptions)
+        response = ExpeditionResponse.create(expedition, items, consumptions)
 
-    def get_all_expedition_responses_bulk(self) -> Dict[int, Dict]:
+        # The document only carries the most recent consumptions; its progress covers all of them
+        progress = raw_data.get('progress') or {}
+        if progress.get('consumed_value') is not None:
+            response.consumed_value = Decimal(str(progress['consumed_value']))
+            response.remaining_value = response.total_value - response.consumed_value
+        return response
+
+    def get_all_expedition_responses_bulk(self, include_archived: bool = False) -> Dict[int, Dict]:
         """
-        Get lightweight progress data for ALL expeditions in a single optimized query.
-        Returns dict keyed by expedition_id with progress statistics.
-        Optimized for dashboard/timeline endpoints with precomputed prices.
+        Get lightweight progress data for ALL expeditions in a single query.
+        Returns dict keyed by expedition_id with progress statistics, newest first.
+        Reads the trigger-maintained expedition_progress summary, so nothing is
+        aggregated per request.
+
+        Args:
+            include_archived: Also return expeditions moved to the archive tables
         """
-        query = """
-        WITH product_avg_prices AS (
-            SELECT
-                produto_id,
-                AVG(preco) as avg_price
-            FROM Estoque
-            WHERE quantidade_restante > 0
-            GROUP BY produto_id
-        ),
-        expedition_progress AS (
+        select = """
             SELECT
-                e.id as expedition_id,
-                e.name,
-                e.owner_chat_id,
-                e.status,
-                e.deadline,
-                e.created_at,
-                e.completed_at,
-                COUNT(DISTINCT ei.id) as total_items,
-                COALESCE(SUM(ei.quantity_required), 0) as total_quantity_needed,
-                COALESCE(SUM(ei.quantity_consumed), 0) as total_quantity_consumed,
-                COALESCE(SUM(ei.quantity_required * COALESCE(ei.target_unit_price, pap.avg_price, 0)), 0) as total_value,
-                COALESCE(SUM(ei.quantity_consumed * COALESCE(ei.target_unit_price, pap.avg_price, 0)), 0) as consumed_value
-            FROM expeditions e
-            LEFT JOIN expedition_items ei ON e.id = ei.expedition_id
-            LEFT JOIN product_avg_prices pap ON ei.produto_id = pap.produto_id
-            GROUP BY e.id, e.name, e.owner_chat_id, e.status, e.deadline, e.created_at, e.completed_at
-        )
-        SELECT
-            expedition_id,
-            name,
-            owner_chat_id,
-            status,
-            deadline,
-            created_at,
-            completed_at,
-            total_items,
-            total_quantity_needed,
-            total_quantity_consumed,
-            CASE
-                WHEN total_quantity_needed > 0
-                THEN ROUND((total_quantity_consumed::numeric / total_quantity_needed::numeric * 100), 2)
-                ELSE 0
-            END as completion_percentage,
-            total_value,
-            consumed_value,
-            (total_value - consumed_value) as remaining_value
-        FROM expedition_progress
-        ORDER BY created_at DESC
-        """
+                e.id, e.name, e.owner_chat_id, e.status, e.deadline, e.created_at, e.completed_at,
+                COALESCE(p.total_items, 0),
+                COALESCE(p.total_quantity_needed, 0),
+                COALESCE(p.total_quantity_consumed, 0),
+                COALESCE(p.completion_percentage, 0),
+                COALESCE(p.total_value, 0),
+                COALESCE(p.consumed_value, 0),
+                COALESCE(p.total_value - p.consumed_value, 0),
+                (e.status = 'active' AND e.deadline < NOW()) AS is_overdue{archived}
+            FROM {expeditions} e
+            LEFT JOIN {progress} p ON p.expedition_id = e.id
+        """
+        if include_archived:
+            query = (
+                select.format(archived=", FALSE", expeditions="expeditions", progress="expedition_progress")
+                + " UNION ALL "
+                + select.format(archived=", TRUE", expeditions="expeditions_archive",
+                                progress="expedition_progress_archive")
+            )
+        else:
+            query = select.format(archived="", expeditions="expeditions", progress="expedition_progress")
+        query += " ORDER BY created_at DESC"
 
         try:
             results = self._execute_query(query, fetch_all=True)
@@ -1209,7 +1521,9 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
                     "completion_percentage": float(row[10]),
                     "total_value": float(row[11]),
                     "consumed_value": float(row[12]),
-                    "remaining_value": float(row[13])
+                    "remaining_value": float(row[13]),
+                    "is_overdue": bool(row[14]),
+                    "is_archived": include_archived and bool(row[15])
                 }
 
             self.logger.debug(f"Fetched bulk expedition data for {len(expedition_data)} expeditions")
@@ -1219,6 +1533,82 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
             self.logger.error(f"Failed to fetch bulk expedition data: {e}", exc_info=True)
             return {}
 
+    def get_dashboard_analytics(self) -> Dict[str, Dict]:
+        """
+        Get dashboard counters for all expeditions in one aggregate query.
+
+        Counts and sums are FILTER aggregates over expedition_progress; the
+        progress buckets match ExpeditionResponse.categorize_progress.
+
+        Returns:
+            Dictionary with overview, value_analysis, progress_analysis and
+            timeline_analysis sections
+        """
+        query = """
+            SELECT
+                COUNT(*),
+                COUNT(*) FILTER (WHERE e.status = 'active'),
+                COUNT(*) FILTER (WHERE e.status = 'completed'),
+                COUNT(*) FILTER (WHERE e.status = 'cancelled'),
+                COUNT(*) FILTER (WHERE e.status = 'active' AND e.deadline < NOW()),
+                COALESCE(SUM(p.total_value), 0),
+                COALESCE(SUM(p.total_value) FILTER (WHERE e.status = 'completed'), 0),
+                COALESCE(SUM(p.total_value) FILTER (WHERE e.status = 'active'), 0),
+                COALESCE(SUM(p.consumed_value), 0),
+                COALESCE(SUM(p.total_value - p.consumed_value), 0),
+                COALESCE(AVG(COALESCE(p.completion_percentage, 0)), 0),
+                COUNT(*) FILTER (WHERE e.status <> 'completed' AND COALESCE(p.completion_percentage, 0) < 25),
+                COUNT(*) FILTER (WHERE e.status <> 'completed' AND p.completion_percentage >= 25
+                                   AND p.completion_percentage < 50),
+                COUNT(*) FILTER (WHERE e.status <> 'completed' AND p.completion_percentage >= 50
+                                   AND p.completion_percentage < 75),
+                COUNT(*) FILTER (WHERE e.status <> 'completed' AND p.completion_percentage >= 75),
+                COUNT(*) FILTER (WHERE e.status = 'completed'),
+                COUNT(*) FILTER (WHERE e.created_at >= NOW() - INTERVAL '7 days'),
+                COUNT(*) FILTER (WHERE e.created_at >= NOW() - INTERVAL '30 days'),
+                COUNT(*) FILTER (WHERE e.completed_at >= NOW() - INTERVAL '7 days'),
+                COUNT(*) FILTER (WHERE e.completed_at >= NOW() - INTERVAL '30 days')
+            FROM expeditions e
+            LEFT JOIN expedition_progress p ON p.expedition_id = e.id
+        """
+
+        row = self._execute_query(query, fetch_one=True)
+        if not row:
+            raise ServiceError("Failed to load dashboard analytics")
+
+        return {
+            "overview": {
+                "total_expeditions": row[0],
+                "active_expeditions": row[1],
+                "completed_expeditions": row[2],
+                "cancelled_expeditions": row[3],
+                "overdue_expeditions": row[4]
+            },
+            "value_analysis": {
+                "total_expedition_value": float(row[5]),
+                "completed_expedition_value": float(row[6]),
+                "active_expedition_value": float(row[7]),
+                "consumed_value": float(row[8]),
+                "pending_value": float(row[9])
+            },
+            "progress_analysis": {
+                "average_completion_rate": float(row[10]),
+                "expeditions_by_progress": {
+                    "0-25%": row[11],
+                    "25-50%": row[12],
+                    "50-75%": row[13],
+                    "75-100%": row[14],
+                    "completed": row[15]
+                }
+            },
+            "timeline_analysis": {
+                "expeditions_created_this_week": row[16],
+                "expeditions_created_this_month": row[17],
+                "expeditions_completed_this_week": row[18],
+                "expeditions_completed_this_month": row[19]
+            }
+        }
+
     def check_expedition_completion(self, expedition_id: int) -> bool:
         """Check if expedition is complete and update status if necessary."""
         expedition = self.get_expedition_by_id(expedition_id)
@@ -1669,71 +2059,123 @@ class ExpeditionService(BaseService, IExpeditionService, IAssignmentService):
         """
         Get comprehensive dashboard summary of all expeditions.
 
+        All counters come from one aggregate query, so the cost does not grow
+        in round trips with the number of expeditions.
+
         Returns:
             Dictionary with dashboard statistics
         """
-        # Get all expeditions
-        all_expeditions = self.get_all_expeditions()
-        active_expeditions = [e for e in all_expeditions if e.is_active()]
-        completed_expeditions = [e for e in all_expeditions if e.status == ExpeditionStatus.COMPLETED.value]
-
-        # Get overdue expeditions
-        overdue_expeditions = self.get_overdue_expeditions()
-        deadline_alerts = self.get_deadline_alerts(7)
+        query = """
+            WITH expedition_counts AS (
+                SELECT
+                    COUNT(*) AS total,
+                    COUNT(*) FILTER (WHERE status = %s) AS active,
+                    COUNT(*) FILTER (WHERE status = %s) AS completed,
+                    COUNT(*) FILTER (WHERE status = %s AND deadline < %s) AS overdue,
+                    COUNT(*) FILTER (WHERE status = %s AND deadline < %s) AS critical_alerts,
+                    COUNT(*) FILTER (WHERE status = %s AND deadline >= %s AND days_left <= 1) AS urgent_alerts,
+                    COUNT(*) FILTER (WHERE status = %s AND deadline >= %s AND days_left BETWEEN 2 AND 3) AS warning_alerts,
+                    COUNT(*) FILTER (WHERE status = %s AND days_left <= %s) AS deadline_alerts
+                FROM (
+                    SELECT status, deadline,
+                           FLOOR(EXTRACT(EPOCH FROM (deadline - %s)) / 86400) AS days_left
+                    FROM expeditions
+                ) e
+            ),
+            consumption_totals AS (
+                SELECT
+                    COUNT(*) AS total_consumptions,
+                    COALESCE(SUM(ea.total_cost), 0) AS total_value,
+                    COALESCE(SUM(ea.total_cost) FILTER (WHERE ea.payment_status = %s), 0) AS paid_value,
+                    COUNT(DISTINCT COALESCE(ep.original_name, ep.pirate_name)) AS unique_consumers
+                FROM expedition_assignments ea
+                JOIN expedition_pirates ep ON ep.id = ea.pirate_id
+            )
+            SELECT ec.total, ec.active, ec.completed, ec.overdue,
+                   ct.total_value, ct.paid_value, ct.total_consumptions, ct.unique_consumers,
+                   ec.deadline_alerts, ec.critical_alerts, ec.urgent_alerts, ec.warning_alerts
+            FROM expedition_counts ec CROSS JOIN consumption_totals ct
+        """
+        now = datetime.now()
+        active = ExpeditionStatus.ACTIVE.value
+        params = (
+            active, ExpeditionStatus.COMPLETED.value, active, now,
+            active, now, active, now, active, now, active, 7,
+            now, PaymentStatus.PAID.value
+        )
 
-        # Calculate aggregate statistics
-        total_consumptions = 0
-        total_consumption_value = 0
-        total_paid_value = 0
-        unique_consumers = set()
+        row = self._execute_query(query, params, fetch_one=True)
+        if not row:
+            raise ServiceError("Failed to compute expedition dashboard summary")
 
-        for expedition in all_expeditions:
-            consumptions = self.get_expedition_consumptions(expedition.id)
-            total_consumptions += len(consumptions)
-            total_consumption_value += sum(c.total_cost for c in consumptions)
-            total_paid_value += sum(c.total_cost for c in consumptions if c.payment_status == PaymentStatus.PAID.value)
-            unique_consumers.update(c.consumer_name for c in consumptions)
+        (total, active_count, completed_count, overdue_count,
+         total_consumption_value, total_paid_value, total_consumptions, unique_consumers,
+         deadline_alerts, critical_alerts, urgent_alerts, warning_alerts) = row
+        total_consumption_value = Decimal(str(total_consumption_value))
+        total_paid_value = Decimal(str(total_paid_value))
 
         return {
             "expeditions": {
-                "total": len(all_expeditions),
-                "active": len(active_expeditions),
-                "completed": len(completed_expeditions),
-                "overdue": len(overdue_expeditions)
+                "total": total,
+                "active": active_count,
+                "completed": completed_count,
+                "overdue": overdue_count
             },
             "financial": {
                 "total_consumption_value": float(total_consumption_value),
                 "total_paid_value": float(total_paid_value),
                 "total_unpaid_value": float(total_consumption_value - total_paid_value),
-                "payment_completion_percentage": round((total_paid_value / total_consumption_value * 100) if total_consumption_value > 0 else 0, 2)
+                "payment_completion_percentage": round(float(total_paid_value / total_consumption_value * 100) if total_consumption_value > 0 else 0, 2)
             },
             "activity": {
                 "total_consumptions": total_consumptions,
-                "unique_consumers": len(unique_consumers),
-                "average_consumptions_per_expedition": round(total_consumptions / len(all_expeditions), 2) if all_expeditions else 0
+                "unique_consumers": unique_consumers,
+                "average_consumptions_per_expedition": round(total_consumptions / total, 2) if total else 0
             },
             "alerts": {
-                "deadline_alerts_count": len(deadline_alerts),
-                "critical_alerts": len([a for a in deadline_alerts if a["alert_level"] == "critical"]),
-                "urgent_alerts": len([a for a in deadline_alerts if a["alert_level"] == "urgent"]),
-                "warning_alerts": len([a for a in deadline_alerts if a["alert_level"] == "warning"])
+                "deadline_alerts_count": deadline_alerts,
+                "critical_alerts": critical_alerts,
+                "urgent_alerts": urgent_alerts,
+                "warning_alerts": warning_alerts
             }
         }
 
     def auto_complete_eligible_expeditions(self) -> List[int]:
         """
-        Automatically check and complete expeditions that have all items fulfilled.
+        Automatically complete active expeditions that have all items fulfilled.
+
+        Eligibility is checked and applied in a single UPDATE, so expeditions
+        are never completed from a stale read.
 
         Returns:
             List of expedition IDs that were auto-completed
         """
-        active_expeditions = self.get_active_expeditions()
-        completed_expedition_ids = []
+        query = """
+            UPDATE expeditions e
+            SET status = %s, completed_at = %s
+            WHERE e.status = %s
+              AND EXISTS (SELECT 1 FROM expedition_items ei WHERE ei.expedition_id = e.id)
+              AND NOT EXISTS (
+                  SELECT 1 FROM expedition_items ei
+                  WHERE ei.expedition_id = e.id
+                    AND COALESCE(ei.quantity_consumed, 0) < ei.quantity_required
+              )
+            RETURNING e.id
+        """
+
+        results = self._execute_query(
+            query,
+            (ExpeditionStatus.COMPLETED.value, datetime.now(), ExpeditionStatus.ACTIVE.value),
+            fetch_all=True
+        )
+        completed_expedition_ids = sorted(row[0] for row in results or [])
 
-        for expedition in active_expeditions:
-            if self.check_expedition_completion(expedition.id):
-                completed_expedition_ids.append(expedition.id)
-                self._log_operation("AutoCompletedExpedition", expedition_id=expedition.id)
+        for expedition_id in completed_expedition_ids:
+            self._log_operation("AutoCompletedExpedition", expedition_id=expedition_id)
+            notify_deadline_changed(expedition_id, None, active=False)
+
+        if completed_expedition_ids:
+            self._invalidate_cache("expeditions")
 
         return completed_expedition_ids
 
@@ -8,7 +8,6 @@ import logging
 import hashlib
 import json
 import secrets
-import random
 from typing import List, Optional, Dict
 from datetime import datetime
 import base64
@@ -17,6 +16,7 @@ from services.base_service import BaseService, ServiceError, ValidationError, No
 from core.interfaces import IBramblerService
 from models.expedition import PirateName
 from utils.encryption import get_encryption_service, generate_owner_key
+from utils.pirate_name_allocator import PirateNameAllocator, PirateNameSpace
 from cryptography.fernet import Fernet
 
 
@@ -56,6 +56,25 @@ class ExpeditionUtilitiesService(BaseService, IBramblerService):
         "the Lost", "the Found", "the Wanderer", "the Explorer", "the Navigator"
     ]
 
+    PIRATE_NAME_PATTERNS = [
+        "{adjective} {name}",
+        "{name} {title}",
+        "{adjective} {name} {title}",
+        "Captain {name}",
+        "Admiral {adjective}",
+        "{name} the {adjective}",
+        "{adjective} Captain {name}"
+    ]
+
+    PIRATE_NAME_SPACE = PirateNameSpace(PIRATE_NAME_PATTERNS, {
+        'adjective': PIRATE_ADJECTIVES,
+        'name': PIRATE_NAMES,
+        'title': PIRATE_TITLES
+    })
+
+    # Attempts per name when a concurrent insert takes the allocated name
+    NAME_CONFLICT_RETRIES = 5
+
     def __init__(self):
         super().__init__()
 
@@ -72,8 +91,8 @@ class ExpeditionUtilitiesService(BaseService, IBramblerService):
         if not expedition_result:
             raise NotFoundError(f"Expedition {expedition_id} not found")
 
-        # Generate unique pirate names
-        used_pirate_names = self._get_used_pirate_names(expedition_id)
+        # Generate unique pirate names from one load of the names in use
+        allocator = self._create_name_allocator(expedition_id)
         generated_names = []
 
         for original_name in original_names:
@@ -96,33 +115,37 @@ class ExpeditionUtilitiesService(BaseService, IBramblerService):
                 # Name already exists, skip
                 continue
 
-            # Generate unique pirate name
-            pirate_name = self._generate_unique_pirate_name_for_expedition(
-                expedition_id, used_pirate_names
-            )
-            used_pirate_names.add(pirate_name)
+            # Insert under the unique index; a name taken concurrently is retried
+            for attempt in range(self.NAME_CONFLICT_RETRIES):
+                pirate_name = allocator.allocate()
 
-            # Create encryption key for this mapping
-            owner_key = self._generate_owner_key()
-            encrypted_mapping = self._create_encrypted_mapping(
-                original_name, pirate_name, owner_key
-            )
+                # Create encryption key for this mapping
+                owner_key = self._generate_owner_key()
+                encrypted_mapping = self._create_encrypted_mapping(
+                    original_name, pirate_name, owner_key
+                )
 
-            # Insert into database
-            insert_query = """
-                INSERT INTO pirate_names (expedition_id, original_name, pirate_name, encrypted_mapping, created_at)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING id, expedition_id, original_name, pirate_name, encrypted_mapping, created_at
-            """
+                insert_query = """
+                    INSERT INTO pirate_names (expedition_id, original_name, pirate_name, encrypted_mapping, created_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT DO NOTHING
+                    RETURNING id, expedition_id, original_name, pirate_name, encrypted_mapping, created_at
+                """
 
-            result = self._execute_query(
-                insert_query,
-                (expedition_id, original_name, pirate_name, encrypted_mapping, datetime.now()),
-                fetch_one=True
-            )
+                result = self._execute_query(
+                    insert_query,
+                    (expedition_id, original_name, pirate_name, encrypted_mapping, datetime.now()),
+                    fetch_one=True
+                )
 
-            if result:
-                generated_names.append(PirateName.from_db_row(result))
+                if result:
+                    generated_names.append(PirateName.from_db_row(result))
+                    break
+
+                self.logger.warning(f"Pirate name '{pirate_name}' was taken concurrently, retrying")
+            else:
+                self.logger.error(f"Could not store a pirate name for '{original_name}' "
+                                  f"after {self.NAME_CONFLICT_RETRIES} attempts")
 
         self.logger.info(f"Generated {len(generated_names)} pirate names for expedition {expedition_id}")
         return generated_names
@@ -208,52 +231,26 @@ class ExpeditionUtilitiesService(BaseService, IBramblerService):
 
     def generate_unique_pirate_name(self) -> str:
         """Generate a unique pirate name."""
-        return self._generate_unique_pirate_name_for_expedition(None, set())
+        return self._create_name_allocator(None).allocate()
 
-    def _get_used_pirate_names(self, expedition_id: int) -> set:
-        """Get all pirate names already used in an expedition."""
-        query = "SELECT pirate_name FROM pirate_names WHERE expedition_id = %s"
-        results = self._execute_query(query, (expedition_id,), fetch_all=True)
-        return {row[0] for row in results or []}
-
-    def _generate_unique_pirate_name_for_expedition(self, expedition_id: Optional[int], used_names: set) -> str:
-        """Generate a unique pirate name for an expedition."""
-        max_attempts = 100
-
-        for attempt in range(max_attempts):
-            # Generate random pirate name
-            adjective = random.choice(self.PIRATE_ADJECTIVES)
-            name = random.choice(self.PIRATE_NAMES)
-            title = random.choice(self.PIRATE_TITLES)
-
-            # Create different name patterns
-            patterns = [
-                f"{adjective} {name}",
-                f"{name} {title}",
-                f"{adjective} {name} {title}",
-                f"Captain {name}",
-                f"Admiral {adjective}",
-                f"{name} the {adjective}",
-                f"{adjective} Captain {name}"
-            ]
-
-            pirate_name = random.choice(patterns)
-
-            # Check if name is unique
-            if pirate_name not in used_names:
-                # Also check global uniqueness if expedition_id provided
-                if expedition_id is not None:
-                    global_query = "SELECT 1 FROM pirate_names WHERE pirate_name = %s LIMIT 1"
-                    existing = self._execute_query(global_query, (pirate_name,), fetch_one=True)
-                    if not existing:
-                        return pirate_name
-                else:
-                    return pirate_name
-
-        # Fallback: add random number to ensure uniqueness
-        base_name = f"{random.choice(self.PIRATE_ADJECTIVES)} {random.choice(self.PIRATE_NAMES)}"
-        random_suffix = secrets.randbelow(10000)
-        return f"{base_name} #{random_suffix}"
+    def _create_name_allocator(self, expedition_id: Optional[int]) -> PirateNameAllocator:
+        """
+        Create a name allocator for an expedition.
+
+        When expedition_id is given, every stored pirate name is loaded once
+        (names are kept globally unique); otherwise the allocator starts empty.
+
+        Args:
+            expedition_id: Expedition ID, or None for a standalone name
+
+        Returns:
+            PirateNameAllocator over PIRATE_NAME_SPACE
+        """
+        used_names = []
+        if expedition_id is not None:
+            results = self._execute_query("SELECT pirate_name FROM pirate_names", fetch_all=True)
+            used_names = (row[0] for row in results or [])
+        return PirateNameAllocator(self.PIRATE_NAME_SPACE, used_names)
 
     def _get_consistent_pirate_name_for_buyer(self, buyer_name: str) -> str:
         """Get or create a consistent pirate name for a buyer across all expeditions."""
@@ -14,6 +14,19 @@ from io import StringIO
 
 from services.base_service import BaseService, ServiceError, ValidationError
 from models.expedition import ExpeditionStatus, PaymentStatus
+from utils.pagination import KeysetPage, decode_cursor, parse_cursor_datetime
+from utils.query_builder import escape_like
+
+
+# Sortable search columns -> (SQL sort key, cursor value parser). Deadline sorts
+# on its epoch with missing deadlines as +Infinity so the keyset never hits NULL.
+SEARCH_SORT_KEYS = {
+    'id': ("e.id", None),
+    'name': ("e.name", None),
+    'created_at': ("e.created_at", parse_cursor_datetime),
+    'deadline': ("COALESCE(EXTRACT(EPOCH FROM e.deadline), 'Infinity'::float8)", float),
+    'status': ("e.status", None)
+}
 
 
 class ExportService(BaseService):
@@ -411,9 +424,15 @@ class ExportService(BaseService):
                           sort_by: str = "created_at",
                           sort_order: str = "DESC",
                           limit: int = 100,
-                          offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+                          cursor: Optional[str] = None) -> Tuple[KeysetPage, Optional[int]]:
         """
-        Search expeditions with advanced filtering and sorting.
+        Search expeditions with advanced filtering, sorting and keyset paging.
+
+        The name search is a substring ILIKE served by the pg_trgm index
+        idx_expeditions_name_trgm when the extension is available. The cursor
+        condition and LIMIT are applied to expeditions directly, so a page reads
+        at most limit + 1 rows. The total is a separate COUNT over the filtered
+        set, run only for the first page (no cursor).
 
         Args:
             search_query: Search in expedition name (optional)
@@ -424,41 +443,35 @@ class ExportService(BaseService):
             sort_by: Column to sort by
             sort_order: ASC or DESC
             limit: Maximum results to return
-            offset: Number of results to skip
+            cursor: Opaque cursor from the previous page (None for first page)
 
         Returns:
-            Tuple of (results list, total count)
+            Tuple of (KeysetPage of result dictionaries, total count or None
+            for pages after the first)
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
         """
         self._log_operation("SearchExpeditions",
                           search_query=search_query,
                           status_filter=status_filter)
 
         # Validate sort parameters
-        valid_sort_columns = ['id', 'name', 'created_at', 'deadline', 'status']
-        if sort_by not in valid_sort_columns:
+        if sort_by not in SEARCH_SORT_KEYS:
             sort_by = 'created_at'
 
-        if sort_order.upper() not in ['ASC', 'DESC']:
-            sort_order = 'DESC'
+        sort_order = sort_order.upper() if sort_order.upper() in ['ASC', 'DESC'] else 'DESC'
+        sort_key, parse_key = SEARCH_SORT_KEYS[sort_by]
 
-        # Build base query
+        after = decode_cursor(cursor, expected_length=2)
+
+        # Build filter conditions
         where_conditions = []
         params = []
 
-        base_query = """
-            SELECT e.id, e.name, e.owner_chat_id, e.status, e.deadline,
-                   e.created_at, e.completed_at,
-                   COUNT(ei.id) as total_items,
-                   COALESCE(SUM(ei.quantity_required), 0) as total_required_quantity,
-                   COALESCE(SUM(ei.quantity_consumed), 0) as total_consumed_quantity
-            FROM expeditions e
-            LEFT JOIN expedition_items ei ON e.id = ei.expedition_id
-        """
-
-        # Add search conditions
         if search_query:
             where_conditions.append("e.name ILIKE %s")
-            params.append(f"%{search_query}%")
+            params.append(f"%{escape_like(search_query)}%")
 
         if status_filter:
             where_conditions.append("e.status = %s")
@@ -476,56 +489,74 @@ class ExportService(BaseService):
             where_conditions.append("e.created_at <= %s")
             params.append(date_to)
 
-        if where_conditions:
-            base_query += " WHERE " + " AND ".join(where_conditions)
+        filter_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
+        filter_params = list(params)
 
-        base_query += f"""
-            GROUP BY e.id, e.name, e.owner_chat_id, e.status, e.deadline, e.created_at, e.completed_at
-            ORDER BY e.{sort_by} {sort_order}
-            LIMIT %s OFFSET %s
-        """
-
-        params.extend([limit, offset])
-
-        # Execute search query
-        results = self._execute_query(base_query, tuple(params), fetch_all=True)
+        if after:
+            comparison = '<' if sort_order == 'DESC' else '>'
+            where_conditions.append(f"({sort_key}, e.id) {comparison} (%s, %s)")
+            params.extend([parse_key(after[0]) if parse_key else after[0], after[1]])
+        params.append(limit + 1)
+        where_clause = "WHERE " + " AND ".join(where_conditions) if where_conditions else ""
 
-        # Get total count for pagination
-        count_query = """
-            SELECT COUNT(DISTINCT e.id)
-            FROM expeditions e
+        query = f"""
+            SELECT m.id, m.name, m.owner_chat_id, m.status, m.deadline,
+                   m.created_at, m.completed_at,
+                   COALESCE(p.total_items, 0) as total_items,
+                   COALESCE(p.total_quantity_needed, 0) as total_required_quantity,
+                   COALESCE(p.total_quantity_consumed, 0) as total_consumed_quantity,
+                   m.sort_key
+            FROM (
+                SELECT e.id, e.name, e.owner_chat_id, e.status, e.deadline,
+                       e.created_at, e.completed_at,
+                       {sort_key} AS sort_key
+                FROM expeditions e
+                {where_clause}
+                ORDER BY {sort_key} {sort_order}, e.id {sort_order}
+                LIMIT %s
+            ) m
+            LEFT JOIN expedition_progress p ON p.expedition_id = m.id
+            ORDER BY m.sort_key {sort_order}, m.id {sort_order}
         """
 
-        if where_conditions:
-            count_query += " WHERE " + " AND ".join(where_conditions[:-2])  # Remove limit/offset params
+        results = self._execute_query(query, tuple(params), fetch_all=True) or []
+
+        total_count = None
+        if not after:
+            count_query = f"SELECT COUNT(*) FROM expeditions e {filter_clause}"
+            total_count = self._execute_query(count_query, tuple(filter_params), fetch_one=True)[0]
 
-        total_count = self._execute_query(count_query, tuple(params[:-2]), fetch_one=True)[0] if where_conditions else 0
+        now = datetime.now()
 
-        # Format results
-        formatted_results = []
-        for row in results or []:
+        def format_result(row) -> Dict[str, Any]:
             (exp_id, name, owner_chat_id, status, deadline, created_at, completed_at,
-             total_items, total_required_qty, total_consumed_qty) = row
+             total_items, total_required_qty, total_consumed_qty, _) = row
 
             completion_pct = (total_consumed_qty / total_required_qty * 100) if total_required_qty > 0 else 0
-            is_overdue = deadline and deadline < datetime.now() if status == ExpeditionStatus.ACTIVE.value else False
+            is_overdue = bool(deadline and deadline < now) if status == ExpeditionStatus.ACTIVE.value else False
 
-            formatted_results.append({
+            return {
                 'id': exp_id,
                 'name': name,
                 'owner_chat_id': owner_chat_id,
                 'status': status,
                 'deadline': deadline.isoformat() if deadline else None,
-                'created_at': created_at.isoformat(),
+                'created_at': created_at.isoformat() if created_at else None,
                 'completed_at': completed_at.isoformat() if completed_at else None,
                 'total_items': total_items,
                 'total_required_quantity': total_required_qty,
                 'total_consumed_quantity': total_consumed_qty,
                 'completion_percentage': round(completion_pct, 1),
                 'is_overdue': is_overdue
-            })
-
-        return formatted_results, total_count
+            }
+
+        page = KeysetPage.from_rows(
+            results,
+            limit,
+            cursor_key=lambda row: (row[10], row[0]),
+            convert=format_result
+        )
+        return page, total_count
 
     def cleanup_export_files(self, older_than_hours: int = 24) -> int:
         """
@@ -4,6 +4,8 @@ from datetime import datetime, timedelta
 from services.base_service import BaseService, ServiceError, ValidationError, NotFoundError
 from models.sale import Payment, CreatePaymentRequest
 from models.cash_balance import CashBalance, CashTransaction, CreateCashTransactionRequest, RevenueReport
+from services.cash_balance_service import CURRENT_BALANCE_QUERY
+from services.rollup_service import RollupService
 from utils.input_sanitizer import InputSanitizer
 
 
@@ -15,6 +17,7 @@ class FinancialService(BaseService):
 
     def __init__(self):
         super().__init__()
+        self.rollup_service = RollupService()
 
     def calculate_debt_summary(self, buyer_name: Optional[str] = None) -> Dict:
         """
@@ -137,25 +140,20 @@ class FinancialService(BaseService):
                 )
             ))
 
-            # Update cash balance
-            balance_query = """
-                INSERT INTO CashBalance (saldo_atual, data_atualizacao)
-                VALUES (
-                    (SELECT COALESCE(saldo_atual, 0) + %s FROM CashBalance ORDER BY data_atualizacao DESC LIMIT 1),
-                    CURRENT_TIMESTAMP
-                )
-            """
-            operations.append((balance_query, (payment_request.valor_pago,)))
-
-            # Log cash transaction
+            # Append the payment to the cash ledger (no shared balance row to update)
             transaction_query = """
-                INSERT INTO CashTransactions (tipo, valor, descricao, venda_id, data_transacao)
-                VALUES ('payment', %s, %s, %s, CURRENT_TIMESTAMP)
+                INSERT INTO CashTransactions (tipo, valor, descricao, venda_id, pagamento_id, delta)
+                VALUES ('receita', %s, %s, %s, currval(pg_get_serial_sequence('pagamentos', 'id')), %s)
             """
             transaction_description = f"Payment from {buyer_name} for sale #{payment_request.venda_id}"
             operations.append((
                 transaction_query,
-                (payment_request.valor_pago, transaction_description, payment_request.venda_id)
+                (
+                    payment_request.valor_pago,
+                    transaction_description,
+                    payment_request.venda_id,
+                    payment_request.valor_pago
+                )
             ))
 
             # Execute all operations in transaction
@@ -286,6 +284,10 @@ class FinancialService(BaseService):
         """
         Generate comprehensive financial reports.
 
+        Closed days are read from the daily_sales/daily_payments rollups and
+        only the current day from raw tables. Payments are filtered by
+        payment date.
+
         Args:
             filters: Dictionary with report filters (date_from, date_to, buyer_name, etc.)
 
@@ -297,101 +299,43 @@ class FinancialService(BaseService):
             date_to = filters.get('date_to')
             buyer_name = filters.get('buyer_name')
 
-            # Build base query with filters
-            where_clauses = []
-            params = []
-
-            if date_from:
-                where_clauses.append("v.data_venda >= %s")
-                params.append(date_from)
-
-            if date_to:
-                where_clauses.append("v.data_venda <= %s")
-                params.append(date_to)
-
-            if buyer_name:
-                where_clauses.append("v.comprador = %s")
-                params.append(buyer_name)
-
-            where_clause = " AND ".join(where_clauses) if where_clauses else "1=1"
-
-            # Sales summary
-            sales_query = f"""
-                SELECT
-                    COUNT(DISTINCT v.id) as total_sales,
-                    COUNT(DISTINCT v.comprador) as unique_buyers,
-                    COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0) as total_sales_value,
-                    COALESCE(AVG(iv.quantidade * iv.valor_unitario), 0) as avg_sale_value
-                FROM Vendas v
-                LEFT JOIN ItensVenda iv ON v.id = iv.venda_id
-                WHERE {where_clause}
-            """
-
-            sales_row = self._execute_query(sales_query, tuple(params), fetch_one=True)
-
-            # Payments summary
-            payments_query = f"""
-                SELECT
-                    COUNT(p.id) as total_payments,
-                    COALESCE(SUM(p.valor_pago), 0) as total_payments_value,
-                    COALESCE(AVG(p.valor_pago), 0) as avg_payment_value
-                FROM Pagamentos p
-                JOIN Vendas v ON p.venda_id = v.id
-                WHERE {where_clause}
-            """
+            sales = self.rollup_service.get_sales_summary(date_from, date_to, buyer_name)
+            payments = self.rollup_service.get_payments_summary(date_from, date_to, buyer_name)
+            top_buyers_rows = self.rollup_service.get_buyer_balances(date_from, date_to, buyer_name, limit=10)
 
-            payments_row = self._execute_query(payments_query, tuple(params), fetch_one=True)
-
-            # Top buyers by debt
-            top_buyers_query = f"""
-                SELECT
-                    v.comprador,
-                    COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0) as total_owed,
-                    COALESCE(SUM(p.valor_pago), 0) as total_paid,
-                    COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0) - COALESCE(SUM(p.valor_pago), 0) as balance_due
-                FROM Vendas v
-                LEFT JOIN ItensVenda iv ON v.id = iv.venda_id
-                LEFT JOIN Pagamentos p ON v.id = p.venda_id
-                WHERE {where_clause}
-                GROUP BY v.comprador
-                HAVING COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0) - COALESCE(SUM(p.valor_pago), 0) > 0
-                ORDER BY balance_due DESC
-                LIMIT 10
-            """
-
-            top_buyers_rows = self._execute_query(top_buyers_query, tuple(params), fetch_all=True)
+            total_sales_value = float(sales["total_sales"])
+            total_payments_value = float(payments["total_paid"])
 
             # Compile report
             report = {
                 "report_generated": datetime.now().isoformat(),
                 "filters": filters,
                 "sales_summary": {
-                    "total_sales": int(sales_row[0]) if sales_row else 0,
-                    "unique_buyers": int(sales_row[1]) if sales_row else 0,
-                    "total_sales_value": float(sales_row[2]) if sales_row else 0.0,
-                    "avg_sale_value": float(sales_row[3]) if sales_row else 0.0
+                    "total_sales": sales["sales_count"],
+                    "unique_buyers": sales["unique_buyers"],
+                    "total_sales_value": total_sales_value,
+                    "avg_sale_value": total_sales_value / sales["items_count"] if sales["items_count"] else 0.0
                 },
                 "payments_summary": {
-                    "total_payments": int(payments_row[0]) if payments_row else 0,
-                    "total_payments_value": float(payments_row[1]) if payments_row else 0.0,
-                    "avg_payment_value": float(payments_row[2]) if payments_row else 0.0
+                    "total_payments": payments["payments_count"],
+                    "total_payments_value": total_payments_value,
+                    "avg_payment_value": total_payments_value / payments["payments_count"] if payments["payments_count"] else 0.0
                 },
                 "outstanding_debt": {
-                    "total_outstanding": float(sales_row[2]) - float(payments_row[1]) if sales_row and payments_row else 0.0,
-                    "payment_rate": (float(payments_row[1]) / float(sales_row[2]) * 100) if sales_row and payments_row and float(sales_row[2]) > 0 else 0.0
+                    "total_outstanding": total_sales_value - total_payments_value,
+                    "payment_rate": (total_payments_value / total_sales_value * 100) if total_sales_value > 0 else 0.0
                 },
                 "top_debtors": []
             }
 
             # Add top buyers
-            if top_buyers_rows:
-                for row in top_buyers_rows:
-                    report["top_debtors"].append({
-                        "buyer_name": row[0],
-                        "total_owed": float(row[1]),
-                        "total_paid": float(row[2]),
-                        "balance_due": float(row[3])
-                    })
+            for row in top_buyers_rows:
+                report["top_debtors"].append({
+                    "buyer_name": row[0],
+                    "total_owed": float(row[1]),
+                    "total_paid": float(row[2]),
+                    "balance_due": float(row[3])
+                })
 
             self._log_operation("financial_report_generated", filters=filters, total_sales=report["sales_summary"]["total_sales"])
 
@@ -403,32 +347,26 @@ class FinancialService(BaseService):
 
     def get_cash_balance_history(self, days: int = 30) -> List[Dict]:
         """
-        Get cash balance history for the specified number of days.
+        Get closing cash balance per day for the specified number of days.
 
         Args:
             days: Number of days to look back
 
         Returns:
-            List of cash balance entries
+            List of daily balance entries, newest first (today is still open)
         """
         try:
-            query = """
-                SELECT id, saldo_atual, data_atualizacao
-                FROM CashBalance
-                WHERE data_atualizacao >= %s
-                ORDER BY data_atualizacao DESC
-            """
-            cutoff_date = datetime.now() - timedelta(days=days)
-            rows = self._execute_query(query, (cutoff_date,), fetch_all=True)
+            start_day = datetime.now().date() - timedelta(days=days)
+            rows = self.rollup_service.get_daily_cash_history(start_day)
 
             balance_history = []
-            if rows:
-                for row in rows:
-                    balance_history.append({
-                        "id": int(row[0]),
-                        "balance": float(row[1]),
-                        "timestamp": row[2].isoformat() if hasattr(row[2], 'isoformat') else str(row[2])
-                    })
+            for row in rows:
+                balance_history.append({
+                    "date": row[0].isoformat() if hasattr(row[0], 'isoformat') else str(row[0]),
+                    "transactions_count": int(row[1]),
+                    "net_change": float(row[2]),
+                    "balance": float(row[3])
+                })
 
             return balance_history
 
@@ -444,13 +382,7 @@ class FinancialService(BaseService):
             Dictionary with current balance information
         """
         try:
-            query = """
-                SELECT id, saldo_atual, data_atualizacao
-                FROM CashBalance
-                ORDER BY data_atualizacao DESC
-                LIMIT 1
-            """
-            row = self._execute_query(query, fetch_one=True)
+            row = self._execute_query(CURRENT_BALANCE_QUERY, fetch_one=True)
 
             if row:
                 return {
@@ -15,6 +15,7 @@ from models.product import Product, ProductWithStock
 from models.sale import Sale, CreateSaleRequest
 from models.user import User, UserLevel, CreateUserRequest, UpdateUserRequest
 from core.modern_service_container import get_user_service, get_product_service, get_sales_service
+from services.report_query_service import ReportQueryService, PAYMENT_STATUS_PENDING
 from core.interfaces import IContext
 from utils.input_sanitizer import InputSanitizer
 import tempfile
@@ -35,6 +36,7 @@ class HandlerBusinessService(BaseService):
         self.user_service = get_user_service(context)
         self.product_service = get_product_service(context)
         self.sales_service = get_sales_service(context)
+        self.report_query_service = ReportQueryService()
     
     def process_login(self, request: LoginRequest) -> LoginResponse:
         """
@@ -217,90 +219,78 @@ class HandlerBusinessService(BaseService):
     def generate_report(self, request: ReportRequest) -> ReportResponse:
         """
         Generate sales or debt reports with CSV export.
-        
+
+        All report rows come from a single joined query (see ReportQueryService),
+        so the number of queries does not grow with the number of sales.
+
         Args:
             request: Report generation request
-            
+
         Returns:
             ReportResponse with report data and optional CSV file
         """
         try:
+            payment_status = request.payment_status
+            if request.report_type == "debts" and payment_status is None:
+                payment_status = PAYMENT_STATUS_PENDING
+
+            rows = self.report_query_service.iter_report_rows(
+                buyer_name=request.comprador_filter or request.buyer_name,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                product_name=request.product_name_filter,
+                payment_status=payment_status
+            )
+
             report_data = []
+            sale_totals = {}
+            buyers = set()
+
+            for row in rows:
+                if request.report_type == "sales":
+                    report_data.append({
+                        'id': row.venda_id,
+                        'comprador': row.comprador,
+                        'produto_nome': row.produto_nome,
+                        'quantidade': row.quantidade,
+                        'valor_total': row.get_total_value(),
+                        'data_venda': row.get_date_str()
+                    })
+                elif request.report_type == "debts":
+                    report_data.append({
+                        'id': row.venda_id,
+                        'produto_nome': row.produto_nome,
+                        'quantidade': row.quantidade,
+                        'valor_total': row.get_total_value(),
+                        'data_venda': row.get_date_str()
+                    })
+
+                sale_totals[row.venda_id] = (row.sale_total, row.sale_paid)
+                buyers.add(row.comprador)
+
+            total_value = sum(total for total, _ in sale_totals.values())
+            total_paid = sum(paid for _, paid in sale_totals.values())
+
             summary = {}
-            
             if request.report_type == "sales":
-                # Get sales with filtering support
-                sales = self._get_filtered_sales(request)
-                
-                # Build report data from sales with product details
-                report_data = []
-                if sales:
-                    for sale in sales:
-                        # Get sale items for this sale
-                        items = self.sales_service.get_sale_items(sale.id)
-                        for item in items:
-                            # Get product name
-                            product = self.product_service.get_product_by_id(item.produto_id)
-                            product_name = product.nome if product else "Unknown Product"
-                            
-                            # Apply product name filter if specified
-                            if request.product_name_filter and request.product_name_filter.lower() not in product_name.lower():
-                                continue
-                            
-                            report_data.append({
-                                'id': sale.id,
-                                'comprador': sale.comprador,
-                                'produto_nome': product_name,
-                                'quantidade': item.quantidade,
-                                'valor_total': item.get_total_value(),
-                                'data_venda': sale.data.strftime('%Y-%m-%d') if hasattr(sale.data, 'strftime') else str(sale.data)
-                            })
-                
                 summary = {
-                    'total_sales': len(sales),
-                    'total_revenue': sum(sale.get_total_value() for sale in sales),
-                    'total_paid': 0.0,  # Will need to calculate payments separately
-                    'total_debt': sum(sale.get_total_value() for sale in sales)  # Simplified for now
+                    'total_sales': len(sale_totals),
+                    'total_revenue': total_value,
+                    'total_paid': total_paid,
+                    'total_debt': max(total_value - total_paid, 0.0)
                 }
-                
             elif request.report_type == "debts":
-                # Use existing method and treat all sales as debts for now
-                # TODO: Implement proper debt tracking with payments
-                if request.buyer_name:
-                    sales = self.sales_service.get_sales_by_buyer(request.buyer_name)
-                else:
-                    sales = self.sales_service.get_sales_by_buyer()
-                
-                # Build report data from sales (treating all sales as debts for now)
-                report_data = []
-                if sales:
-                    for sale in sales:
-                        # Get sale items for this sale
-                        items = self.sales_service.get_sale_items(sale.id)
-                        for item in items:
-                            # Get product name
-                            product = self.product_service.get_product_by_id(item.produto_id)
-                            product_name = product.nome if product else "Unknown Product"
-                            
-                            report_data.append({
-                                'id': sale.id,
-                                'produto_nome': product_name,
-                                'quantidade': item.quantidade,
-                                'valor_total': item.get_total_value(),  # Use the method instead of preco_total
-                                'data_venda': sale.data.strftime('%Y-%m-%d') if hasattr(sale.data, 'strftime') else str(sale.data)
-                            })
-                
                 summary = {
-                    'total_debtors': len(set(sale.comprador for sale in sales)) if sales else 0,
-                    'total_unpaid_sales': len(sales) if sales else 0,
-                    'total_debt_amount': sum(sale.get_total_value() for sale in sales) if sales else 0.0
+                    'total_debtors': len(buyers),
+                    'total_unpaid_sales': len(sale_totals),
+                    'total_debt_amount': max(total_value - total_paid, 0.0)
                 }
-            
+
             # Generate CSV file
             csv_file_path = None
             if report_data:
                 csv_file_path = self._generate_csv_report(request.report_type, report_data)
-            
+
             return ReportResponse(
                 success=True,
                 report_data=report_data,
@@ -308,7 +298,7 @@ class HandlerBusinessService(BaseService):
                 summary=summary,
                 message=f"✅ Relatório de {request.report_type} gerado com sucesso!"
             )
-            
+
         except Exception as e:
             self.logger.error(f"Report generation error: {e}")
             return ReportResponse(
@@ -316,7 +306,7 @@ class HandlerBusinessService(BaseService):
                 report_data=[],  # Required field
                 message="❌ Erro ao gerar relatório."
             )
-    
+
     def process_payment(self, request: PaymentRequest) -> PaymentResponse:
         """
         Process payment for a sale with debt calculation.
@@ -651,55 +641,3 @@ class HandlerBusinessService(BaseService):
         except Exception as e:
             self.logger.error(f"Delete user data error: {e}")
             return False
-    
-    def _get_filtered_sales(self, request: ReportRequest) -> List[Sale]:
-        """
-        Get sales with filtering applied.
-        
-        Args:
-            request: Report request with filter parameters
-            
-        Returns:
-            List of filtered sales
-        """
-        # Start with buyer name filter (use new field with fallback to legacy)
-        buyer_name = request.comprador_filter or request.buyer_name
-        
-        # Get base sales
-        if buyer_name:
-            sales = self.sales_service.get_sales_by_buyer(buyer_name)
-        else:
-            sales = self.sales_service.get_all_sales()
-        
-        # Apply date filtering if specified
-        if request.start_date or request.end_date:
-            filtered_sales = []
-            for sale in sales:
-                sale_date = sale.data.date() if hasattr(sale.data, 'date') else sale.data
-                
-                # Convert sale_date to datetime.date if it's a datetime object
-                if hasattr(sale_date, 'strftime'):
-                    try:
-                        from datetime import datetime
-                        sale_date = datetime.strptime(sale_date.strftime('%Y-%m-%d'), '%Y-%m-%d').date()
-                    except:
-                        continue
-                
-                include_sale = True
-                
-                if request.start_date:
-                    start_date = request.start_date.date() if hasattr(request.start_date, 'date') else request.start_date
-                    if sale_date < start_date:
-                        include_sale = False
-                
-                if request.end_date and include_sale:
-                    end_date = request.end_date.date() if hasattr(request.end_date, 'date') else request.end_date
-                    if sale_date > end_date:
-                        include_sale = False
-                
-                if include_sale:
-                    filtered_sales.append(sale)
-            
-            sales = filtered_sales
-        
-        return sales
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Master key service.
+Resolves a user's master key from the in-process memo, then the
+user_master_keys table, and only derives it (100k-iteration PBKDF2) when
+neither has it. Derived keys are stored, so derivation happens once per user.
+"""
+
+from typing import Any, Dict
+
+from services.base_service import BaseService, ServiceError
+
+
+class MasterKeyService(BaseService):
+    """
+    Service for looking up and persisting user master keys.
+
+    The memo lives on the shared ExpeditionEncryption instance, so every
+    MasterKeyService and every direct generate_user_master_key() call share it.
+    Its statistics (hits, derivations, estimated time saved) are available
+    from get_stats().
+    """
+
+    def __init__(self):
+        super().__init__()
+        from utils.encryption import get_encryption_service
+        self.encryption_service = get_encryption_service()
+
+    def get_master_key(self, owner_chat_id: int) -> str:
+        """
+        Get a user's master key, deriving and storing it only if it is unknown.
+
+        Args:
+            owner_chat_id: Owner's Telegram chat ID
+
+        Returns:
+            Base64-encoded master key
+        """
+        master_key = self.encryption_service.master_keys.get(owner_chat_id)
+        if master_key is not None:
+            return master_key
+
+        row = self._execute_query(
+            "SELECT master_key FROM user_master_keys WHERE owner_chat_id = %s",
+            (owner_chat_id,), fetch_one=True
+        )
+        if row:
+            self.encryption_service.master_keys.put(owner_chat_id, row[0])
+            self.encryption_service.master_keys.record_avoided()
+            return row[0]
+
+        return self._store(owner_chat_id)['master_key']
+
+    def get_master_key_record(self, owner_chat_id: int) -> Dict[str, Any]:
+        """
+        Get a user's stored master key with its metadata, creating it if needed.
+
+        Marks the key as accessed.
+
+        Args:
+            owner_chat_id: Owner's Telegram chat ID
+
+        Returns:
+            Dictionary with master_key, created_at, key_version and created
+            (True if the key was stored by this call)
+        """
+        row = self._execute_query("""
+            UPDATE user_master_keys
+            SET last_accessed = CURRENT_TIMESTAMP
+            WHERE owner_chat_id = %s
+            RETURNING master_key, created_at, key_version
+        """, (owner_chat_id,), fetch_one=True)
+
+        if row:
+            master_key, created_at, key_version = row
+            if self.encryption_service.master_keys.get(owner_chat_id) is None:
+                self.encryption_service.master_keys.put(owner_chat_id, master_key)
+                self.encryption_service.master_keys.record_avoided()
+            return {
+                'master_key': master_key,
+                'created_at': created_at,
+                'key_version': key_version,
+                'created': False
+            }
+
+        return self._store(owner_chat_id)
+
+    def _store(self, owner_chat_id: int) -> Dict[str, Any]:
+        """Derive (or take from the memo) and insert a master key; a concurrent insert wins."""
+        derived_key = self.encryption_service.generate_user_master_key(owner_chat_id)
+
+        # xmax is 0 only for a freshly inserted row
+        row = self._execute_query("""
+            INSERT INTO user_master_keys (owner_chat_id, master_key, key_version)
+            VALUES (%s, %s, 1)
+            ON CONFLICT (owner_chat_id) DO UPDATE SET last_accessed = CURRENT_TIMESTAMP
+            RETURNING master_key, created_at, key_version, (xmax = 0) AS created
+        """, (owner_chat_id, derived_key), fetch_one=True)
+        if not row:
+            raise ServiceError(f"Failed to store master key for chat_id {owner_chat_id}")
+
+        master_key, created_at, key_version, created = row
+        if master_key != derived_key:
+            self.encryption_service.master_keys.put(owner_chat_id, master_key)
+        if created:
+            self._log_operation("MasterKeyStored", owner_chat_id=owner_chat_id)
+
+        return {
+            'master_key': master_key,
+            'created_at': created_at,
+            'key_version': key_version,
+            'created': bool(created)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get master key memo statistics.
+
+        Returns:
+            Dictionary with hits, derivations, mean derivation time and
+            estimated time saved
+        """
+        return self.encryption_service.master_keys.get_stats()
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from services.base_repository import BaseRepository
 from models.product import Product, StockItem
+from utils.pagination import KeysetPage, decode_cursor
 
 
 class ProductRepository(BaseRepository):
@@ -94,6 +95,76 @@ class ProductRepository(BaseRepository):
 
         return products_with_stock
 
+    def get_products_with_stock_page(self, limit: int, cursor: Optional[str] = None) -> KeysetPage:
+        """
+        Get one keyset page of products with stock information.
+
+        Products are ordered by (nome, id), backed by idx_produtos_nome_id, and
+        stock is aggregated only for the products on the page.
+
+        Args:
+            limit: Page size
+            cursor: Opaque cursor from the previous page (None for first page)
+
+        Returns:
+            KeysetPage whose items are product/stock dictionaries
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
+        after = decode_cursor(cursor, expected_length=2)
+
+        where_clause = ""
+        params = []
+        if after:
+            where_clause = "WHERE (p.nome, p.id) > (%s, %s)"
+            params.extend(after)
+        params.append(limit + 1)
+
+        query = f"""
+            SELECT
+                p.id, p.nome, p.emoji, p.media_file_id,
+                COALESCE(s.total_quantity, 0) as total_quantity,
+                COALESCE(s.avg_cost, 0) as avg_cost,
+                COALESCE(s.avg_price, 0) as avg_price,
+                COALESCE(s.total_value, 0) as total_value
+            FROM (
+                SELECT id, nome, emoji, media_file_id
+                FROM Produtos p
+                {where_clause}
+                ORDER BY p.nome, p.id
+                LIMIT %s
+            ) p
+            LEFT JOIN LATERAL (
+                SELECT SUM(e.quantidade) as total_quantity,
+                       AVG(e.custo) as avg_cost,
+                       AVG(e.preco) as avg_price,
+                       SUM(e.quantidade * e.preco) as total_value
+                FROM Estoque e
+                WHERE e.produto_id = p.id
+            ) s ON TRUE
+            ORDER BY p.nome, p.id
+        """
+
+        rows = self._execute_query(query, tuple(params), fetch_all=True)
+
+        return KeysetPage.from_rows(
+            rows, limit,
+            cursor_key=lambda row: (row[1], row[0]),
+            convert=self._row_to_product_with_stock
+        )
+
+    @staticmethod
+    def _row_to_product_with_stock(row: tuple) -> dict:
+        """Convert a product + stock aggregate row into a dictionary."""
+        return {
+            'product': Product.from_db_row(row[:4]),
+            'total_quantity': int(row[4]),
+            'average_cost': float(row[5]),
+            'average_price': float(row[6]),
+            'total_value': float(row[7])
+        }
+
 
 class StockRepository(BaseRepository):
     """
@@ -4,6 +4,7 @@ from services.product_repository import ProductRepository, StockRepository
 from services.validation_service import ValidationService
 from models.product import Product, CreateProductRequest, UpdateProductRequest, StockItem, AddStockRequest, ProductWithStock
 from utils.input_sanitizer import InputSanitizer
+from utils.pagination import KeysetPage
 from core.interfaces import IProductService
 
 
@@ -86,6 +87,21 @@ class ProductService(BaseService, IProductService):
 
         return products_with_stock
     
+    def get_products_with_stock_page(self, limit: int, cursor: Optional[str] = None) -> KeysetPage:
+        """
+        Get one keyset page of products with stock information.
+
+        Args:
+            limit: Page size
+            cursor: Opaque cursor from the previous page (None for first page)
+
+        Returns:
+            KeysetPage whose items are ProductWithStock objects
+        """
+        page = self._product_repository.get_products_with_stock_page(limit=limit, cursor=cursor)
+        page.items = [ProductWithStock(**data) for data in page.items]
+        return page
+
     def create_product(self, request: CreateProductRequest) -> Product:
         """
         Create a new product.
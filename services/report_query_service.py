@@ -0,0 +1,169 @@
+"""
+Report query engine for sales and debt reports.
+Pulls every report row with a single joined, filtered query instead of
+loading sales and then their items one sale at a time, and streams it from a
+server-side cursor so large reports are never held in memory as one result.
+"""
+
+import uuid
+from datetime import datetime, date, timedelta
+from typing import Iterator, List, Optional, Tuple, Union
+from services.base_service import BaseService
+from models.sale import SaleReportRow
+from utils.input_sanitizer import InputSanitizer
+from utils.query_builder import escape_like
+
+
+PAYMENT_STATUS_PAID = 'paid'
+PAYMENT_STATUS_PENDING = 'pending'
+
+# Rows fetched per round trip from the server-side report cursor
+REPORT_FETCH_SIZE = 500
+
+
+class ReportQueryService(BaseService):
+    """
+    Builds report rows (one per sale item) with buyer, date range, product
+    and payment status filters pushed into SQL.
+    """
+
+    def build_report_query(self, buyer_name: Optional[str] = None,
+                           start_date: Optional[Union[datetime, date]] = None,
+                           end_date: Optional[Union[datetime, date]] = None,
+                           product_name: Optional[str] = None,
+                           payment_status: Optional[str] = None) -> Tuple[str, tuple]:
+        """
+        Build the joined report query and its parameters.
+
+        Args:
+            buyer_name: Exact buyer name (already sanitized)
+            start_date: Inclusive start date
+            end_date: Inclusive end date
+            product_name: Case-insensitive product name substring
+            payment_status: 'paid', 'pending' or None for both
+
+        Returns:
+            Tuple of (query, params)
+        """
+        sale_conditions = []
+        sale_params = []
+
+        if buyer_name:
+            sale_conditions.append("v.comprador = %s")
+            sale_params.append(buyer_name)
+
+        if start_date:
+            sale_conditions.append("v.data_venda >= %s")
+            sale_params.append(self._day_start(start_date))
+
+        if end_date:
+            # End date is inclusive, so compare against the start of the next day
+            sale_conditions.append("v.data_venda < %s")
+            sale_params.append(self._day_start(end_date) + timedelta(days=1))
+
+        sale_where = f"WHERE {' AND '.join(sale_conditions)}" if sale_conditions else ""
+
+        row_conditions = []
+        row_params = []
+
+        if product_name:
+            row_conditions.append("COALESCE(pr.nome, iv.produto_nome) ILIKE %s")
+            row_params.append(f"%{escape_like(product_name)}%")
+
+        if payment_status == PAYMENT_STATUS_PAID:
+            row_conditions.append("st.sale_total - st.sale_paid <= 0.01")
+        elif payment_status == PAYMENT_STATUS_PENDING:
+            row_conditions.append("st.sale_total - st.sale_paid > 0.01")
+
+        row_where = f"WHERE {' AND '.join(row_conditions)}" if row_conditions else ""
+
+        query = f"""
+            WITH sale_totals AS (
+                SELECT v.id, v.comprador, v.data_venda,
+                       COALESCE((SELECT SUM(i.quantidade * i.valor_unitario)
+                                 FROM ItensVenda i WHERE i.venda_id = v.id), 0) AS sale_total,
+                       COALESCE((SELECT SUM(p.valor_pago)
+                                 FROM Pagamentos p WHERE p.venda_id = v.id), 0) AS sale_paid
+                FROM Vendas v
+                {sale_where}
+            )
+            SELECT st.id, st.comprador, st.data_venda,
+                   iv.produto_id, COALESCE(pr.nome, iv.produto_nome) AS produto_nome,
+                   iv.quantidade, iv.valor_unitario,
+                   st.sale_total, st.sale_paid
+            FROM sale_totals st
+            JOIN ItensVenda iv ON iv.venda_id = st.id
+            LEFT JOIN Produtos pr ON pr.id = iv.produto_id
+            {row_where}
+            ORDER BY st.data_venda DESC, st.id DESC, iv.id
+        """
+
+        return query, tuple(sale_params + row_params)
+
+    def iter_report_rows(self, buyer_name: Optional[str] = None,
+                         start_date: Optional[Union[datetime, date]] = None,
+                         end_date: Optional[Union[datetime, date]] = None,
+                         product_name: Optional[str] = None,
+                         payment_status: Optional[str] = None) -> Iterator[SaleReportRow]:
+        """
+        Yield report rows ordered by sale date (newest first).
+
+        Executes exactly one query regardless of how many sales match; rows
+        are fetched REPORT_FETCH_SIZE at a time from a server-side cursor.
+
+        Args:
+            buyer_name: Buyer name filter
+            start_date: Inclusive start date
+            end_date: Inclusive end date
+            product_name: Product name substring filter
+            payment_status: 'paid', 'pending' or None
+
+        Yields:
+            SaleReportRow for each matching sale item
+        """
+        if buyer_name:
+            try:
+                buyer_name = InputSanitizer.sanitize_buyer_name(buyer_name)
+            except ValueError:
+                return  # Invalid buyer name, no rows
+
+        query, params = self.build_report_query(
+            buyer_name=buyer_name,
+            start_date=start_date,
+            end_date=end_date,
+            product_name=product_name,
+            payment_status=payment_status
+        )
+
+        for rows in self._stream_rows(query, params):
+            for row in rows:
+                report_row = SaleReportRow.from_db_row(row)
+                if report_row:
+                    yield report_row
+
+    def get_report_rows(self, **filters) -> List[SaleReportRow]:
+        """Get all report rows as a list (see iter_report_rows for filters)."""
+        return list(self.iter_report_rows(**filters))
+
+    def _stream_rows(self, query: str, params: tuple) -> Iterator[List[tuple]]:
+        """Yield result chunks from a server-side cursor."""
+        with self.db_manager.get_connection() as conn:
+            try:
+                with conn.cursor(name=f"report_rows_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = REPORT_FETCH_SIZE
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(REPORT_FETCH_SIZE)
+                        if not rows:
+                            break
+                        yield rows
+            finally:
+                # Read-only; ends the transaction holding the named cursor
+                conn.rollback()
+
+    @staticmethod
+    def _day_start(value: Union[datetime, date]) -> datetime:
+        """Normalize a date or datetime to midnight of that day."""
+        if isinstance(value, datetime):
+            value = value.date()
+        return datetime(value.year, value.month, value.day)
@@ -0,0 +1,463 @@
+"""
+Daily rollup service.
+Reads report aggregates from the daily_* rollup tables for closed days and
+from the raw tables only for the current, still-open day. Also rebuilds the
+rollups from raw data (see migrations/backfill_daily_rollups.py).
+"""
+
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Union
+from services.base_service import BaseService, ServiceError
+from services.cash_balance_service import CURRENT_BALANCE_QUERY
+
+
+DayLike = Union[datetime, date, str]
+
+ROLLUP_TABLES = ('daily_sales', 'daily_payments', 'daily_cash', 'daily_expedition_consumption')
+
+# Unit cost of a sold item, snapshotted on the item when it is sold; must match
+# the rollup triggers in database/schema.py
+_ITEM_COST_SQL = "COALESCE(iv.custo_unitario, 0)"
+
+# Lower bound for reading CashTransactions directly: the given day or the first
+# day not yet folded into daily_cash by close_cash_days, whichever is later
+_CASH_UNFOLDED_FROM_SQL = "GREATEST(%s, (SELECT MAX(day) + 1 FROM daily_cash))"
+
+
+class RollupService(BaseService):
+    """
+    Service for the daily_sales, daily_payments, daily_cash and
+    daily_expedition_consumption rollups.
+
+    Every range is split into closed days [start, min(end + 1, today)) served
+    by rollups and the open part [today, end + 1) served by raw tables.
+    """
+
+    # ------------------------------------------------------------------
+    # Range helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def to_day(value: Optional[DayLike]) -> Optional[date]:
+        """Normalize a date, datetime or ISO string to a date."""
+        if value is None or value == '':
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.fromisoformat(str(value)).date()
+
+    @classmethod
+    def split_range(cls, start_day: Optional[DayLike], end_day: Optional[DayLike] = None,
+                    today: Optional[date] = None) -> Tuple[date, date, datetime, datetime]:
+        """
+        Split an inclusive day range into its rollup and raw parts.
+
+        Args:
+            start_day: First day (None for all history)
+            end_day: Last day, inclusive (None for up to now)
+            today: Current day (defaults to date.today())
+
+        Returns:
+            Tuple of (rollup_from, rollup_to_exclusive, raw_from, raw_to_exclusive);
+            either part may be empty (from >= to)
+        """
+        today = today or date.today()
+        start = cls.to_day(start_day) or date.min
+        end_exclusive = (cls.to_day(end_day) + timedelta(days=1)) if end_day else date.max
+
+        rollup_to = min(end_exclusive, today)
+        raw_from = datetime.combine(max(start, today), datetime.min.time())
+        raw_to = datetime.combine(end_exclusive, datetime.min.time()) if end_day else datetime.max
+
+        return start, rollup_to, raw_from, raw_to
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_sales_summary(self, start_day: Optional[DayLike], end_day: Optional[DayLike] = None,
+                          buyer_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Sales totals for a day range.
+
+        Returns:
+            Dict with sales_count, items_count, total_sales, total_cost, unique_buyers
+        """
+        rollup_from, rollup_to, raw_from, raw_to = self.split_range(start_day, end_day)
+        buyer_rollup = "AND comprador = %s" if buyer_name else ""
+        buyer_raw = "AND v.comprador = %s" if buyer_name else ""
+
+        query = f"""
+            SELECT COALESCE(SUM(sales_count), 0), COALESCE(SUM(items_count), 0),
+                   COALESCE(SUM(total_sales), 0), COALESCE(SUM(total_cost), 0),
+                   COUNT(DISTINCT comprador) FILTER (WHERE sales_count > 0)
+            FROM (
+                SELECT comprador, sales_count, items_count, total_sales, total_cost
+                FROM daily_sales
+                WHERE day >= %s AND day < %s {buyer_rollup}
+                UNION ALL
+                SELECT v.comprador, 1, COUNT(iv.id),
+                       COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0),
+                       COALESCE(SUM(iv.quantidade * {_ITEM_COST_SQL}), 0)
+                FROM Vendas v
+                LEFT JOIN ItensVenda iv ON iv.venda_id = v.id
+                WHERE v.data_venda >= %s AND v.data_venda < %s {buyer_raw}
+                GROUP BY v.id, v.comprador
+            ) s
+        """
+        params = self._range_params(rollup_from, rollup_to, raw_from, raw_to, buyer_name)
+        row = self._execute_query(query, params, fetch_one=True)
+
+        return {
+            "sales_count": int(row[0]) if row else 0,
+            "items_count": int(row[1]) if row else 0,
+            "total_sales": row[2] if row else Decimal('0.00'),
+            "total_cost": row[3] if row else Decimal('0.00'),
+            "unique_buyers": int(row[4]) if row else 0
+        }
+
+    def get_payments_summary(self, start_day: Optional[DayLike], end_day: Optional[DayLike] = None,
+                             buyer_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Payment totals for a day range (by payment date).
+
+        Returns:
+            Dict with payments_count, total_paid
+        """
+        rollup_from, rollup_to, raw_from, raw_to = self.split_range(start_day, end_day)
+        buyer_rollup = "AND comprador = %s" if buyer_name else ""
+        buyer_raw = "AND v.comprador = %s" if buyer_name else ""
+
+        query = f"""
+            SELECT COALESCE(SUM(payments_count), 0), COALESCE(SUM(total_paid), 0)
+            FROM (
+                SELECT payments_count, total_paid
+                FROM daily_payments
+                WHERE day >= %s AND day < %s {buyer_rollup}
+                UNION ALL
+                SELECT 1, p.valor_pago
+                FROM Pagamentos p
+                JOIN Vendas v ON v.id = p.venda_id
+                WHERE p.data_pagamento >= %s AND p.data_pagamento < %s {buyer_raw}
+            ) s
+        """
+        params = self._range_params(rollup_from, rollup_to, raw_from, raw_to, buyer_name)
+        row = self._execute_query(query, params, fetch_one=True)
+
+        return {
+            "payments_count": int(row[0]) if row else 0,
+            "total_paid": row[1] if row else Decimal('0.00')
+        }
+
+    def get_buyer_balances(self, start_day: Optional[DayLike], end_day: Optional[DayLike] = None,
+                           buyer_name: Optional[str] = None, limit: int = 10) -> List[Tuple]:
+        """
+        Buyers with outstanding balance in a day range, largest first.
+
+        Returns:
+            List of (comprador, total_owed, total_paid, balance_due) tuples
+        """
+        rollup_from, rollup_to, raw_from, raw_to = self.split_range(start_day, end_day)
+        buyer_rollup = "AND comprador = %s" if buyer_name else ""
+        buyer_raw = "AND v.comprador = %s" if buyer_name else ""
+
+        query = f"""
+            SELECT comprador, SUM(owed) AS total_owed, SUM(paid) AS total_paid,
+                   SUM(owed) - SUM(paid) AS balance_due
+            FROM (
+                SELECT comprador, total_sales AS owed, 0 AS paid
+                FROM daily_sales
+                WHERE day >= %s AND day < %s {buyer_rollup}
+                UNION ALL
+                SELECT v.comprador, iv.quantidade * iv.valor_unitario, 0
+                FROM Vendas v
+                JOIN ItensVenda iv ON iv.venda_id = v.id
+                WHERE v.data_venda >= %s AND v.data_venda < %s {buyer_raw}
+                UNION ALL
+                SELECT comprador, 0, total_paid
+                FROM daily_payments
+                WHERE day >= %s AND day < %s {buyer_rollup}
+                UNION ALL
+                SELECT v.comprador, 0, p.valor_pago
+                FROM Pagamentos p
+                JOIN Vendas v ON v.id = p.venda_id
+                WHERE p.data_pagamento >= %s AND p.data_pagamento < %s {buyer_raw}
+            ) s
+            GROUP BY comprador
+            HAVING SUM(owed) - SUM(paid) > 0
+            ORDER BY balance_due DESC
+            LIMIT %s
+        """
+        range_params = self._range_params(rollup_from, rollup_to, raw_from, raw_to, buyer_name)
+        params = range_params + range_params + (limit,)
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    def get_cash_summary(self, start_day: Optional[DayLike], end_day: Optional[DayLike] = None) -> Dict[str, Any]:
+        """
+        Cash ledger totals for a day range.
+
+        Returns:
+            Dict with transactions_count, total_receitas, total_despesas,
+            total_ajustes and net_change
+        """
+        rollup_from, rollup_to, raw_from, raw_to = self.split_range(start_day, end_day)
+
+        # Days are folded on the write side, so finished days that are not in
+        # daily_cash yet are read from the ledger along with today
+        query = f"""
+            SELECT COALESCE(SUM(transactions_count), 0), COALESCE(SUM(total_receitas), 0),
+                   COALESCE(SUM(total_despesas), 0), COALESCE(SUM(total_ajustes), 0),
+                   COALESCE(SUM(net_change), 0)
+            FROM (
+                SELECT transactions_count, total_receitas, total_despesas, total_ajustes, net_change
+                FROM daily_cash
+                WHERE day >= %s AND day < %s
+                UNION ALL
+                SELECT COUNT(*),
+                       COALESCE(SUM(valor) FILTER (WHERE tipo = 'receita'), 0),
+                       COALESCE(SUM(valor) FILTER (WHERE tipo = 'despesa'), 0),
+                       COALESCE(SUM(delta) FILTER (WHERE tipo = 'ajuste'), 0),
+                       COALESCE(SUM(delta), 0)
+                FROM CashTransactions
+                WHERE data_transacao >= {_CASH_UNFOLDED_FROM_SQL} AND data_transacao < %s
+            ) s
+        """
+        row = self._execute_query(query, (rollup_from, rollup_to, rollup_from, raw_to), fetch_one=True)
+
+        return {
+            "transactions_count": int(row[0]) if row else 0,
+            "total_receitas": row[1] if row else Decimal('0.00'),
+            "total_despesas": row[2] if row else Decimal('0.00'),
+            "total_ajustes": row[3] if row else Decimal('0.00'),
+            "net_change": row[4] if row else Decimal('0.00')
+        }
+
+    def get_daily_cash_history(self, start_day: DayLike) -> List[Tuple]:
+        """
+        Closing balance per day since start_day, newest first.
+
+        Closing balances are derived by walking back from the current balance
+        over each newer day's net change.
+
+        Returns:
+            List of (day, transactions_count, net_change, closing_balance) tuples
+        """
+        today = date.today()
+        rollup_from, rollup_to, raw_from, _ = self.split_range(start_day, None, today=today)
+
+        query = f"""
+            WITH days AS (
+                SELECT day, transactions_count, net_change
+                FROM daily_cash
+                WHERE day >= %s AND day < %s
+                UNION ALL
+                SELECT data_transacao::date, COUNT(*), COALESCE(SUM(delta), 0)
+                FROM CashTransactions
+                WHERE data_transacao >= {_CASH_UNFOLDED_FROM_SQL} AND data_transacao < %s
+                GROUP BY data_transacao::date
+                UNION ALL
+                SELECT CAST(%s AS DATE), COUNT(*), COALESCE(SUM(delta), 0)
+                FROM CashTransactions
+                WHERE data_transacao >= %s
+            ),
+            balance AS (
+                SELECT saldo_atual FROM (
+                    {CURRENT_BALANCE_QUERY}
+                ) AS current_balance (last_id, saldo_atual, data_atualizacao)
+            )
+            SELECT d.day, d.transactions_count, d.net_change,
+                   b.saldo_atual - COALESCE(SUM(d.net_change) OVER (
+                       ORDER BY d.day DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                   ), 0) AS closing_balance
+            FROM days d CROSS JOIN balance b
+            ORDER BY d.day DESC
+        """
+        params = (rollup_from, rollup_to, rollup_from, raw_from, today, raw_from)
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    def get_expedition_consumption(self, start_day: Optional[DayLike], end_day: Optional[DayLike] = None,
+                                   expedition_id: Optional[int] = None) -> List[Tuple]:
+        """
+        Consumption totals per expedition for a day range.
+
+        Returns:
+            List of (expedition_id, consumptions_count, quantity_consumed, total_cost, total_paid)
+        """
+        rollup_from, rollup_to, raw_from, raw_to = self.split_range(start_day, end_day)
+        expedition_filter = "AND expedition_id = %s" if expedition_id else ""
+        expedition_params = (expedition_id,) if expedition_id else ()
+
+        query = f"""
+            SELECT expedition_id, SUM(consumptions_count), SUM(quantity_consumed),
+                   SUM(total_cost), SUM(total_paid)
+            FROM (
+                SELECT expedition_id, consumptions_count, quantity_consumed, total_cost, total_paid
+                FROM daily_expedition_consumption
+                WHERE day >= %s AND day < %s {expedition_filter}
+                UNION ALL
+                SELECT expedition_id, 1, COALESCE(consumed_quantity, 0), total_cost, 0
+                FROM expedition_assignments
+                WHERE assigned_at >= %s AND assigned_at < %s {expedition_filter}
+                UNION ALL
+                SELECT expedition_id, 0, 0, 0, payment_amount
+                FROM expedition_payments
+                WHERE processed_at >= %s AND processed_at < %s
+                  AND payment_status = 'completed' {expedition_filter}
+            ) s
+            GROUP BY expedition_id
+            ORDER BY expedition_id
+        """
+        params = ((rollup_from, rollup_to) + expedition_params
+                  + (raw_from, raw_to) + expedition_params
+                  + (raw_from, raw_to) + expedition_params)
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def close_cash_days(self) -> int:
+        """
+        Fold closed ledger days that are not yet in daily_cash.
+
+        The cash ledger is append-only and timestamped at insert, so a day
+        never changes once it is over; it is rolled up once instead of by a
+        trigger that would make every ledger insert contend on today's row.
+        CashBalanceService calls this on the first ledger write of a day;
+        reads never do, and serve unfolded days from CashTransactions.
+
+        Returns:
+            Number of days rolled up
+        """
+        query = """
+            INSERT INTO daily_cash (day, transactions_count, total_receitas, total_despesas,
+                                    total_ajustes, net_change)
+            SELECT data_transacao::date, COUNT(*),
+                   COALESCE(SUM(valor) FILTER (WHERE tipo = 'receita'), 0),
+                   COALESCE(SUM(valor) FILTER (WHERE tipo = 'despesa'), 0),
+                   COALESCE(SUM(delta) FILTER (WHERE tipo = 'ajuste'), 0),
+                   COALESCE(SUM(delta), 0)
+            FROM CashTransactions
+            WHERE data_transacao >= COALESCE((SELECT MAX(day) + 1 FROM daily_cash), DATE '1970-01-01')
+              AND data_transacao < %s
+            GROUP BY data_transacao::date
+            ON CONFLICT (day) DO NOTHING
+        """
+        return self._execute_query(query, (date.today(),)) or 0
+
+    def backfill(self, start_day: DayLike, end_day: DayLike, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Rebuild all rollups for an inclusive day range from raw tables.
+
+        Args:
+            start_day: First day to rebuild
+            end_day: Last day to rebuild (inclusive)
+            dry_run: Only count the rows that would be written
+
+        Returns:
+            Dict of table name -> rows written (or that would be written)
+        """
+        start = self.to_day(start_day)
+        end_exclusive = self.to_day(end_day) + timedelta(days=1)
+        range_params = (start, end_exclusive)
+        # The open ledger day is folded by close_cash_days once it is over
+        cash_params = (start, min(end_exclusive, date.today()))
+
+        rebuild_queries = {
+            'daily_sales': f"""
+                SELECT v.data_venda::date, v.comprador, COUNT(DISTINCT v.id), COUNT(iv.id),
+                       COALESCE(SUM(iv.quantidade * iv.valor_unitario), 0),
+                       COALESCE(SUM(iv.quantidade * {_ITEM_COST_SQL}), 0)
+                FROM Vendas v
+                LEFT JOIN ItensVenda iv ON iv.venda_id = v.id
+                WHERE v.data_venda >= %s AND v.data_venda < %s
+                GROUP BY v.data_venda::date, v.comprador
+            """,
+            'daily_payments': """
+                SELECT p.data_pagamento::date, v.comprador, COUNT(*), SUM(p.valor_pago)
+                FROM Pagamentos p
+                JOIN Vendas v ON v.id = p.venda_id
+                WHERE p.data_pagamento >= %s AND p.data_pagamento < %s
+                GROUP BY p.data_pagamento::date, v.comprador
+            """,
+            'daily_cash': """
+                SELECT data_transacao::date, COUNT(*),
+                       COALESCE(SUM(valor) FILTER (WHERE tipo = 'receita'), 0),
+                       COALESCE(SUM(valor) FILTER (WHERE tipo = 'despesa'), 0),
+                       COALESCE(SUM(delta) FILTER (WHERE tipo = 'ajuste'), 0),
+                       COALESCE(SUM(delta), 0)
+                FROM CashTransactions
+                WHERE data_transacao >= %s AND data_transacao < %s
+                GROUP BY data_transacao::date
+            """,
+            'daily_expedition_consumption': """
+                SELECT day, expedition_id, SUM(consumptions_count), SUM(quantity_consumed),
+                       SUM(total_cost), SUM(total_paid)
+                FROM (
+                    SELECT assigned_at::date AS day, expedition_id, 1 AS consumptions_count,
+                           COALESCE(consumed_quantity, 0) AS quantity_consumed,
+                           total_cost, 0 AS total_paid
+                    FROM expedition_assignments
+                    WHERE assigned_at >= %s AND assigned_at < %s AND expedition_id IS NOT NULL
+                    UNION ALL
+                    SELECT processed_at::date, expedition_id, 0, 0, 0, payment_amount
+                    FROM expedition_payments
+                    WHERE processed_at >= %s AND processed_at < %s AND expedition_id IS NOT NULL
+                      AND payment_status = 'completed'
+                ) s
+                GROUP BY day, expedition_id
+            """
+        }
+        columns = {
+            'daily_sales': "day, comprador, sales_count, items_count, total_sales, total_cost",
+            'daily_payments': "day, comprador, payments_count, total_paid",
+            'daily_cash': "day, transactions_count, total_receitas, total_despesas, total_ajustes, net_change",
+            'daily_expedition_consumption': (
+                "day, expedition_id, consumptions_count, quantity_consumed, total_cost, total_paid"
+            )
+        }
+
+        def params_for(table: str) -> tuple:
+            if table == 'daily_cash':
+                return cash_params
+            if table == 'daily_expedition_consumption':
+                return range_params * 2
+            return range_params
+
+        try:
+            with self.db_manager.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    written = {}
+                    for table in ROLLUP_TABLES:
+                        if dry_run:
+                            cursor.execute(f"SELECT COUNT(*) FROM ({rebuild_queries[table]}) s", params_for(table))
+                            written[table] = cursor.fetchone()[0]
+                            continue
+
+                        cursor.execute(f"DELETE FROM {table} WHERE day >= %s AND day < %s", params_for(table)[:2])
+                        cursor.execute(
+                            f"INSERT INTO {table} ({columns[table]}) {rebuild_queries[table]}",
+                            params_for(table)
+                        )
+                        written[table] = cursor.rowcount
+
+                    if not dry_run:
+                        conn.commit()
+
+            self._log_operation("rollups_backfilled", start=str(start), end=str(end_day),
+                                dry_run=dry_run, **written)
+            return written
+
+        except Exception as e:
+            self.logger.error(f"Failed to backfill rollups: {e}")
+            raise ServiceError(f"Failed to backfill rollups: {str(e)}")
+
+    @staticmethod
+    def _range_params(rollup_from: date, rollup_to: date, raw_from: datetime, raw_to: datetime,
+                      buyer_name: Optional[str]) -> tuple:
+        """Parameters for a rollup UNION ALL raw query with an optional buyer filter."""
+        buyer = (buyer_name,) if buyer_name else ()
+        return (rollup_from, rollup_to) + buyer + (raw_from, raw_to) + buyer
@@ -7,6 +7,7 @@ from services.product_repository import StockRepository
 from services.expedition_integration_service import ExpeditionIntegrationService
 from models.sale import Sale, SaleItem, Payment, SaleWithPayments, CreateSaleRequest, CreatePaymentRequest
 from utils.input_sanitizer import InputSanitizer
+from utils.pagination import KeysetPage, decode_cursor, parse_cursor_datetime
 from core.interfaces import ISalesService
 
 if TYPE_CHECKING:
@@ -338,8 +339,7 @@ class SalesService(BaseService, ISalesService):
 
     def get_sales_with_details(self, limit: int = 50) -> List['SaleWithDetails']:
         """
-        Get sales with detailed information including payment status and product list.
-        Optimized single query for API responses.
+        Get the most recent sales with payment status and product list.
 
         Args:
             limit: Maximum number of sales to return
@@ -347,23 +347,71 @@ class SalesService(BaseService, ISalesService):
         Returns:
             List of SaleWithDetails objects
         """
+        return self.get_sales_with_details_page(limit=limit).items
+
+    def get_sales_with_details_page(self, limit: int, cursor: Optional[str] = None) -> KeysetPage:
+        """
+        Get one keyset page of sales with payment status and product list.
+
+        Sales are ordered by (data_venda DESC, id DESC), backed by
+        idx_vendas_data_id; totals, payments and products are aggregated only
+        for the sales on the page.
+
+        Args:
+            limit: Page size
+            cursor: Opaque cursor from the previous page (None for first page)
+
+        Returns:
+            KeysetPage whose items are SaleWithDetails objects
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
         from models.sale import SaleWithDetails
 
-        query = """
-            SELECT v.id, v.data_venda, v.comprador_nome, v.preco_total,
-                   CASE WHEN p.valor_pago >= v.preco_total THEN 'Pago' ELSE 'Pendente' END as status,
-                   STRING_AGG(pr.emoji || ' ' || pr.nome, ', ') as produtos
-            FROM Vendas v
-            LEFT JOIN Pagamentos p ON v.comprador_nome = p.usuario_nome
-            LEFT JOIN ItensVenda iv ON v.id = iv.venda_id
-            LEFT JOIN Produtos pr ON iv.produto_id = pr.id
-            GROUP BY v.id, v.data_venda, v.comprador_nome, v.preco_total, p.valor_pago
-            ORDER BY v.data_venda DESC
-            LIMIT %s
-        """
-
-        results = self._execute_query(query, (limit,), fetch_all=True)
-        return [SaleWithDetails.from_db_row(row) for row in results or []]
+        after = decode_cursor(cursor, expected_length=2)
+
+        where_clause = ""
+        params = []
+        if after:
+            where_clause = "WHERE (v.data_venda, v.id) < (%s, %s)"
+            params.extend([parse_cursor_datetime(after[0]), after[1]])
+        params.append(limit + 1)
+
+        query = f"""
+            SELECT v.id, v.data_venda, v.comprador,
+                   COALESCE(items.total, 0) as total,
+                   CASE WHEN COALESCE(paid.total_paid, 0) >= COALESCE(items.total, 0) - 0.01
+                        THEN 'Pago' ELSE 'Pendente' END as status,
+                   items.produtos
+            FROM (
+                SELECT id, data_venda, comprador
+                FROM Vendas v
+                {where_clause}
+                ORDER BY v.data_venda DESC, v.id DESC
+                LIMIT %s
+            ) v
+            LEFT JOIN LATERAL (
+                SELECT SUM(iv.quantidade * iv.valor_unitario) as total,
+                       STRING_AGG(COALESCE(pr.emoji || ' ', '') || COALESCE(pr.nome, iv.produto_nome), ', ') as produtos
+                FROM ItensVenda iv
+                LEFT JOIN Produtos pr ON iv.produto_id = pr.id
+                WHERE iv.venda_id = v.id
+            ) items ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT SUM(p.valor_pago) as total_paid
+                FROM Pagamentos p
+                WHERE p.venda_id = v.id
+            ) paid ON TRUE
+            ORDER BY v.data_venda DESC, v.id DESC
+        """
+
+        results = self._execute_query(query, tuple(params), fetch_all=True)
+        return KeysetPage.from_rows(
+            results, limit,
+            cursor_key=lambda row: (row[1], row[0]),
+            convert=SaleWithDetails.from_db_row
+        )
 
     def get_unpaid_sales(self, buyer_name: Optional[str] = None) -> List[SaleWithPayments]:
         """
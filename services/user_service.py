@@ -4,6 +4,7 @@ from services.user_repository import UserRepository
 from services.validation_service import ValidationService
 from models.user import User, UserLevel, CreateUserRequest, UpdateUserRequest
 from utils.input_sanitizer import InputSanitizer
+from utils.pagination import KeysetPage, decode_cursor
 from core.interfaces import IUserService
 
 
@@ -298,6 +299,62 @@ class UserService(BaseService, IUserService):
         results = self._execute_query(query, params if params else None, fetch_all=True)
         return [UserWithStats.from_db_row(row) for row in results or []]
 
+    def get_users_with_stats_page(self, limit: int, cursor: Optional[str] = None) -> KeysetPage:
+        """
+        Get one keyset page of users with purchase statistics.
+
+        Users are ordered by username (unique index); purchase totals are
+        aggregated only for the users on the page via idx_vendas_buyer_date.
+
+        Args:
+            limit: Page size
+            cursor: Opaque cursor from the previous page (None for first page)
+
+        Returns:
+            KeysetPage whose items are UserWithStats objects
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed
+        """
+        from models.user import UserWithStats
+
+        after = decode_cursor(cursor, expected_length=1)
+
+        where_clause = ""
+        params = []
+        if after:
+            where_clause = "WHERE u.username > %s"
+            params.extend(after)
+        params.append(limit + 1)
+
+        query = f"""
+            SELECT u.username, u.nivel,
+                   COALESCE(s.total_compras, 0) as total_compras,
+                   s.ultimo_acesso
+            FROM (
+                SELECT username, nivel
+                FROM Usuarios u
+                {where_clause}
+                ORDER BY u.username
+                LIMIT %s
+            ) u
+            LEFT JOIN LATERAL (
+                SELECT SUM(iv.quantidade * iv.valor_unitario) as total_compras,
+                       MAX(v.data_venda) as ultimo_acesso
+                FROM Vendas v
+                LEFT JOIN ItensVenda iv ON iv.venda_id = v.id
+                WHERE v.comprador = u.username
+            ) s ON TRUE
+            ORDER BY u.username
+        """
+
+        results = self._execute_query(query, tuple(params), fetch_all=True)
+        return KeysetPage.from_rows(
+            results, limit,
+            cursor_key=lambda row: (row[0],),
+            convert=UserWithStats.from_db_row
+        )
+
     def username_exists(self, username: str, exclude_user_id: Optional[int] = None) -> bool:
         """
         Check if username already exists.
@@ -12,6 +12,7 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 from services.base_service import BaseService, ServiceError
 from core.interfaces import IWebSocketService
 from models.expedition import ExpeditionStatus
+from services.deadline_scheduler import get_deadline_scheduler
 
 
 class WebSocketService(BaseService, IWebSocketService):
@@ -285,48 +286,28 @@ class WebSocketService(BaseService, IWebSocketService):
             self.logger.error(f"Failed to broadcast system alert: {e}", exc_info=True)
             return False
 
-    def check_deadline_alerts(self) -> int:
-        """Check all expeditions for deadline alerts and send notifications."""
-        alerts_sent = 0
-
+    def start_deadline_scheduler(self) -> bool:
+        """Start the background deadline scheduler that sends deadline alerts."""
         try:
-            # Get all active expeditions with deadlines
-            query = """
-                SELECT id, name, deadline, owner_user_id
-                FROM expeditions
-                WHERE status IN ('active', 'in_progress')
-                AND deadline IS NOT NULL
-            """
-            expeditions = self._execute_query(query, fetch_all=True)
+            get_deadline_scheduler().start(self.send_deadline_alert, self._alert_thresholds)
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to start deadline scheduler: {e}", exc_info=True)
+            return False
 
-            if not expeditions:
-                return 0
+    def check_deadline_alerts(self) -> int:
+        """
+        Send deadline alerts whose threshold has been crossed.
 
-            current_time = datetime.now()
+        Alerts come from the deadline scheduler's timer heap, so only due
+        alerts are looked at and each threshold fires once per deadline.
+        """
+        try:
+            scheduler = get_deadline_scheduler()
+            if not scheduler.is_loaded:
+                scheduler.load(self.send_deadline_alert, self._alert_thresholds)
 
-            for expedition_id, name, deadline, owner_user_id in expeditions:
-                time_remaining = deadline - current_time
-
-                # Determine alert type based on time remaining
-                alert_type = None
-                if time_remaining <= self._alert_thresholds['critical']:
-                    alert_type = 'critical'
-                elif time_remaining <= self._alert_thresholds['urgent']:
-                    alert_type = 'urgent'
-                elif time_remaining <= self._alert_thresholds['warning']:
-                    alert_type = 'warning'
-                elif time_remaining <= self._alert_thresholds['info']:
-                    alert_type = 'info'
-
-                if alert_type:
-                    alert_data = {
-                        'message': f"Expedition '{name}' deadline approaching",
-                        'time_remaining': str(time_remaining),
-                        'hours_remaining': time_remaining.total_seconds() / 3600
-                    }
-
-                    if self.send_deadline_alert(expedition_id, alert_type, alert_data):
-                        alerts_sent += 1
+            alerts_sent = scheduler.run_pending()
 
             if alerts_sent > 0:
                 self._log_operation("check_deadline_alerts", alerts_sent=alerts_sent)
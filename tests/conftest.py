@@ -310,6 +310,26 @@ def mock_db_manager_with_schema():
         yield mock_manager
 
 
+@pytest.fixture
+def mock_db_connection():
+    """
+    Attach a mocked connection to a service.
+
+    Returns a callable taking the service instance; it replaces the service's
+    db_manager so get_connection() yields a MagicMock connection whose
+    cursor() context yields a MagicMock cursor, and returns
+    (service, cursor, conn). Tests set fetchone/fetchall data on the cursor.
+    """
+    def attach(service):
+        cursor = MagicMock()
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        service.db_manager = MagicMock()
+        service.db_manager.get_connection.return_value.__enter__.return_value = conn
+        return service, cursor, conn
+    return attach
+
+
 @pytest.fixture(scope="function")
 def event_loop():
     """Create an event loop for async tests"""
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Comparative Analytics Tests
+
+Covers AnalyticsService.get_bulk_expedition_metrics and
+get_comparative_analytics:
+- Metrics for any number of expeditions come from one grouped query
+- Scoring and ranking work on per-expedition arrays
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from services.analytics_service import AnalyticsService
+
+
+def make_row(expedition_id, total_value, paid_value, consumed=5, required=10, consumers=2):
+    created = datetime.now() - timedelta(days=4)
+    top = [{'consumer_name': 'Barba Ruiva', 'total_spent': float(total_value), 'consumption_count': 2}]
+    return (
+        expedition_id, f'Expedition {expedition_id}', 'active', created, None,
+        2, required, 3, consumed, Decimal(total_value), Decimal(paid_value), 1, consumers, top
+    )
+
+
+@pytest.fixture
+def service():
+    return AnalyticsService(MagicMock())
+
+
+class TestBulkMetrics:
+    """Test grouped metrics for many expeditions."""
+
+    def test_one_query_for_many_expeditions(self, service):
+        rows = [make_row(i, '100.00', '50.00') for i in range(1, 51)]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            metrics = service.get_bulk_expedition_metrics(list(range(1, 51)) + [3])
+
+        assert mock_query.call_count == 1
+        assert 'GROUP BY' in mock_query.call_args[0][0]
+        assert mock_query.call_args[0][1][0] == list(range(1, 51))
+        assert len(metrics) == 50
+        service.expedition_service.get_expedition_consumptions.assert_not_called()
+
+    def test_metrics_shape(self, service):
+        with patch.object(service, '_execute_query', return_value=[make_row(7, '80.00', '20.00')]):
+            metrics = service.get_expedition_performance_metrics(7)
+
+        assert metrics['expedition_id'] == 7
+        assert metrics['completion_metrics']['quantity_completion_rate'] == 50.0
+        assert metrics['completion_metrics']['item_completion_rate'] == 50.0
+        assert metrics['financial_metrics']['pending_value'] == 60.0
+        assert metrics['financial_metrics']['payment_completion_rate'] == 25.0
+        assert metrics['performance_scores']['timeliness_score'] == 100
+        assert metrics['consumer_metrics']['top_consumers'][0]['avg_consumption_value'] == 40.0
+
+    def test_decimal_totals_from_driver(self, service):
+        # SUM over bigint comes back from PostgreSQL as numeric
+        row = list(make_row(7, '80.00', '20.00'))
+        row[6:9] = [Decimal(10), Decimal(3), Decimal(5)]
+
+        with patch.object(service, '_execute_query', return_value=[tuple(row)]):
+            metrics = service.get_expedition_performance_metrics(7)
+
+        assert metrics['completion_metrics']['quantity_completion_rate'] == 50.0
+        assert metrics['completion_metrics']['total_consumed_quantity'] == 5
+        assert metrics['consumer_metrics']['total_consumptions'] == 3
+        assert metrics['performance_scores']['completion_score'] == 50.0
+
+    def test_missing_expedition(self, service):
+        with patch.object(service, '_execute_query', return_value=[]):
+            assert service.get_expedition_performance_metrics(404) == {}
+
+
+class TestComparativeAnalytics:
+    """Test comparison and ranking across expeditions."""
+
+    def test_rankings(self, service):
+        rows = [
+            make_row(1, '100.00', '100.00', consumed=10),
+            make_row(2, '300.00', '0.00', consumed=2),
+            make_row(3, '200.00', '100.00', consumed=5),
+        ]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            comparison = service.get_comparative_analytics([1, 2, 3])
+
+        assert mock_query.call_count == 1
+        assert comparison['expeditions_compared'] == 3
+        assert comparison['financial_comparison']['total_revenue'] == 600.0
+        assert comparison['financial_comparison']['highest_revenue']['expedition_id'] == 2
+        assert comparison['performance_comparison']['best_performing']['expedition_id'] == 1
+        assert comparison['performance_comparison']['worst_performing']['expedition_id'] == 2
+
+        rankings = comparison['expedition_rankings']
+        assert [e['expedition_id'] for e in rankings['by_revenue']] == [2, 3, 1]
+        assert [e['expedition_id'] for e in rankings['by_completion']] == [1, 3, 2]
+        assert rankings['by_revenue'][0]['by_revenue_rank'] == 1
+        assert rankings['by_revenue'][0]['by_completion_rank'] == 3
+
+    def test_no_expeditions(self, service):
+        with patch.object(service, '_execute_query', return_value=[]):
+            assert service.get_comparative_analytics([1, 2]) == {}
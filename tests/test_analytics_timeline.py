@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Analytics Timeline Tests
+
+Covers AnalyticsService.get_timeline_visualization_data:
+- Consumptions are fetched once, ordered by time, with only the needed columns
+- Bucketing is a single merge pass that matches per-bucket filtering
+- Hourly, daily and weekly granularities
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from services.analytics_service import AnalyticsService
+
+
+CREATED = datetime(2024, 6, 1, 12, 0)
+
+
+def make_rows(count, step=timedelta(minutes=37)):
+    return [
+        (CREATED + step * (i + 1), i % 4 + 1, Decimal('2.50') * (i % 4 + 1), f'Pirate {i % 7}')
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def service():
+    expedition_service = MagicMock()
+    expedition_service.get_expedition_by_id.return_value = MagicMock(created_at=CREATED)
+    return AnalyticsService(expedition_service)
+
+
+def filter_per_bucket(rows, buckets):
+    """Reference: the per-bucket filter the merge pass replaces."""
+    counts = []
+    for index, (bucket_start, bucket_end) in enumerate(buckets):
+        last = index == len(buckets) - 1
+        counts.append(len([r for r in rows if bucket_start <= r[0] and (r[0] < bucket_end or last)]))
+    return counts
+
+
+class TestTimelineBucketing:
+    """Test one-pass timeline bucketing."""
+
+    @pytest.mark.parametrize("granularity,periods", [("hourly", 62), ("daily", 3), ("weekly", 1)])
+    def test_granularities(self, service, granularity, periods):
+        rows = make_rows(100)
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            data = service.get_timeline_visualization_data(5, granularity)
+
+        assert mock_query.call_count == 1
+        assert 'ORDER BY ea.assigned_at' in mock_query.call_args[0][0]
+        timeline = data["timeline"]
+        assert len(timeline) == periods
+        assert sum(t["consumptions_count"] for t in timeline) == 100
+        assert timeline[-1]["cumulative_quantity"] == sum(r[1] for r in rows)
+        assert timeline[-1]["cumulative_value"] == float(sum(r[2] for r in rows))
+        assert timeline[-1]["cumulative_consumers"] == 7
+        service.expedition_service.get_expedition_consumptions.assert_not_called()
+
+    def test_matches_per_bucket_filtering(self, service):
+        rows = make_rows(500, step=timedelta(minutes=11))
+        buckets = service._generate_time_buckets(CREATED, rows[-1][0], "hourly")
+
+        timeline = service._bucket_consumptions(rows, buckets, "hourly")
+
+        assert [t["consumptions_count"] for t in timeline] == filter_per_bucket(rows, buckets)
+
+    def test_rows_before_creation_are_skipped(self, service):
+        rows = [(CREATED - timedelta(hours=1), 1, Decimal('1'), 'Early')] + make_rows(3)
+        buckets = service._generate_time_buckets(CREATED, rows[-1][0], "daily")
+
+        timeline = service._bucket_consumptions(rows, buckets, "daily")
+
+        assert sum(t["consumptions_count"] for t in timeline) == 3
+
+    def test_no_consumptions(self, service):
+        with patch.object(service, '_execute_query', return_value=[]):
+            assert service.get_timeline_visualization_data(5) == {"timeline": [], "summary": {}}
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Batch Migration Service Tests
+
+Covers BatchMigrationService and the key/encryption migrations:
+- Batches are read by key, transformed in a worker pool and checkpointed
+  in the same transaction as their writes
+- Unfinished runs resume after the checkpoint; dry runs write nothing
+- Conflicting batches are rolled back and re-read
+- Writes are single UPDATE ... FROM (VALUES ...) statements
+- Pirate encryption and master key re-encryption produce decryptable values
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.base_service import ServiceError, ValidationError
+from services.batch_migration_service import (
+    BatchConflictError, BatchMigration, BatchMigrationService, MasterKeyMigration,
+    OwnerKeyBackfillMigration, PirateEncryptionMigration, values_update
+)
+from utils.encryption import get_encryption_service
+
+
+class ListMigration(BatchMigration):
+    """In-memory migration over keys 1..n; odd keys (or fail_keys) fail."""
+
+    name = 'list_migration'
+
+    def __init__(self, count, conflicts=0, fail_odd=False, fail_keys=()):
+        self.keys = list(range(1, count + 1))
+        self.conflicts = conflicts
+        self.fail_odd = fail_odd
+        self.fail_keys = set(fail_keys)
+        self.written = []
+
+    def fetch_batch(self, cursor, after_key, batch_size):
+        return [(key,) for key in self.keys if key > after_key][:batch_size]
+
+    def transform(self, row):
+        if (self.fail_odd and row[0] % 2) or row[0] in self.fail_keys:
+            return None
+        return (row[0], row[0] * 10)
+
+    def write_batch(self, cursor, updates):
+        if self.conflicts:
+            self.conflicts -= 1
+            raise BatchConflictError("changed")
+        self.written.extend(updates)
+        return len(updates)
+
+
+@pytest.fixture
+def runner(mock_db_connection):
+    return mock_db_connection(BatchMigrationService())
+
+
+@pytest.fixture(scope="module")
+def keys():
+    encryption = get_encryption_service()
+    old_key = encryption.generate_owner_key(9, 77, use_master_key=False)
+    return old_key, encryption.generate_user_master_key(77)
+
+
+def checkpoint_updates(cursor):
+    return [call[0][1] for call in cursor.execute.call_args_list
+            if 'UPDATE migration_checkpoints' in call[0][0]]
+
+
+class TestRunner:
+    """Test batching, checkpoints and dry runs."""
+
+    def test_batches_are_checkpointed_with_their_writes(self, runner):
+        service, cursor, conn = runner
+        migration = ListMigration(5)
+
+        with patch.object(service, '_execute_query', return_value=None) as mock_query:
+            report = service.run(migration, batch_size=2, workers=2)
+
+        assert [key for key, _ in migration.written] == [1, 2, 3, 4, 5]
+        assert migration.written[0] == (1, 10)
+        assert [params[0] for params in checkpoint_updates(cursor)] == [2, 4, 5]
+        assert report.completed and report.batches == 3 and report.written == 5
+        queries = [call[0][0] for call in mock_query.call_args_list]
+        assert 'INSERT INTO migration_checkpoints' in queries[1]
+        assert 'completed_at = CURRENT_TIMESTAMP' in queries[-1]
+
+    def test_checkpoint_is_held_below_first_failed_key(self, runner):
+        service, cursor, _ = runner
+        migration = ListMigration(6, fail_keys={3, 5})
+
+        with patch.object(service, 'get_checkpoint', return_value=None), \
+                patch.object(service, '_execute_query'):
+            report = service.run(migration, batch_size=2, workers=1)
+
+        assert [key for key, _ in migration.written] == [1, 2, 4, 6]
+        assert [params[0] for params in checkpoint_updates(cursor)] == [2, 2, 2]
+        assert (report.last_key, report.first_failed_key, report.checkpoint_key) == (6, 3, 2)
+        assert report.failed == 2 and report.completed
+
+    def test_abstract_migration_cannot_be_created(self):
+        class PartialMigration(BatchMigration):
+            def fetch_batch(self, cursor, after_key, batch_size):
+                return []
+
+            def transform(self, row):
+                return row
+
+        with pytest.raises(TypeError):
+            BatchMigration()
+        with pytest.raises(TypeError):
+            PartialMigration()
+
+    def test_unfinished_checkpoint_is_resumed(self, runner):
+        service, cursor, _ = runner
+        migration = ListMigration(5)
+        checkpoint = {'last_key': 3, 'completed_at': None}
+
+        with patch.object(service, 'get_checkpoint', return_value=checkpoint), \
+                patch.object(service, '_execute_query') as mock_query:
+            report = service.run(migration, batch_size=10, workers=1)
+
+        assert [key for key, _ in migration.written] == [4, 5]
+        assert report.resumed_from == 3
+        assert mock_query.call_args_list[0][0][1] == ('list_migration', 3)
+
+    def test_restart_ignores_checkpoint(self, runner):
+        service, _, _ = runner
+        migration = ListMigration(3)
+
+        with patch.object(service, 'get_checkpoint', return_value={'last_key': 2, 'completed_at': None}), \
+                patch.object(service, '_execute_query'):
+            service.run(migration, restart=True)
+
+        assert len(migration.written) == 3
+
+    def test_dry_run_writes_nothing(self, runner):
+        service, cursor, _ = runner
+        migration = ListMigration(4, fail_odd=True)
+
+        with patch.object(service, 'get_checkpoint', return_value=None), \
+                patch.object(service, '_execute_query') as mock_query:
+            report = service.run(migration, batch_size=3, dry_run=True)
+
+        assert migration.written == []
+        assert checkpoint_updates(cursor) == []
+        mock_query.assert_not_called()
+        assert (report.rows_scanned, report.written, report.failed) == (4, 2, 2)
+        assert report.rows_per_second > 0
+
+    def test_max_batches_stops_early(self, runner):
+        service, _, _ = runner
+        migration = ListMigration(10)
+
+        with patch.object(service, 'get_checkpoint', return_value=None), \
+                patch.object(service, '_execute_query'):
+            report = service.run(migration, batch_size=2, max_batches=2)
+
+        assert len(migration.written) == 4
+        assert not report.completed
+
+    def test_conflicting_batch_is_retried(self, runner):
+        service, _, _ = runner
+        migration = ListMigration(2, conflicts=2)
+
+        with patch.object(service, 'get_checkpoint', return_value=None), \
+                patch.object(service, '_execute_query'):
+            report = service.run(migration, batch_size=5)
+
+        assert report.retries == 2
+        assert len(migration.written) == 2
+
+    def test_persistent_conflict_raises(self, runner):
+        service, _, _ = runner
+
+        with patch.object(service, 'get_checkpoint', return_value=None), \
+                patch.object(service, '_execute_query'):
+            with pytest.raises(ServiceError):
+                service.run(ListMigration(2, conflicts=10))
+
+    def test_invalid_options_are_rejected(self, runner):
+        service, _, _ = runner
+        with pytest.raises(ValidationError):
+            service.run(ListMigration(1), batch_size=0)
+
+
+class TestValuesUpdate:
+    """Test the multi-row UPDATE helper."""
+
+    def test_one_statement_with_typed_values(self):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [(1,), (2,)]
+
+        written = values_update(cursor, 'expeditions', "owner_key = v.owner_key",
+                                [('id', 'integer'), ('owner_key', 'text')],
+                                [(1, 'a'), (2, 'b')], condition="t.owner_key IS NULL")
+
+        query, params = cursor.execute.call_args[0]
+        assert written == {1, 2}
+        assert 'FROM (VALUES (%s::integer, %s::text), (%s::integer, %s::text)) AS v(id, owner_key)' in query
+        assert 'AND t.owner_key IS NULL' in query
+        assert params == (1, 'a', 2, 'b')
+
+    def test_no_rows_no_statement(self):
+        cursor = MagicMock()
+        assert values_update(cursor, 't', 'x = v.x', [('id', 'integer')], []) == set()
+        cursor.execute.assert_not_called()
+
+
+class TestMigrations:
+    """Test the concrete migrations' transforms and writes."""
+
+    def test_owner_key_backfill(self, keys):
+        migration = OwnerKeyBackfillMigration()
+
+        assert migration.transform((9, 77)) == (9, keys[1], 77)
+        assert migration.transform((9, None)) is None
+
+    def test_pirate_encryption_builds_verified_identity(self, keys):
+        migration = PirateEncryptionMigration()
+        encryption = get_encryption_service()
+
+        pirate_id, identity, previous = migration.transform((5, 9, 'Ana', 'Capitão Trovão', False, keys[1]))
+
+        assert (pirate_id, previous) == (5, 'Ana')
+        assert encryption.decrypt_name_mapping(identity, keys[1])['mapping'] == {'Ana': 'Capitão Trovão'}
+        assert migration.transform((6, 9, 'Bia', 'Barão', True, keys[1])) == (6, None, 'Bia')
+        assert migration.transform((7, 9, 'Cris', 'Duque', False, None)) is None
+
+    def test_pirate_encryption_filters_expedition(self):
+        cursor = MagicMock()
+        PirateEncryptionMigration(expedition_id=9).fetch_batch(cursor, 100, 50)
+
+        query, params = cursor.execute.call_args[0]
+        assert 'ep.expedition_id = %s' in query
+        assert params == (100, 9, 50)
+
+    def test_master_key_reencrypts_with_master_key(self, keys):
+        old_key, master_key = keys
+        encryption = get_encryption_service()
+        pirate = encryption.encrypt_name_mapping(9, {'Ana': 'Capitão Trovão'}, old_key)
+        item = encryption.encrypt_name_mapping(9, {'Rum': 'Item 1'}, old_key)
+        migrated = encryption.encrypt_name_mapping_v2(9, {'Bia': 'Barão'}, master_key)
+
+        result = MasterKeyMigration().transform(
+            (9, 77, old_key, None, [(1, pirate), (2, migrated)], [(3, item)])
+        )
+
+        expedition_id, owner_chat_id, new_key, previous_key, pirates, items = result
+        assert (expedition_id, owner_chat_id, new_key, previous_key) == (9, 77, master_key, old_key)
+        assert [row_id for row_id, _, _ in pirates] == [1]
+        assert encryption.decrypt_name_mapping(pirates[0][1], master_key)['mapping'] == {'Ana': 'Capitão Trovão'}
+        assert encryption.decrypt_name_mapping(items[0][1], master_key)['mapping'] == {'Rum': 'Item 1'}
+        assert pirates[0][2] == pirate
+
+    def test_master_key_leaves_undecryptable_expeditions(self, keys):
+        old_key, master_key = keys
+        other_key = get_encryption_service().generate_user_master_key(78)
+        foreign = get_encryption_service().encrypt_name_mapping(9, {'Ana': 'X'}, other_key)
+
+        assert MasterKeyMigration().transform((9, 77, old_key, master_key, [(1, foreign)], [])) is None
+
+    def test_master_key_write_conflict_rolls_back(self, keys):
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        update = (9, 77, keys[1], keys[0], [(1, b'v2', 'old')], [])
+
+        with pytest.raises(BatchConflictError):
+            MasterKeyMigration().write_batch(cursor, [update])
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Brambler All-Names Tests
+
+Covers the maintenance listing behind /api/brambler/all-names:
+- Owner, expedition and name filters are pushed into the SQL
+- Ciphertexts are only read when requested
+- Totals come from the expedition_progress.pirate_count counters
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+from services.brambler_service import BramblerService
+
+
+def pirate_rows(count, expedition_id=5):
+    joined = datetime(2024, 1, 1)
+    return [
+        (i, f'Pirate {i}', None, expedition_id, None, 'Exp', 123, joined)
+        for i in range(count, 0, -1)
+    ]
+
+
+class TestFilteredPage:
+    """Test filters and ciphertext selection."""
+
+    def test_filters_are_sql_conditions(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=pirate_rows(3)) as mock_query:
+            page = service.get_all_expedition_pirates(
+                limit=10, owner_chat_id=123, expedition_id=5, search='50%_off'
+            )
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'e.owner_chat_id = %s' in query
+        assert 'ep.expedition_id = %s' in query
+        assert 'ep.pirate_name ILIKE %s' in query
+        assert params == (123, 5, '%50\\%\\_off%', 11)
+        assert len(page.items) == 3
+
+    def test_filters_repeat_for_archived_sources(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            service.get_all_expedition_pirates(limit=10, owner_chat_id=123, include_archived=True)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert query.count('e.owner_chat_id = %s') == 2
+        assert params == (123, 123, 11)
+
+    def test_ciphertext_is_omitted_by_default(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=pirate_rows(2)) as mock_query:
+            page = service.get_all_expedition_pirates(limit=10)
+
+        assert 'brambler_ciphertext' not in mock_query.call_args[0][0]
+        assert all('encrypted_identity' not in pirate for pirate in page.items)
+
+    def test_ciphertext_on_request(self):
+        service = BramblerService()
+        rows = [row[:4] + ('enc',) + row[5:] for row in pirate_rows(2)]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            page = service.get_all_expedition_pirates(limit=10, include_ciphertext=True)
+
+        assert 'brambler_ciphertext' in mock_query.call_args[0][0]
+        assert [pirate['encrypted_identity'] for pirate in page.items] == ['enc', 'enc']
+
+
+class TestPirateCounts:
+    """Test counter-based totals."""
+
+    def test_total_sums_counters(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=(42,)) as mock_query:
+            total = service.count_expedition_pirates()
+
+        query = mock_query.call_args[0][0]
+        assert total == 42
+        assert 'SUM(p.pirate_count)' in query
+        assert 'expedition_pirates' not in query
+        assert 'JOIN' not in query
+
+    def test_owner_total_joins_expeditions(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=(7,)) as mock_query:
+            total = service.count_expedition_pirates(owner_chat_id=123, include_archived=True)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert total == 7
+        assert 'expedition_progress_archive' in query
+        assert 'INNER JOIN expeditions_archive e' in query
+        assert params == (123, 123)
+
+    def test_count_error_returns_none(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', side_effect=Exception('boom')):
+            assert service.count_expedition_pirates(expedition_id=5) is None
+
+    def test_counter_is_trigger_maintained(self):
+        import inspect
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            assert f"AFTER {event} ON expedition_pirates REFERENCING" in source
+        assert 'ALTER TABLE expedition_progress ADD COLUMN pirate_count' in source
+        assert 'idx_expeditionpirates_pirate_name_trgm' in source
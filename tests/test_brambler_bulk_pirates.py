@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Brambler Bulk Pirate Creation Tests
+
+Covers the batched pirate paths of BramblerService:
+- The expedition's pirates are loaded once and all new rows go in one INSERT
+- Buyers that already have a pirate (plain or encrypted) are reused
+- Pirate name collisions are resolved in memory
+- Names taken by a concurrent insert (ON CONFLICT DO NOTHING) are re-allocated
+- Names are encrypted with the expedition's key, or its owner's master key
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services.base_service import NotFoundError
+from services.brambler_service import BramblerService
+from utils.encryption import get_encryption_service
+
+
+EXPEDITION = 7
+
+
+@pytest.fixture(scope="module")
+def owner_key():
+    return get_encryption_service().generate_user_master_key(321)
+
+
+class FakeDatabase:
+    """_execute_query stand-in that records statements and answers by shape."""
+
+    def __init__(self, pirates=(), global_names=None, taken=()):
+        self.pirates = list(pirates)
+        self.global_names = global_names or {}
+        self.taken = set(taken)
+        self.queries = []
+        self._next_id = 100
+
+    def __call__(self, query, params=(), fetch_one=False, fetch_all=False):
+        self.queries.append((query, params))
+        if 'FROM expedition_pirates' in query:
+            return self.pirates
+        if 'FROM pirate_names' in query:
+            return [(name, pirate) for name, pirate in self.global_names.items() if name in params[0]]
+        if 'INSERT INTO expedition_pirates' in query:
+            rows = []
+            for i in range(0, len(params), 5):
+                pirate_name = params[i + 1]
+                if pirate_name in self.taken:
+                    continue
+                self._next_id += 1
+                rows.append((self._next_id, pirate_name))
+            return rows
+        return None
+
+    def inserts(self):
+        return [params for query, params in self.queries if 'INSERT INTO expedition_pirates' in query]
+
+
+def make_service(database):
+    service = BramblerService()
+    service._execute_query = database
+    return service
+
+
+class TestGeneratePirateNames:
+    """Test the encrypted bulk path."""
+
+    def test_one_load_and_one_insert(self, owner_key):
+        database = FakeDatabase()
+        service = make_service(database)
+        buyers = [f'Buyer {i}' for i in range(20)]
+
+        pirates = service.generate_pirate_names(EXPEDITION, buyers, owner_key=owner_key)
+
+        assert len(database.queries) == 2
+        assert len(database.inserts()) == 1
+        assert len(pirates) == 20
+        assert len({p.pirate_name for p in pirates}) == 20
+        assert all(p.original_name is None for p in pirates)
+
+        encryption = get_encryption_service()
+        for buyer, pirate in zip(buyers, pirates):
+            mapping = encryption.decrypt_name_mapping(pirate.encrypted_mapping, owner_key)
+            assert mapping['mapping'] == {buyer: pirate.pirate_name}
+            assert mapping['expedition_id'] == EXPEDITION
+
+        params = database.inserts()[0]
+        assert params[0] is None
+        assert isinstance(params[4], bytes)
+
+    def test_existing_encrypted_pirates_are_reused(self, owner_key):
+        service = make_service(FakeDatabase())
+        name = service._generate_deterministic_pirate_name('Buyer 1')
+        identity = get_encryption_service().encrypt_name_mapping_v2(EXPEDITION, {'Buyer 1': name}, owner_key)
+        database = FakeDatabase(pirates=[(5, None, name, identity, None)])
+        service = make_service(database)
+
+        pirates = service.generate_pirate_names(EXPEDITION, ['Buyer 1', 'Buyer 2', 'Buyer 2'], owner_key=owner_key)
+
+        assert (pirates[0].id, pirates[0].pirate_name) == (5, name)
+        assert len(pirates) == 2
+        assert len(database.inserts()[0]) == 5
+
+    def test_colliding_names_are_made_unique(self, owner_key):
+        database = FakeDatabase(pirates=[(1, 'Old', 'Capitão Trovão o Bravo', None, '')])
+        service = make_service(database)
+
+        with patch.object(service, '_generate_deterministic_pirate_name', return_value='Capitão Trovão o Bravo'):
+            pirates = service.generate_pirate_names(EXPEDITION, ['A', 'B'], owner_key=owner_key)
+
+        names = [p.pirate_name for p in pirates]
+        assert len(set(names)) == 2
+        assert 'Capitão Trovão o Bravo' not in names
+        assert all(service.PIRATE_NAME_SPACE.indices_of(name) for name in names)
+
+    def test_names_taken_concurrently_are_reallocated(self, owner_key):
+        service = make_service(FakeDatabase())
+        taken = service._generate_deterministic_pirate_name('Buyer 2')
+        database = FakeDatabase(taken=[taken])
+        service = make_service(database)
+
+        pirates = service.generate_pirate_names(EXPEDITION, ['Buyer 1', 'Buyer 2'], owner_key=owner_key)
+
+        assert len(pirates) == 2
+        assert taken not in {p.pirate_name for p in pirates}
+        assert len(database.inserts()) == 2
+        assert len(database.inserts()[1]) == 5
+        mapping = get_encryption_service().decrypt_name_mapping(pirates[1].encrypted_mapping, owner_key)
+        assert mapping['mapping'] == {'Buyer 2': pirates[1].pirate_name}
+
+
+class TestBuyerBatches:
+    """Test the plain-name and global-name batch paths."""
+
+    def test_random_names_for_buyers(self):
+        database = FakeDatabase(pirates=[(3, 'Ana', 'Almirante Tempestade', None, '')])
+        service = make_service(database)
+
+        pirates = service.generate_random_pirate_names_for_buyers(EXPEDITION, ['Ana', ' Bia ', '', 'Bia'])
+
+        assert [(p.id, p.original_name) for p in pirates] == [(3, 'Ana'), (101, 'Bia')]
+        insert = database.inserts()[0]
+        assert insert[0] == 'Bia' and insert[3] == ''
+        assert len(database.queries) == 2
+
+    def test_add_pirates_to_expedition(self, owner_key):
+        database = FakeDatabase(
+            pirates=[(3, 'Ana', 'Pirate Ana', None, '')],
+            global_names={'Ana': 'Pirate Ana', 'Bia': 'Pirate Bia'}
+        )
+        service = make_service(database)
+
+        with patch.object(service, '_expedition_owner_key', return_value=owner_key) as mock_key:
+            added = service.add_pirates_to_expedition(EXPEDITION, ['Ana', 'Bia', 'Cris'])
+
+        mock_key.assert_called_once_with(EXPEDITION)
+        assert added == ['Ana', 'Bia']
+        assert len(database.queries) == 3
+        insert = database.inserts()[0]
+        assert insert[:3] == ('Bia', 'Pirate Bia', EXPEDITION)
+
+    def test_add_single_pirate_without_global_name(self):
+        service = make_service(FakeDatabase())
+
+        assert service.add_pirate_to_expedition(EXPEDITION, 'Nobody') is False
+
+
+class TestExpeditionOwnerKey:
+    """Test which key an expedition's names are encrypted with."""
+
+    def test_stored_owner_key_is_used(self):
+        expedition = MagicMock(owner_key='stored-key', owner_chat_id=111)
+
+        with patch('services.master_key_service.MasterKeyService.get_master_key') as mock_master:
+            assert BramblerService()._expedition_owner_key(EXPEDITION, expedition) == 'stored-key'
+
+        mock_master.assert_not_called()
+
+    def test_missing_key_falls_back_to_the_owners_master_key(self):
+        expedition = MagicMock(owner_key=None, owner_chat_id=111)
+
+        with patch('services.master_key_service.MasterKeyService.get_master_key',
+                   return_value='owner-master-key') as mock_master:
+            assert BramblerService()._expedition_owner_key(EXPEDITION, expedition) == 'owner-master-key'
+
+        mock_master.assert_called_once_with(111)
+
+    def test_unknown_expedition_fails(self):
+        expedition_service = MagicMock()
+        expedition_service.get_expedition_by_id.return_value = None
+
+        with patch('core.modern_service_container.get_expedition_service', return_value=expedition_service), \
+             patch('services.master_key_service.MasterKeyService.get_master_key') as mock_master:
+            with pytest.raises(NotFoundError):
+                BramblerService()._expedition_owner_key(EXPEDITION)
+
+        mock_master.assert_not_called()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Brambler Envelope Encryption Tests
+
+Covers EnvelopeKeyring and BramblerEncryption:
+- PBKDF2 runs once per (password, salt) per session, not per value
+- One random data key per scope, wrapped by the key-encryption key
+- Values carry a version byte; the header is authenticated
+- Legacy Fernet values still decrypt and migrate to the envelope format
+"""
+
+import base64
+
+import pytest
+
+from utils.encryption import (
+    BramblerEncryption, EncryptionError, EnvelopeKeyring, SecureKeyManager,
+    ENVELOPE_HEADER_SIZE, ENVELOPE_VERSION,
+)
+
+
+PASSWORD = 'expedition-key'
+
+
+@pytest.fixture
+def brambler():
+    return BramblerEncryption(keyring=EnvelopeKeyring())
+
+
+def legacy_encrypt(value: str, password: str):
+    """Encrypt the way BramblerEncryption did before envelopes."""
+    key_manager = SecureKeyManager()
+    salt = key_manager.generate_salt()
+    fernet = key_manager.generate_fernet_key(key_manager.derive_key_from_password(password, salt))
+    return (base64.b64encode(fernet.encrypt(value.encode('utf-8'))).decode(),
+            base64.b64encode(salt).decode())
+
+
+class TestEnvelopeKeyring:
+    """Test the session key hierarchy."""
+
+    def test_one_kdf_per_owner(self, brambler):
+        values = [brambler.encrypt_single_value(f'Name {i}', PASSWORD) for i in range(20)]
+        decrypted = [brambler.decrypt_single_value(data, salt, PASSWORD) for data, salt in values]
+
+        assert decrypted == [f'Name {i}' for i in range(20)]
+        stats = brambler.keyring.get_stats()
+        assert stats['kdf_runs'] == 1
+        assert stats['data_keys_created'] == 1
+        assert stats['unwraps'] == 0
+
+    def test_data_key_per_scope(self, brambler):
+        first = brambler.encrypt_name_mapping({'Ana': 'Barba Ruiva'}, PASSWORD, scope=1)
+        again = brambler.encrypt_name_mapping({'Bia': 'Olho Torto'}, PASSWORD, scope=1)
+        other = brambler.encrypt_name_mapping({'Caio': 'Perna de Pau'}, PASSWORD, scope=2)
+
+        assert first.key_id == again.key_id != other.key_id
+        assert first.salt == other.salt
+        assert brambler.keyring.get_stats()['kdf_runs'] == 1
+
+    def test_new_session_unwraps_once(self, brambler):
+        values = [brambler.encrypt_single_value(f'Name {i}', PASSWORD, scope=7) for i in range(5)]
+        reader = BramblerEncryption(keyring=EnvelopeKeyring())
+
+        assert [reader.decrypt_single_value(d, s, PASSWORD) for d, s in values] == [f'Name {i}' for i in range(5)]
+        assert reader.keyring.get_stats()['kdf_runs'] == 1
+        assert reader.keyring.get_stats()['unwraps'] == 1
+
+    def test_wrong_password_is_rejected(self, brambler):
+        data, salt = brambler.encrypt_single_value('Ana', PASSWORD)
+
+        with pytest.raises(EncryptionError):
+            brambler.decrypt_single_value(data, salt, 'not-the-key')
+
+    def test_caches_are_bounded(self):
+        keyring = EnvelopeKeyring(max_keks=2, max_data_keys=2)
+        brambler = BramblerEncryption(keyring=keyring)
+
+        for i in range(4):
+            brambler.encrypt_single_value('Ana', f'key-{i}')
+
+        assert keyring.get_stats()['keks'] == 2
+        assert keyring.get_stats()['data_keys'] == 2
+
+
+class TestEnvelopeFormat:
+    """Test the stored value layout."""
+
+    def test_version_byte_and_layout(self, brambler):
+        data, _ = brambler.encrypt_single_value('Ana', PASSWORD)
+        raw = base64.b64decode(data)
+
+        assert raw[0] == ENVELOPE_VERSION
+        assert len(raw) == ENVELOPE_HEADER_SIZE + 12 + len('Ana') + 16
+        assert not BramblerEncryption.is_legacy_value(data)
+
+    def test_tampered_header_fails(self, brambler):
+        data, salt = brambler.encrypt_single_value('Ana', PASSWORD)
+        raw = bytearray(base64.b64decode(data))
+        raw[5] ^= 1
+
+        with pytest.raises(EncryptionError):
+            brambler.decrypt_single_value(base64.b64encode(bytes(raw)).decode(), salt, PASSWORD)
+
+    def test_unknown_version(self, brambler):
+        data = base64.b64encode(b'\x07' + b'\x00' * 100).decode()
+
+        with pytest.raises(EncryptionError, match='Unknown ciphertext version'):
+            brambler.decrypt_single_value(data, base64.b64encode(b'\x00' * 16).decode(), PASSWORD)
+
+    def test_name_mapping_roundtrip(self, brambler):
+        result = brambler.encrypt_name_mapping({'Ana': 'Barba Ruiva'}, PASSWORD, scope=3)
+        decrypted = brambler.decrypt_name_mapping(result.encrypted_data, result.salt, PASSWORD)
+
+        assert decrypted.success
+        assert decrypted.decrypted_data == {'Ana': 'Barba Ruiva'}
+
+
+class TestLegacyMigration:
+    """Test reading and rewriting per-value PBKDF2 ciphertexts."""
+
+    def test_legacy_value_still_decrypts(self, brambler):
+        data, salt = legacy_encrypt('Ana', PASSWORD)
+
+        assert BramblerEncryption.is_legacy_value(data)
+        assert brambler.decrypt_single_value(data, salt, PASSWORD) == 'Ana'
+
+    def test_migrate_legacy_value(self, brambler):
+        data, salt = legacy_encrypt('{"Ana": "Barba Ruiva"}', PASSWORD)
+
+        new_data, new_salt = brambler.migrate_value(data, salt, PASSWORD, scope=3)
+
+        assert base64.b64decode(new_data)[0] == ENVELOPE_VERSION
+        assert new_salt == base64.b64encode(brambler.keyring.session_salt(PASSWORD)).decode()
+        result = brambler.decrypt_name_mapping(new_data, new_salt, PASSWORD)
+        assert result.decrypted_data == {'Ana': 'Barba Ruiva'}
+
+    def test_migrate_leaves_envelope_values(self, brambler):
+        data, salt = brambler.encrypt_single_value('Ana', PASSWORD)
+
+        assert brambler.migrate_value(data, salt, PASSWORD) == (data, salt)
+
+    def test_migrate_with_wrong_password(self, brambler):
+        data, salt = legacy_encrypt('Ana', PASSWORD)
+
+        with pytest.raises(EncryptionError):
+            brambler.migrate_value(data, salt, 'not-the-key')
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Brambler Pirate Stats Tests
+
+Covers the per-pirate read model behind /api/brambler/names:
+- Totals, debt and recent items are served from expedition_pirate_stats
+- Pirates without activity report zero totals
+- Assignments and payments are aggregated separately (no fan-out)
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from services.base_service import ServiceError
+from services.brambler_service import BramblerService
+
+
+JOINED = datetime(2024, 1, 1)
+
+
+def stats_database(pirates, recent):
+    def execute_query(query, params=(), fetch_one=False, fetch_all=False):
+        if 'LEFT JOIN expedition_pirate_stats' in query:
+            return pirates
+        if 'unnest(s.recent_assignment_ids)' in query:
+            return recent
+        return None
+    return execute_query
+
+
+class TestPirateStats:
+    """Test reads of the expedition_pirate_stats read model."""
+
+    def test_totals_are_served_from_read_model(self):
+        service = BramblerService()
+        # Pirate 1: 3 assignments (R$90 spent, 5 consumed) and 2 completed payments (R$60).
+        # The old single GROUP BY joined 3 x 2 rows: R$180 spent and R$180 paid.
+        pirates = [
+            (1, 9, 'Capitão Trovão', 'Ana', JOINED, 3, 5, Decimal('90.00'), Decimal('60.00'), Decimal('30.00')),
+            (2, 9, 'Barão Vento Negro', 'Bia', JOINED, 0, 0, 0, 0, 0),
+        ]
+        recent = [
+            (1, 'Rum', '🍺', 2, datetime(2024, 1, 3)),
+            (1, 'Sal', None, 1, None),
+        ]
+
+        with patch.object(service, '_execute_query', side_effect=stats_database(pirates, recent)) as mock_query:
+            result = service.get_expedition_pirate_stats(9)
+
+        assert mock_query.call_count == 2
+        assert result[0]['stats'] == {
+            'total_items': 3,
+            'items_consumed': 5,
+            'total_spent': 90.0,
+            'total_paid': 60.0,
+            'debt': 30.0
+        }
+        assert [item['name'] for item in result[0]['recent_items']] == ['Rum', 'Sal']
+        assert result[0]['recent_items'][1] == {'name': 'Sal', 'emoji': '', 'quantity': 1, 'consumed_at': None}
+        assert result[1]['stats']['debt'] == 0.0
+        assert result[1]['recent_items'] == []
+        assert result[0]['original_name'] == 'Ana'
+
+    def test_recent_items_include_items_without_a_product(self):
+        service = BramblerService()
+        pirates = [(1, 9, 'Capitão Trovão', 'Ana', JOINED, 1, 1, Decimal('5.00'), 0, Decimal('5.00'))]
+        recent = [(1, 'ITEM-7', None, 1, None)]
+
+        with patch.object(service, '_execute_query', side_effect=stats_database(pirates, recent)) as mock_query:
+            result = service.get_expedition_pirate_stats(9)
+
+        recent_query = mock_query.call_args_list[1][0][0]
+        assert 'LEFT JOIN produtos p' in recent_query
+        assert "COALESCE(p.nome, ei.original_product_name, ei.anonymized_item_code, 'Item')" in recent_query
+        assert result[0]['recent_items'][0]['name'] == 'ITEM-7'
+
+    def test_empty_expedition_skips_recent_items(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', side_effect=stats_database([], [])) as mock_query:
+            assert service.get_expedition_pirate_stats(9) == []
+
+        assert mock_query.call_count == 1
+
+    def test_read_errors_raise_service_error(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', side_effect=Exception('boom')):
+            with pytest.raises(ServiceError):
+                service.get_expedition_pirate_stats(9)
+
+
+class TestPirateStatsTriggers:
+    """Test that the read model is maintained without fan-out."""
+
+    def test_refresh_aggregates_assignments_and_payments_separately(self):
+        import inspect
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        refresh = source[source.index('FUNCTION refresh_expedition_pirate_stats'):]
+        refresh = refresh[:refresh.index('$$ LANGUAGE plpgsql')]
+
+        assert 'WHERE ea.pirate_id = ids.pirate_id' in refresh
+        assert 'WHERE epm.pirate_id = ids.pirate_id' in refresh
+        assert 'JOIN expedition_payments' not in refresh
+        for table in ('assignments', 'payments'):
+            for event in ('insert', 'update', 'delete'):
+                assert f"CREATE TRIGGER trg_pirate_stats_{table}_{event}" in source
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Bulk Decryption Tests
+
+Covers BulkDecryptionService:
+- Rows are read in chunks from a server-side (named) cursor
+- Chunks are decrypted on the pool and yielded in row order
+- Rows that fail to decrypt are counted, not fatal
+- The decrypt-all response is streamed as valid JSON, even on failure
+"""
+
+import json
+
+import pytest
+from unittest.mock import MagicMock
+
+from services.bulk_decryption_service import BulkDecryptionService
+from services.base_service import ValidationError
+from utils.encryption import get_encryption_service
+
+
+OWNER = 111
+
+
+@pytest.fixture(scope="module")
+def owner_key():
+    return get_encryption_service().generate_user_master_key(OWNER)
+
+
+def identity(owner_key, original, pirate):
+    return get_encryption_service().encrypt_name_mapping(1, {original: pirate}, owner_key)
+
+
+def make_service(chunks_by_query, chunk_size=2, workers=2):
+    """Service whose named cursors return the given chunks, one list per query."""
+    service = BulkDecryptionService(workers=workers, chunk_size=chunk_size)
+    conn = MagicMock()
+    cursors = []
+
+    def named_cursor(name=None):
+        cursor = MagicMock()
+        cursor.fetchmany.side_effect = list(chunks_by_query.pop(0)) + [[]]
+        cursors.append((name, cursor))
+        context = MagicMock()
+        context.__enter__.return_value = cursor
+        return context
+
+    conn.cursor.side_effect = named_cursor
+    service.db_manager = MagicMock()
+    service.db_manager.get_connection.return_value.__enter__.return_value = conn
+    return service, conn, cursors
+
+
+class TestIterOwnerMappings:
+    """Test streaming, chunked decryption."""
+
+    def test_chunks_from_named_cursor_in_order(self, owner_key):
+        rows = [(f'Pirate {i}', identity(owner_key, f'Buyer {i}', f'Pirate {i}')) for i in range(7)]
+        chunks = [rows[i:i + 2] for i in range(0, len(rows), 2)]
+        service, conn, cursors = make_service([chunks])
+
+        pairs = list(service.iter_owner_mappings('pirates', OWNER, owner_key))
+
+        assert pairs == [(f'Pirate {i}', f'Buyer {i}') for i in range(7)]
+        name, cursor = cursors[0]
+        assert name.startswith('bulk_decrypt_')
+        assert cursor.itersize == 2
+        assert cursor.execute.call_args[0][1] == (OWNER,)
+        conn.rollback.assert_called_once()
+
+    def test_failures_are_counted(self, owner_key):
+        other_key = get_encryption_service().generate_user_master_key(999)
+        rows = [
+            ('Pirate 1', identity(owner_key, 'Buyer 1', 'Pirate 1')),
+            ('Pirate 2', identity(other_key, 'Buyer 2', 'Pirate 2')),
+            ('Pirate 3', identity(owner_key, 'Buyer 3', 'Someone else')),
+        ]
+        service, _, _ = make_service([[rows]])
+        from services.bulk_decryption_service import BulkDecryptionStats
+        stats = BulkDecryptionStats()
+
+        pairs = list(service.iter_owner_mappings('pirates', OWNER, owner_key, stats=stats))
+
+        assert pairs == [('Pirate 1', 'Buyer 1')]
+        assert (stats.rows, stats.decrypted, stats.failed) == (3, 1, 2)
+        assert stats.rows_per_second > 0
+
+    def test_unknown_kind(self, owner_key):
+        service, _, _ = make_service([[]])
+
+        with pytest.raises(ValidationError):
+            list(service.iter_owner_mappings('ships', OWNER, owner_key))
+
+
+class TestStreamedResponse:
+    """Test the streamed decrypt-all JSON body."""
+
+    def test_body_is_valid_json(self, owner_key):
+        pirates = [(f'Pirate {i}', identity(owner_key, f'Buyer {i}', f'Pirate {i}')) for i in range(5)]
+        pirates.append(('Pirate 0', identity(owner_key, 'Buyer 0', 'Pirate 0')))
+        items = [('CARGO-1', identity(owner_key, 'Rum', 'CARGO-1'))]
+        service, _, _ = make_service([[pirates[:3], pirates[3:]], [items]])
+
+        fragments = list(service.stream_decrypt_all_json(OWNER, owner_key))
+        body = json.loads(''.join(fragments))
+
+        assert len(fragments) > 3
+        assert body['success'] is True
+        assert body['owner_chat_id'] == OWNER
+        assert body['pirate_mappings'] == {f'Pirate {i}': f'Buyer {i}' for i in range(5)}
+        assert body['item_mappings'] == {'CARGO-1': 'Rum'}
+        assert body['total_pirates_decrypted'] == 5
+        assert body['total_items_decrypted'] == 1
+        assert body['decryption_stats']['pirates']['rows'] == 6
+
+    def test_failure_midway_still_closes_json(self, owner_key):
+        pirates = [('Pirate 1', identity(owner_key, 'Buyer 1', 'Pirate 1'))]
+        service, conn, _ = make_service([[pirates]])
+        conn.cursor.side_effect = [conn.cursor.side_effect(None), Exception("connection lost")]
+
+        body = json.loads(''.join(service.stream_decrypt_all_json(OWNER, owner_key)))
+
+        assert body['success'] is False
+        assert body['error'] == 'connection lost'
+        assert body['pirate_mappings'] == {'Pirate 1': 'Buyer 1'}
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Cash Ledger Tests
+
+Covers the append-only CashTransactions ledger in CashBalanceService:
+- Writes are a single INSERT of a signed delta (no balance read-modify-write)
+- The current balance is the latest snapshot plus newer deltas
+- Running balances are derived on read with a window function
+- Snapshots are taken every SNAPSHOT_INTERVAL transactions
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+from decimal import Decimal
+
+from services.base_service import ServiceError
+from services.cash_balance_service import CashBalanceService, SNAPSHOT_INTERVAL
+
+
+def _transaction_row(transaction_id, tipo, valor, saldo_anterior, saldo_novo):
+    return (transaction_id, tipo, valor, 'desc', None, None, None,
+            saldo_anterior, saldo_novo, datetime(2024, 1, 1))
+
+
+class TestLedgerWrites:
+    """Test that every write is one append-only INSERT."""
+
+    @pytest.mark.parametrize("method,args,expected_delta", [
+        ('add_expense', (Decimal('30.00'), 'Rum'), Decimal('-30.00')),
+        ('add_revenue_from_payment', (7, Decimal('50.00'), 3), Decimal('50.00')),
+        ('adjust_balance', (Decimal('-12.50'), 'Correction'), Decimal('-12.50')),
+    ])
+    def test_write_is_single_insert_of_signed_delta(self, method, args, expected_delta):
+        service = CashBalanceService()
+        row = _transaction_row(1, 'despesa', Decimal('30.00'), Decimal('100.00'), Decimal('70.00'))
+
+        with patch.object(service, '_execute_query', return_value=row) as mock_query:
+            getattr(service, method)(*args)
+
+        assert mock_query.call_count == 1
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'INSERT INTO CashTransactions' in query
+        assert 'UPDATE CashBalance' not in query
+        assert 'FOR UPDATE' not in query
+        assert params[-1] == expected_delta
+
+    def test_invalid_request_is_rejected_before_query(self):
+        service = CashBalanceService()
+
+        with patch.object(service, '_execute_query') as mock_query:
+            with pytest.raises(ServiceError):
+                service.add_expense(Decimal('-5.00'), 'Negative')
+
+        mock_query.assert_not_called()
+
+    def test_snapshot_taken_every_interval(self):
+        service = CashBalanceService()
+        on_interval = _transaction_row(SNAPSHOT_INTERVAL, 'receita', Decimal('1.00'), Decimal('0'), Decimal('1'))
+        off_interval = _transaction_row(SNAPSHOT_INTERVAL + 1, 'receita', Decimal('1.00'), Decimal('1'), Decimal('2'))
+
+        with patch.object(service, 'create_snapshot') as mock_snapshot:
+            with patch.object(service, '_execute_query', return_value=on_interval):
+                service.add_expense(Decimal('1.00'), 'x')
+            with patch.object(service, '_execute_query', return_value=off_interval):
+                service.add_expense(Decimal('1.00'), 'y')
+
+        assert mock_snapshot.call_count == 1
+
+
+class TestLedgerReads:
+    """Test balance and history reads."""
+
+    def test_current_balance_is_snapshot_plus_deltas(self):
+        service = CashBalanceService()
+        row = (42, Decimal('150.00'), datetime(2024, 1, 1))
+
+        with patch.object(service, '_execute_query', return_value=row) as mock_query:
+            balance = service.get_current_balance()
+
+        query = mock_query.call_args[0][0]
+        assert 'CashBalanceSnapshots' in query
+        assert 't.id > snap.last_transaction_id' in query
+        assert balance.saldo_atual == Decimal('150.00')
+
+    def test_history_uses_window_function(self):
+        service = CashBalanceService()
+        rows = [
+            _transaction_row(2, 'despesa', Decimal('20.00'), Decimal('100.00'), Decimal('80.00')),
+            _transaction_row(1, 'receita', Decimal('100.00'), Decimal('0.00'), Decimal('100.00')),
+        ]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            history = service.get_transactions_history(limit=2)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'SUM(t.delta) OVER newest_first' in query
+        assert params == (2, 0)
+        assert [t.saldo_novo for t in history] == [Decimal('80.00'), Decimal('100.00')]
+
+    def test_history_fetches_rows_through_execute_query(self):
+        service = CashBalanceService()
+        cursor = MagicMock()
+        cursor.rowcount = 2
+        cursor.fetchall.return_value = [
+            _transaction_row(2, 'despesa', Decimal('20.00'), Decimal('100.00'), Decimal('80.00')),
+            _transaction_row(1, 'receita', Decimal('100.00'), Decimal('0.00'), Decimal('100.00')),
+        ]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        service.db_manager = MagicMock()
+        service.db_manager.get_connection.return_value.__enter__.return_value = conn
+
+        history = service.get_transactions_history(limit=2)
+
+        cursor.fetchall.assert_called_once()
+        assert [t.id for t in history] == [2, 1]
+
+    def test_balance_history_totals_come_from_rollups(self):
+        service = CashBalanceService()
+        today_rows = [
+            _transaction_row(3, 'ajuste', Decimal('5.00'), Decimal('80.00'), Decimal('75.00')),
+        ]
+        cash_summary = {
+            "transactions_count": 3,
+            "total_receitas": Decimal('100.00'),
+            "total_despesas": Decimal('20.00'),
+            "total_ajustes": Decimal('-5.00'),
+            "net_change": Decimal('75.00')
+        }
+        balance = (3, Decimal('75.00'), datetime(2024, 1, 1))
+
+        with patch.object(service.rollup_service, 'get_cash_summary', return_value=cash_summary), \
+             patch.object(service, '_execute_query', side_effect=[balance, today_rows]):
+            history = service.get_balance_history(days=7)
+
+        assert history.balance_start == Decimal('0.00')
+        assert history.balance_end == Decimal('75.00')
+        assert history.total_receitas == Decimal('100.00')
+        assert history.total_despesas == Decimal('20.00')
+        assert history.total_ajustes == Decimal('-5.00')
+        assert history.to_summary()['transactions_count'] == 3
+        assert len(history.transactions) == 1
+
+    def test_balance_history_fetches_todays_rows(self):
+        service = CashBalanceService()
+        cursor = MagicMock()
+        cursor.fetchone.return_value = (3, Decimal('75.00'), datetime(2024, 1, 1))
+        cursor.fetchall.return_value = [
+            _transaction_row(3, 'ajuste', Decimal('5.00'), Decimal('80.00'), Decimal('75.00')),
+        ]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        service.db_manager = MagicMock()
+        service.db_manager.get_connection.return_value.__enter__.return_value = conn
+
+        with patch.object(service.rollup_service, 'get_cash_summary', return_value={
+                "transactions_count": 1, "total_receitas": Decimal('0.00'),
+                "total_despesas": Decimal('0.00'), "total_ajustes": Decimal('-5.00'),
+                "net_change": Decimal('-5.00')}):
+            history = service.get_balance_history(days=7)
+
+        assert [t.id for t in history.transactions] == [3]
+        assert history.balance_start == Decimal('80.00')
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Cipher Cache Tests
+
+Covers CipherCache and its use in ExpeditionEncryption:
+- One parsed key and AESGCM per owner key, reused across records
+- Entries are keyed by a hash, bounded, and zeroized on eviction
+- An entry evicted while leased is zeroized on release
+- The stored nonce/tag/ciphertext layout is unchanged
+"""
+
+import base64
+import hashlib
+import json
+import os
+
+import pytest
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from utils.encryption import CipherCache, EncryptionError, ExpeditionEncryption
+
+
+@pytest.fixture(scope="module")
+def owner_keys():
+    encryption = ExpeditionEncryption()
+    return [encryption.generate_user_master_key(chat_id) for chat_id in (1, 2, 3)]
+
+
+class TestCipherCache:
+    """Test the owner key -> AESGCM LRU."""
+
+    def test_key_is_parsed_once(self, owner_keys):
+        cache = CipherCache()
+
+        for _ in range(5):
+            with cache.lease(owner_keys[0]):
+                pass
+
+        assert cache.get_stats()['misses'] == 1
+        assert cache.get_stats()['hits'] == 4
+
+    def test_entries_are_keyed_by_hash(self, owner_keys):
+        cache = CipherCache()
+
+        with cache.lease(owner_keys[0]):
+            pass
+
+        assert list(cache._entries) == [hashlib.sha256(owner_keys[0].encode('utf-8')).digest()]
+
+    def test_evicted_key_is_zeroized(self, owner_keys):
+        cache = CipherCache(max_size=2)
+
+        with cache.lease(owner_keys[0]):
+            first = next(iter(cache._entries.values()))
+        with cache.lease(owner_keys[1]):
+            pass
+        with cache.lease(owner_keys[2]):
+            pass
+
+        assert cache.get_stats()['size'] == 2
+        assert cache.get_stats()['evictions'] == 1
+        assert first.evicted
+        assert first.key == bytearray(32)
+
+    def test_leased_entry_is_zeroized_on_release(self, owner_keys):
+        cache = CipherCache(max_size=1)
+
+        with cache.lease(owner_keys[0]):
+            first = next(iter(cache._entries.values()))
+            with cache.lease(owner_keys[1]):
+                pass
+            assert first.evicted
+            assert first.key != bytearray(32)
+
+        assert first.key == bytearray(32)
+
+    def test_clear_zeroizes(self, owner_keys):
+        cache = CipherCache()
+        with cache.lease(owner_keys[0]):
+            entry = next(iter(cache._entries.values()))
+
+        cache.clear()
+
+        assert cache.get_stats()['size'] == 0
+        assert entry.key == bytearray(32)
+
+    def test_malformed_key(self):
+        cache = CipherCache()
+
+        with pytest.raises(EncryptionError):
+            with cache.lease(base64.urlsafe_b64encode(b'short').decode()):
+                pass
+
+        assert cache.get_stats()['size'] == 0
+
+
+class TestExpeditionEncryption:
+    """Test encrypt/decrypt through the cache."""
+
+    def test_roundtrip_reuses_cipher(self, owner_keys):
+        encryption = ExpeditionEncryption()
+
+        encrypted = [encryption.encrypt_name_mapping(7, {f'Name {i}': f'Pirate {i}'}, owner_keys[0])
+                     for i in range(20)]
+        decrypted = [encryption.decrypt_name_mapping(value, owner_keys[0]) for value in encrypted]
+
+        assert [d['mapping'] for d in decrypted] == [{f'Name {i}': f'Pirate {i}'} for i in range(20)]
+        stats = encryption.get_stats()
+        assert stats['cipher_cache']['misses'] == 1
+        assert stats['operations'] == {'encrypted': 20, 'decrypted': 20, 'decrypt_failures': 0}
+
+    def test_reads_existing_layout(self, owner_keys):
+        key = base64.urlsafe_b64decode(owner_keys[0].encode('utf-8'))[32:64]
+        nonce = os.urandom(12)
+        encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).encryptor()
+        plaintext = json.dumps({'expedition_id': 3, 'mapping': {'Ana': 'Barba Ruiva'}}).encode('utf-8')
+        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+        stored = base64.urlsafe_b64encode(nonce + encryptor.tag + ciphertext).decode('utf-8')
+
+        decrypted = ExpeditionEncryption().decrypt_name_mapping(stored, owner_keys[0])
+
+        assert decrypted['mapping'] == {'Ana': 'Barba Ruiva'}
+
+    def test_wrong_key_counts_failure(self, owner_keys):
+        encryption = ExpeditionEncryption()
+        encrypted = encryption.encrypt_name_mapping(7, {'Ana': 'Barba Ruiva'}, owner_keys[0])
+
+        assert encryption.decrypt_name_mapping(encrypted, owner_keys[1]) is None
+        assert encryption.get_stats()['operations']['decrypt_failures'] == 1
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Ciphertext Version 2 Tests
+
+Covers the packed binary name mapping format and its migration:
+- Version 2 values carry a version byte and decrypt to the version 1 shape
+- Readers accept version 1 text, version 2 bytes and version 2 text
+- The conversion batch verifies, writes with one guarded UPDATE and reports
+- Read queries render both versions through brambler_ciphertext()
+"""
+
+import base64
+import struct
+
+import pytest
+from unittest.mock import patch
+
+from services.ciphertext_migration_service import CiphertextMigrationService, ConversionReport
+from services.bulk_decryption_service import BulkDecryptionService
+from services.brambler_service import BramblerService
+from services.base_service import ValidationError
+from utils.encryption import (
+    ExpeditionEncryption, MAPPING_FORMAT_V2, ciphertext_to_text, is_ciphertext_v2,
+)
+
+
+MAPPING = {'Ana': 'Barba Ruiva'}
+
+
+@pytest.fixture(scope="module")
+def encryption():
+    return ExpeditionEncryption()
+
+
+@pytest.fixture(scope="module")
+def owner_key(encryption):
+    return encryption.generate_user_master_key(77)
+
+
+class TestFormat:
+    """Test the binary layout."""
+
+    def test_layout(self, encryption, owner_key):
+        value = encryption.encrypt_name_mapping_v2(9, MAPPING, owner_key, timestamp=1700000000)
+
+        assert value[0] == MAPPING_FORMAT_V2
+        # version | nonce | tag | header | (uint16 length | UTF-8) per name
+        payload_size = struct.calcsize('>IqH') + 2 + len('Ana') + 2 + len('Barba Ruiva')
+        assert len(value) == 1 + 12 + 16 + payload_size
+        assert is_ciphertext_v2(value)
+
+    def test_names_are_length_prefixed(self, encryption, owner_key):
+        mapping = {'Ana\x00Bia': '', 'Çé': 'Barba\x00Ruiva'}
+        value = encryption.encrypt_name_mapping_v2(9, mapping, owner_key)
+
+        assert encryption.decrypt_name_mapping(value, owner_key)['mapping'] == mapping
+
+    def test_smaller_than_v1(self, encryption, owner_key):
+        v1 = encryption.encrypt_name_mapping(9, MAPPING, owner_key)
+        v2 = encryption.encrypt_name_mapping_v2(9, MAPPING, owner_key)
+
+        assert len(v2) < len(v1) / 2
+
+    def test_changed_version_byte_fails(self, encryption, owner_key):
+        value = bytearray(encryption.encrypt_name_mapping_v2(9, MAPPING, owner_key))
+        value[0] = 0x03
+
+        assert encryption.decrypt_name_mapping(bytes(value), owner_key) is None
+
+
+class TestReaders:
+    """Test that both versions decrypt through one call."""
+
+    def test_all_representations(self, encryption, owner_key):
+        v1 = encryption.encrypt_name_mapping(9, MAPPING, owner_key)
+        v2 = encryption.convert_to_v2(v1, owner_key)
+
+        for value in (v1, v1.encode('utf-8'), v2, memoryview(v2), ciphertext_to_text(v2)):
+            decrypted = encryption.decrypt_name_mapping(value, owner_key)
+            assert decrypted['expedition_id'] == 9
+            assert decrypted['mapping'] == MAPPING
+
+    def test_conversion_keeps_timestamp(self, encryption, owner_key):
+        v1 = encryption.encrypt_name_mapping(9, MAPPING, owner_key)
+        original = encryption.decrypt_name_mapping(v1, owner_key)['timestamp']
+
+        converted = encryption.decrypt_name_mapping(encryption.convert_to_v2(v1, owner_key), owner_key)
+
+        assert converted['timestamp'] == original.split('.')[0]
+
+    def test_text_rendering(self, encryption, owner_key):
+        v2 = encryption.encrypt_name_mapping_v2(9, MAPPING, owner_key)
+        text = ciphertext_to_text(v2)
+
+        assert text.startswith('~')
+        assert base64.urlsafe_b64decode(text[1:]) == v2
+        assert is_ciphertext_v2(text)
+        assert not is_ciphertext_v2(encryption.encrypt_name_mapping(9, MAPPING, owner_key))
+
+    def test_read_queries_render_both_versions(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            service.decrypt_expedition_pirates(1, 'key')
+            service.decrypt_item_names(1, 'key')
+
+        pirates_query, items_query = [call[0][0] for call in mock_query.call_args_list]
+        assert 'brambler_ciphertext(encrypted_identity, encrypted_identity_v2)' in pirates_query
+        assert 'encrypted_identity_v2 IS NOT NULL' in pirates_query
+        assert 'brambler_ciphertext(encrypted_mapping, encrypted_mapping_v2)' in items_query
+
+    def test_bulk_query_reads_binary(self):
+        query, _ = BulkDecryptionService._owner_query('pirates', 1, False)
+
+        assert 'COALESCE(ep.encrypted_identity_v2' in query
+
+
+@pytest.fixture
+def migration(encryption, mock_db_connection):
+    service = CiphertextMigrationService()
+    service.encryption_service = encryption
+    return mock_db_connection(service)
+
+
+class TestConversion:
+    """Test the batched online conversion."""
+
+    def test_batch_converts_and_reports(self, migration, encryption, owner_key):
+        service, cursor, conn = migration
+        rows = [(i, encryption.encrypt_name_mapping(9, {f'Buyer {i}': f'Pirate {i}'}, owner_key), owner_key)
+                for i in (3, 5)]
+        rows.append((8, 'garbage', owner_key))
+        cursor.fetchall.side_effect = [rows, [(3,)]]
+        report = ConversionReport()
+
+        assert service.convert_batch('pirates', 0, 10, report) == 8
+
+        update_query, params = cursor.execute.call_args_list[1][0]
+        assert 'SET encrypted_identity_v2 = v.ciphertext, encrypted_identity = NULL' in update_query
+        assert 't.encrypted_identity = v.previous' in update_query
+        assert params[0] == 3 and params[2] == rows[0][1]
+        assert encryption.decrypt_name_mapping(params[1], owner_key)['mapping'] == {'Buyer 3': 'Pirate 3'}
+        assert (report.rows_scanned, report.converted, report.skipped, report.failed) == (3, 1, 1, 1)
+        assert report.to_dict()['savings_percent'] > 50
+        assert conn.commit.call_count == 2
+
+    def test_dry_run_writes_nothing(self, migration, encryption, owner_key):
+        service, cursor, _ = migration
+        cursor.fetchall.return_value = [(1, encryption.encrypt_name_mapping(9, MAPPING, owner_key), owner_key)]
+        report = ConversionReport()
+
+        service.convert_batch('items', 0, 10, report, dry_run=True)
+
+        assert cursor.execute.call_count == 1
+        assert report.converted == 1
+        assert report.v2_decrypts == 1
+
+    def test_convert_all_pages_by_id(self, migration):
+        service, _, _ = migration
+
+        with patch.object(service, 'convert_batch', side_effect=[10, 20, None]) as mock_batch:
+            reports = service.convert_all(['pirates'], batch_size=10)
+
+        assert [call[0][1] for call in mock_batch.call_args_list] == [0, 10, 20]
+        assert set(reports) == {'pirates'}
+
+    def test_unknown_kind(self, migration):
+        service, _, _ = migration
+
+        with pytest.raises(ValidationError):
+            service.convert_batch('ships')
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Daily Rollup Tests
+
+Covers RollupService and the report methods rewritten on top of it:
+- Day ranges split into closed days (rollups) and the open day (raw tables)
+- Reports read daily_* tables and touch raw tables only from today on
+- Backfill rebuilds each rollup table for the requested days
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from services.rollup_service import RollupService, ROLLUP_TABLES
+from services.cash_balance_service import CashBalanceService
+from services.financial_service import FinancialService
+
+
+TODAY = date(2024, 6, 15)
+
+
+class TestSplitRange:
+    """Test rollup/raw range splitting."""
+
+    def test_window_ending_now(self):
+        rollup_from, rollup_to, raw_from, raw_to = RollupService.split_range(
+            date(2024, 6, 1), None, today=TODAY
+        )
+        assert (rollup_from, rollup_to) == (date(2024, 6, 1), TODAY)
+        assert raw_from == datetime(2024, 6, 15)
+        assert raw_to == datetime.max
+
+    def test_closed_window_never_reads_raw(self):
+        rollup_from, rollup_to, raw_from, raw_to = RollupService.split_range(
+            '2024-05-01', '2024-05-31', today=TODAY
+        )
+        assert (rollup_from, rollup_to) == (date(2024, 5, 1), date(2024, 6, 1))
+        assert raw_from >= raw_to  # empty raw part
+
+    def test_window_starting_today_never_reads_rollups(self):
+        rollup_from, rollup_to, raw_from, _ = RollupService.split_range(
+            datetime(2024, 6, 15, 10, 30), None, today=TODAY
+        )
+        assert rollup_from >= rollup_to  # empty rollup part
+        assert raw_from == datetime(2024, 6, 15)
+
+
+class TestRollupReads:
+    """Test that reads combine rollups with the open day only."""
+
+    def test_sales_summary_reads_rollup_and_today(self):
+        service = RollupService()
+        row = (12, 30, Decimal('900.00'), Decimal('400.00'), 4)
+
+        with patch.object(service, '_execute_query', return_value=row) as mock_query:
+            summary = service.get_sales_summary(date(2024, 6, 1), buyer_name='Ana')
+
+        today = date.today()
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'FROM daily_sales' in query
+        assert 'FROM Vendas v' in query
+        assert params == (date(2024, 6, 1), today, 'Ana',
+                          datetime.combine(today, datetime.min.time()), datetime.max, 'Ana')
+        assert summary == {
+            "sales_count": 12, "items_count": 30, "total_sales": Decimal('900.00'),
+            "total_cost": Decimal('400.00'), "unique_buyers": 4
+        }
+
+    def test_cash_summary_reads_unfolded_days_without_writing(self):
+        service = RollupService()
+        row = (5, Decimal('100.00'), Decimal('30.00'), Decimal('0.00'), Decimal('70.00'))
+
+        with patch.object(service, '_execute_query', return_value=row) as mock_query:
+            summary = service.get_cash_summary(date(2024, 6, 1))
+
+        assert mock_query.call_count == 1
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'INSERT' not in query
+        assert 'GREATEST(%s, (SELECT MAX(day) + 1 FROM daily_cash))' in query
+        assert params == (date(2024, 6, 1), date.today(), date(2024, 6, 1), datetime.max)
+        assert summary["net_change"] == Decimal('70.00')
+
+    def test_ledger_write_closes_finished_days_once_per_day(self):
+        service = CashBalanceService()
+        row = (1, 'despesa', Decimal('1.00'), 'x', None, None, None,
+               Decimal('1.00'), Decimal('0.00'), datetime(2024, 1, 1))
+
+        with patch.object(CashBalanceService, '_cash_days_closed_on', None), \
+             patch.object(service.rollup_service, 'close_cash_days', return_value=1) as mock_close, \
+             patch.object(service, '_execute_query', return_value=row):
+            service.add_expense(Decimal('1.00'), 'x')
+            service.add_expense(Decimal('1.00'), 'y')
+
+        mock_close.assert_called_once()
+
+
+class TestReportsUseRollups:
+    """Test the report methods rewritten on top of the rollups."""
+
+    def test_revenue_report(self):
+        service = CashBalanceService()
+        rollups = service.rollup_service
+
+        with patch.object(rollups, 'get_sales_summary', return_value={
+                "sales_count": 10, "items_count": 25, "total_sales": Decimal('1000.00'),
+                "total_cost": Decimal('600.00'), "unique_buyers": 3}), \
+             patch.object(rollups, 'get_payments_summary', return_value={
+                "payments_count": 8, "total_paid": Decimal('700.00')}), \
+             patch.object(rollups, 'get_cash_summary', return_value={
+                "transactions_count": 9, "total_receitas": Decimal('700.00'),
+                "total_despesas": Decimal('50.00'), "total_ajustes": Decimal('0.00'),
+                "net_change": Decimal('650.00')}), \
+             patch.object(service, '_execute_query', return_value=(9, Decimal('650.00'), datetime.now())) as mock_query:
+            report = service.get_revenue_report(days=30)
+
+        # Only the current balance is read directly; everything else is rollups
+        assert mock_query.call_count == 1
+        assert report.total_vendas == Decimal('1000.00')
+        assert report.lucro_bruto == Decimal('400.00')
+        assert report.lucro_liquido == Decimal('350.00')
+        assert report.total_pagamentos == Decimal('700.00')
+        assert report.transacoes_count == 9
+        assert report.vendas_count == 10
+
+    def test_financial_report(self):
+        service = FinancialService()
+        rollups = service.rollup_service
+
+        with patch.object(rollups, 'get_sales_summary', return_value={
+                "sales_count": 4, "items_count": 8, "total_sales": Decimal('400.00'),
+                "total_cost": Decimal('100.00'), "unique_buyers": 2}) as mock_sales, \
+             patch.object(rollups, 'get_payments_summary', return_value={
+                "payments_count": 2, "total_paid": Decimal('100.00')}), \
+             patch.object(rollups, 'get_buyer_balances', return_value=[
+                ('Ana', Decimal('300.00'), Decimal('50.00'), Decimal('250.00'))]), \
+             patch.object(service, '_execute_query') as mock_query:
+            report = service.generate_financial_report({'date_from': '2024-06-01', 'buyer_name': 'Ana'})
+
+        mock_query.assert_not_called()
+        mock_sales.assert_called_once_with('2024-06-01', None, 'Ana')
+        assert report["sales_summary"]["avg_sale_value"] == 50.0
+        assert report["outstanding_debt"]["total_outstanding"] == 300.0
+        assert report["outstanding_debt"]["payment_rate"] == 25.0
+        assert report["top_debtors"][0]["balance_due"] == 250.0
+
+    def test_cash_balance_history_per_day(self):
+        service = FinancialService()
+        rows = [
+            (date(2024, 6, 15), 2, Decimal('20.00'), Decimal('120.00')),
+            (date(2024, 6, 14), 5, Decimal('-10.00'), Decimal('100.00')),
+        ]
+
+        with patch.object(service.rollup_service, 'get_daily_cash_history', return_value=rows):
+            history = service.get_cash_balance_history(days=7)
+
+        assert history[0] == {"date": "2024-06-15", "transactions_count": 2, "net_change": 20.0, "balance": 120.0}
+        assert history[1]["balance"] == 100.0
+
+
+class TestBackfill:
+    """Test rebuilding rollups from raw tables."""
+
+    def _mock_connection(self, service):
+        cursor = MagicMock()
+        cursor.rowcount = 3
+        cursor.fetchone.return_value = (7,)
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        service.db_manager = MagicMock()
+        service.db_manager.get_connection.return_value.__enter__.return_value = conn
+        return conn, cursor
+
+    def test_backfill_replaces_each_table(self):
+        service = RollupService()
+        conn, cursor = self._mock_connection(service)
+
+        written = service.backfill(date(2024, 1, 1), date(2024, 1, 31))
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        for table in ROLLUP_TABLES:
+            assert any(s.startswith(f"DELETE FROM {table}") for s in statements)
+            assert any(s.startswith(f"INSERT INTO {table}") for s in statements)
+        assert written == {table: 3 for table in ROLLUP_TABLES}
+        conn.commit.assert_called_once()
+
+    def test_backfill_dry_run_writes_nothing(self):
+        service = RollupService()
+        conn, cursor = self._mock_connection(service)
+
+        written = service.backfill(date(2024, 1, 1), date(2024, 1, 31), dry_run=True)
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert not any(s.startswith(("DELETE", "INSERT")) for s in statements)
+        assert written == {table: 7 for table in ROLLUP_TABLES}
+        conn.commit.assert_not_called()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Deadline Scheduler Tests
+
+Covers DeadlineAlertScheduler:
+- State is recovered from expedition_deadline_alerts at load
+- Each threshold fires once, claimed in the database before sending
+- Changing or removing a deadline re-arms or cancels the expedition
+- Idle ticks touch neither the database nor the armed expeditions
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+
+from services.deadline_scheduler import DeadlineAlertScheduler
+
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def sender():
+    return MagicMock(return_value=True)
+
+
+def make_scheduler(clock, sender, rows):
+    scheduler = DeadlineAlertScheduler(clock=clock)
+    with patch.object(scheduler, '_execute_query', return_value=rows):
+        scheduler.load(sender)
+    return scheduler
+
+
+class TestLoad:
+    """Test recovering scheduler state from the database."""
+
+    def test_resumes_after_fired_thresholds(self, clock, sender):
+        deadline = NOW + timedelta(days=2)
+        scheduler = make_scheduler(clock, sender, [
+            (1, deadline, ['info']),
+            (2, deadline, ['info', 'warning', 'urgent', 'critical']),
+            (3, NOW + timedelta(days=10), []),
+        ])
+
+        assert set(scheduler._armed) == {1, 3}
+        assert scheduler._armed[1][2] == 1
+        assert scheduler.next_fire_time() == deadline - timedelta(days=1)
+
+    def test_schedule_before_load_is_ignored(self, clock):
+        scheduler = DeadlineAlertScheduler(clock=clock)
+        scheduler.schedule(1, NOW + timedelta(days=1))
+        assert scheduler.next_fire_time() is None
+
+
+class TestRunPending:
+    """Test firing due thresholds."""
+
+    def test_threshold_fires_once(self, clock, sender):
+        scheduler = make_scheduler(clock, sender, [(1, NOW + timedelta(days=2), [])])
+
+        with patch.object(scheduler, '_execute_query', return_value=[('info', 'Tortuga')]) as mock_query:
+            assert scheduler.run_pending() == 1
+            assert scheduler.run_pending() == 0
+
+        assert mock_query.call_count == 1
+        assert 'ON CONFLICT DO NOTHING' in mock_query.call_args[0][0]
+        assert mock_query.call_args[0][1][0] == ['info']
+        expedition_id, alert_type, alert_data = sender.call_args[0]
+        assert (expedition_id, alert_type) == (1, 'info')
+        assert alert_data['message'] == "Expedition 'Tortuga' deadline approaching"
+        assert scheduler.next_fire_time() == NOW + timedelta(days=1)
+
+    def test_only_most_severe_crossed_threshold_is_sent(self, clock, sender):
+        scheduler = make_scheduler(clock, sender, [(1, NOW + timedelta(minutes=30), [])])
+        claimed = [(t, 'Tortuga') for t in ('info', 'warning', 'urgent', 'critical')]
+
+        with patch.object(scheduler, '_execute_query', return_value=claimed) as mock_query:
+            assert scheduler.run_pending() == 1
+
+        assert mock_query.call_args[0][1][0] == ['info', 'warning', 'urgent', 'critical']
+        sender.assert_called_once()
+        assert sender.call_args[0][1] == 'critical'
+        assert scheduler.next_fire_time() is None
+
+    def test_claim_lost_to_another_process_is_not_sent(self, clock, sender):
+        scheduler = make_scheduler(clock, sender, [(1, NOW + timedelta(days=2), [])])
+
+        with patch.object(scheduler, '_execute_query', return_value=[]):
+            assert scheduler.run_pending() == 0
+
+        sender.assert_not_called()
+
+    def test_idle_tick_does_no_work(self, clock, sender):
+        rows = [(i, NOW + timedelta(days=30, minutes=i), []) for i in range(10_000)]
+        scheduler = make_scheduler(clock, sender, rows)
+
+        with patch.object(scheduler, '_execute_query') as mock_query:
+            assert scheduler.run_pending() == 0
+
+        mock_query.assert_not_called()
+        assert len(scheduler._heap) == 10_000
+
+
+class TestRearm:
+    """Test deadline changes and cancellation."""
+
+    def test_changed_deadline_rearms_from_first_threshold(self, clock, sender):
+        scheduler = make_scheduler(clock, sender, [(1, NOW + timedelta(days=2), ['info'])])
+        new_deadline = NOW + timedelta(days=5)
+
+        scheduler.schedule(1, new_deadline)
+
+        assert scheduler.next_fire_time() == new_deadline - timedelta(days=3)
+        clock.now = new_deadline - timedelta(days=3)
+        with patch.object(scheduler, '_execute_query', return_value=[('info', 'Tortuga')]) as mock_query:
+            assert scheduler.run_pending() == 1
+        assert mock_query.call_args[0][1][3] == new_deadline
+
+    def test_cancelled_expedition_never_fires(self, clock, sender):
+        scheduler = make_scheduler(clock, sender, [(1, NOW + timedelta(days=2), [])])
+
+        scheduler.cancel(1)
+
+        with patch.object(scheduler, '_execute_query') as mock_query:
+            assert scheduler.run_pending() == 0
+        mock_query.assert_not_called()
+        assert scheduler.next_fire_time() is None
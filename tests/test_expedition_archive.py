@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Expedition Archive Tests
+
+Covers ExpeditionArchiveService and the include_archived read paths:
+- A batch locks, copies and deletes its expeditions in one transaction
+- Archive and restore run with the triggers bypassed
+- Restore puts parents back before children and re-links sales
+- Read APIs only union the archive tables when asked
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from decimal import Decimal
+
+from services.expedition_archive_service import ExpeditionArchiveService, ARCHIVED_TABLES
+from services.expedition_service import ExpeditionService
+from services.brambler_service import BramblerService
+from services.bulk_decryption_service import BulkDecryptionService
+from services.base_service import ServiceError, NotFoundError
+
+
+CREATED = datetime(2024, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def service_and_cursor(mock_db_connection):
+    return mock_db_connection(ExpeditionArchiveService())
+
+
+def executed(cursor):
+    return [call[0][0] for call in cursor.execute.call_args_list]
+
+
+class TestArchiveBatch:
+    """Test moving expeditions into the archive tables."""
+
+    def test_batch_is_one_transaction(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchall.return_value = [(3,), (5,)]
+
+        with patch.object(service, '_invalidate_cache') as mock_invalidate:
+            archived = service.archive_batch(older_than_days=30, batch_size=2)
+
+        assert archived == [3, 5]
+        queries = executed(cursor)
+        assert queries[0] == "SET LOCAL app.expedition_archival = 'on'"
+        assert 'FOR UPDATE SKIP LOCKED' in queries[1]
+        for table, query in zip(ARCHIVED_TABLES, queries[2:8]):
+            assert f"INSERT INTO {table}_archive" in query
+        assert "'archived_at'" in queries[2]
+        assert 'expedition_sale_links_archive' in queries[8]
+        assert queries[9] == "DELETE FROM expeditions WHERE id = ANY(%s)"
+        assert all(call[0][1] == ([3, 5],) for call in cursor.execute.call_args_list[2:])
+        conn.commit.assert_called_once()
+        mock_invalidate.assert_called_once_with("expeditions")
+
+    def test_nothing_to_archive(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchall.return_value = []
+
+        assert service.archive_batch() == []
+        assert len(executed(cursor)) == 2
+        conn.commit.assert_not_called()
+
+    def test_archive_expired_runs_until_short_batch(self, service_and_cursor):
+        service, _, _ = service_and_cursor
+
+        with patch.object(service, 'archive_batch', side_effect=[[1, 2], [3, 4], [5]]) as mock_batch:
+            assert service.archive_expired(older_than_days=10, batch_size=2) == 5
+
+        assert mock_batch.call_count == 3
+
+    def test_archive_expired_respects_max_batches(self, service_and_cursor):
+        service, _, _ = service_and_cursor
+
+        with patch.object(service, 'archive_batch', return_value=[1, 2]) as mock_batch:
+            assert service.archive_expired(batch_size=2, max_batches=2) == 4
+
+        assert mock_batch.call_count == 2
+
+    def test_database_errors_become_service_errors(self, service_and_cursor):
+        service, cursor, _ = service_and_cursor
+        cursor.execute.side_effect = Exception("boom")
+
+        with pytest.raises(ServiceError):
+            service.archive_batch()
+
+
+class TestRestore:
+    """Test moving an expedition back to the live tables."""
+
+    def test_restore_parents_first(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.rowcount = 1
+
+        with patch.object(service, '_invalidate_cache'):
+            service.restore_expedition(9)
+
+        queries = executed(cursor)
+        assert queries[0] == "SET LOCAL app.expedition_archival = 'on'"
+        for table, query in zip(ARCHIVED_TABLES, queries[1:7]):
+            assert f"INSERT INTO {table}\n" in query
+            assert f"FROM {table}_archive t" in query
+        assert 'UPDATE Vendas' in queries[-1]
+        conn.commit.assert_called_once()
+
+    def test_restore_missing_expedition(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.rowcount = 0
+
+        with pytest.raises(NotFoundError):
+            service.restore_expedition(404)
+
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+
+class TestIncludeArchived:
+    """Test that read APIs only touch the archive when asked."""
+
+    def test_bulk_responses_default_to_live_tables(self):
+        service = ExpeditionService()
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            service.get_all_expedition_responses_bulk()
+
+        assert '_archive' not in mock_query.call_args[0][0]
+
+    def test_bulk_responses_with_archive(self):
+        service = ExpeditionService()
+        rows = [
+            (2, 'Live', 111, 'active', None, CREATED, None,
+             1, 10, 5, Decimal('50'), Decimal('100'), Decimal('50'), Decimal('50'), False, False),
+            (1, 'Old', 111, 'completed', None, CREATED, CREATED,
+             1, 10, 10, Decimal('100'), Decimal('100'), Decimal('100'), Decimal('0'), False, True),
+        ]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            data = service.get_all_expedition_responses_bulk(include_archived=True)
+
+        query = mock_query.call_args[0][0]
+        assert 'UNION ALL' in query
+        assert 'expedition_progress_archive' in query
+        assert data[2]['is_archived'] is False
+        assert data[1]['is_archived'] is True
+
+    def test_all_names_pages_across_archive(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            service.get_all_expedition_pirates(limit=10, include_archived=True)
+
+        query, params = mock_query.call_args[0]
+        assert 'expedition_pirates_archive' in query
+        assert query.count('WHERE ep.expedition_id IS NOT NULL') == 2
+        assert params == (11,)
+
+    def test_decrypt_all_includes_archive_when_asked(self):
+        live_query, live_params = BulkDecryptionService._owner_query('pirates', 111, False)
+        archived_query, archived_params = BulkDecryptionService._owner_query('items', 111, True)
+
+        assert '_archive' not in live_query
+        assert live_params == (111,)
+        assert 'expedition_items_archive' in archived_query
+        assert archived_params == (111, 111)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Batch Payment Tests
+
+Covers ExpeditionService.pay_assignments_batch:
+- Amounts are allocated to the oldest outstanding assignments first
+- One locked SELECT, one UPDATE and one multi-row INSERT in a single transaction
+- Caches are invalidated once per affected expedition
+"""
+
+import pytest
+from unittest.mock import patch
+from decimal import Decimal
+
+from services.expedition_service import ExpeditionService
+from services.base_service import ValidationError, NotFoundError
+from models.expedition import BatchPaymentRequest
+
+
+# (id, expedition_id, pirate_id, total_cost, amount_paid), oldest first
+OUTSTANDING_ROWS = [
+    (11, 1, 7, Decimal('30.00'), Decimal('10.00')),
+    (12, 1, 7, Decimal('50.00'), Decimal('0.00')),
+    (13, 2, 7, Decimal('40.00'), Decimal('0.00')),
+]
+
+
+@pytest.fixture
+def service_and_cursor(mock_db_connection):
+    service, cursor, conn = mock_db_connection(ExpeditionService())
+    cursor.fetchall.return_value = list(OUTSTANDING_ROWS)
+    return service, cursor, conn
+
+
+class TestBatchPayments:
+    """Test batch settlement of assignments."""
+
+    def test_partial_amount_allocated_oldest_first(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+
+        result = service.pay_assignments_batch(BatchPaymentRequest(pirate_id=7, amount=Decimal('45.00')))
+
+        assert [(a['assignment_id'], a['amount'], a['payment_status']) for a in result.allocations] == [
+            (11, Decimal('20.00'), 'paid'),
+            (12, Decimal('25.00'), 'partial'),
+        ]
+        assert result.total_paid == Decimal('45.00')
+        assert result.remaining_outstanding == Decimal('65.00')
+        conn.commit.assert_called_once()
+
+    def test_single_update_and_multi_row_insert(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+
+        with patch.object(service, '_invalidate_expedition_cache') as mock_invalidate:
+            result = service.pay_assignments_batch(BatchPaymentRequest(assignment_ids=[11, 12, 13]))
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert len(statements) == 3
+        assert 'FOR UPDATE OF ea' in statements[0]
+        assert 'UPDATE expedition_assignments' in statements[1]
+        assert 'INSERT INTO expedition_payments' in statements[2]
+
+        insert_params = cursor.execute.call_args_list[2][0][1]
+        assert len(insert_params) == 9 * 3
+        assert result.total_paid == Decimal('110.00')
+        assert all(a['payment_status'] == 'paid' for a in result.allocations)
+        assert sorted(c[0][0] for c in mock_invalidate.call_args_list) == [1, 2]
+
+    def test_amount_above_outstanding_is_rejected(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+
+        with pytest.raises(ValidationError):
+            service.pay_assignments_batch(BatchPaymentRequest(pirate_id=7, amount=Decimal('500.00')))
+
+        conn.commit.assert_not_called()
+
+    def test_nothing_outstanding(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchall.return_value = [(11, 1, 7, Decimal('30.00'), Decimal('30.00'))]
+
+        with pytest.raises(NotFoundError):
+            service.pay_assignments_batch(BatchPaymentRequest(pirate_id=7))
+
+    @pytest.mark.parametrize("request_kwargs", [
+        {},
+        {'assignment_ids': [1], 'pirate_id': 7},
+        {'pirate_id': 7, 'amount': Decimal('0')},
+        {'assignment_ids': [0]},
+        {'pirate_id': 7, 'amount': Decimal('NaN')},
+        {'pirate_id': 7, 'amount': Decimal('Infinity')},
+        {'pirate_id': '7'},
+        {'pirate_id': 7.5},
+        {'pirate_id': True},
+    ])
+    def test_invalid_requests(self, service_and_cursor, request_kwargs):
+        service, cursor, conn = service_and_cursor
+
+        with pytest.raises(ValidationError):
+            service.pay_assignments_batch(BatchPaymentRequest(**request_kwargs))
+
+        cursor.execute.assert_not_called()
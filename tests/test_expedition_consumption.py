@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Item Consumption Tests
+
+Covers ExpeditionService.consume_item:
+- Two round trips: one read, one statement that writes everything
+- The over-consumption check is a guard in the expedition_items UPDATE
+- New pirates are encrypted up front and upserted inside the statement
+- The sale record is written in the same transaction
+- consume_items_bulk validates every row against one snapshot and writes
+  with multi-row statements
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+from decimal import Decimal
+
+from services.expedition_service import ExpeditionService
+from services.base_service import ValidationError, NotFoundError
+from models.expedition import ItemConsumptionRequest
+
+
+NOW = datetime(2024, 6, 1, 12, 0)
+
+# (expedition_id, quantity_required, quantity_consumed, status, owner_key, pirate_id, owner_chat_id)
+ITEM_ROW = (3, 10, 4, 'active', 'owner-key', 21, 111)
+
+# Assignment columns followed by the sale id
+WRITTEN_ROW = (
+    55, 3, 'Barba Ruiva', 8, 2, Decimal('5.00'), Decimal('10.00'),
+    'consumption', 'completed', NOW, None, NOW, None, NOW, NOW, 900
+)
+
+
+def make_request(**overrides):
+    values = dict(
+        expedition_item_id=8,
+        consumer_name='Joao',
+        pirate_name='Barba Ruiva',
+        quantity_consumed=2,
+        unit_price=Decimal('5.00'),
+    )
+    values.update(overrides)
+    return ItemConsumptionRequest(**values)
+
+
+@pytest.fixture
+def service_and_cursor(mock_db_connection):
+    service, cursor, conn = mock_db_connection(ExpeditionService())
+    cursor.fetchone.side_effect = [ITEM_ROW, WRITTEN_ROW]
+    return service, cursor, conn
+
+
+class TestConsumeItem:
+    """Test single-transaction item consumption."""
+
+    def test_existing_pirate_uses_two_round_trips(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+
+        with patch.object(service, '_invalidate_expedition_cache') as mock_invalidate:
+            assignment = service.consume_item(make_request())
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert len(statements) < 3
+        assert 'LEFT JOIN expedition_pirates' in statements[0]
+        assert 'COALESCE(ei.quantity_consumed, 0) + %s <= ei.quantity_required' in statements[1]
+        assert 'INSERT INTO expedition_assignments' in statements[1]
+        assert 'INSERT INTO ItensVenda' in statements[1]
+        assert 'INSERT INTO expedition_pirates' not in statements[1]
+        assert service.db_manager.get_connection.call_count == 1
+        conn.commit.assert_called_once()
+        mock_invalidate.assert_called_once_with(3)
+
+        assert assignment.id == 55
+        assert assignment.pirate_name == 'Barba Ruiva'
+        assert assignment.assignment_amount == Decimal('10.00')
+
+    def test_sale_requires_a_product(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchone.side_effect = [ITEM_ROW, WRITTEN_ROW[:15] + (None,)]
+
+        with patch.object(service, '_invalidate_expedition_cache'):
+            service.consume_item(make_request())
+
+        statement = cursor.execute.call_args_list[1][0][0]
+        sale_cte = statement[statement.index('sale AS ('):statement.index('sale_item AS (')]
+        assert 'INSERT INTO Vendas' in sale_cte
+        assert 'JOIN Produtos p ON p.id = item.produto_id' in sale_cte
+        conn.commit.assert_called_once()
+
+    def test_new_pirate_is_upserted_in_the_same_statement(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchone.side_effect = [ITEM_ROW[:5] + (None, 111), WRITTEN_ROW]
+        brambler = MagicMock()
+        brambler.encrypt_pirate_identity.return_value = 'encrypted'
+
+        with patch('core.modern_service_container.get_brambler_service', return_value=brambler), \
+             patch.object(service, '_invalidate_expedition_cache'):
+            service.consume_item(make_request())
+
+        brambler.encrypt_pirate_identity.assert_called_once_with(3, 'Joao', 'Barba Ruiva', 'owner-key')
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert len(statements) == 2
+        assert 'ON CONFLICT (expedition_id, pirate_name)' in statements[1]
+        assert 'encrypted' in cursor.execute.call_args_list[1][0][1]
+
+    def test_missing_owner_key_uses_the_owners_key(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchone.side_effect = [(3, 10, 4, 'active', None, None, 111), WRITTEN_ROW]
+        brambler = MagicMock()
+        brambler.encrypt_pirate_identity.return_value = 'encrypted'
+
+        with patch('core.modern_service_container.get_brambler_service', return_value=brambler), \
+             patch('services.expedition_service.generate_owner_key', return_value='derived-key') as mock_key, \
+             patch.object(service, '_invalidate_expedition_cache'):
+            service.consume_item(make_request())
+
+        mock_key.assert_called_once_with(3, 111)
+        brambler.encrypt_pirate_identity.assert_called_once_with(3, 'Joao', 'Barba Ruiva', 'derived-key')
+
+    def test_over_consumption_rejected_before_writing(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+
+        with pytest.raises(ValidationError, match="exceed requirement"):
+            service.consume_item(make_request(quantity_consumed=7))
+
+        assert cursor.execute.call_count == 1
+        conn.commit.assert_not_called()
+
+    def test_lost_race_rolls_back(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchone.side_effect = [ITEM_ROW, None]
+
+        with pytest.raises(ValidationError):
+            service.consume_item(make_request())
+
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+    def test_missing_item(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchone.side_effect = [None]
+
+        with pytest.raises(NotFoundError):
+            service.consume_item(make_request())
+
+    def test_inactive_expedition(self, service_and_cursor):
+        service, cursor, conn = service_and_cursor
+        cursor.fetchone.side_effect = [(3, 10, 4, 'completed', 'owner-key', 21, 111)]
+
+        with pytest.raises(ValidationError, match="inactive"):
+            service.consume_item(make_request())
+
+
+# (id, produto_id, quantity_required, quantity_consumed, nome, status, owner_key, owner_chat_id)
+BULK_ITEM_ROWS = [
+    (8, 100, 10, 4, 'Rum', 'active', 'owner-key', 111),
+    (9, 101, 5, 0, 'Grog', 'active', 'owner-key', 111),
+]
+
+
+@pytest.fixture
+def bulk_service_and_cursor(service_and_cursor):
+    service, cursor, conn = service_and_cursor
+    cursor.fetchall.side_effect = [
+        list(BULK_ITEM_ROWS),
+        [('Barba Ruiva', 21)],
+        [(501, 2), (500, 1), (502, 3)],
+        [(900, 'Joao'), (901, 'Maria')],
+    ]
+    return service, cursor, conn
+
+
+class TestConsumeItemsBulk:
+    """Test recording many consumptions in one transaction."""
+
+    def test_rows_validated_against_one_snapshot(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+        requests = [
+            make_request(quantity_consumed=4),
+            make_request(quantity_consumed=3),   # 4 + 4 + 3 > 10
+            make_request(expedition_item_id=9, consumer_name='Maria', quantity_consumed=5),
+            make_request(expedition_item_id=99),
+            make_request(quantity_consumed=2),
+        ]
+
+        with patch.object(service, '_invalidate_expedition_cache') as mock_invalidate:
+            result = service.consume_items_bulk(3, requests)
+
+        assert [r['success'] for r in result.results] == [True, False, True, False, True]
+        assert 'exceed requirement' in result.results[1]['error']
+        assert result.results[3]['error'] == 'Expedition item not found'
+        assert [r['assignment'].id for r in result.results if r['success']] == [500, 501, 502]
+        assert [r['sale_id'] for r in result.results if r['success']] == [900, 901, 900]
+        conn.commit.assert_called_once()
+        mock_invalidate.assert_called_once_with(3)
+
+    def test_statement_count_does_not_grow_with_rows(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+
+        with patch.object(service, '_invalidate_expedition_cache'):
+            service.consume_items_bulk(3, [make_request(quantity_consumed=1) for _ in range(3)])
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert len(statements) == 6
+        assert 'FOR UPDATE OF ei' in statements[0]
+        assert 'pirate_name = ANY(%s)' in statements[1]
+        assert 'UPDATE expedition_items' in statements[2]
+        assert 'INSERT INTO expedition_assignments' in statements[3]
+        assert 'INSERT INTO Vendas' in statements[4]
+        assert 'INSERT INTO ItensVenda' in statements[5]
+        # Three rows for one item collapse into a single quantity update
+        assert cursor.execute.call_args_list[2][0][1] == (8, 3)
+        # One array per column, so the parameter count does not grow either
+        assert 'WITH ORDINALITY' in statements[3]
+        assert [len(column) for column in cursor.execute.call_args_list[3][0][1][:5]] == [3] * 5
+
+    def test_missing_pirates_created_in_one_upsert(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+        cursor.fetchall.side_effect = [
+            list(BULK_ITEM_ROWS), [], [('Olho de Vidro', 30), ('Perna de Pau', 31)],
+            [(500, 1), (501, 2), (502, 3)], [(900, 'Joao')],
+        ]
+        brambler = MagicMock()
+        brambler.encrypt_pirate_identity.side_effect = lambda exp_id, name, pirate, key: f'enc-{pirate}'
+        requests = [
+            make_request(pirate_name='Olho de Vidro', quantity_consumed=1),
+            make_request(pirate_name='Perna de Pau', quantity_consumed=1),
+            make_request(pirate_name='Olho de Vidro', quantity_consumed=1),
+        ]
+
+        with patch('core.modern_service_container.get_brambler_service', return_value=brambler), \
+             patch.object(service, '_invalidate_expedition_cache'):
+            result = service.consume_items_bulk(3, requests)
+
+        assert brambler.encrypt_pirate_identity.call_count == 2
+        upsert = cursor.execute.call_args_list[2][0]
+        assert 'ON CONFLICT (expedition_id, pirate_name)' in upsert[0]
+        assert upsert[1] == (3, 'Olho de Vidro', 'enc-Olho de Vidro', 3, 'Perna de Pau', 'enc-Perna de Pau')
+        assignment_params = cursor.execute.call_args_list[4][0][1]
+        assert assignment_params[0] == [30, 31, 30]
+        assert result.recorded_count == 3
+
+    def test_invalid_prices_are_rejected_per_row(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+        cursor.fetchall.side_effect = [
+            list(BULK_ITEM_ROWS), [('Barba Ruiva', 21)], [(500, 1)], [(900, 'Joao')],
+        ]
+        requests = [
+            make_request(unit_price=Decimal('NaN')),
+            make_request(unit_price=Decimal('Infinity')),
+            make_request(unit_price=Decimal('0')),
+            make_request(quantity_consumed=1),
+        ]
+
+        with patch.object(service, '_invalidate_expedition_cache'):
+            result = service.consume_items_bulk(3, requests)
+
+        assert [r['success'] for r in result.results] == [False, False, False, True]
+        assert 'finite' in result.results[0]['error']
+        assert 'finite' in result.results[1]['error']
+        assert result.results[2]['error'] == 'Unit price must be greater than 0'
+        conn.commit.assert_called_once()
+
+    def test_item_without_product_records_no_sale(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+        cursor.fetchall.side_effect = [
+            [(8, None, 10, 4, None, 'active', 'owner-key', 111)] + BULK_ITEM_ROWS[1:],
+            [('Barba Ruiva', 21)], [(500, 1), (501, 2)], [(900, 'Joao')],
+        ]
+        requests = [make_request(), make_request(expedition_item_id=9)]
+
+        with patch.object(service, '_invalidate_expedition_cache'):
+            result = service.consume_items_bulk(3, requests)
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert 'LEFT JOIN Produtos' in statements[0]
+        assert [r['success'] for r in result.results] == [True, True]
+        assert [r['sale_id'] for r in result.results] == [None, 900]
+        sale_items = cursor.execute.call_args_list[-1][0]
+        assert 'INSERT INTO ItensVenda' in sale_items[0]
+        assert sale_items[1] == (900, 101, 2, Decimal('5.00'), 'Grog')
+
+    def test_all_rows_rejected_writes_nothing(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+
+        result = service.consume_items_bulk(3, [make_request(quantity_consumed=50)])
+
+        assert result.failed_count == 1
+        assert cursor.execute.call_count == 1
+        conn.commit.assert_not_called()
+
+    def test_inactive_expedition_rejects_batch(self, bulk_service_and_cursor):
+        service, cursor, conn = bulk_service_and_cursor
+        cursor.fetchall.side_effect = [[row[:5] + ('completed', 'owner-key', 111) for row in BULK_ITEM_ROWS]]
+
+        with pytest.raises(ValidationError, match="inactive"):
+            service.consume_items_bulk(3, [make_request()])
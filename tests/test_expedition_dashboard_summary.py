@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Expedition Dashboard Summary Tests
+
+Query-count regression tests for the set-based implementations of
+ExpeditionService.get_expedition_dashboard_summary and
+auto_complete_eligible_expeditions: both must issue a constant number of
+queries regardless of how many expeditions exist.
+"""
+
+import pytest
+from unittest.mock import patch
+from decimal import Decimal
+
+from services.expedition_service import ExpeditionService
+from services.base_service import ServiceError
+
+
+SUMMARY_ROW = (12, 7, 4, 2, Decimal('500.00'), Decimal('125.00'), 40, 9, 5, 2, 1, 2)
+
+
+class TestDashboardSummary:
+    """Test the single-query dashboard summary."""
+
+    def test_summary_is_one_query(self):
+        service = ExpeditionService()
+
+        with patch.object(service, '_execute_query', return_value=SUMMARY_ROW) as mock_query, \
+             patch.object(service, 'get_expedition_consumptions') as mock_consumptions:
+            summary = service.get_expedition_dashboard_summary()
+
+        assert mock_query.call_count == 1
+        mock_consumptions.assert_not_called()
+        assert 'FILTER (WHERE' in mock_query.call_args[0][0]
+        assert summary['expeditions'] == {'total': 12, 'active': 7, 'completed': 4, 'overdue': 2}
+        assert summary['financial']['total_unpaid_value'] == 375.0
+        assert summary['financial']['payment_completion_percentage'] == 25.0
+        assert summary['activity'] == {
+            'total_consumptions': 40, 'unique_consumers': 9, 'average_consumptions_per_expedition': 3.33
+        }
+        assert summary['alerts'] == {
+            'deadline_alerts_count': 5, 'critical_alerts': 2, 'urgent_alerts': 1, 'warning_alerts': 2
+        }
+
+    def test_empty_database(self):
+        service = ExpeditionService()
+        row = (0, 0, 0, 0, Decimal('0'), Decimal('0'), 0, 0, 0, 0, 0, 0)
+
+        with patch.object(service, '_execute_query', return_value=row):
+            summary = service.get_expedition_dashboard_summary()
+
+        assert summary['financial']['payment_completion_percentage'] == 0
+        assert summary['activity']['average_consumptions_per_expedition'] == 0
+
+    def test_missing_row_raises(self):
+        service = ExpeditionService()
+
+        with patch.object(service, '_execute_query', return_value=None):
+            with pytest.raises(ServiceError):
+                service.get_expedition_dashboard_summary()
+
+
+class TestAutoComplete:
+    """Test the single-statement auto-completion."""
+
+    @pytest.mark.parametrize("completed_rows", [[], [(3,)], [(9,), (2,), (5,)] * 100])
+    def test_auto_complete_is_one_query(self, completed_rows):
+        service = ExpeditionService()
+
+        with patch.object(service, '_execute_query', return_value=completed_rows) as mock_query, \
+             patch.object(service, 'check_expedition_completion') as mock_check, \
+             patch.object(service, '_invalidate_cache') as mock_invalidate:
+            completed = service.auto_complete_eligible_expeditions()
+
+        assert mock_query.call_count == 1
+        mock_check.assert_not_called()
+        query = mock_query.call_args[0][0]
+        assert 'UPDATE expeditions' in query
+        assert 'NOT EXISTS' in query
+        assert 'RETURNING e.id' in query
+        assert completed == sorted(row[0] for row in completed_rows)
+        assert mock_invalidate.call_count == (1 if completed_rows else 0)
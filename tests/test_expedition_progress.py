@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Expedition Progress Summary Tests
+
+Covers the expedition_progress summary behind the dashboard endpoints:
+- get_all_expedition_responses_bulk reads the summary instead of aggregating
+  items and Estoque prices per request
+- get_dashboard_analytics returns every counter from one FILTER aggregate row
+- Item writes (including consumptions) maintain the summary via triggers
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from decimal import Decimal
+
+from services.expedition_service import ExpeditionService
+
+
+CREATED = datetime(2024, 6, 1, 12, 0)
+
+
+class TestProgressSummaryReads:
+    """Test reads of the expedition_progress summary."""
+
+    def test_bulk_reads_summary_with_overdue_flag(self):
+        service = ExpeditionService()
+        rows = [
+            (2, 'Late', 111, 'active', datetime(2024, 6, 2), CREATED, None,
+             3, 30, 12, Decimal('40.00'), Decimal('300.00'), Decimal('120.00'), Decimal('180.00'), True),
+            (1, 'Empty', 111, 'active', None, CREATED, None,
+             0, 0, 0, Decimal('0'), Decimal('0'), Decimal('0'), Decimal('0'), None),
+        ]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            data = service.get_all_expedition_responses_bulk()
+
+        query = mock_query.call_args[0][0]
+        assert 'expedition_progress' in query
+        assert 'Estoque' not in query
+        assert list(data) == [2, 1]
+        assert data[2]['is_overdue'] is True
+        assert data[1]['is_overdue'] is False
+        assert data[2]['completion_percentage'] == 40.0
+        assert data[2]['remaining_value'] == 180.0
+
+    def test_dashboard_analytics_is_one_aggregate_row(self):
+        service = ExpeditionService()
+        row = (
+            10, 6, 3, 1, 2,
+            Decimal('1000.00'), Decimal('300.00'), Decimal('650.00'), Decimal('400.00'), Decimal('600.00'),
+            Decimal('42.5'),
+            2, 2, 1, 2, 3,
+            4, 9, 1, 3,
+        )
+
+        with patch.object(service, '_execute_query', return_value=row) as mock_query:
+            analytics = service.get_dashboard_analytics()
+
+        assert mock_query.call_count == 1
+        assert 'FILTER (WHERE' in mock_query.call_args[0][0]
+        assert analytics['overview'] == {
+            'total_expeditions': 10, 'active_expeditions': 6, 'completed_expeditions': 3,
+            'cancelled_expeditions': 1, 'overdue_expeditions': 2
+        }
+        assert analytics['value_analysis']['pending_value'] == 600.0
+        assert analytics['progress_analysis']['average_completion_rate'] == 42.5
+        assert analytics['progress_analysis']['expeditions_by_progress'] == {
+            '0-25%': 2, '25-50%': 2, '50-75%': 1, '75-100%': 2, 'completed': 3
+        }
+        assert analytics['timeline_analysis']['expeditions_created_this_month'] == 9
+
+
+class TestProgressTriggers:
+    """Test that the summary is maintained transactionally."""
+
+    def test_item_writes_refresh_progress(self):
+        import inspect
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            assert f"AFTER {event} ON expedition_items REFERENCING" in source
+        assert 'FOR EACH STATEMENT EXECUTE FUNCTION expedition_progress_trigger()' in source
+        assert 'FOR EACH ROW EXECUTE FUNCTION expedition_progress_created_trigger()' in source
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Expedition Read Model Tests
+
+Covers ExpeditionReadModelService and the read path of
+ExpeditionService.get_expedition_details_optimized:
+- Documents are assembled in one query, built on first read when missing
+- Owner-only fields are projected out for everyone but the owner
+- Triggers keep every section-feeding table covered with per-entry deltas
+- Consumptions are capped to a recent window; progress still covers all of them
+"""
+
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from services.expedition_read_model_service import (
+    ExpeditionReadModelService, READ_MODEL_SECTIONS, RECENT_CONSUMPTIONS_LIMIT
+)
+from services.expedition_service import ExpeditionService
+
+
+def make_document(owner_chat_id=111):
+    return {
+        'expedition': {'id': 5, 'name': 'Tortuga', 'owner_chat_id': owner_chat_id, 'status': 'active',
+                       'deadline': None, 'created_at': '2024-06-01T12:00:00', 'completed_at': None},
+        'items': [{'id': 8, 'produto_id': 100, 'product_name': 'Rum', 'product_emoji': '',
+                   'quantity_needed': 10, 'unit_price': 5.0, 'quantity_consumed': 2,
+                   'added_at': '2024-06-01T12:00:00', 'encrypted_product_name': None,
+                   'original_product_name': 'Rum'}],
+        'consumptions': [{'id': 55, 'consumer_name': 'Barba Ruiva', 'pirate_name': 'Barba Ruiva',
+                          'encrypted_identity': 'enc', 'product_name': 'Rum', 'quantity': 2,
+                          'unit_price': 5.0, 'total_price': 10.0, 'amount_paid': 0,
+                          'payment_status': 'pending', 'consumed_at': '2024-06-01T12:30:00',
+                          'encrypted_product_name': None}],
+        'pirates': [{'id': 21, 'pirate_name': 'Barba Ruiva', 'consumptions_count': 1,
+                     'quantity_consumed': 2, 'total_cost': 10.0, 'amount_paid': 0, 'outstanding': 10.0}],
+        'progress': {'total_items': 10, 'consumed_items': 2, 'remaining_items': 8,
+                     'completion_percentage': 20.0, 'total_value': 50.0,
+                     'consumed_value': 10.0, 'remaining_value': 40.0},
+    }
+
+
+class TestReadModelService:
+    """Test document lookup and rebuild."""
+
+    def test_existing_document_is_one_lookup(self):
+        service = ExpeditionReadModelService()
+
+        with patch.object(service, '_execute_query', return_value=(make_document(),)) as mock_query:
+            document = service.get_document(5)
+
+        assert mock_query.call_count == 1
+        assert 'expedition_read_model_document(%s)' in mock_query.call_args[0][0]
+        assert set(document) == set(READ_MODEL_SECTIONS)
+
+    def test_missing_document_is_built(self):
+        service = ExpeditionReadModelService()
+
+        # The assembly function yields NULL when there is no document row
+        with patch.object(service, '_execute_query', side_effect=[(None,), (make_document(),)]) as mock_query:
+            document = service.get_document(5)
+
+        rebuild_call = mock_query.call_args_list[1][0]
+        assert 'rebuild_expedition_read_model(%s)' in rebuild_call[0]
+        assert rebuild_call[1] == (5,)
+        assert document['expedition']['id'] == 5
+
+    def test_missing_expedition_returns_none(self):
+        service = ExpeditionReadModelService()
+
+        with patch.object(service, '_execute_query', side_effect=[(None,), (None,)]):
+            assert service.get_document(404) is None
+
+    def test_projection_strips_owner_only_fields(self):
+        document = ExpeditionReadModelService.project(make_document(), is_owner=False)
+        assert 'encrypted_identity' not in document['consumptions'][0]
+
+        document = ExpeditionReadModelService.project(make_document(), is_owner=True)
+        assert document['consumptions'][0]['encrypted_identity'] == 'enc'
+
+
+class TestExpeditionDetailsFromReadModel:
+    """Test that expedition details are served from the read model."""
+
+    @pytest.fixture
+    def service(self):
+        service = ExpeditionService()
+        service.read_model_service = MagicMock()
+        service.read_model_service.project.side_effect = ExpeditionReadModelService.project
+        return service
+
+    def test_non_owner_gets_projected_document_without_queries(self, service):
+        service.read_model_service.get_document.return_value = make_document()
+        cache = MagicMock()
+        cache.get.return_value = None
+
+        with patch('services.expedition_service.get_query_cache', return_value=cache), \
+             patch.object(service, '_execute_query') as mock_query:
+            details = service.get_expedition_details_optimized(5, requesting_chat_id=999)
+
+        mock_query.assert_not_called()
+        cache.set.assert_not_called()
+        assert 'encrypted_identity' not in details['consumptions'][0]
+        assert details['pirates'][0]['outstanding'] == 10.0
+        assert details['progress']['completion_percentage'] == 20.0
+
+    def test_owner_gets_decrypted_names(self, service):
+        service.read_model_service.get_document.return_value = make_document()
+        cache = MagicMock()
+        cache.get.return_value = None
+        encryption = MagicMock()
+        encryption.decrypt_name_mapping.return_value = {'mapping': {'Joao': 'Barba Ruiva'}}
+
+        with patch('services.expedition_service.get_query_cache', return_value=cache), \
+             patch('utils.encryption.get_encryption_service', return_value=encryption), \
+             patch.object(service, '_execute_query', return_value=('owner-key',)):
+            details = service.get_expedition_details_optimized(5, requesting_chat_id=111)
+
+        assert details['consumptions'][0]['original_name'] == 'Joao'
+        assert 'encrypted_identity' not in details['consumptions'][0]
+        cache.set.assert_called_once()
+
+    def test_response_is_built_from_document(self, service):
+        service.read_model_service.get_document.return_value = make_document()
+
+        with patch.object(service, '_execute_query'):
+            response = service.get_expedition_response(5, requesting_chat_id=999)
+
+        assert response.expedition.name == 'Tortuga'
+        assert response.total_items == 10
+        assert response.consumed_items == 2
+
+    def test_consumed_value_covers_consumptions_outside_the_window(self, service):
+        document = make_document()
+        document['progress'].update(consumed_value=35.0, remaining_value=15.0)
+        service.read_model_service.get_document.return_value = document
+
+        with patch.object(service, '_execute_query'):
+            response = service.get_expedition_response(5, requesting_chat_id=999)
+
+        # Only one recent consumption (10.0) is in the document
+        assert len(response.consumptions) == 1
+        assert response.consumed_value == Decimal('35.0')
+        assert response.remaining_value == Decimal('15.0')
+
+
+class TestReadModelTriggers:
+    """Test that every table feeding a section maintains the read model."""
+
+    def test_section_tables_have_statement_triggers(self):
+        import inspect
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        for table in ('expedition_items', 'expedition_assignments', 'expedition_payments', 'expedition_pirates'):
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                assert f"AFTER {event} ON {table} REFERENCING" in source
+        assert 'FOR EACH STATEMENT EXECUTE FUNCTION expedition_read_model_trigger' in source
+        assert 'EXECUTE FUNCTION expedition_read_model_header_trigger()' in source
+
+    def test_writes_apply_entry_deltas_without_locking_the_document(self):
+        import inspect
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        trigger = source[source.index('CREATE OR REPLACE FUNCTION expedition_read_model_trigger()'):]
+        trigger = trigger[:trigger.index('$$ LANGUAGE plpgsql;')]
+
+        assert 'PRIMARY KEY (expedition_id, section, entry_id)' in source
+        assert 'apply_expedition_read_model_entries' in trigger
+        assert 'FOR UPDATE' not in trigger
+        assert 'refresh_expedition_read_model' not in source.replace(
+            'DROP FUNCTION IF EXISTS refresh_expedition_read_model', '')
+
+    def test_recent_window_matches_the_schema(self):
+        import inspect
+        import re
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        limit = re.search(
+            r'FUNCTION expedition_read_model_recent_limit\(\)\s+RETURNS INTEGER AS \$\$\s+SELECT (\d+)', source
+        )
+        assert limit and int(limit.group(1)) == RECENT_CONSUMPTIONS_LIMIT
+        assert 'ranked.recency > expedition_read_model_recent_limit()' in source
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Expedition Search Tests
+
+Covers ExportService.search_expeditions:
+- The cursor condition and LIMIT are applied before joining progress
+- Keyset paging continues from the cursor, not an OFFSET
+- The total is a separate count, taken only for the first page
+- LIKE wildcards in the search text match literally
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+
+from services.export_service import ExportService
+from utils.pagination import InvalidCursorError, encode_cursor
+
+
+CREATED = datetime(2024, 6, 1, 12, 0)
+
+
+def make_rows(count):
+    return [
+        (i, f'Tortuga {i}', 111, 'active', None, CREATED - timedelta(hours=i), None,
+         2, 10, 5, CREATED - timedelta(hours=i))
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def service():
+    return ExportService()
+
+
+class TestSearchExpeditions:
+    """Test trigram-backed search with keyset paging."""
+
+    def test_first_page_counts_the_filtered_set(self, service):
+        with patch.object(service, '_execute_query', side_effect=[make_rows(3), (42,)]) as mock_query:
+            page, total = service.search_expeditions(search_query='tort', limit=2)
+
+        assert mock_query.call_count == 2
+        query, params = mock_query.call_args_list[0][0]
+        assert 'OVER ()' not in query
+        assert 'e.name ILIKE %s' in query
+        assert 'OFFSET' not in query
+        assert params == ('%tort%', 3)
+        count_query, count_params = mock_query.call_args_list[1][0]
+        assert count_query.startswith('SELECT COUNT(*) FROM expeditions e WHERE e.name ILIKE %s')
+        assert count_params == ('%tort%',)
+        assert total == 42
+        assert [r['id'] for r in page.items] == [1, 2]
+        assert page.items[0]['completion_percentage'] == 50.0
+        assert page.has_more
+
+    def test_total_without_filters(self, service):
+        with patch.object(service, '_execute_query', side_effect=[make_rows(2), (2,)]) as mock_query:
+            page, total = service.search_expeditions()
+
+        assert 'WHERE' not in mock_query.call_args_list[0][0][0].split('FROM expeditions e')[1].split(') m')[0]
+        assert mock_query.call_args_list[1][0] == ('SELECT COUNT(*) FROM expeditions e ', ())
+        assert total == 2
+        assert not page.has_more
+
+    def test_next_page_continues_from_cursor(self, service):
+        with patch.object(service, '_execute_query', side_effect=[make_rows(3), (42,)]):
+            first, _ = service.search_expeditions(status_filter='active', limit=2)
+
+        with patch.object(service, '_execute_query', return_value=make_rows(1)) as mock_query:
+            second, total = service.search_expeditions(status_filter='active', limit=2, cursor=first.next_cursor)
+
+        # One query: the cursor condition and LIMIT sit on expeditions, and no count is taken
+        assert mock_query.call_count == 1
+        query, params = mock_query.call_args[0]
+        inner = query.split(') m')[0]
+        assert 'WHERE e.status = %s AND (e.created_at, e.id) < (%s, %s)' in inner
+        assert 'LIMIT %s' in inner
+        assert params == ('active', CREATED - timedelta(hours=2), 2, 3)
+        assert total is None
+
+    def test_ascending_deadline_sort(self, service):
+        cursor = encode_cursor(float('inf'), 7)
+
+        with patch.object(service, '_execute_query', return_value=make_rows(1)) as mock_query:
+            service.search_expeditions(sort_by='deadline', sort_order='asc', cursor=cursor)
+
+        query, params = mock_query.call_args[0]
+        assert ("(COALESCE(EXTRACT(EPOCH FROM e.deadline), 'Infinity'::float8), e.id) > (%s, %s)"
+                in query)
+        assert params[:2] == (float('inf'), 7)
+
+    def test_past_last_page_is_empty_without_a_count(self, service):
+        cursor = encode_cursor(CREATED.isoformat(), 1)
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            page, total = service.search_expeditions(search_query='x', cursor=cursor)
+
+        assert page.items == []
+        assert not page.has_more
+        assert total is None
+        assert mock_query.call_count == 1
+
+    def test_like_wildcards_are_escaped(self, service):
+        with patch.object(service, '_execute_query', side_effect=[[], (0,)]) as mock_query:
+            service.search_expeditions(search_query='50%_off')
+
+        assert mock_query.call_args_list[0][0][1][0] == '%50\\%\\_off%'
+
+    def test_invalid_cursor(self, service):
+        with pytest.raises(InvalidCursorError):
+            service.search_expeditions(cursor='not-a-cursor')
+
+
+class TestSearchIndex:
+    """Test that the schema creates the trigram index when possible."""
+
+    def test_trigram_index_with_fallback(self):
+        import inspect
+        from database import schema
+
+        source = inspect.getsource(schema.initialize_schema)
+        assert 'CREATE EXTENSION IF NOT EXISTS pg_trgm' in source
+        assert 'EXCEPTION WHEN OTHERS THEN' in source
+        assert 'USING gin (name gin_trgm_ops)' in source
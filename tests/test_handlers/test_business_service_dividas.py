@@ -5,6 +5,8 @@ This would have caught the missing get_sale_items method.
 
 import pytest
 import os
+from datetime import datetime
+from decimal import Decimal
 from unittest.mock import Mock, patch
 
 from services.handler_business_service import HandlerBusinessService
@@ -27,68 +29,119 @@ class TestBusinessServiceDividas:
         if "BOT_TOKEN" in os.environ:
             del os.environ["BOT_TOKEN"]
     
-    def test_generate_debt_report_calls_get_sale_items(self):
+    def test_generate_debt_report_uses_single_report_query(self):
         """
-        Test that debt report generation calls get_sale_items method.
-        This would have caught the missing method error.
+        Test that debt report generation loads all rows with one joined query
+        instead of calling get_sale_items once per sale.
         """
-        # Mock the services that business service depends on
         mock_sales_service = Mock()
         mock_product_service = Mock()
-        
-        # Setup mock data
-        sample_sales = [
-            Sale(id=1, comprador="testuser", data="2024-01-01"),
-            Sale(id=2, comprador="testuser", data="2024-01-02")
+
+        # Rows: venda_id, comprador, data_venda, produto_id, produto_nome,
+        #       quantidade, valor_unitario, sale_total, sale_paid
+        report_rows = [
+            (2, "testuser", datetime(2024, 1, 2), 2, "Test Product 2", 1, Decimal('30.00'), Decimal('30.00'), Decimal('0.00')),
+            (1, "testuser", datetime(2024, 1, 1), 1, "Test Product 1", 2, Decimal('50.00'), Decimal('100.00'), Decimal('40.00')),
         ]
-        
-        sample_items = {
-            1: [SaleItem(id=1, venda_id=1, produto_id=1, quantidade=2, valor_unitario=50.0)],
-            2: [SaleItem(id=2, venda_id=2, produto_id=2, quantidade=1, valor_unitario=30.0)]
-        }
-        
-        sample_products = {
-            1: Product(id=1, nome="Test Product 1", emoji="🎮", media_type=None, media_file_id=None),
-            2: Product(id=2, nome="Test Product 2", emoji="🖱️", media_type=None, media_file_id=None)
-        }
-        
-        # Configure mocks
-        mock_sales_service.get_sales_by_buyer.return_value = sample_sales
-        mock_sales_service.get_sale_items.side_effect = lambda sale_id: sample_items.get(sale_id, [])
-        mock_product_service.get_product_by_id.side_effect = lambda prod_id: sample_products.get(prod_id)
-        
-        # Patch the service container to return our mocks
+
         with patch('core.modern_service_container.get_sales_service', return_value=mock_sales_service), \
              patch('core.modern_service_container.get_product_service', return_value=mock_product_service), \
              patch('services.base_service.get_db_manager', return_value=Mock()):
-            
-            # Create business service
+
             business_service = HandlerBusinessService(None)
             business_service.sales_service = mock_sales_service
             business_service.product_service = mock_product_service
-            
-            # Create report request
-            request = ReportRequest(report_type="debts", buyer_name="testuser")
-            
-            # This would fail if get_sale_items method was missing
-            response = business_service.generate_report(request)
-            
-            # Verify the method was called
-            mock_sales_service.get_sale_items.assert_called()
-            assert mock_sales_service.get_sale_items.call_count == 2  # Called for each sale
-            
-            # Verify successful response
+
+            with patch.object(business_service.report_query_service, '_stream_rows',
+                              return_value=iter([report_rows])) as mock_query:
+                request = ReportRequest(report_type="debts", buyer_name="testuser")
+                response = business_service.generate_report(request)
+
+            # One query for the whole report, no per-sale lookups
+            assert mock_query.call_count == 1
+            mock_sales_service.get_sale_items.assert_not_called()
+            mock_product_service.get_product_by_id.assert_not_called()
+
+            # Debt reports only include pending sales
+            query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+            assert "st.sale_total - st.sale_paid > 0.01" in query
+            assert params == ("testuser",)
+
             assert response.success == True
             assert len(response.report_data) == 2
-            
-            # Verify data structure
+
             first_item = response.report_data[0]
-            assert 'id' in first_item
-            assert 'produto_nome' in first_item
-            assert 'quantidade' in first_item
-            assert 'valor_total' in first_item
-            assert 'data_venda' in first_item
-    
+            assert first_item == {
+                'id': 2,
+                'produto_nome': "Test Product 2",
+                'quantidade': 1,
+                'valor_total': 30.0,
+                'data_venda': '2024-01-02'
+            }
+
+            assert response.summary['total_debtors'] == 1
+            assert response.summary['total_unpaid_sales'] == 2
+            assert response.summary['total_debt_amount'] == 90.0
+
+    def test_generate_sales_report_pushes_filters_into_sql(self):
+        """Test that buyer, date, product and payment filters become SQL conditions."""
+        with patch('services.base_service.get_db_manager', return_value=Mock()):
+            business_service = HandlerBusinessService(None)
+
+            with patch.object(business_service.report_query_service, '_stream_rows',
+                              return_value=iter([])) as mock_query:
+                request = ReportRequest(
+                    report_type="sales",
+                    comprador_filter="testuser",
+                    product_name_filter="50%",
+                    start_date=datetime(2024, 1, 1, 15, 30),
+                    end_date=datetime(2024, 1, 31),
+                    payment_status="paid"
+                )
+                response = business_service.generate_report(request)
+
+            assert mock_query.call_count == 1
+            query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+            assert "v.comprador = %s" in query
+            assert "v.data_venda >= %s" in query
+            assert "v.data_venda < %s" in query
+            assert "ILIKE %s" in query
+            assert "st.sale_total - st.sale_paid <= 0.01" in query
+            assert params == (
+                "testuser",
+                datetime(2024, 1, 1),
+                datetime(2024, 2, 1),
+                "%50\\%%"
+            )
+
+            assert response.success == True
+            assert response.report_data == []
+            assert response.summary['total_sales'] == 0
+
+    def test_report_rows_stream_from_server_side_cursor(self):
+        """Test that report rows are fetched in chunks from a named cursor."""
+        from services.report_query_service import ReportQueryService, REPORT_FETCH_SIZE
+
+        row = (1, "testuser", datetime(2024, 1, 1), 1, "Rum", 1, Decimal('10.00'), Decimal('10.00'), Decimal('0.00'))
+        cursor = Mock()
+        cursor.fetchmany.side_effect = [[row], [row], []]
+        conn = Mock()
+        conn.cursor.return_value.__enter__ = Mock(return_value=cursor)
+        conn.cursor.return_value.__exit__ = Mock(return_value=False)
+        db_manager = Mock()
+        db_manager.get_connection.return_value.__enter__ = Mock(return_value=conn)
+        db_manager.get_connection.return_value.__exit__ = Mock(return_value=False)
+
+        with patch('services.base_service.get_db_manager', return_value=db_manager):
+            service = ReportQueryService()
+            rows = list(service.iter_report_rows(buyer_name="testuser"))
+
+        assert len(rows) == 2
+        assert conn.cursor.call_args[1]['name'].startswith('report_rows_')
+        cursor.fetchmany.assert_called_with(REPORT_FETCH_SIZE)
+        cursor.fetchall.assert_not_called()
+        conn.rollback.assert_called_once()
+
     def test_generate_debt_report_handles_missing_method_gracefully(self):
         """
         Test that business service handles missing methods gracefully.
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Keyset Pagination Tests
+
+Covers the cursor codec in utils.pagination and the keyset page methods behind
+/api/products, /api/users, /api/sales and /api/brambler/all-names:
+- Opaque cursors round-trip the sort keys of the last row
+- The extra (limit + 1) row only signals another page
+- Follow-up pages filter on the sort keys instead of using OFFSET
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from decimal import Decimal
+
+from services.product_repository import ProductRepository
+from services.user_service import UserService
+from services.sales_service import SalesService
+from services.brambler_service import BramblerService
+from utils.pagination import (
+    KeysetPage, InvalidCursorError, encode_cursor, decode_cursor, clamp_page_size
+)
+
+
+@pytest.mark.phase4
+class TestCursorCodec:
+    """Test opaque cursor encoding and decoding."""
+
+    def test_round_trip(self):
+        cursor = encode_cursor("Rum", 42)
+        assert decode_cursor(cursor, expected_length=2) == ["Rum", 42]
+
+    def test_datetime_is_serialized_as_iso(self):
+        ts = datetime(2024, 5, 1, 12, 30)
+        cursor = encode_cursor(ts, 7)
+        assert decode_cursor(cursor, expected_length=2) == [ts.isoformat(), 7]
+
+    def test_empty_cursor_means_first_page(self):
+        assert decode_cursor(None, expected_length=2) is None
+        assert decode_cursor("", expected_length=2) is None
+
+    @pytest.mark.parametrize("bad_cursor", ["not-base64!!", encode_cursor(1), "e30"])
+    def test_malformed_cursor_raises(self, bad_cursor):
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(bad_cursor, expected_length=2)
+
+    def test_clamp_page_size(self):
+        assert clamp_page_size(None) == 50
+        assert clamp_page_size(0) == 1
+        assert clamp_page_size(10_000) == 500
+        assert clamp_page_size(10_000, maximum=1000) == 1000
+
+
+@pytest.mark.phase4
+class TestKeysetPage:
+    """Test building pages from limit + 1 rows."""
+
+    def test_extra_row_produces_next_cursor(self):
+        rows = [(1, 'a'), (2, 'b'), (3, 'c')]
+        page = KeysetPage.from_rows(rows, 2, cursor_key=lambda r: (r[1], r[0]))
+
+        assert page.items == [(1, 'a'), (2, 'b')]
+        assert page.has_more
+        assert decode_cursor(page.next_cursor, expected_length=2) == ['b', 2]
+
+    def test_last_page_has_no_cursor(self):
+        page = KeysetPage.from_rows([(1, 'a')], 2, cursor_key=lambda r: (r[1], r[0]))
+
+        assert page.next_cursor is None
+        assert page.to_pagination_dict() == {
+            "limit": 2, "count": 1, "next_cursor": None, "has_more": False
+        }
+
+
+@pytest.mark.phase4
+class TestKeysetPageMethods:
+    """Test that list endpoints page on sort keys instead of OFFSET."""
+
+    def test_products_first_and_next_page(self):
+        repository = ProductRepository()
+        rows = [
+            (i, f'Product {i:03d}', '🧪', None, 10, Decimal('1.00'), Decimal('2.00'), Decimal('20.00'))
+            for i in range(1, 4)
+        ]
+
+        with patch.object(repository, '_execute_query', return_value=rows) as mock_query:
+            page = repository.get_products_with_stock_page(limit=2)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'OFFSET' not in query
+        assert params == (3,)
+        assert len(page.items) == 2
+        assert page.items[0]['product'].nome == 'Product 001'
+
+        with patch.object(repository, '_execute_query', return_value=[]) as mock_query:
+            repository.get_products_with_stock_page(limit=2, cursor=page.next_cursor)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert '(p.nome, p.id) > (%s, %s)' in query
+        assert params == ('Product 002', 2, 3)
+
+    def test_users_page_uses_username_cursor(self):
+        service = UserService()
+        cursor = encode_cursor('mario')
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            page = service.get_users_with_stats_page(limit=20, cursor=cursor)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'u.username > %s' in query
+        assert 'OFFSET' not in query
+        assert params == ('mario', 21)
+        assert page.items == []
+
+    def test_sales_page_uses_date_and_id_cursor(self):
+        service = SalesService()
+        sold_at = datetime(2024, 3, 10, 18, 0)
+        rows = [
+            (10, sold_at, 'Buyer', Decimal('30.00'), 'Pago', '🧪 Rum'),
+            (9, sold_at, 'Buyer', Decimal('15.00'), 'Pendente', '🧪 Rum'),
+        ]
+
+        with patch.object(service, '_execute_query', return_value=rows):
+            page = service.get_sales_with_details_page(limit=1)
+
+        assert [sale.id for sale in page.items] == [10]
+
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            service.get_sales_with_details_page(limit=1, cursor=page.next_cursor)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert '(v.data_venda, v.id) < (%s, %s)' in query
+        assert params == (sold_at, 10, 2)
+
+    def test_brambler_all_names_rejects_bad_cursor(self):
+        service = BramblerService()
+
+        with patch.object(service, '_execute_query') as mock_query:
+            with pytest.raises(InvalidCursorError):
+                service.get_all_expedition_pirates(limit=10, cursor='garbage')
+
+        mock_query.assert_not_called()
+
+    def test_brambler_all_names_pages_in_sql(self):
+        service = BramblerService()
+        joined = datetime(2024, 1, 1)
+        rows = [
+            (i, f'Pirate {i}', None, 5, 'enc', 'Exp', 123, joined)
+            for i in range(30, 19, -1)
+        ]
+
+        with patch.object(service, '_execute_query', return_value=rows) as mock_query:
+            page = service.get_all_expedition_pirates(limit=10)
+
+        query, params = mock_query.call_args[0][0], mock_query.call_args[0][1]
+        assert 'LIMIT %s' in query
+        assert params == (11,)
+        assert len(page.items) == 10
+        assert decode_cursor(page.next_cursor, expected_length=2) == [5, 21]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Master Key Service Tests
+
+Covers MasterKeyCache and MasterKeyService:
+- generate_user_master_key runs PBKDF2 once per chat_id while memoized
+- The memo is bounded and entries expire after their TTL
+- Stored keys in user_master_keys are used before deriving
+- Derived keys are stored, and a concurrently stored key wins
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from services.master_key_service import MasterKeyService
+from services.base_service import ServiceError
+from utils.encryption import ExpeditionEncryption, MasterKeyCache
+
+
+CREATED = datetime(2024, 6, 1, 12, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def service():
+    service = MasterKeyService()
+    service.encryption_service = ExpeditionEncryption()
+    return service
+
+
+class TestMasterKeyCache:
+    """Test the chat_id -> master key memo."""
+
+    def test_derivation_is_memoized(self):
+        encryption = ExpeditionEncryption()
+
+        keys = [encryption.generate_user_master_key(42) for _ in range(5)]
+
+        assert len(set(keys)) == 1
+        stats = encryption.get_stats()['master_keys']
+        assert stats['derivations'] == 1
+        assert stats['avoided_derivations'] == 4
+        assert stats['time_saved_seconds'] == pytest.approx(4 * stats['mean_derivation_ms'] / 1000, rel=0.01)
+
+    def test_memoized_key_matches_fresh_derivation(self):
+        memoized = ExpeditionEncryption()
+        memoized.generate_user_master_key(42)
+
+        assert memoized.generate_user_master_key(42) == ExpeditionEncryption().generate_user_master_key(42)
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = MasterKeyCache(ttl_seconds=60, clock=clock)
+        cache.put(1, 'key')
+
+        clock.now += 59
+        assert cache.get(1) == 'key'
+        clock.now += 2
+        assert cache.get(1) is None
+        assert cache.get_stats()['expirations'] == 1
+
+    def test_bounded(self):
+        cache = MasterKeyCache(max_size=2)
+        for chat_id in (1, 2, 3):
+            cache.put(chat_id, f'key-{chat_id}')
+
+        assert cache.get(1) is None
+        assert cache.get(3) == 'key-3'
+        assert cache.get_stats()['size'] == 2
+
+
+class TestMasterKeyService:
+    """Test memo -> user_master_keys -> derive resolution."""
+
+    def test_memo_hit_skips_database(self, service):
+        service.encryption_service.master_keys.put(7, 'memo-key')
+
+        with patch.object(service, '_execute_query') as mock_query:
+            assert service.get_master_key(7) == 'memo-key'
+
+        mock_query.assert_not_called()
+
+    def test_stored_key_is_not_derived(self, service):
+        with patch.object(service, '_execute_query', return_value=('stored-key',)) as mock_query:
+            assert service.get_master_key(7) == 'stored-key'
+            assert service.get_master_key(7) == 'stored-key'
+
+        assert mock_query.call_count == 1
+        stats = service.get_stats()
+        assert stats['derivations'] == 0
+        assert stats['avoided_derivations'] == 2
+
+    def test_unknown_user_is_derived_and_stored(self, service):
+        derived = ExpeditionEncryption().generate_user_master_key(7)
+
+        with patch.object(service, '_execute_query',
+                          side_effect=[None, (derived, CREATED, 1, True)]) as mock_query:
+            assert service.get_master_key(7) == derived
+
+        insert_query, insert_params = mock_query.call_args_list[1][0]
+        assert 'INSERT INTO user_master_keys' in insert_query
+        assert 'ON CONFLICT (owner_chat_id)' in insert_query
+        assert insert_params == (7, derived)
+        assert service.get_stats()['derivations'] == 1
+
+    def test_concurrently_stored_key_wins(self, service):
+        with patch.object(service, '_execute_query',
+                          side_effect=[None, ('other-key', CREATED, 2, False)]):
+            record = service.get_master_key_record(7)
+
+        assert record == {'master_key': 'other-key', 'created_at': CREATED, 'key_version': 2, 'created': False}
+        assert service.get_master_key(7) == 'other-key'
+
+    def test_record_touches_last_accessed(self, service):
+        with patch.object(service, '_execute_query', return_value=('stored-key', CREATED, 1)) as mock_query:
+            record = service.get_master_key_record(7)
+
+        assert 'SET last_accessed = CURRENT_TIMESTAMP' in mock_query.call_args[0][0]
+        assert record['created'] is False
+        assert service.encryption_service.master_keys.get(7) == 'stored-key'
+
+    def test_failed_insert(self, service):
+        with patch.object(service, '_execute_query', side_effect=[None, None]):
+            with pytest.raises(ServiceError):
+                service.get_master_key(7)
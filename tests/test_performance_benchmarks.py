@@ -21,7 +21,9 @@ Usage:
 """
 
 import pytest
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock, patch
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -29,9 +31,12 @@ from typing import List, Tuple
 
 # Import services
 from services.expedition_service import ExpeditionService
+from services.expedition_read_model_service import RECENT_CONSUMPTIONS_LIMIT
+from services.export_service import ExportService
 from services.product_repository import ProductRepository
 from services.user_service import UserService
 from services.sales_service import SalesService
+from utils.pagination import encode_cursor
 
 # Import models
 from models.expedition import ExpeditionStatus, PaymentStatus
@@ -475,6 +480,93 @@ class TestPhase4PaginationPerformance:
         assert time_paginated <= time_full
 
 
+# =============================================================================
+# Keyset Pagination Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+@pytest.mark.phase4
+class TestKeysetPaginationBenchmark:
+    """
+    Page 1 versus page 500 for the keyset-paginated list endpoints.
+
+    With OFFSET the database reads and discards (page - 1) * limit rows, so
+    page 500 costs ~500x page 1. With keyset cursors every page is an index
+    range scan of limit + 1 rows: the query and its parameters are the same
+    size for page 1 and page 500.
+    """
+
+    PAGE_SIZE = 50
+
+    def _walk_to_page(self, fetch_page, make_rows, target_page: int):
+        """Follow next_cursor from page 1 to target_page, returning per-page stats."""
+        cursor = None
+        stats = {}
+        for page_number in range(1, target_page + 1):
+            rows = make_rows(page_number)
+            with patch.object(fetch_page.__self__, '_execute_query', return_value=rows) as mock_query:
+                start_time = time.time()
+                page = fetch_page(limit=self.PAGE_SIZE, cursor=cursor)
+                elapsed = time.time() - start_time
+            if page_number in (1, target_page):
+                stats[page_number] = {
+                    'params': mock_query.call_args[0][1],
+                    'query': mock_query.call_args[0][0],
+                    'time': elapsed,
+                    'count': len(page.items)
+                }
+            cursor = page.next_cursor
+        return stats
+
+    def test_benchmark_products_page_1_vs_500(self):
+        """Products: page 500 must issue the same bounded query as page 1."""
+        repository = ProductRepository()
+
+        def make_rows(page_number):
+            base = (page_number - 1) * self.PAGE_SIZE
+            return [
+                (base + i, f'Product {base + i:06d}', '🧪', None, 10,
+                 Decimal('1.00'), Decimal('2.00'), Decimal('20.00'))
+                for i in range(1, self.PAGE_SIZE + 2)
+            ]
+
+        stats = self._walk_to_page(repository.get_products_with_stock_page, make_rows, 500)
+
+        print("\n=== Keyset Pagination: Products ===")
+        for page_number, metrics in stats.items():
+            print(f"Page {page_number:3d}: params={metrics['params']}, {metrics['time']:.5f}s")
+
+        assert 'OFFSET' not in stats[500]['query']
+        assert stats[1]['params'] == (self.PAGE_SIZE + 1,)
+        # Page 500 only adds the two cursor keys; nothing grows with depth
+        assert stats[500]['params'] == ('Product 024950', 24950, self.PAGE_SIZE + 1)
+        assert stats[500]['count'] == self.PAGE_SIZE
+
+    def test_benchmark_sales_page_1_vs_500(self):
+        """Sales: page 500 is an index range scan from the cursor, not OFFSET 24950."""
+        service = SalesService()
+        start = datetime(2024, 1, 1)
+        total = 500 * self.PAGE_SIZE + 1
+
+        def make_rows(page_number):
+            base = (page_number - 1) * self.PAGE_SIZE
+            return [
+                (total - (base + i), start + timedelta(minutes=total - (base + i)), 'Buyer',
+                 Decimal('10.00'), 'Pago', '🧪 Rum')
+                for i in range(self.PAGE_SIZE + 1)
+            ]
+
+        stats = self._walk_to_page(service.get_sales_with_details_page, make_rows, 500)
+
+        print("\n=== Keyset Pagination: Sales ===")
+        for page_number, metrics in stats.items():
+            print(f"Page {page_number:3d}: params={metrics['params']}, {metrics['time']:.5f}s")
+
+        assert 'OFFSET' not in stats[500]['query']
+        assert len(stats[500]['params']) == 3
+        assert stats[500]['params'][-1] == self.PAGE_SIZE + 1
+
+
 # =============================================================================
 # Phase 4: Pirate Names Detail Optimization Benchmark
 # =============================================================================
@@ -525,6 +617,1287 @@ class TestPhase4PirateNamesDetailBenchmark:
         assert query_improvement >= 10
 
 
+# =============================================================================
+# Report Query Engine Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestReportQueryEngineBenchmark:
+    """
+    Regression benchmark for HandlerBusinessService.generate_report.
+
+    Old approach: 1 query for sales + 2 per sale (sale + items reload)
+                  + 1 get_sale_items per sale + 1 product lookup per item
+    New approach: 1 joined query streamed into the report builder
+    """
+
+    SALES_COUNT = 2000
+
+    @pytest.fixture
+    def business_service(self):
+        """Create HandlerBusinessService with a mocked database manager."""
+        from services.handler_business_service import HandlerBusinessService
+        with patch('services.base_service.get_db_manager', return_value=Mock()):
+            yield HandlerBusinessService(None)
+
+    def generate_report_rows(self, sales_count: int) -> List[Tuple]:
+        """Generate one item row per sale for a single heavy buyer."""
+        start = datetime(2024, 1, 1)
+        return [
+            (
+                i,  # venda_id
+                'heavy_buyer',  # comprador
+                start + timedelta(minutes=i),  # data_venda
+                i % 20,  # produto_id
+                f'Product {i % 20}',  # produto_nome
+                2,  # quantidade
+                Decimal('15.00'),  # valor_unitario
+                Decimal('30.00'),  # sale_total
+                Decimal('0.00')  # sale_paid
+            )
+            for i in range(sales_count, 0, -1)
+        ]
+
+    @pytest.mark.parametrize("report_type", ["sales", "debts"])
+    def test_benchmark_report_2000_sales_single_query(self, business_service, report_type):
+        """A buyer with 2,000 sales must be reported with exactly one query."""
+        from models.handler_models import ReportRequest
+
+        mock_rows = self.generate_report_rows(self.SALES_COUNT)
+        old_queries = 1 + 2 * self.SALES_COUNT + self.SALES_COUNT + self.SALES_COUNT
+
+        with patch.object(business_service.report_query_service, '_stream_rows') as mock_query, \
+             patch.object(business_service, '_generate_csv_report', return_value=None):
+            mock_query.return_value = iter([mock_rows[i:i + 500] for i in range(0, len(mock_rows), 500)])
+
+            start_time = time.time()
+            response = business_service.generate_report(
+                ReportRequest(report_type=report_type, buyer_name='heavy_buyer')
+            )
+            execution_time = time.time() - start_time
+
+            metrics = PerformanceMetrics(f"Report {report_type} ({self.SALES_COUNT} sales)")
+            metrics.query_count = mock_query.call_count
+            metrics.execution_time = execution_time
+            metrics.result_size = len(response.report_data)
+            print(metrics)
+            print(f"  Old pattern: {old_queries} queries")
+
+        assert response.success
+        assert mock_query.call_count == 1, "Report must not issue per-sale queries"
+        assert len(response.report_data) == self.SALES_COUNT
+        assert execution_time < 1.0, "Report building should stay well under 1 second"
+
+
+# =============================================================================
+# Cash Ledger Concurrency Benchmark
+# =============================================================================
+
+class _SimulatedLedgerStore:
+    """
+    In-memory stand-in for CashTransactions/CashBalanceSnapshots.
+
+    Statements sleep briefly to simulate database latency, which widens the
+    window between reading a balance and writing a new one. Appends are
+    atomic (like an INSERT); nothing else is locked.
+    """
+
+    LATENCY = 0.0005
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deltas = []
+        self.snapshot = (Decimal('0.00'), 0)
+        self.legacy_balance = Decimal('0.00')
+
+    def _balance(self):
+        saldo, last_id = self.snapshot
+        return saldo + sum(self.deltas[last_id:], Decimal('0.00'))
+
+    def execute(self, query, params=None, fetch_one=False, fetch_all=False):
+        if 'INSERT INTO CashTransactions' in query:
+            base = self._balance()
+            time.sleep(self.LATENCY)
+            delta = params[-1]
+            with self.lock:
+                self.deltas.append(delta)
+                transaction_id = len(self.deltas)
+            return (transaction_id, params[0], params[1], params[2], params[3], params[4],
+                    params[5], base, base + delta, datetime.now())
+        return (len(self.deltas), self._balance(), datetime.now())
+
+    def create_snapshot(self):
+        with self.lock:  # Mirrors LOCK TABLE ... IN SHARE MODE
+            self.snapshot = (self._balance(), len(self.deltas))
+
+    def legacy_read_modify_write(self, delta):
+        """The previous _create_transaction: read balance, add in Python, write back."""
+        current = self.legacy_balance
+        time.sleep(self.LATENCY)
+        self.legacy_balance = current + delta
+
+
+@pytest.mark.performance
+class TestCashLedgerConcurrencyBenchmark:
+    """
+    50 parallel writers against the append-only ledger.
+
+    The legacy read-modify-write of CashBalance.saldo_atual loses updates as
+    soon as two writers interleave; appending deltas cannot.
+    """
+
+    WRITERS = 50
+    WRITES_PER_WRITER = 20
+
+    def _run_writers(self, write):
+        barrier = threading.Barrier(self.WRITERS)
+
+        def writer(writer_id):
+            barrier.wait()
+            for i in range(self.WRITES_PER_WRITER):
+                write(writer_id, i)
+
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.WRITERS) as executor:
+            list(executor.map(writer, range(self.WRITERS)))
+        return time.time() - start_time
+
+    def test_stress_50_writers_no_lost_updates(self):
+        """Final balance equals the sum of every write; throughput is reported."""
+        from services.cash_balance_service import CashBalanceService
+
+        store = _SimulatedLedgerStore()
+        service = CashBalanceService()
+        total_writes = self.WRITERS * self.WRITES_PER_WRITER
+
+        def ledger_write(writer_id, i):
+            if i % 2 == 0:
+                service.adjust_balance(Decimal('3.00'), f'w{writer_id}-{i}')
+            else:
+                service.add_expense(Decimal('1.00'), f'w{writer_id}-{i}')
+
+        with patch.object(service, '_execute_query', side_effect=store.execute), \
+             patch.object(service, 'create_snapshot', side_effect=store.create_snapshot) as mock_snapshot:
+            ledger_time = self._run_writers(ledger_write)
+            balance = service.get_current_balance()
+
+        expected = Decimal('2.00') * (total_writes // 2)
+
+        self._run_writers(
+            lambda writer_id, i: store.legacy_read_modify_write(Decimal('3.00') if i % 2 == 0 else Decimal('-1.00'))
+        )
+
+        print("\n=== Cash Ledger: 50 Parallel Writers ===")
+        print(f"Writes: {total_writes}")
+        print(f"Ledger:  balance={balance.saldo_atual} expected={expected} "
+              f"{ledger_time:.3f}s ({total_writes / ledger_time:,.0f} writes/sec)")
+        print(f"Legacy read-modify-write: balance={store.legacy_balance} "
+              f"(short by {expected - store.legacy_balance} from lost updates)")
+        print(f"Snapshots taken: {mock_snapshot.call_count}")
+
+        assert len(store.deltas) == total_writes
+        assert balance.saldo_atual == expected
+        assert mock_snapshot.call_count == total_writes // 500
+        # Sanity check that the harness actually races writers
+        assert store.legacy_balance != expected
+
+
+# =============================================================================
+# Bulk Consumption Benchmark
+# =============================================================================
+
+class _SimulatedConsumptionCursor:
+    """
+    Cursor stand-in for the consumption statements.
+
+    Each execute() sleeps LATENCY to stand in for one database round trip and
+    answers with rows shaped like the real statements return.
+    """
+
+    LATENCY = 0.0005
+
+    def __init__(self, items: int, pirates: int):
+        self.items = items
+        self.pirates = pirates
+        self.executes = 0
+        self._next_id = 1
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        time.sleep(self.LATENCY)
+        self.executes += 1
+        now = datetime.now()
+        if 'LEFT JOIN expedition_pirates' in query:
+            self._rows = [(1, 10_000, 0, 'active', 'owner-key', 1, 111)]
+        elif 'WITH item AS' in query:
+            self._rows = [(self._take_id(), 1, params[4], params[1], params[0], Decimal('5.00'),
+                           Decimal('5.00') * params[0], 'consumption', 'completed',
+                           now, None, now, None, now, now, self._take_id())]
+        elif 'FOR UPDATE OF ei' in query:
+            self._rows = [(i, 100 + i, 10_000, 0, f'Product {i}', 'active', 'owner-key', 111)
+                          for i in range(1, self.items + 1)]
+        elif 'pirate_name = ANY' in query:
+            self._rows = [(name, i) for i, name in enumerate(params[1], start=1)]
+        elif 'INSERT INTO expedition_assignments' in query:
+            self._rows = [(self._take_id(), ordinal) for ordinal in range(1, len(params[0]) + 1)]
+        elif 'INSERT INTO Vendas' in query:
+            self._rows = [(self._take_id(), params[i]) for i in range(0, len(params), 3)]
+        else:
+            self._rows = []
+
+    def _take_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+@pytest.mark.performance
+class TestBulkConsumptionBenchmark:
+    """
+    200 consumption rows: one consume_items_bulk call versus 200 consume_item calls.
+
+    consume_item costs two round trips, a connection checkout and a cache
+    invalidation per row. The bulk path pays a fixed number of statements and
+    one invalidation for the whole batch.
+    """
+
+    ROWS = 200
+    ITEMS = 10
+    PIRATES = 20
+
+    def _service(self, cursor):
+        service = ExpeditionService()
+        conn = Mock()
+        conn.cursor.return_value = cursor
+        service.db_manager = Mock()
+        service.db_manager.get_connection.return_value.__enter__ = Mock(return_value=conn)
+        service.db_manager.get_connection.return_value.__exit__ = Mock(return_value=False)
+        return service
+
+    def _requests(self):
+        from models.expedition import ItemConsumptionRequest
+        return [
+            ItemConsumptionRequest(
+                expedition_item_id=i % self.ITEMS + 1,
+                consumer_name=f'Buyer {i % self.PIRATES}',
+                pirate_name=f'Pirate {i % self.PIRATES}',
+                quantity_consumed=1,
+                unit_price=Decimal('5.00')
+            )
+            for i in range(self.ROWS)
+        ]
+
+    def test_benchmark_bulk_vs_single_calls(self):
+        """Bulk recording uses a constant number of round trips."""
+        requests = self._requests()
+
+        single_cursor = _SimulatedConsumptionCursor(self.ITEMS, self.PIRATES)
+        single_service = self._service(single_cursor)
+        with patch.object(single_service, '_invalidate_expedition_cache') as single_invalidate:
+            start_time = time.time()
+            for consumption in requests:
+                single_service.consume_item(consumption)
+            single_time = time.time() - start_time
+
+        bulk_cursor = _SimulatedConsumptionCursor(self.ITEMS, self.PIRATES)
+        bulk_service = self._service(bulk_cursor)
+        with patch.object(bulk_service, '_invalidate_expedition_cache') as bulk_invalidate:
+            start_time = time.time()
+            result = bulk_service.consume_items_bulk(1, requests)
+            bulk_time = time.time() - start_time
+
+        print(f"\n=== Bulk Consumption: {self.ROWS} rows ===")
+        print(f"Single calls: {single_cursor.executes} round trips, "
+              f"{single_service.db_manager.get_connection.call_count} connections, "
+              f"{single_invalidate.call_count} cache invalidations, {single_time:.4f}s")
+        print(f"Bulk call:    {bulk_cursor.executes} round trips, "
+              f"{bulk_service.db_manager.get_connection.call_count} connection, "
+              f"{bulk_invalidate.call_count} cache invalidation, {bulk_time:.4f}s")
+        print(f"Speedup: {single_time / bulk_time:.1f}x")
+
+        assert result.recorded_count == self.ROWS
+        assert single_cursor.executes == 2 * self.ROWS
+        assert bulk_cursor.executes == 6
+        assert bulk_invalidate.call_count == 1
+        assert bulk_time < single_time
+
+
+# =============================================================================
+# Expedition Read Model Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestExpeditionReadModelBenchmark:
+    """
+    Read path of /api/expeditions/<id> when served from the read model.
+
+    The document is assembled from one primary-key range of entries, with
+    consumptions capped to the recent window however large the expedition is;
+    what remains on the read path is the non-owner projection and model
+    conversion in Python, measured here for a full window.
+    """
+
+    ITEMS = 40
+    CONSUMPTIONS = RECENT_CONSUMPTIONS_LIMIT
+    REQUESTS = 200
+
+    def _document(self):
+        items = [
+            {'id': i, 'produto_id': 100 + i, 'product_name': f'Product {i}', 'product_emoji': '',
+             'quantity_needed': 100, 'unit_price': 5.0, 'quantity_consumed': 12,
+             'added_at': '2024-06-01T12:00:00', 'encrypted_product_name': None,
+             'original_product_name': f'Product {i}'}
+            for i in range(1, self.ITEMS + 1)
+        ]
+        consumptions = [
+            {'id': i, 'consumer_name': f'Pirate {i % 30}', 'pirate_name': f'Pirate {i % 30}',
+             'encrypted_identity': 'enc', 'product_name': f'Product {i % self.ITEMS + 1}', 'quantity': 1,
+             'unit_price': 5.0, 'total_price': 5.0, 'amount_paid': 0, 'payment_status': 'pending',
+             'consumed_at': '2024-06-01T12:30:00.123456', 'encrypted_product_name': None}
+            for i in range(1, self.CONSUMPTIONS + 1)
+        ]
+        return {
+            'expedition': {'id': 1, 'name': 'Tortuga', 'owner_chat_id': 111, 'status': 'active',
+                           'deadline': None, 'created_at': '2024-06-01T12:00:00', 'completed_at': None},
+            'items': items, 'consumptions': consumptions, 'pirates': [], 'progress': {}
+        }
+
+    def test_benchmark_read_model_p95(self):
+        """p95 of a non-owner read over a full consumption window stays in single-digit ms."""
+        import json
+        import statistics
+
+        service = ExpeditionService()
+        # psycopg2 decodes the JSONB column with json.loads on every read
+        document_json = json.dumps(self._document())
+        timings = []
+
+        with patch.object(service.read_model_service, '_execute_query',
+                          side_effect=lambda *args, **kwargs: (json.loads(document_json),)) as mock_query:
+            for _ in range(self.REQUESTS):
+                start_time = time.perf_counter()
+                response = service.get_expedition_response(1, requesting_chat_id=999)
+                timings.append(time.perf_counter() - start_time)
+
+        p95 = statistics.quantiles(timings, n=20)[18]
+
+        print(f"\n=== Expedition Read Model: {self.ITEMS} items, {self.CONSUMPTIONS} consumptions ===")
+        print(f"Queries per read: {mock_query.call_count // self.REQUESTS}")
+        print(f"p50: {statistics.median(timings) * 1000:.2f} ms, p95: {p95 * 1000:.2f} ms")
+
+        assert mock_query.call_count == self.REQUESTS
+        assert len(response.consumptions) == self.CONSUMPTIONS
+        assert p95 < 0.010
+
+
+# =============================================================================
+# Expedition Progress Summary Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestExpeditionProgressBenchmark:
+    """
+    /api/dashboard/analytics counters at 5,000 expeditions.
+
+    The previous endpoint pulled one aggregated row per expedition and looped
+    over them in Python, re-parsing the ISO dates the service had just
+    produced. The summary-backed version returns one row of FILTER aggregates.
+    """
+
+    EXPEDITIONS = 5_000
+
+    def _bulk_rows(self):
+        now = datetime.now()
+        statuses = ('active', 'completed', 'cancelled')
+        return [
+            (i, f'Expedition {i}', 111, statuses[i % 3], now - timedelta(days=i % 40 - 20),
+             now - timedelta(days=i % 60), now - timedelta(days=i % 20) if i % 3 == 1 else None,
+             5, 50, i % 51, Decimal(str(round((i % 51) * 2, 2))), Decimal('250.00'),
+             Decimal('5.00') * (i % 51), Decimal('250.00') - Decimal('5.00') * (i % 51), i % 3 == 0)
+            for i in range(1, self.EXPEDITIONS + 1)
+        ]
+
+    @staticmethod
+    def _legacy_counters(expedition_data_map):
+        """The per-expedition loop the analytics endpoint used to run."""
+        from models.expedition import ExpeditionResponse, ExpeditionStatus
+
+        counters = {'active': 0, 'completed': 0, 'cancelled': 0, 'overdue': 0, 'value': 0.0, 'buckets': {}}
+        current_time = datetime.now()
+        week_ago = current_time - timedelta(days=7)
+        for exp_data in expedition_data_map.values():
+            if exp_data['status'] in ('active', 'completed', 'cancelled'):
+                counters[exp_data['status']] += 1
+            deadline = datetime.fromisoformat(exp_data['deadline']) if exp_data.get('deadline') else None
+            if deadline and deadline < current_time and exp_data['status'] == 'active':
+                counters['overdue'] += 1
+            counters['value'] += exp_data['total_value']
+            category = ExpeditionResponse.categorize_progress(
+                ExpeditionStatus.from_string(exp_data['status']), exp_data['completion_percentage']
+            )
+            counters['buckets'][category] = counters['buckets'].get(category, 0) + 1
+            created_at = datetime.fromisoformat(exp_data['created_at']) if exp_data.get('created_at') else None
+            if created_at and created_at >= week_ago:
+                counters['created_this_week'] = counters.get('created_this_week', 0) + 1
+        return counters
+
+    def test_benchmark_analytics_5000_expeditions(self):
+        """One aggregate row replaces 5,000 rows and a Python loop."""
+        service = ExpeditionService()
+        rows = self._bulk_rows()
+
+        with patch.object(service, '_execute_query', return_value=rows):
+            start_time = time.time()
+            legacy = self._legacy_counters(service.get_all_expedition_responses_bulk())
+            legacy_time = time.time() - start_time
+
+        aggregate_row = (self.EXPEDITIONS, legacy['active'], legacy['completed'], legacy['cancelled'],
+                         legacy['overdue'], Decimal('0'), Decimal('0'), Decimal('0'), Decimal('0'),
+                         Decimal('0'), Decimal('0'), 0, 0, 0, 0, legacy['completed'], 0, 0, 0, 0)
+        with patch.object(service, '_execute_query', return_value=aggregate_row) as mock_query:
+            start_time = time.time()
+            analytics = service.get_dashboard_analytics()
+            summary_time = time.time() - start_time
+
+        print(f"\n=== Dashboard Analytics: {self.EXPEDITIONS} expeditions ===")
+        print(f"Legacy loop:     {len(rows)} rows fetched, {legacy_time:.4f}s in Python")
+        print(f"FILTER aggregate: 1 row fetched, {summary_time:.5f}s in Python")
+
+        assert mock_query.call_count == 1
+        assert analytics['overview']['total_expeditions'] == self.EXPEDITIONS
+        assert summary_time < legacy_time
+
+
+# =============================================================================
+# Deadline Scheduler Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestDeadlineSchedulerBenchmark:
+    """
+    Deadline alert ticks at 50,000 active expeditions with deadlines.
+
+    check_deadline_alerts used to fetch and classify every expedition on each
+    call; the scheduler only pops heap entries that are due.
+    """
+
+    EXPEDITIONS = 50_000
+
+    def test_benchmark_idle_and_due_ticks(self):
+        """A tick costs O(log n) per due alert instead of O(n)."""
+        from services.deadline_scheduler import DeadlineAlertScheduler, DEFAULT_ALERT_THRESHOLDS
+
+        now = datetime(2024, 6, 1, 12, 0)
+        rows = [(i, now + timedelta(days=3, minutes=i + 1), []) for i in range(self.EXPEDITIONS)]
+
+        # Legacy: classify every row on every tick
+        start_time = time.time()
+        thresholds = sorted(DEFAULT_ALERT_THRESHOLDS.items(), key=lambda item: item[1])
+        due = 0
+        for _, deadline, _ in rows:
+            time_remaining = deadline - now
+            if any(time_remaining <= lead for _, lead in thresholds):
+                due += 1
+        legacy_time = time.time() - start_time
+
+        scheduler = DeadlineAlertScheduler(clock=lambda: now)
+        with patch.object(scheduler, '_execute_query', return_value=rows):
+            scheduler.load(lambda *args: True)
+
+        with patch.object(scheduler, '_execute_query') as mock_query:
+            start_time = time.time()
+            scheduler.run_pending()
+            idle_time = time.time() - start_time
+        mock_query.assert_not_called()
+
+        # Ten alerts come due
+        scheduler._clock = lambda: now + timedelta(minutes=10)
+        with patch.object(scheduler, '_execute_query', return_value=[('info', 'Expedition')]):
+            start_time = time.time()
+            fired = scheduler.run_pending()
+            due_time = time.time() - start_time
+
+        print(f"\n=== Deadline Alerts: {self.EXPEDITIONS} expeditions ===")
+        print(f"Legacy full scan:   {legacy_time:.4f}s per tick ({due} due)")
+        print(f"Scheduler idle:     {idle_time:.6f}s per tick")
+        print(f"Scheduler 10 due:   {due_time:.6f}s ({fired} fired)")
+
+        assert fired == 10
+        assert idle_time < legacy_time
+
+
+# =============================================================================
+# Analytics Timeline Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestTimelineBucketingBenchmark:
+    """
+    get_timeline_visualization_data at 100,000 consumptions.
+
+    The previous implementation re-filtered the whole consumption list for
+    every bucket (O(buckets x consumptions)); the merge pass visits each
+    consumption and bucket once.
+    """
+
+    CONSUMPTIONS = 100_000
+
+    def _service_and_rows(self):
+        from services.analytics_service import AnalyticsService
+
+        created = datetime(2024, 1, 1)
+        expedition_service = Mock()
+        expedition_service.get_expedition_by_id.return_value = Mock(created_at=created)
+        # ~90 days of consumptions, one every ~78 seconds
+        rows = [
+            (created + timedelta(seconds=78 * (i + 1)), i % 5 + 1, Decimal('3.00'), f'Pirate {i % 250}')
+            for i in range(self.CONSUMPTIONS)
+        ]
+        return AnalyticsService(expedition_service), rows
+
+    def test_benchmark_bucketing_100k(self):
+        """Hourly, daily and weekly timelines in one pass each."""
+        service, rows = self._service_and_rows()
+
+        print(f"\n=== Timeline Bucketing: {self.CONSUMPTIONS} consumptions ===")
+        for granularity in ("hourly", "daily", "weekly"):
+            with patch.object(service, '_execute_query', return_value=rows):
+                start_time = time.time()
+                data = service.get_timeline_visualization_data(1, granularity)
+                elapsed = time.time() - start_time
+
+            timeline = data["timeline"]
+            assert sum(t["consumptions_count"] for t in timeline) == self.CONSUMPTIONS
+            print(f"{granularity:>7}: {len(timeline):5d} buckets in {elapsed:.3f}s")
+            assert elapsed < 2.0
+
+        # Legacy per-bucket filtering, daily only (hourly would be ~2,000 full scans)
+        buckets = service._generate_time_buckets(rows[0][0] - timedelta(seconds=78), rows[-1][0], "daily")
+        start_time = time.time()
+        for bucket_start, bucket_end in buckets:
+            [r for r in rows if bucket_start <= r[0] < bucket_end]
+        legacy_time = time.time() - start_time
+        print(f"Legacy daily filter: {len(buckets)} buckets in {legacy_time:.3f}s")
+
+
+# =============================================================================
+# Expedition Search Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestExpeditionSearchBenchmark:
+    """
+    Expedition name search at 100,000 expeditions.
+
+    Models the two plans in Python: the old ILIKE search scanned every name
+    twice (page query and count query) and skipped OFFSET rows, while the
+    trigram plan intersects GIN-style posting lists, rechecks candidates and
+    takes a keyset page; the total is only counted for the first page.
+    """
+
+    EXPEDITIONS = 100_000
+
+    @staticmethod
+    def _trigrams(text):
+        padded = f"  {text.lower()} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def test_benchmark_search_100k(self):
+        import bisect
+        import random
+        from collections import defaultdict
+
+        rng = random.Random(7)
+        words = ['Tortuga', 'Kraken', 'Maré', 'Rum', 'Ouro', 'Coral', 'Nevoa', 'Sirena', 'Corsario', 'Baia']
+        names = [f"{rng.choice(words)} {rng.choice(words)} {i}" for i in range(self.EXPEDITIONS)]
+        query, limit, deep_offset = 'kraken sir', 50, 500
+
+        # Old plan: full scan for the page, full scan again for the count, OFFSET skip
+        start_time = time.time()
+        matches = [i for i, name in enumerate(names) if query in name.lower()]
+        page = sorted(matches, reverse=True)[deep_offset:deep_offset + limit]
+        total = len([i for i, name in enumerate(names) if query in name.lower()])
+        legacy_time = time.time() - start_time
+
+        # Trigram plan: posting-list intersection, recheck, keyset page
+        index = defaultdict(set)
+        for i, name in enumerate(names):
+            for gram in self._trigrams(name):
+                index[gram].add(i)
+        needed = self._trigrams(query) - {f"  {query[0]}", f"{query[-2:]} "}
+
+        start_time = time.time()
+        postings = sorted((index.get(gram, set()) for gram in needed), key=len)
+        candidates = set.intersection(*postings) if postings else set(range(len(names)))
+        trigram_matches = sorted(i for i in candidates if query in names[i].lower())
+        trigram_total = len(trigram_matches)
+        cursor_id = sorted(trigram_matches, reverse=True)[deep_offset - 1]
+        position = bisect.bisect_left(trigram_matches, cursor_id)
+        trigram_page = trigram_matches[max(0, position - limit):position][::-1]
+        trigram_time = time.time() - start_time
+
+        service = ExportService()
+        with patch.object(service, '_execute_query', return_value=[]) as mock_query:
+            service.search_expeditions(search_query=query, sort_by='id', limit=limit,
+                                       cursor=encode_cursor(cursor_id, cursor_id))
+
+        print(f"\n=== Expedition Search: {self.EXPEDITIONS} expeditions, {total} matches ===")
+        print(f"ILIKE scan + count + OFFSET: {2 * self.EXPEDITIONS} rows scanned, 2 queries, {legacy_time:.4f}s")
+        print(f"Trigram + keyset page:       {len(candidates)} candidates, {mock_query.call_count} query, {trigram_time:.4f}s")
+
+        assert trigram_total == total
+        assert trigram_page == page
+        assert mock_query.call_count == 1
+        assert trigram_time < legacy_time
+
+
+# =============================================================================
+# Cipher Cache Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestCipherCacheBenchmark:
+    """
+    Decrypting 10,000 pirate identities with one owner key.
+
+    The legacy path decoded and sliced the owner key, built a new
+    Cipher(AES, GCM) and formatted an INFO log line for every record; the
+    cached path reuses one prepared AESGCM per owner key.
+    """
+
+    IDENTITIES = 10_000
+
+    @staticmethod
+    def _legacy_decrypt(encrypted_mapping, owner_key, logger):
+        import base64
+        import json
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        key = base64.urlsafe_b64decode(owner_key.encode('utf-8'))[32:64]
+        encrypted_data = base64.urlsafe_b64decode(encrypted_mapping.encode('utf-8'))
+        nonce, tag, ciphertext = encrypted_data[:12], encrypted_data[12:28], encrypted_data[28:]
+        decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag)).decryptor()
+        mapping_data = json.loads((decryptor.update(ciphertext) + decryptor.finalize()).decode('utf-8'))
+        logger.info(f"Decrypted name mapping for expedition {mapping_data['expedition_id']}")
+        return mapping_data
+
+    def test_benchmark_decrypt_10k_identities(self):
+        import logging
+        from utils.encryption import ExpeditionEncryption
+
+        encryption = ExpeditionEncryption()
+        owner_key = encryption.generate_user_master_key(123)
+        identities = [
+            encryption.encrypt_name_mapping(i % 50, {f'Buyer {i}': f'Pirate {i}'}, owner_key)
+            for i in range(self.IDENTITIES)
+        ]
+        logger = logging.getLogger("legacy_decrypt")
+
+        legacy_time = min(
+            self._timed(lambda: [self._legacy_decrypt(v, owner_key, logger) for v in identities])
+            for _ in range(3)
+        )
+        cached_time = min(
+            self._timed(lambda: [encryption.decrypt_name_mapping(v, owner_key) for v in identities])
+            for _ in range(3)
+        )
+
+        stats = encryption.get_stats()
+        print(f"\n=== Decrypt {self.IDENTITIES} identities ===")
+        print(f"Cipher per record: {self.IDENTITIES / legacy_time:,.0f} decrypts/sec ({legacy_time:.4f}s)")
+        print(f"Cached AESGCM:     {self.IDENTITIES / cached_time:,.0f} decrypts/sec ({cached_time:.4f}s)")
+        print(f"Key parses: {stats['cipher_cache']['misses']}, cache hits: {stats['cipher_cache']['hits']}")
+
+        assert stats['cipher_cache']['misses'] == 1
+        assert stats['operations']['decrypt_failures'] == 0
+        assert cached_time < legacy_time
+
+    @staticmethod
+    def _timed(func):
+        start_time = time.time()
+        func()
+        return time.time() - start_time
+
+
+# =============================================================================
+# Bulk Decryption Benchmark
+# =============================================================================
+
+class _SimulatedNamedCursor:
+    """Server-side cursor over in-memory rows that records how far it has read."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetched = 0
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params):
+        pass
+
+    def fetchmany(self, size):
+        chunk = self.rows[self.fetched:self.fetched + size]
+        self.fetched += len(chunk)
+        return chunk
+
+
+@pytest.mark.performance
+class TestBulkDecryptionBenchmark:
+    """
+    decrypt-all for an owner with 20,000 pirate identities.
+
+    The legacy path fetched every row, decrypted them one by one and only then
+    serialized the whole response. The streaming path reads chunks from a
+    server-side cursor, decrypts them on a pool and emits JSON as it goes, so
+    the first bytes leave after one chunk and memory is bounded by the chunks
+    in flight.
+    """
+
+    IDENTITIES = 20_000
+
+    def test_benchmark_decrypt_all_20k(self):
+        import json
+        from services.bulk_decryption_service import BulkDecryptionService, DECRYPT_CHUNK_SIZE
+        from utils.encryption import get_encryption_service
+
+        encryption = get_encryption_service()
+        owner_key = encryption.generate_user_master_key(321)
+        rows = [
+            (f'Pirate {i}', encryption.encrypt_name_mapping(i % 40, {f'Buyer {i}': f'Pirate {i}'}, owner_key))
+            for i in range(self.IDENTITIES)
+        ]
+
+        # Legacy: materialize, decrypt sequentially, scan each mapping, serialize at the end
+        start_time = time.time()
+        fetched = list(rows)
+        legacy_mappings = {}
+        for pirate_name, encrypted_identity in fetched:
+            decrypted = encryption.decrypt_name_mapping(encrypted_identity, owner_key)
+            for original, pirate in decrypted['mapping'].items():
+                if pirate == pirate_name:
+                    legacy_mappings[pirate_name] = original
+                    break
+        legacy_body = json.dumps({"pirate_mappings": legacy_mappings})
+        legacy_time = time.time() - start_time
+
+        service = BulkDecryptionService(workers=4)
+        cursors = []
+
+        def named_cursor(name=None):
+            cursor = _SimulatedNamedCursor(rows if not cursors else [])
+            cursors.append(cursor)
+            return cursor
+
+        conn = Mock()
+        conn.cursor.side_effect = named_cursor
+        service.db_manager = Mock()
+        service.db_manager.get_connection.return_value.__enter__ = Mock(return_value=conn)
+        service.db_manager.get_connection.return_value.__exit__ = Mock(return_value=False)
+
+        start_time = time.time()
+        stream = service.stream_decrypt_all_json(321, owner_key)
+        fragments = [next(stream), next(stream), next(stream)]
+        first_bytes_time = time.time() - start_time
+        rows_read_at_first_bytes = cursors[0].fetched
+        fragments.extend(stream)
+        streaming_time = time.time() - start_time
+
+        body = json.loads(''.join(fragments))
+        stats = body['decryption_stats']['pirates']
+
+        print(f"\n=== decrypt-all: {self.IDENTITIES} pirate identities ===")
+        print(f"Legacy (materialize + sequential): {self.IDENTITIES / legacy_time:,.0f} rows/s, "
+              f"first byte after {legacy_time:.3f}s, {len(legacy_body):,} bytes built in memory")
+        print(f"Streaming (chunks of {DECRYPT_CHUNK_SIZE}, 4 workers): {stats['rows_per_second']:,.0f} rows/s, "
+              f"first bytes after {first_bytes_time:.3f}s ({rows_read_at_first_bytes} rows read), "
+              f"{len(fragments)} fragments, total {streaming_time:.3f}s")
+
+        assert body['success'] is True
+        assert body['pirate_mappings'] == legacy_mappings
+        assert stats['failed'] == 0
+        assert rows_read_at_first_bytes <= 2 * 4 * DECRYPT_CHUNK_SIZE
+        assert first_bytes_time < legacy_time
+
+
+@pytest.mark.performance
+class TestBramblerEnvelopeBenchmark:
+    """
+    Encrypting and decrypting an expedition's names with BramblerEncryption.
+
+    The legacy path ran PBKDF2 (100k iterations) for every value; the envelope
+    path runs it once per owner per session and encrypts each value with the
+    expedition's data key.
+    """
+
+    LEGACY_VALUES = 10
+    ENVELOPE_VALUES = 5_000
+
+    def test_benchmark_envelope_throughput(self):
+        import base64
+        from utils.encryption import BramblerEncryption, EnvelopeKeyring, SecureKeyManager
+
+        key_manager = SecureKeyManager()
+        password = 'expedition-key'
+
+        start_time = time.time()
+        for i in range(self.LEGACY_VALUES):
+            salt = key_manager.generate_salt()
+            fernet = key_manager.generate_fernet_key(key_manager.derive_key_from_password(password, salt))
+            base64.b64encode(fernet.encrypt(f'Name {i}'.encode('utf-8')))
+        legacy_rate = self.LEGACY_VALUES / (time.time() - start_time)
+
+        brambler = BramblerEncryption(keyring=EnvelopeKeyring())
+        start_time = time.time()
+        values = [brambler.encrypt_single_value(f'Name {i}', password, scope=42)
+                  for i in range(self.ENVELOPE_VALUES)]
+        encrypt_rate = self.ENVELOPE_VALUES / (time.time() - start_time)
+
+        # A fresh session pays one PBKDF2 and one unwrap, then decrypts at AEAD speed
+        reader = BramblerEncryption(keyring=EnvelopeKeyring())
+        start_time = time.time()
+        decrypted = [reader.decrypt_single_value(data, salt, password) for data, salt in values]
+        decrypt_rate = self.ENVELOPE_VALUES / (time.time() - start_time)
+
+        print(f"\n=== BramblerEncryption throughput ===")
+        print(f"Legacy (PBKDF2 per value): {legacy_rate:,.1f} values/sec")
+        print(f"Envelope encrypt:          {encrypt_rate:,.0f} values/sec ({self.ENVELOPE_VALUES} values)")
+        print(f"Envelope decrypt:          {decrypt_rate:,.0f} values/sec (new session)")
+        print(f"KDF runs: {brambler.keyring.get_stats()['kdf_runs']} encrypt, "
+              f"{reader.keyring.get_stats()['kdf_runs']} decrypt")
+
+        assert decrypted == [f'Name {i}' for i in range(self.ENVELOPE_VALUES)]
+        assert brambler.keyring.get_stats()['kdf_runs'] == 1
+        assert reader.keyring.get_stats()['kdf_runs'] == 1
+        assert encrypt_rate > 10 * legacy_rate
+        assert decrypt_rate > 10 * legacy_rate
+
+
+
+@pytest.mark.performance
+class TestMasterKeyMemoBenchmark:
+    """
+    Resolving owner keys on request paths (generate_owner_key fallbacks).
+
+    The legacy path ran PBKDF2 (100k iterations) on every call; the memo runs
+    it once per chat_id and reports the time saved.
+    """
+
+    CALLS = 20
+
+    def test_benchmark_owner_key_lookups(self):
+        from utils.encryption import ExpeditionEncryption, MasterKeyCache
+
+        legacy = ExpeditionEncryption(master_key_cache=MasterKeyCache(ttl_seconds=0))
+        start_time = time.time()
+        for expedition_id in range(self.CALLS):
+            legacy.generate_owner_key(expedition_id, 1)
+        legacy_time = time.time() - start_time
+
+        memoized = ExpeditionEncryption()
+        start_time = time.time()
+        for expedition_id in range(self.CALLS):
+            memoized.generate_owner_key(expedition_id, 1)
+        memo_time = time.time() - start_time
+
+        stats = memoized.get_stats()['master_keys']
+        print(f"\n=== {self.CALLS} owner key lookups ===")
+        print(f"PBKDF2 per call: {legacy_time:.3f}s")
+        print(f"Memoized:        {memo_time:.3f}s ({stats['derivations']} derivation, "
+              f"{stats['mean_derivation_ms']:.1f}ms each)")
+        print(f"Reported time saved: {stats['time_saved_seconds']:.3f}s")
+
+        assert legacy.get_stats()['master_keys']['derivations'] == self.CALLS
+        assert stats['derivations'] == 1
+        assert stats['avoided_derivations'] == self.CALLS - 1
+        assert memo_time < legacy_time / 5
+
+
+@pytest.mark.performance
+class TestCiphertextV2Benchmark:
+    """
+    Storage and decrypt throughput of 10,000 pirate identities, v1 vs v2.
+
+    Version 1 is urlsafe base64 of AES-GCM over a JSON document; version 2 is
+    raw bytes over a packed payload. Storage is the win; decrypts are bound by
+    AES-GCM, so v2 only has to keep up with v1.
+    """
+
+    IDENTITIES = 10_000
+
+    def test_benchmark_v1_vs_v2(self):
+        from utils.encryption import ExpeditionEncryption
+
+        encryption = ExpeditionEncryption()
+        owner_key = encryption.generate_user_master_key(456)
+        v1_values = [
+            encryption.encrypt_name_mapping(i % 50, {f'Buyer {i}': f'Pirate {i}'}, owner_key)
+            for i in range(self.IDENTITIES)
+        ]
+        v2_values = [encryption.convert_to_v2(value, owner_key) for value in v1_values]
+
+        v1_bytes = sum(len(value) for value in v1_values)
+        v2_bytes = sum(len(value) for value in v2_values)
+
+        v1_time = min(
+            self._timed(lambda: [encryption.decrypt_name_mapping(v, owner_key) for v in v1_values])
+            for _ in range(5)
+        )
+        v2_time = min(
+            self._timed(lambda: [encryption.decrypt_name_mapping(v, owner_key) for v in v2_values])
+            for _ in range(5)
+        )
+
+        print(f"\n=== {self.IDENTITIES} pirate identities: v1 vs v2 ===")
+        print(f"Storage: v1 {v1_bytes:,} bytes ({v1_bytes / self.IDENTITIES:.0f}/row), "
+              f"v2 {v2_bytes:,} bytes ({v2_bytes / self.IDENTITIES:.0f}/row), "
+              f"{100 * (v1_bytes - v2_bytes) / v1_bytes:.1f}% saved")
+        print(f"Decrypt: v1 {self.IDENTITIES / v1_time:,.0f}/sec, v2 {self.IDENTITIES / v2_time:,.0f}/sec")
+
+        assert v2_bytes < v1_bytes / 2
+        assert v2_time < v1_time * 1.25
+        assert encryption.get_stats()['operations']['decrypt_failures'] == 0
+
+    @staticmethod
+    def _timed(func):
+        start_time = time.time()
+        func()
+        return time.time() - start_time
+
+
+# =============================================================================
+# Bulk Pirate Creation Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestBulkPirateCreationBenchmark:
+    """
+    Creating pirates for 500 buyers: per-buyer statements versus the bulk path.
+
+    The per-buyer loop paid an existence check and an INSERT (two round trips)
+    and a cipher lease per buyer. The bulk path loads the expedition once,
+    encrypts in one pass and writes every row with one INSERT.
+    """
+
+    BUYERS = 500
+    LATENCY = 0.0005
+
+    def _database(self):
+        calls = []
+
+        def execute_query(query, params=(), fetch_one=False, fetch_all=False):
+            time.sleep(self.LATENCY)
+            calls.append(query)
+            if 'INSERT INTO expedition_pirates' in query:
+                rows = [(i, params[i + 1]) for i in range(0, len(params), 5)]
+                return rows[0] if fetch_one else rows
+            return [] if fetch_all else None
+
+        return execute_query, calls
+
+    def test_benchmark_500_buyers(self):
+        from services.brambler_service import BramblerService
+        from utils.encryption import get_encryption_service
+
+        encryption = get_encryption_service()
+        owner_key = encryption.generate_user_master_key(654)
+        buyers = [f'Buyer {i}' for i in range(self.BUYERS)]
+
+        legacy = BramblerService()
+        legacy._execute_query, legacy_calls = self._database()
+        start_time = time.time()
+        for buyer in buyers:
+            if legacy.get_pirate_name(1, buyer):
+                continue
+            pirate_name = legacy._generate_deterministic_pirate_name(buyer)
+            identity = encryption.encrypt_name_mapping_v2(1, {buyer: pirate_name}, owner_key)
+            legacy._execute_query(
+                "INSERT INTO expedition_pirates (original_name, pirate_name, expedition_id, "
+                "encrypted_identity, encrypted_identity_v2) VALUES (%s, %s, %s, %s, %s) RETURNING id",
+                (None, pirate_name, 1, None, identity), fetch_one=True
+            )
+        legacy_time = time.time() - start_time
+
+        bulk = BramblerService()
+        bulk._execute_query, bulk_calls = self._database()
+        start_time = time.time()
+        pirates = bulk.generate_pirate_names(1, buyers, owner_key=owner_key)
+        bulk_time = time.time() - start_time
+
+        print(f"\n=== Pirate creation: {self.BUYERS} buyers ===")
+        print(f"Per buyer: {len(legacy_calls)} round trips, {legacy_time:.4f}s")
+        print(f"Bulk:      {len(bulk_calls)} round trips, {bulk_time:.4f}s")
+        print(f"Speedup: {legacy_time / bulk_time:.1f}x")
+
+        assert len(pirates) == self.BUYERS
+        assert len({p.pirate_name for p in pirates}) == self.BUYERS
+        assert len(legacy_calls) == 2 * self.BUYERS
+        assert len(bulk_calls) == 2
+        assert bulk_time < legacy_time / 2
+
+
+# =============================================================================
+# Pirate Name Allocator Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestPirateNameAllocatorBenchmark:
+    """
+    Allocating 1,000 names with 90% of the name space already used.
+
+    The legacy loop drew random candidates and ran a uniqueness SELECT for each
+    free-looking one, giving up after 100 draws. The allocator loads the used
+    names into a bitmap once (one reverse lookup per stored name) and never
+    queries again.
+    """
+
+    NAMES = 1000
+    USED_FRACTION = 0.9
+    LATENCY = 0.0005
+
+    def test_benchmark_allocator_vs_retry_loop(self):
+        import random
+        from services.expedition_utilities_service import ExpeditionUtilitiesService
+        from utils.pirate_name_allocator import PirateNameAllocator
+
+        space = ExpeditionUtilitiesService.PIRATE_NAME_SPACE
+        rng = random.Random(11)
+        used = {space.name_at(index) for index in rng.sample(range(space.size), int(space.size * self.USED_FRACTION))}
+
+        legacy_used = set(used)
+        legacy_queries = 0
+        legacy_draws = 0
+        start_time = time.time()
+        for _ in range(self.NAMES):
+            for attempt in range(100):
+                legacy_draws += 1
+                candidate = space.name_at(rng.randrange(space.size))
+                if candidate in legacy_used:
+                    continue
+                time.sleep(self.LATENCY)
+                legacy_queries += 1
+                legacy_used.add(candidate)
+                break
+        legacy_time = time.time() - start_time
+
+        start_time = time.time()
+        allocator = PirateNameAllocator(space, used, rng=rng)
+        load_time = time.time() - start_time
+        start_time = time.time()
+        names = [allocator.allocate() for _ in range(self.NAMES)]
+        allocate_time = time.time() - start_time
+
+        stats = allocator.get_stats()
+        print(f"\n=== {self.NAMES} pirate names, {space.size:,} name space, "
+              f"{self.USED_FRACTION:.0%} used ===")
+        print(f"Retry loop: {legacy_draws:,} draws, {legacy_queries} uniqueness queries, {legacy_time:.4f}s")
+        print(f"Allocator:  load {load_time:.4f}s ({stats['bitmap_bytes']:,} byte bitmap), "
+              f"allocate {allocate_time:.4f}s, 0 queries")
+
+        assert len(set(names)) == self.NAMES
+        assert not used & set(names)
+        assert stats['fallbacks'] == 0
+        assert allocate_time < legacy_time / 5
+
+# =============================================================================
+# Brambler Console Listing Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestBramblerConsoleListingBenchmark:
+    """
+    One owner's first page and total on the brambler console.
+
+    Without server-side filters the console pulled every page (ciphertext
+    included) to filter by owner and count client-side. With filters in SQL
+    it reads one page without ciphertexts, and the total is a sum over one
+    pirate_count counter per expedition.
+    """
+
+    EXPEDITIONS = 1000
+    PIRATES_PER_EXPEDITION = 50
+    PAGE_SIZE = 100
+
+    def test_benchmark_filtered_page_vs_client_side_scan(self):
+        from datetime import datetime
+        from services.brambler_service import BramblerService
+
+        joined = datetime(2024, 1, 1)
+        ciphertext = 'x' * 180
+        pirates = [
+            (expedition_id * 1000 + i, f'Pirate {i}', None, expedition_id, ciphertext,
+             'Exp', expedition_id % 20, joined)
+            for expedition_id in range(self.EXPEDITIONS, 0, -1)
+            for i in range(self.PIRATES_PER_EXPEDITION, 0, -1)
+        ]
+        counters = {expedition_id: (expedition_id % 20, self.PIRATES_PER_EXPEDITION)
+                    for expedition_id in range(1, self.EXPEDITIONS + 1)}
+        owner = 7
+
+        # Client-side: every page is converted and shipped, then filtered and counted
+        start_time = time.time()
+        scanned = [BramblerService._pirate_row_to_dict(row) for row in pirates]
+        owned = [pirate for pirate in scanned if pirate['owner_chat_id'] == owner]
+        legacy_page, legacy_total = owned[:self.PAGE_SIZE], len(owned)
+        legacy_bytes = sum(len(pirate['encrypted_identity']) for pirate in scanned)
+        legacy_time = time.time() - start_time
+
+        # Server-side: the database hands back one filtered page and the counter sum
+        owner_rows = [row[:4] + (None,) + row[5:] for row in pirates if row[6] == owner]
+        start_time = time.time()
+        page = [BramblerService._pirate_row_to_dict(row) for row in owner_rows[:self.PAGE_SIZE]]
+        total = sum(count for owner_chat_id, count in counters.values() if owner_chat_id == owner)
+        new_time = time.time() - start_time
+
+        print(f"\n=== Brambler console, {len(pirates):,} pirates, page of {self.PAGE_SIZE} ===")
+        print(f"Client-side scan: {len(scanned):,} rows converted, {legacy_bytes:,} ciphertext bytes, "
+              f"{legacy_time:.4f}s")
+        print(f"Server-side page: {len(page)} rows converted, 0 ciphertext bytes, "
+              f"{len(counters):,} counters summed, {new_time:.4f}s")
+
+        assert [pirate['id'] for pirate in page] == [pirate['id'] for pirate in legacy_page]
+        assert total == legacy_total
+        assert new_time < legacy_time / 5
+
+# =============================================================================
+# Brambler Pirate Stats Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestPirateStatsReadModelBenchmark:
+    """
+    Pirate stats for one expedition: fan-out GROUP BY vs the read model.
+
+    LEFT JOINing assignments and payments in one GROUP BY builds
+    assignments x payments rows per pirate and sums each side once per row of
+    the other. The read model keeps one pre-aggregated row per pirate.
+    """
+
+    PIRATES = 200
+    ASSIGNMENTS = 30
+    PAYMENTS = 10
+
+    def test_benchmark_fan_out_vs_read_model(self):
+        assignments = {pirate: [(3, 12.5)] * self.ASSIGNMENTS for pirate in range(self.PIRATES)}
+        payments = {pirate: [10.0] * self.PAYMENTS for pirate in range(self.PIRATES)}
+
+        # Fan-out: every assignment row is joined with every payment row
+        start_time = time.time()
+        joined_rows = 0
+        fan_out = {}
+        for pirate in range(self.PIRATES):
+            spent = paid = 0.0
+            for _, cost in assignments[pirate]:
+                for amount in payments[pirate]:
+                    joined_rows += 1
+                    spent += cost
+                    paid += amount
+            fan_out[pirate] = (spent, paid)
+        fan_out_time = time.time() - start_time
+
+        # Read model: aggregates kept per pirate, read as one row each
+        read_model = {
+            pirate: (sum(cost for _, cost in assignments[pirate]), sum(payments[pirate]))
+            for pirate in range(self.PIRATES)
+        }
+        start_time = time.time()
+        served = {pirate: read_model[pirate] for pirate in range(self.PIRATES)}
+        read_time = time.time() - start_time
+
+        expected = (self.ASSIGNMENTS * 12.5, self.PAYMENTS * 10.0)
+        print(f"\n=== Pirate stats, {self.PIRATES} pirates x {self.ASSIGNMENTS} assignments "
+              f"x {self.PAYMENTS} payments ===")
+        print(f"Fan-out GROUP BY: {joined_rows:,} joined rows, {fan_out_time:.4f}s, "
+              f"spent/paid per pirate {fan_out[0]} (expected {expected})")
+        print(f"Read model:       {len(served)} rows, {read_time:.4f}s, spent/paid per pirate {served[0]}")
+
+        assert served[0] == expected
+        assert fan_out[0] == (expected[0] * self.PAYMENTS, expected[1] * self.ASSIGNMENTS)
+        assert joined_rows == self.PIRATES * self.ASSIGNMENTS * self.PAYMENTS
+
+# =============================================================================
+# Batch Migration Runner Benchmark
+# =============================================================================
+
+@pytest.mark.performance
+class TestBatchMigrationBenchmark:
+    """
+    Encrypting 2,000 plain-text pirate names.
+
+    The legacy scripts ran one UPDATE and one commit per pirate. The runner
+    reads 500 rows per batch, encrypts them in a worker pool and writes each
+    batch with one UPDATE ... FROM (VALUES ...) plus its checkpoint.
+    """
+
+    PIRATES = 2000
+    BATCH_SIZE = 500
+    LATENCY = 0.0005
+
+    def test_benchmark_batched_runner_vs_row_updates(self):
+        from unittest.mock import MagicMock
+        from services.batch_migration_service import BatchMigrationService, PirateEncryptionMigration
+        from utils.encryption import get_encryption_service
+
+        encryption = get_encryption_service()
+        owner_key = encryption.generate_user_master_key(4242)
+        pirates = [(i, 1, f'Buyer {i}', f'Pirate {i}', False, owner_key) for i in range(1, self.PIRATES + 1)]
+
+        # Legacy: encrypt, UPDATE and commit one pirate at a time
+        legacy_statements = 0
+        start_time = time.time()
+        for pirate_id, expedition_id, original_name, pirate_name, _, key in pirates:
+            encryption.encrypt_name_mapping(expedition_id, {original_name: pirate_name}, key)
+            time.sleep(self.LATENCY * 2)
+            legacy_statements += 2
+        legacy_time = time.time() - start_time
+
+        # Runner: one read, one UPDATE and one checkpoint + commit per batch
+        statements = []
+        cursor = MagicMock()
+
+        def execute(query, params=()):
+            statements.append(query)
+            time.sleep(self.LATENCY)
+            if 'FROM expedition_pirates ep' in query:
+                after_key, limit = params
+                cursor.fetchall.return_value = [row for row in pirates if row[0] > after_key][:limit]
+            elif 'UPDATE expedition_pirates' in query:
+                cursor.fetchall.return_value = [(params[i],) for i in range(0, len(params), 3)]
+        cursor.execute.side_effect = execute
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+        service = BatchMigrationService()
+        service.db_manager = MagicMock()
+        service.db_manager.get_connection.return_value.__enter__.return_value = conn
+        service._execute_query = MagicMock(return_value=None)
+
+        report = service.run(PirateEncryptionMigration(), batch_size=self.BATCH_SIZE, workers=4)
+
+        print(f"\n=== Encrypting {self.PIRATES} pirate names ===")
+        print(f"Row-by-row: {legacy_statements} statements, {legacy_time:.4f}s "
+              f"({self.PIRATES / legacy_time:,.0f} rows/sec)")
+        print(f"Runner:     {len(statements)} statements in {report.batches} batches, "
+              f"{report.elapsed_seconds:.4f}s ({report.rows_per_second:,.0f} rows/sec)")
+
+        assert report.written == self.PIRATES
+        assert len(statements) < legacy_statements / 100
+        assert report.elapsed_seconds < legacy_time
+
 # =============================================================================
 # Summary Benchmark Report
 # =============================================================================
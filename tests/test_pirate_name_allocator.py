@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Pirate Name Allocator Tests
+
+Covers PirateNameSpace and PirateNameAllocator:
+- Every index of the space builds a name that maps back to it
+- The allocator walks the whole space once, skipping used names
+- Names spelled by two patterns are only handed out once
+- Numbered names are used once the space is exhausted
+- The services load used names once and retry names lost to conflicts
+"""
+
+import random
+
+import pytest
+from unittest.mock import patch
+
+from services.brambler_service import BramblerService
+from services.expedition_utilities_service import ExpeditionUtilitiesService
+from utils.pirate_name_allocator import PirateNameAllocator, PirateNameSpace
+
+
+@pytest.fixture
+def space():
+    return PirateNameSpace(
+        ["{adjective} {name}", "{name} {title}", "{name} the {adjective}"],
+        {'adjective': ['Bold', 'Mad'], 'name': ['Kraken', 'Eel'], 'title': ['the Bold', 'of the Seas']}
+    )
+
+
+class TestPirateNameSpace:
+    """Test numbering and reverse lookups."""
+
+    def test_size_counts_only_used_components(self, space):
+        assert space.size == 4 + 4 + 4
+
+    def test_indices_round_trip(self, space):
+        for index in range(space.size):
+            assert index in space.indices_of(space.name_at(index))
+
+    def test_aliases_and_unknown_names(self, space):
+        assert len(space.indices_of('Kraken the Bold')) == 2
+        assert space.indices_of('Captain Hook') == []
+
+    def test_repeated_component_is_rejected(self):
+        with pytest.raises(ValueError):
+            PirateNameSpace(["{name} {name}"], {'name': ['Eel']})
+
+
+class TestPirateNameAllocator:
+    """Test allocation order, used names and exhaustion."""
+
+    def test_allocates_every_distinct_name_once(self, space):
+        allocator = PirateNameAllocator(space, rng=random.Random(7))
+        distinct = {space.name_at(index) for index in range(space.size)}
+
+        names = [allocator.allocate() for _ in range(len(distinct))]
+
+        assert set(names) == distinct
+        assert allocator.remaining == 0
+
+    def test_used_names_are_skipped(self, space):
+        allocator = PirateNameAllocator(space, ['Bold Kraken', 'Kraken the Bold', 'Custom Name'],
+                                        rng=random.Random(7))
+
+        names = [allocator.allocate() for _ in range(8)]
+
+        assert 'Bold Kraken' not in names
+        assert 'Kraken the Bold' not in names
+        assert len(set(names)) == 8
+        assert allocator.is_used('Custom Name')
+        assert all(allocator.is_used(name) for name in names)
+
+    def test_numbered_names_after_exhaustion(self, space):
+        allocator = PirateNameAllocator(space, rng=random.Random(7))
+        names = [allocator.allocate() for _ in range(14)]
+
+        # 12 indices spell 10 distinct names ('Kraken the Bold', 'Eel the Bold' twice)
+        assert len(set(names)) == 14
+        assert [name.rsplit(' #', 1)[1] for name in names[-4:]] == ['2', '3', '4', '5']
+        assert allocator.get_stats()['fallbacks'] == 4
+
+    def test_walk_order_is_scrambled(self):
+        space = BramblerService.PIRATE_NAME_SPACE
+        allocator = PirateNameAllocator(space, rng=random.Random(3))
+
+        first = [allocator.allocate() for _ in range(3)]
+
+        assert first != [space.name_at(index) for index in range(3)]
+        assert allocator.get_stats()['bitmap_bytes'] == (space.size + 7) // 8
+
+
+class TestServices:
+    """Test the allocator inside the services."""
+
+    def test_brambler_unique_names_do_not_repeat(self):
+        service = BramblerService()
+        with patch.object(BramblerService, '_unique_name_allocator', None), \
+                patch.object(service, '_execute_query', return_value=[('Capitão Trovão o Bravo',)]) as query:
+            names = [service.generate_unique_pirate_name() for _ in range(200)]
+
+        assert len(set(names)) == 200
+        assert 'Capitão Trovão o Bravo' not in names
+        assert query.call_count == 1
+
+    def test_utilities_loads_used_names_once_and_retries_conflicts(self):
+        service = ExpeditionUtilitiesService()
+        inserts = []
+
+        def execute_query(query, params=(), fetch_one=False, fetch_all=False):
+            if 'SELECT id FROM expeditions' in query:
+                return (1,)
+            if query.strip() == 'SELECT pirate_name FROM pirate_names':
+                return [('Bold Kraken',)]
+            if 'INSERT INTO pirate_names' in query:
+                inserts.append(params)
+                if len(inserts) == 1:
+                    return None  # Name taken by a concurrent insert
+                return (len(inserts), params[0], params[1], params[2], params[3], params[4])
+            return None
+
+        with patch.object(service, '_execute_query', side_effect=execute_query) as query:
+            pirates = service.generate_pirate_names(1, ['Ana', 'Bia'])
+
+        assert [p.original_name for p in pirates] == ['Ana', 'Bia']
+        assert len(inserts) == 3
+        assert inserts[0][2] != inserts[1][2]
+        assert 'Bold Kraken' not in {p.pirate_name for p in pirates}
+        assert sum('SELECT 1 FROM pirate_names' in call[0][0] for call in query.call_args_list) == 0
@@ -192,3 +192,39 @@ def paginated_response(
     }
 
     return jsonify(response_data), status_code
+
+
+def cursor_paginated_response(
+    items_key: str,
+    items: list,
+    page: Any,
+    status_code: int = 200,
+    **extra: Any
+) -> Tuple[Response, int]:
+    """
+    Create a standardized keyset-paginated response.
+
+    Args:
+        items_key: Key holding the items (e.g. "products")
+        items: Serialized items for the current page
+        page: KeysetPage the items came from
+        status_code: HTTP status code (default: 200)
+        **extra: Additional top-level fields
+
+    Returns:
+        Tuple of (Response, status_code)
+
+    Example:
+        return cursor_paginated_response(
+            "products",
+            [item.to_dict() for item in page.items],
+            page
+        )
+    """
+    response_data = {
+        items_key: items,
+        "pagination": page.to_pagination_dict(),
+        **extra
+    }
+
+    return jsonify(response_data), status_code
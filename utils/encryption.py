@@ -9,14 +9,20 @@ import base64
 import hashlib
 import secrets
 import logging
-from typing import Dict, Optional, Tuple, List
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple, List, Union
 from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
 from dataclasses import dataclass
 import json
+import struct
+from datetime import datetime
 
 
 logger = logging.getLogger(__name__)
@@ -43,28 +49,363 @@ class DecryptionResult:
     error_message: Optional[str] = None
 
 
+# Prepared AES-GCM objects kept per owner key. Bulk decrypts use one owner key
+# for thousands of records, so a small bound covers the working set.
+CIPHER_CACHE_SIZE = 64
+
+GCM_NONCE_SIZE = 12
+GCM_TAG_SIZE = 16
+
+# Name mapping formats. Version 1 (text columns) is urlsafe base64 of
+#   nonce(12) | tag(16) | AES-GCM(JSON {expedition_id, mapping, timestamp}).
+# Version 2 (bytea columns) is
+#   version(1) | nonce(12) | tag(16) | AES-GCM(payload)
+# with a packed payload:
+#   expedition_id (uint32) | unix time (int64) | pair count (uint16) |
+#   original, pirate, original, pirate, ... each as length (uint16) | UTF-8
+# When a version 2 value is read back as text (brambler_ciphertext() in SQL)
+# it is V2_TEXT_PREFIX + urlsafe base64, which version 1 text never starts with.
+MAPPING_FORMAT_V2 = 0x02
+V2_TEXT_PREFIX = '~'
+_V2_HEADER = struct.Struct('>IqH')
+_V2_LENGTH = struct.Struct('>H')
+
+CiphertextValue = Union[str, bytes, bytearray, memoryview]
+
+# Derived user master keys. Derivation is deterministic per chat_id, so the
+# memo only bounds how long a key stays in memory.
+MASTER_KEY_CACHE_TTL = 3600  # seconds
+MASTER_KEY_CACHE_SIZE = 1024
+
+
+def _zeroize(buffer: bytearray) -> None:
+    """Overwrite a key buffer in place."""
+    for index in range(len(buffer)):
+        buffer[index] = 0
+
+
+class _CipherEntry:
+    """A prepared AESGCM and the key buffer it was built from."""
+
+    __slots__ = ('cipher', 'key', 'leases', 'evicted')
+
+    def __init__(self, key: bytearray):
+        self.key = key
+        # AESGCM keeps a reference to the buffer, so zeroizing it wipes the key
+        self.cipher = AESGCM(key)
+        self.leases = 0
+        self.evicted = False
+
+
+class CipherCache:
+    """
+    Thread-safe LRU of owner key -> prepared AESGCM.
+
+    Entries are keyed by the SHA-256 of the owner key, so raw keys are never
+    stored as dictionary keys. The parsed key buffer is zeroized when its entry
+    is evicted or cleared; an entry evicted while another thread is still using
+    it is zeroized when that thread releases it.
+    """
+
+    def __init__(self, max_size: int = CIPHER_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, _CipherEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def lease(self, owner_key: str) -> Iterator[AESGCM]:
+        """
+        Borrow the prepared cipher for an owner key, parsing the key on a miss.
+
+        Args:
+            owner_key: Base64-encoded owner key
+
+        Raises:
+            EncryptionError: If the owner key is malformed
+        """
+        digest = hashlib.sha256(owner_key.encode('utf-8')).digest()
+
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                entry.leases += 1
+
+        if entry is None:
+            # Parse outside the lock; a racing thread may insert the same key first
+            new_entry = _CipherEntry(_parse_owner_key(owner_key))
+            with self._lock:
+                entry = self._entries.get(digest)
+                if entry is None:
+                    entry = new_entry
+                    self._entries[digest] = entry
+                    self.misses += 1
+                    self._evict_overflow()
+                else:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                entry.leases += 1
+            if entry is not new_entry:
+                _zeroize(new_entry.key)
+
+        try:
+            yield entry.cipher
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                if entry.evicted and entry.leases == 0:
+                    _zeroize(entry.key)
+
+    def _evict_overflow(self) -> None:
+        """Drop least recently used entries beyond max_size. Caller holds the lock."""
+        while len(self._entries) > self.max_size:
+            _, entry = self._entries.popitem(last=False)
+            self._retire(entry)
+            self.evictions += 1
+
+    @staticmethod
+    def _retire(entry: _CipherEntry) -> None:
+        """Zeroize an entry now, or when its last lease is released. Caller holds the lock."""
+        entry.evicted = True
+        if entry.leases == 0:
+            _zeroize(entry.key)
+
+    def clear(self) -> None:
+        """Drop and zeroize every entry."""
+        with self._lock:
+            for entry in self._entries.values():
+                self._retire(entry)
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class MasterKeyCache:
+    """
+    Thread-safe TTL memo of owner_chat_id -> derived master key.
+
+    Also times derivations, so every avoided one can be reported as time saved
+    (avoided derivations x mean measured derivation time).
+    """
+
+    def __init__(self, ttl_seconds: float = MASTER_KEY_CACHE_TTL, max_size: int = MASTER_KEY_CACHE_SIZE,
+                 clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._clock = clock
+        self._entries: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.derivations = 0
+        self.derivation_seconds = 0.0
+        self.avoided_derivations = 0
+
+    def get(self, owner_chat_id: int) -> Optional[str]:
+        """
+        Get a memoized master key.
+
+        Args:
+            owner_chat_id: Owner's Telegram chat ID
+
+        Returns:
+            Master key, or None if absent or expired
+        """
+        with self._lock:
+            entry = self._entries.get(owner_chat_id)
+            if entry is not None and entry[1] <= self._clock():
+                del self._entries[owner_chat_id]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(owner_chat_id)
+            self.hits += 1
+            self.avoided_derivations += 1
+            return entry[0]
+
+    def put(self, owner_chat_id: int, master_key: str) -> None:
+        """Memoize a master key for ttl_seconds."""
+        with self._lock:
+            self._entries[owner_chat_id] = (master_key, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(owner_chat_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def record_derivation(self, seconds: float) -> None:
+        """Record the cost of one PBKDF2 derivation."""
+        with self._lock:
+            self.derivations += 1
+            self.derivation_seconds += seconds
+
+    def record_avoided(self) -> None:
+        """Record a derivation avoided outside the memo (e.g. a stored key)."""
+        with self._lock:
+            self.avoided_derivations += 1
+
+    def invalidate(self, owner_chat_id: Optional[int] = None) -> None:
+        """Forget one owner's key, or all keys."""
+        with self._lock:
+            if owner_chat_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(owner_chat_id, None)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get memo statistics, including estimated time saved."""
+        with self._lock:
+            mean = self.derivation_seconds / self.derivations if self.derivations else 0.0
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expirations': self.expirations,
+                'derivations': self.derivations,
+                'mean_derivation_ms': round(mean * 1000, 2),
+                'avoided_derivations': self.avoided_derivations,
+                'time_saved_seconds': round(self.avoided_derivations * mean, 3)
+            }
+
+
+def _pack_mapping_v2(expedition_id: int, name_mapping: Dict[str, str], timestamp: int) -> bytes:
+    """Pack a name mapping into the version 2 payload."""
+    parts = [_V2_HEADER.pack(expedition_id, timestamp, len(name_mapping))]
+    for text in (text for pair in name_mapping.items() for text in pair):
+        encoded = str(text).encode('utf-8')
+        if len(encoded) > 0xFFFF:
+            raise EncryptionError("Name too long for version 2 format")
+        parts.append(_V2_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+
+def _unpack_mapping_v2(payload: bytes) -> Dict:
+    """Unpack a version 2 payload into the version 1 dictionary shape."""
+    try:
+        expedition_id, timestamp, count = _V2_HEADER.unpack_from(payload)
+        offset = _V2_HEADER.size
+        texts = []
+        for _ in range(count * 2):
+            (length,) = _V2_LENGTH.unpack_from(payload, offset)
+            offset += _V2_LENGTH.size
+            if offset + length > len(payload):
+                raise EncryptionError("Invalid version 2 payload")
+            texts.append(payload[offset:offset + length].decode('utf-8'))
+            offset += length
+    except (struct.error, UnicodeDecodeError) as e:
+        raise EncryptionError("Invalid version 2 payload") from e
+    if offset != len(payload):
+        raise EncryptionError("Invalid version 2 payload")
+    return {
+        'expedition_id': expedition_id,
+        'mapping': dict(zip(texts[0::2], texts[1::2])),
+        'timestamp': datetime.fromtimestamp(timestamp).isoformat()
+    }
+
+
+def ciphertext_to_text(value: CiphertextValue) -> str:
+    """
+    Render a stored name mapping as text (for API responses and text columns).
+
+    Args:
+        value: Version 1 text or version 2 bytes
+
+    Returns:
+        Version 1 text unchanged, or V2_TEXT_PREFIX + urlsafe base64
+    """
+    if isinstance(value, str):
+        return value
+    return V2_TEXT_PREFIX + base64.urlsafe_b64encode(bytes(value)).decode('ascii')
+
+
+def is_ciphertext_v2(value: CiphertextValue) -> bool:
+    """Check whether a stored name mapping uses the binary version 2 format."""
+    if isinstance(value, str):
+        return value.startswith(V2_TEXT_PREFIX)
+    return bool(value) and value[0] == MAPPING_FORMAT_V2
+
+
+def _parse_owner_key(owner_key: str) -> bytearray:
+    """
+    Extract the AES key from an owner key (32 bytes salt + 32 bytes key).
+
+    Args:
+        owner_key: Base64-encoded owner key
+
+    Returns:
+        Mutable buffer with the 256-bit key
+
+    Raises:
+        EncryptionError: If the owner key is malformed
+    """
+    try:
+        key_data = bytearray(base64.urlsafe_b64decode(owner_key.encode('utf-8')))
+    except Exception as e:
+        raise EncryptionError(f"Invalid owner key: {str(e)}")
+
+    try:
+        if len(key_data) < 64:
+            raise EncryptionError("Invalid owner key: Invalid owner key format")
+        return key_data[32:64]
+    finally:
+        _zeroize(key_data)
+
+
 class ExpeditionEncryption:
     """
     Secure encryption service for expedition name mapping.
     Uses AES-256-GCM for authenticated encryption.
     """
 
-    def __init__(self):
+    def __init__(self, cipher_cache_size: int = CIPHER_CACHE_SIZE,
+                 master_key_cache: Optional[MasterKeyCache] = None):
         self.logger = logging.getLogger(__name__)
         self._backend = default_backend()
+        self._ciphers = CipherCache(cipher_cache_size)
+        self.master_keys = master_key_cache or MasterKeyCache()
+        self._counter_lock = threading.Lock()
+        self._encrypt_count = 0
+        self._decrypt_count = 0
+        self._decrypt_failures = 0
 
     def generate_user_master_key(self, owner_chat_id: int) -> str:
         """
         Generate a SINGLE master key for a user (based on chat_id).
         This key will be used for ALL expeditions owned by this user.
 
+        The derivation is deterministic, so results are memoized in
+        ``self.master_keys``; see MasterKeyService for the persisted copy.
+
         Args:
             owner_chat_id: Owner's Telegram chat ID
 
         Returns:
             Base64-encoded master key (consistent for this user)
         """
+        cached = self.master_keys.get(owner_chat_id)
+        if cached is not None:
+            return cached
+
         try:
+            start_time = time.perf_counter()
+
             # Create a deterministic seed from the user's chat_id
             # Using a fixed secret to ensure the same chat_id always produces the same key
             seed_data = f"user_master_key_v1_{owner_chat_id}"
@@ -90,6 +431,9 @@ class ExpeditionEncryption:
             key_data = salt + key
             encoded_key = base64.urlsafe_b64encode(key_data).decode('utf-8')
 
+            self.master_keys.record_derivation(time.perf_counter() - start_time)
+            self.master_keys.put(owner_chat_id, encoded_key)
+
             self.logger.info(f"Generated user master key for chat_id {owner_chat_id}")
             return encoded_key
 
@@ -145,125 +489,246 @@ class ExpeditionEncryption:
             self.logger.error(f"Failed to generate owner key: {e}", exc_info=True)
             raise EncryptionError(f"Key generation failed: {str(e)}")
 
-    def _derive_key_from_owner_key(self, owner_key: str) -> Tuple[bytes, bytes]:
+    def encrypt_name_mapping(self, expedition_id: int, name_mapping: Dict[str, str], owner_key: str) -> str:
         """
-        Derive encryption key and salt from owner key.
+        Encrypt name mapping dictionary with owner key.
 
         Args:
-            owner_key: Base64-encoded owner key
+            expedition_id: Expedition identifier
+            name_mapping: Dictionary mapping original names to pirate names
+            owner_key: Owner's encryption key
 
         Returns:
-            Tuple of (key, salt)
+            Base64-encoded encrypted mapping
         """
         try:
-            key_data = base64.urlsafe_b64decode(owner_key.encode('utf-8'))
+            # Prepare data for encryption
+            mapping_data = {
+                'expedition_id': expedition_id,
+                'mapping': name_mapping,
+                'timestamp': __import__('datetime').datetime.now().isoformat()
+            }
+
+            plaintext = json.dumps(mapping_data, sort_keys=True).encode('utf-8')
 
-            if len(key_data) < 64:  # 32 bytes salt + 32 bytes key
-                raise EncryptionError("Invalid owner key format")
+            # Generate random nonce for GCM
+            nonce = os.urandom(GCM_NONCE_SIZE)  # 96-bit nonce for GCM
 
-            salt = key_data[:32]
-            key = key_data[32:64]
+            # AESGCM returns ciphertext + tag
+            with self._ciphers.lease(owner_key) as cipher:
+                sealed = cipher.encrypt(nonce, plaintext, None)
 
-            return key, salt
+            # Stored layout: nonce, tag, ciphertext
+            encrypted_data = nonce + sealed[-GCM_TAG_SIZE:] + sealed[:-GCM_TAG_SIZE]
+
+            # Encode for storage
+            encoded_data = base64.urlsafe_b64encode(encrypted_data).decode('utf-8')
+
+            with self._counter_lock:
+                self._encrypt_count += 1
+            self.logger.debug(f"Encrypted name mapping for expedition {expedition_id}")
+            return encoded_data
 
         except Exception as e:
-            raise EncryptionError(f"Invalid owner key: {str(e)}")
+            self.logger.error(f"Encryption failed: {e}", exc_info=True)
+            raise EncryptionError(f"Encryption failed: {str(e)}")
 
-    def encrypt_name_mapping(self, expedition_id: int, name_mapping: Dict[str, str], owner_key: str) -> str:
+    def encrypt_name_mapping_v2(self, expedition_id: int, name_mapping: Dict[str, str], owner_key: str,
+                                timestamp: Optional[int] = None) -> bytes:
         """
-        Encrypt name mapping dictionary with owner key.
+        Encrypt name mapping dictionary in the binary version 2 format.
 
         Args:
             expedition_id: Expedition identifier
             name_mapping: Dictionary mapping original names to pirate names
             owner_key: Owner's encryption key
+            timestamp: Unix time to record (default: now)
 
         Returns:
-            Base64-encoded encrypted mapping
+            Raw bytes for a bytea column
         """
         try:
-            # Derive encryption key
-            key, salt = self._derive_key_from_owner_key(owner_key)
+            payload = _pack_mapping_v2(expedition_id, name_mapping,
+                                       int(time.time()) if timestamp is None else timestamp)
+            nonce = os.urandom(GCM_NONCE_SIZE)
 
-            # Prepare data for encryption
-            mapping_data = {
-                'expedition_id': expedition_id,
-                'mapping': name_mapping,
-                'timestamp': __import__('datetime').datetime.now().isoformat()
-            }
+            with self._ciphers.lease(owner_key) as cipher:
+                sealed = cipher.encrypt(nonce, payload, None)
 
-            plaintext = json.dumps(mapping_data, sort_keys=True).encode('utf-8')
+            with self._counter_lock:
+                self._encrypt_count += 1
+            return bytes([MAPPING_FORMAT_V2]) + nonce + sealed[-GCM_TAG_SIZE:] + sealed[:-GCM_TAG_SIZE]
 
-            # Generate random nonce for GCM
-            nonce = os.urandom(12)  # 96-bit nonce for GCM
+        except Exception as e:
+            self.logger.error(f"Encryption failed: {e}", exc_info=True)
+            raise EncryptionError(f"Encryption failed: {str(e)}")
+
+    def encrypt_name_mappings_v2(self, expedition_id: int, name_mappings: List[Dict[str, str]], owner_key: str,
+                                 timestamp: Optional[int] = None) -> List[bytes]:
+        """
+        Encrypt many name mappings of one expedition in the binary version 2 format.
 
-            # Create cipher with AES-GCM mode
-            cipher = Cipher(algorithms.AES(key), modes.GCM(nonce), backend=self._backend)
-            encryptor = cipher.encryptor()
+        The owner's cipher is leased once for the whole batch and every value
+        records the same timestamp.
 
-            # Encrypt data
-            ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+        Args:
+            expedition_id: Expedition identifier
+            name_mappings: Name mapping dictionaries to encrypt
+            owner_key: Owner's encryption key
+            timestamp: Unix time to record (default: now)
 
-            # Combine nonce, tag, and ciphertext
-            encrypted_data = nonce + encryptor.tag + ciphertext
+        Returns:
+            Raw bytes for a bytea column, one per mapping, in order
+        """
+        try:
+            timestamp = int(time.time()) if timestamp is None else timestamp
+            header = bytes([MAPPING_FORMAT_V2])
+            encrypted = []
 
-            # Encode for storage
-            encoded_data = base64.urlsafe_b64encode(encrypted_data).decode('utf-8')
+            with self._ciphers.lease(owner_key) as cipher:
+                for name_mapping in name_mappings:
+                    nonce = os.urandom(GCM_NONCE_SIZE)
+                    sealed = cipher.encrypt(nonce, _pack_mapping_v2(expedition_id, name_mapping, timestamp), None)
+                    encrypted.append(header + nonce + sealed[-GCM_TAG_SIZE:] + sealed[:-GCM_TAG_SIZE])
 
-            self.logger.info(f"Encrypted name mapping for expedition {expedition_id}")
-            return encoded_data
+            with self._counter_lock:
+                self._encrypt_count += len(encrypted)
+            return encrypted
 
         except Exception as e:
             self.logger.error(f"Encryption failed: {e}", exc_info=True)
             raise EncryptionError(f"Encryption failed: {str(e)}")
 
-    def decrypt_name_mapping(self, encrypted_mapping: str, owner_key: str) -> Optional[Dict[str, str]]:
+    def convert_to_v2(self, encrypted_mapping: str, owner_key: str) -> Optional[bytes]:
         """
-        Decrypt name mapping with owner key.
+        Re-encrypt a version 1 mapping in the version 2 format.
+
+        The expedition ID and timestamp (to the second) are kept.
 
         Args:
-            encrypted_mapping: Base64-encoded encrypted mapping
+            encrypted_mapping: Version 1 base64 text
             owner_key: Owner's encryption key
 
         Returns:
-            Decrypted name mapping dictionary or None if decryption fails
+            Version 2 bytes, or None if the value cannot be decrypted
+        """
+        mapping_data = self.decrypt_name_mapping(encrypted_mapping, owner_key)
+        if mapping_data is None:
+            return None
+        return self.reencrypt_v2(mapping_data, owner_key)
+
+    def reencrypt_v2(self, mapping_data: Dict, owner_key: str) -> bytes:
+        """
+        Encrypt an already decrypted mapping in the version 2 format.
+
+        Args:
+            mapping_data: Dictionary returned by decrypt_name_mapping()
+            owner_key: Owner's encryption key
+
+        Returns:
+            Version 2 bytes
         """
         try:
-            # Derive decryption key
-            key, salt = self._derive_key_from_owner_key(owner_key)
+            timestamp = int(datetime.fromisoformat(mapping_data['timestamp']).timestamp())
+        except (KeyError, TypeError, ValueError):
+            timestamp = int(time.time())
+
+        return self.encrypt_name_mapping_v2(
+            mapping_data['expedition_id'], mapping_data['mapping'], owner_key, timestamp
+        )
+
+    def _open_v1(self, encrypted_data: bytes, owner_key: str) -> Dict:
+        """Decrypt nonce | tag | ciphertext and parse the JSON payload."""
+        if len(encrypted_data) < GCM_NONCE_SIZE + GCM_TAG_SIZE:
+            raise EncryptionError("Invalid encrypted data format")
+
+        # Extract components
+        nonce = encrypted_data[:GCM_NONCE_SIZE]
+        tag = encrypted_data[GCM_NONCE_SIZE:GCM_NONCE_SIZE + GCM_TAG_SIZE]
+        ciphertext = encrypted_data[GCM_NONCE_SIZE + GCM_TAG_SIZE:]
+
+        # AESGCM expects ciphertext + tag and verifies the tag
+        with self._ciphers.lease(owner_key) as cipher:
+            plaintext = cipher.decrypt(nonce, ciphertext + tag, None)
 
-            # Decode encrypted data
-            encrypted_data = base64.urlsafe_b64decode(encrypted_mapping.encode('utf-8'))
+        return json.loads(plaintext.decode('utf-8'))
 
-            if len(encrypted_data) < 28:  # 12 bytes nonce + 16 bytes tag
-                raise EncryptionError("Invalid encrypted data format")
+    def _open_v2(self, encrypted_data: bytes, owner_key: str) -> Dict:
+        """Decrypt version | nonce | tag | ciphertext and unpack the payload."""
+        if len(encrypted_data) < 1 + GCM_NONCE_SIZE + GCM_TAG_SIZE or encrypted_data[0] != MAPPING_FORMAT_V2:
+            raise EncryptionError("Invalid encrypted data format")
 
-            # Extract components
-            nonce = encrypted_data[:12]
-            tag = encrypted_data[12:28]
-            ciphertext = encrypted_data[28:]
+        nonce = encrypted_data[1:1 + GCM_NONCE_SIZE]
+        tag = encrypted_data[1 + GCM_NONCE_SIZE:1 + GCM_NONCE_SIZE + GCM_TAG_SIZE]
+        ciphertext = encrypted_data[1 + GCM_NONCE_SIZE + GCM_TAG_SIZE:]
 
-            # Create cipher with AES-GCM mode
-            cipher = Cipher(algorithms.AES(key), modes.GCM(nonce, tag), backend=self._backend)
-            decryptor = cipher.decryptor()
+        # The version byte only selects the parser; any other parse fails the tag
+        with self._ciphers.lease(owner_key) as cipher:
+            payload = cipher.decrypt(nonce, ciphertext + tag, None)
 
-            # Decrypt data
-            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+        return _unpack_mapping_v2(payload)
 
-            # Parse JSON data
-            mapping_data = json.loads(plaintext.decode('utf-8'))
+    def decrypt_name_mapping(self, encrypted_mapping: CiphertextValue, owner_key: str) -> Optional[Dict[str, str]]:
+        """
+        Decrypt name mapping with owner key.
+
+        Accepts version 1 base64 text (as str or bytes), version 2 bytes
+        (bytea) and version 2 text as rendered by ciphertext_to_text().
+
+        Args:
+            encrypted_mapping: Encrypted mapping in either format
+            owner_key: Owner's encryption key
+
+        Returns:
+            Decrypted name mapping dictionary or None if decryption fails
+        """
+        try:
+            if isinstance(encrypted_mapping, str):
+                if encrypted_mapping.startswith(V2_TEXT_PREFIX):
+                    mapping_data = self._open_v2(base64.urlsafe_b64decode(encrypted_mapping[1:]), owner_key)
+                else:
+                    mapping_data = self._open_v1(base64.urlsafe_b64decode(encrypted_mapping.encode('utf-8')), owner_key)
+            else:
+                encrypted_data = bytes(encrypted_mapping)
+                if is_ciphertext_v2(encrypted_data):
+                    mapping_data = self._open_v2(encrypted_data, owner_key)
+                else:
+                    mapping_data = self._open_v1(base64.urlsafe_b64decode(encrypted_data), owner_key)
 
             # Validate data structure
             if 'mapping' not in mapping_data or 'expedition_id' not in mapping_data:
                 raise EncryptionError("Invalid decrypted data structure")
 
-            self.logger.info(f"Decrypted name mapping for expedition {mapping_data['expedition_id']}")
+            with self._counter_lock:
+                self._decrypt_count += 1
             return mapping_data  # Return full mapping_data, not just the mapping
 
         except Exception as e:
-            self.logger.error(f"Decryption failed: {e}", exc_info=True)
+            # Bulk decrypts hit this once per record with a wrong key; keep it out of INFO logs
+            with self._counter_lock:
+                self._decrypt_failures += 1
+            self.logger.debug(f"Decryption failed: {e}")
             return None
 
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get encrypt/decrypt counters, cipher cache and master key memo statistics.
+
+        Returns:
+            Dictionary with 'operations', 'cipher_cache' and 'master_keys' sections
+        """
+        with self._counter_lock:
+            operations = {
+                'encrypted': self._encrypt_count,
+                'decrypted': self._decrypt_count,
+                'decrypt_failures': self._decrypt_failures
+            }
+        return {
+            'operations': operations,
+            'cipher_cache': self._ciphers.get_stats(),
+            'master_keys': self.master_keys.get_stats()
+        }
+
     def verify_owner_key(self, expedition_id: int, owner_key: str, test_mapping: Dict[str, str]) -> bool:
         """
         Verify owner key by testing encryption/decryption roundtrip.
@@ -416,61 +881,278 @@ class SecureKeyManager:
             return False
 
 
+# BramblerEncryption envelope values (version 2) are laid out as
+#   version(1) | key nonce(12) | wrapped data key(32 + 16) | nonce(12) | ciphertext + tag
+# and the first 61 bytes (the header) are the AAD of the value. Version 1 values
+# are Fernet tokens (version byte 0x80, so their text starts with "gA"), each
+# under its own PBKDF2 salt.
+ENVELOPE_VERSION = 0x02
+LEGACY_FERNET_PREFIX = b'gA'
+ENVELOPE_HEADER_SIZE = 1 + GCM_NONCE_SIZE + 32 + GCM_TAG_SIZE
+_DATA_KEY_WRAP_AAD = b'brambler-data-key'
+
+# Key-encryption keys (one PBKDF2 each) and data keys kept per process
+KEK_CACHE_SIZE = 32
+DATA_KEY_CACHE_SIZE = 256
+
+# Scope used when the caller does not name one (e.g. an expedition)
+DEFAULT_DATA_KEY_SCOPE = 'default'
+
+
+class EnvelopeKeyring:
+    """
+    Session key hierarchy for BramblerEncryption.
+
+    - One key-encryption key (KEK) per (password, salt): PBKDF2 runs once per
+      owner per process instead of once per value
+    - One random data key per (KEK, scope), e.g. per expedition, wrapped by the
+      KEK and carried in the header of every value it encrypts
+    - Unwrapped data keys are cached per (KEK, header), so decrypting many
+      values of one expedition unwraps its key once
+
+    Caches are keyed by SHA-256 digests; passwords are never stored.
+    """
+
+    def __init__(self, max_keks: int = KEK_CACHE_SIZE, max_data_keys: int = DATA_KEY_CACHE_SIZE):
+        self.max_keks = max_keks
+        self.max_data_keys = max_data_keys
+        self.key_manager = SecureKeyManager()
+        self._lock = threading.Lock()
+        self._session_salts: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._keks: "OrderedDict[bytes, AESGCM]" = OrderedDict()
+        self._data_keys: "OrderedDict[Tuple[bytes, str], Tuple[AESGCM, bytes]]" = OrderedDict()
+        self._unwrapped: "OrderedDict[Tuple[bytes, bytes], AESGCM]" = OrderedDict()
+        self.kdf_runs = 0
+        self.data_keys_created = 0
+        self.unwraps = 0
+
+    @staticmethod
+    def _remember(cache: OrderedDict, key, value, max_size: int):
+        """Insert into an LRU unless a racing thread already did. Caller holds the lock."""
+        existing = cache.get(key)
+        if existing is not None:
+            cache.move_to_end(key)
+            return existing
+        cache[key] = value
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _lookup(cache: OrderedDict, key):
+        """LRU get. Caller holds the lock."""
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    def session_salt(self, password: str) -> bytes:
+        """
+        Get the salt new values are encrypted under for a password.
+
+        Args:
+            password: Owner password (expedition key)
+
+        Returns:
+            16-byte salt, random per password per process
+        """
+        digest = hashlib.sha256(password.encode('utf-8')).digest()
+        with self._lock:
+            salt = self._lookup(self._session_salts, digest)
+            if salt is None:
+                salt = self._remember(self._session_salts, digest,
+                                      self.key_manager.generate_salt(), self.max_keks)
+            return salt
+
+    def _kek(self, password: str, salt: bytes) -> Tuple[bytes, AESGCM]:
+        """Get (kek_id, KEK cipher), running PBKDF2 on a miss."""
+        kek_id = hashlib.sha256(salt + password.encode('utf-8')).digest()
+        with self._lock:
+            kek = self._lookup(self._keks, kek_id)
+        if kek is None:
+            # Derive outside the lock; a racing thread may insert the same KEK first
+            derived = AESGCM(self.key_manager.derive_key_from_password(password, salt))
+            with self._lock:
+                self.kdf_runs += 1
+                kek = self._remember(self._keks, kek_id, derived, self.max_keks)
+        return kek_id, kek
+
+    def data_key(self, password: str, salt: bytes, scope: str = DEFAULT_DATA_KEY_SCOPE) -> Tuple[AESGCM, bytes]:
+        """
+        Get the data key for a scope, creating and wrapping it on first use.
+
+        Args:
+            password: Owner password (expedition key)
+            salt: KEK salt
+            scope: Data key scope, e.g. an expedition ID
+
+        Returns:
+            Tuple of (data key cipher, envelope header carrying the wrapped key)
+        """
+        kek_id, kek = self._kek(password, salt)
+        with self._lock:
+            entry = self._lookup(self._data_keys, (kek_id, scope))
+        if entry is None:
+            data_key = AESGCM.generate_key(bit_length=256)
+            key_nonce = os.urandom(GCM_NONCE_SIZE)
+            header = (bytes([ENVELOPE_VERSION]) + key_nonce
+                      + kek.encrypt(key_nonce, data_key, _DATA_KEY_WRAP_AAD))
+            cipher = AESGCM(data_key)
+            with self._lock:
+                entry = self._remember(self._data_keys, (kek_id, scope), (cipher, header), self.max_data_keys)
+                if entry[1] is header:
+                    self.data_keys_created += 1
+                    self._remember(self._unwrapped, (kek_id, header), cipher, self.max_data_keys)
+        return entry
+
+    def unwrap(self, password: str, salt: bytes, header: bytes) -> AESGCM:
+        """
+        Get the data key cipher for an envelope header.
+
+        Args:
+            password: Owner password (expedition key)
+            salt: KEK salt
+            header: Envelope header (version, key nonce, wrapped data key)
+
+        Returns:
+            Data key cipher
+
+        Raises:
+            InvalidTag: If the password or salt do not match the header
+        """
+        kek_id, kek = self._kek(password, salt)
+        with self._lock:
+            cipher = self._lookup(self._unwrapped, (kek_id, header))
+        if cipher is None:
+            key_nonce = header[1:1 + GCM_NONCE_SIZE]
+            data_key = kek.decrypt(key_nonce, header[1 + GCM_NONCE_SIZE:], _DATA_KEY_WRAP_AAD)
+            with self._lock:
+                self.unwraps += 1
+                cipher = self._remember(self._unwrapped, (kek_id, header), AESGCM(data_key),
+                                        self.max_data_keys)
+        return cipher
+
+    def clear(self) -> None:
+        """Drop every cached salt and key."""
+        with self._lock:
+            self._session_salts.clear()
+            self._keks.clear()
+            self._data_keys.clear()
+            self._unwrapped.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get keyring statistics."""
+        with self._lock:
+            return {
+                'keks': len(self._keks),
+                'data_keys': len(self._data_keys),
+                'kdf_runs': self.kdf_runs,
+                'data_keys_created': self.data_keys_created,
+                'unwraps': self.unwraps
+            }
+
+
+_envelope_keyring = None
+
+
+def get_envelope_keyring() -> EnvelopeKeyring:
+    """Get the process-wide envelope keyring."""
+    global _envelope_keyring
+    if _envelope_keyring is None:
+        _envelope_keyring = EnvelopeKeyring()
+    return _envelope_keyring
+
+
 class BramblerEncryption:
     """
     Main encryption service for Brambler name anonymization.
-    Provides AES encryption with PBKDF2 key derivation using Fernet.
+
+    Values are envelope encrypted: AES-GCM under a per-scope data key, which is
+    wrapped by a PBKDF2-derived key-encryption key shared by the session (see
+    EnvelopeKeyring). Legacy Fernet values (one PBKDF2 per value) still decrypt,
+    and migrate_value() rewrites them in the envelope format.
     """
 
-    def __init__(self):
+    def __init__(self, keyring: Optional[EnvelopeKeyring] = None):
         self.key_manager = SecureKeyManager()
+        self.keyring = keyring or get_envelope_keyring()
+
+    def _encrypt_bytes(self, plaintext: bytes, password: str, salt: bytes, scope: str) -> Tuple[bytes, bytes]:
+        """Envelope encrypt. Returns (value, header)."""
+        cipher, header = self.keyring.data_key(password, salt, scope)
+        nonce = os.urandom(GCM_NONCE_SIZE)
+        return header + nonce + cipher.encrypt(nonce, plaintext, header), header
+
+    def _decrypt_bytes(self, value: bytes, salt: bytes, password: str) -> bytes:
+        """Decrypt an envelope or legacy Fernet value."""
+        if not value:
+            raise EncryptionError("Empty ciphertext")
+
+        if value[0] == ENVELOPE_VERSION:
+            if len(value) < ENVELOPE_HEADER_SIZE + GCM_NONCE_SIZE + GCM_TAG_SIZE:
+                raise EncryptionError("Truncated ciphertext")
+            header = value[:ENVELOPE_HEADER_SIZE]
+            nonce = value[ENVELOPE_HEADER_SIZE:ENVELOPE_HEADER_SIZE + GCM_NONCE_SIZE]
+            cipher = self.keyring.unwrap(password, salt, header)
+            return cipher.decrypt(nonce, value[ENVELOPE_HEADER_SIZE + GCM_NONCE_SIZE:], header)
+
+        if value.startswith(LEGACY_FERNET_PREFIX):
+            derived_key = self.key_manager.derive_key_from_password(password, salt)
+            fernet = self.key_manager.generate_fernet_key(derived_key)
+            return fernet.decrypt(value)
+
+        raise EncryptionError(f"Unknown ciphertext version: {value[0]:#04x}")
+
+    @staticmethod
+    def is_legacy_value(encrypted_data: str) -> bool:
+        """
+        Check whether a stored value still uses the per-value PBKDF2 format.
+
+        Args:
+            encrypted_data: Base64 encoded encrypted data
+
+        Returns:
+            True for legacy Fernet values
+        """
+        try:
+            return base64.b64decode(encrypted_data.encode()).startswith(LEGACY_FERNET_PREFIX)
+        except Exception:
+            return False
 
     def encrypt_name_mapping(
         self,
         name_mappings: Dict[str, str],
         password: str,
-        salt: Optional[bytes] = None
+        salt: Optional[bytes] = None,
+        scope: str = DEFAULT_DATA_KEY_SCOPE
     ) -> EncryptionResult:
         """
-        Encrypt name mappings using AES encryption.
+        Encrypt name mappings using envelope encryption.
 
         Args:
             name_mappings: Dictionary of original_name -> pirate_name
             password: Password for encryption (expedition key)
-            salt: Optional salt (generated if not provided)
+            salt: Optional KEK salt (the session salt for the password if not provided)
+            scope: Data key scope, e.g. the expedition ID
 
         Returns:
-            EncryptionResult with encrypted data and metadata
+            EncryptionResult with encrypted data, salt and data key ID
         """
         try:
-            # Generate salt if not provided
             if salt is None:
-                salt = self.key_manager.generate_salt()
-
-            # Derive key from password
-            derived_key = self.key_manager.derive_key_from_password(password, salt)
+                salt = self.keyring.session_salt(password)
 
-            # Create Fernet cipher
-            fernet = self.key_manager.generate_fernet_key(derived_key)
-
-            # Serialize name mappings to JSON
             json_data = json.dumps(name_mappings, ensure_ascii=False)
+            encrypted_data, header = self._encrypt_bytes(json_data.encode('utf-8'), password, salt, str(scope))
 
-            # Encrypt the data
-            encrypted_data = fernet.encrypt(json_data.encode('utf-8'))
-
-            # Encode for storage
-            encrypted_b64 = base64.b64encode(encrypted_data).decode()
-            salt_b64 = base64.b64encode(salt).decode()
-
-            # Generate key ID for tracking
-            key_id = secrets.token_hex(8)
+            # Identifies the data key, not the value
+            key_id = hashlib.sha256(header).hexdigest()[:16]
 
-            logger.info(f"Successfully encrypted name mappings with key ID: {key_id}")
+            logger.debug(f"Encrypted name mappings with key ID: {key_id}")
 
             return EncryptionResult(
-                encrypted_data=encrypted_b64,
-                salt=salt_b64,
+                encrypted_data=base64.b64encode(encrypted_data).decode(),
+                salt=base64.b64encode(salt).decode(),
                 key_id=key_id
             )
 
@@ -485,7 +1167,7 @@ class BramblerEncryption:
         password: str
     ) -> DecryptionResult:
         """
-        Decrypt name mappings.
+        Decrypt name mappings (envelope or legacy format).
 
         Args:
             encrypted_data: Base64 encoded encrypted data
@@ -496,24 +1178,13 @@ class BramblerEncryption:
             DecryptionResult with decrypted mappings
         """
         try:
-            # Decode from base64
             encrypted_bytes = base64.b64decode(encrypted_data.encode())
             salt_bytes = base64.b64decode(salt.encode())
 
-            # Derive key from password
-            derived_key = self.key_manager.derive_key_from_password(password, salt_bytes)
-
-            # Create Fernet cipher
-            fernet = self.key_manager.generate_fernet_key(derived_key)
-
-            # Decrypt the data
-            decrypted_bytes = fernet.decrypt(encrypted_bytes)
-
-            # Parse JSON
-            json_data = decrypted_bytes.decode('utf-8')
-            name_mappings = json.loads(json_data)
+            decrypted_bytes = self._decrypt_bytes(encrypted_bytes, salt_bytes, password)
+            name_mappings = json.loads(decrypted_bytes.decode('utf-8'))
 
-            logger.info("Successfully decrypted name mappings")
+            logger.debug("Decrypted name mappings")
 
             return DecryptionResult(
                 decrypted_data=name_mappings,
@@ -525,26 +1196,25 @@ class BramblerEncryption:
             return DecryptionResult(
                 decrypted_data={},
                 success=False,
-                error_message=str(e)
+                error_message=str(e) or type(e).__name__
             )
 
-    def encrypt_single_value(self, value: str, password: str) -> Tuple[str, str]:
+    def encrypt_single_value(self, value: str, password: str,
+                             scope: str = DEFAULT_DATA_KEY_SCOPE) -> Tuple[str, str]:
         """
         Encrypt a single string value.
 
         Args:
             value: String to encrypt
             password: Encryption password
+            scope: Data key scope, e.g. the expedition ID
 
         Returns:
             Tuple of (encrypted_data, salt) both base64 encoded
         """
         try:
-            salt = self.key_manager.generate_salt()
-            derived_key = self.key_manager.derive_key_from_password(password, salt)
-            fernet = self.key_manager.generate_fernet_key(derived_key)
-
-            encrypted_data = fernet.encrypt(value.encode('utf-8'))
+            salt = self.keyring.session_salt(password)
+            encrypted_data, _ = self._encrypt_bytes(value.encode('utf-8'), password, salt, str(scope))
 
             return (
                 base64.b64encode(encrypted_data).decode(),
@@ -557,7 +1227,7 @@ class BramblerEncryption:
 
     def decrypt_single_value(self, encrypted_data: str, salt: str, password: str) -> str:
         """
-        Decrypt a single string value.
+        Decrypt a single string value (envelope or legacy format).
 
         Args:
             encrypted_data: Base64 encoded encrypted data
@@ -571,15 +1241,49 @@ class BramblerEncryption:
             encrypted_bytes = base64.b64decode(encrypted_data.encode())
             salt_bytes = base64.b64decode(salt.encode())
 
-            derived_key = self.key_manager.derive_key_from_password(password, salt_bytes)
-            fernet = self.key_manager.generate_fernet_key(derived_key)
-
-            decrypted_bytes = fernet.decrypt(encrypted_bytes)
-            return decrypted_bytes.decode('utf-8')
+            return self._decrypt_bytes(encrypted_bytes, salt_bytes, password).decode('utf-8')
 
         except Exception as e:
             logger.error(f"Failed to decrypt single value: {e}")
-            raise EncryptionError(f"Single value decryption failed: {str(e)}")
+            raise EncryptionError(f"Single value decryption failed: {str(e) or type(e).__name__}")
+
+    def migrate_value(self, encrypted_data: str, salt: str, password: str,
+                      scope: str = DEFAULT_DATA_KEY_SCOPE) -> Tuple[str, str]:
+        """
+        Re-encrypt a legacy value in the envelope format.
+
+        Works for both single values and name mappings; envelope values are
+        returned unchanged. Callers store the returned pair in place of the old one.
+
+        Args:
+            encrypted_data: Base64 encoded encrypted data
+            salt: Base64 encoded salt
+            password: Password the value was encrypted with
+            scope: Data key scope for the new value
+
+        Returns:
+            Tuple of (encrypted_data, salt) both base64 encoded
+
+        Raises:
+            EncryptionError: If the value cannot be decrypted
+        """
+        if not self.is_legacy_value(encrypted_data):
+            return encrypted_data, salt
+
+        try:
+            plaintext = self._decrypt_bytes(base64.b64decode(encrypted_data.encode()),
+                                            base64.b64decode(salt.encode()), password)
+            new_salt = self.keyring.session_salt(password)
+            encrypted_bytes, _ = self._encrypt_bytes(plaintext, password, new_salt, str(scope))
+
+            return (
+                base64.b64encode(encrypted_bytes).decode(),
+                base64.b64encode(new_salt).decode()
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to migrate encrypted value: {e}")
+            raise EncryptionError(f"Value migration failed: {str(e) or type(e).__name__}")
 
 
 # Utility functions for quick operations
@@ -0,0 +1,127 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Cursors are opaque to API clients: they encode the sort-key values of the
+last row of a page as url-safe base64 JSON. Services decode them back into
+the key tuple and continue with `WHERE (k1, k2) > (%s, %s)` instead of
+OFFSET, so deep pages cost the same as the first one.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+    pass
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode sort-key values into an opaque cursor string.
+
+    Datetimes are serialized as ISO strings; decode_cursor callers convert
+    them back with the matching parser.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], expected_length: int) -> Optional[List[Any]]:
+    """
+    Decode an opaque cursor into its sort-key values.
+
+    Args:
+        cursor: Cursor string from a previous page (None/empty for first page)
+        expected_length: Number of sort-key values the cursor must contain
+
+    Returns:
+        List of sort-key values, or None for the first page
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {e}")
+
+    if not isinstance(values, list) or len(values) != expected_length:
+        raise InvalidCursorError("Invalid cursor: unexpected shape")
+
+    return values
+
+
+def parse_cursor_datetime(value: Any) -> datetime:
+    """Parse a datetime value stored in a cursor."""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursorError(f"Invalid cursor timestamp: {e}")
+
+
+def clamp_page_size(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE,
+                    maximum: int = MAX_PAGE_SIZE) -> int:
+    """Clamp a requested page size into [1, maximum]."""
+    if limit is None:
+        return default
+    return max(1, min(int(limit), maximum))
+
+
+@dataclass
+class KeysetPage:
+    """One page of keyset-paginated results."""
+    items: List[Any]
+    limit: int
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Any], limit: int,
+                  cursor_key: Callable[[Any], Sequence[Any]],
+                  convert: Optional[Callable[[Any], Any]] = None) -> 'KeysetPage':
+        """
+        Build a page from `limit + 1` fetched rows.
+
+        The extra row only signals that another page exists; it is dropped
+        and the cursor is taken from the last row actually returned.
+
+        Args:
+            rows: Rows fetched with LIMIT limit + 1
+            limit: Page size
+            cursor_key: Returns the sort-key values of a raw row
+            convert: Optional row -> item conversion
+        """
+        rows = list(rows or [])
+        has_more = len(rows) > limit
+        page_rows = rows[:limit]
+
+        next_cursor = None
+        if has_more and page_rows:
+            next_cursor = encode_cursor(*cursor_key(page_rows[-1]))
+
+        items = [convert(row) for row in page_rows] if convert else page_rows
+        return cls(items=items, limit=limit, next_cursor=next_cursor)
+
+    def to_pagination_dict(self) -> Dict[str, Any]:
+        """Pagination envelope shared by all keyset-paginated endpoints."""
+        return {
+            "limit": self.limit,
+            "count": len(self.items),
+            "next_cursor": self.next_cursor,
+            "has_more": self.has_more
+        }
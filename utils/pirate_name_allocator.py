@@ -0,0 +1,270 @@
+"""
+Pirate name allocation.
+
+Pirate names are built from component lists (adjectives, names, titles...)
+and a set of patterns. PirateNameSpace numbers every name the patterns can
+produce; PirateNameAllocator walks that numbering as a pseudo-random
+permutation and skips taken names with a bitmap, so allocating is O(1)
+amortized and never queries the database. Once the space is exhausted it
+hands out numbered names ("<name> #2", "<name> #3", ...).
+
+Uniqueness across processes stays with the database: callers insert under a
+unique index and, on conflict, mark the name used and allocate again.
+"""
+
+import bisect
+import math
+import random
+import re
+import string
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+class PirateNameSpace:
+    """
+    Numbering of every name a set of patterns can produce.
+
+    Each pattern is a format string over component names, e.g.
+    "{adjective} {name} {title}". Index i belongs to the pattern whose block
+    contains it, and the offset inside the block is a mixed-radix number over
+    the pattern's components.
+    """
+
+    def __init__(self, patterns: Sequence[str], components: Dict[str, Sequence[str]]):
+        """
+        Args:
+            patterns: Format strings over component names
+            components: Component name -> list of values
+        """
+        self.patterns = list(patterns)
+        self.components = {key: list(values) for key, values in components.items()}
+        self._fields = []
+        self._offsets = []
+
+        size = 0
+        for pattern in self.patterns:
+            fields = [field for _, field, _, _ in string.Formatter().parse(pattern) if field]
+            if len(set(fields)) != len(fields):
+                raise ValueError(f"Pattern repeats a component: {pattern}")
+            self._fields.append(fields)
+            self._offsets.append(size)
+            size += math.prod(len(self.components[field]) for field in fields)
+        self.size = size
+
+        self._matchers = None
+        self._positions = None
+
+    def name_at(self, index: int) -> str:
+        """
+        Build the name with the given index.
+
+        Args:
+            index: Position in the space (0 <= index < size)
+
+        Returns:
+            Pirate name
+        """
+        pattern_index = bisect.bisect_right(self._offsets, index) - 1
+        local = index - self._offsets[pattern_index]
+        values = {}
+        for field in reversed(self._fields[pattern_index]):
+            choices = self.components[field]
+            local, position = divmod(local, len(choices))
+            values[field] = choices[position]
+        return self.patterns[pattern_index].format(**values)
+
+    def indices_of(self, name: str) -> List[int]:
+        """
+        Find every index that produces a name.
+
+        Different patterns can produce the same text, so a name may have
+        several indices; names outside the space have none.
+
+        Args:
+            name: Pirate name
+
+        Returns:
+            List of indices
+        """
+        if self._matchers is None:
+            self._build_matchers()
+
+        indices = []
+        for pattern_index, (matcher, min_length, max_length) in enumerate(self._matchers):
+            if not min_length <= len(name) <= max_length:
+                continue
+            match = matcher.fullmatch(name)
+            if not match:
+                continue
+            local = 0
+            for field in self._fields[pattern_index]:
+                local = local * len(self.components[field]) + self._positions[field][match.group(field)]
+            indices.append(self._offsets[pattern_index] + local)
+        return indices
+
+    def _build_matchers(self):
+        """Compile one regex per pattern (with its length bounds) for reverse lookups."""
+        self._positions = {
+            field: {value: position for position, value in enumerate(values)}
+            for field, values in self.components.items()
+        }
+        alternations = {
+            field: '|'.join(re.escape(value) for value in sorted(values, key=len, reverse=True))
+            for field, values in self.components.items()
+        }
+        lengths = {field: [len(value) for value in values] for field, values in self.components.items()}
+
+        matchers = []
+        for pattern in self.patterns:
+            parsed = list(string.Formatter().parse(pattern))
+            regex = ''.join(
+                re.escape(literal) + (f'(?P<{field}>{alternations[field]})' if field else '')
+                for literal, field, _, _ in parsed
+            )
+            literal_length = sum(len(literal) for literal, _, _, _ in parsed)
+            fields = [field for _, field, _, _ in parsed if field]
+            matchers.append((
+                re.compile(regex),
+                literal_length + sum(min(lengths[field]) for field in fields),
+                literal_length + sum(max(lengths[field]) for field in fields)
+            ))
+        self._matchers = matchers
+
+
+class PirateNameAllocator:
+    """
+    Hands out unused names from a PirateNameSpace.
+
+    Taken names are one bit each. Positions 0, 1, 2... of the walk map to
+    (start + step * k) mod size with step coprime to size, which visits every
+    index exactly once in a scrambled order, so consecutive names look
+    unrelated. Names outside the space (custom and numbered names) are kept
+    in a set.
+    """
+
+    def __init__(self, space: PirateNameSpace, used_names: Iterable[str] = (),
+                 rng: Optional[random.Random] = None):
+        """
+        Args:
+            space: Name space to allocate from
+            used_names: Names already taken
+            rng: Random source for the walk order (default: system random)
+        """
+        self.space = space
+        rng = rng or random.SystemRandom()
+        self._bitmap = bytearray((space.size + 7) // 8)
+        self._used_in_space = 0
+        self._outside = set()
+        self._start = rng.randrange(space.size)
+        self._step = self._coprime_step(space.size, rng)
+        self._position = 0
+        self._fallback_base = space.name_at(self._start)
+        self._fallback_number = 1
+        self._allocated = 0
+        self._fallbacks = 0
+        self._lock = threading.Lock()
+
+        for name in used_names:
+            self.mark_used(name)
+
+    @staticmethod
+    def _coprime_step(size: int, rng: random.Random) -> int:
+        """Pick a step that makes the walk a permutation of range(size)."""
+        if size <= 2:
+            return 1
+        while True:
+            step = rng.randrange(1, size)
+            if math.gcd(step, size) == 1:
+                return step
+
+    def _test_and_set(self, index: int) -> bool:
+        """Mark an index used; returns True if it was free."""
+        byte, bit = divmod(index, 8)
+        mask = 1 << bit
+        if self._bitmap[byte] & mask:
+            return False
+        self._bitmap[byte] |= mask
+        self._used_in_space += 1
+        return True
+
+    def mark_used(self, name: str) -> None:
+        """
+        Record a name as taken (loaded from the database or lost to a conflict).
+
+        Args:
+            name: Pirate name
+        """
+        with self._lock:
+            indices = self.space.indices_of(name)
+            for index in indices:
+                self._test_and_set(index)
+            if not indices:
+                self._outside.add(name)
+
+    def is_used(self, name: str) -> bool:
+        """
+        Check whether a name is taken.
+
+        Args:
+            name: Pirate name
+
+        Returns:
+            True if the name was marked used or allocated
+        """
+        with self._lock:
+            indices = self.space.indices_of(name)
+            if not indices:
+                return name in self._outside
+            return any(self._bitmap[index // 8] & (1 << (index % 8)) for index in indices)
+
+    def allocate(self) -> str:
+        """
+        Take the next unused name.
+
+        Returns:
+            Pirate name not handed out or marked used before
+        """
+        with self._lock:
+            while self._position < self.space.size:
+                index = (self._start + self._step * self._position) % self.space.size
+                self._position += 1
+                if not self._test_and_set(index):
+                    continue
+                name = self.space.name_at(index)
+                # Another pattern may spell the same name; it must be free too
+                aliases = [alias for alias in self.space.indices_of(name) if alias != index]
+                if all([self._test_and_set(alias) for alias in aliases]):
+                    self._allocated += 1
+                    return name
+
+            while True:
+                self._fallback_number += 1
+                name = f"{self._fallback_base} #{self._fallback_number}"
+                if name not in self._outside:
+                    self._outside.add(name)
+                    self._allocated += 1
+                    self._fallbacks += 1
+                    return name
+
+    @property
+    def remaining(self) -> int:
+        """Unused names left in the space before numbered names are used."""
+        return self.space.size - self._used_in_space
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get allocator statistics.
+
+        Returns:
+            Dictionary with space size, used and remaining names, allocations,
+            numbered fallbacks and bitmap size
+        """
+        return {
+            'space_size': self.space.size,
+            'used': self._used_in_space,
+            'remaining': self.remaining,
+            'allocated': self._allocated,
+            'fallbacks': self._fallbacks,
+            'bitmap_bytes': len(self._bitmap)
+        }
@@ -404,6 +404,19 @@ class QueryBuilder:
         return f'"{clean_identifier}"'
 
 
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE/ILIKE wildcards so user input only matches literally.
+
+    Args:
+        value: Raw search text
+
+    Returns:
+        Text with backslash, % and _ escaped for the default LIKE escape character
+    """
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
 # Global query builder instance
 _query_builder = QueryBuilder()
 